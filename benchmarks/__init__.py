@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks do sistema FactorySense.
+
+Execute a partir da raiz do projeto, por exemplo:
+    python -m benchmarks.memory
+"""
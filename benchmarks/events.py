@@ -0,0 +1,78 @@
+"""
+Benchmark do barramento de eventos: latência do cadastro com assinantes lentos.
+
+Mede register_piece seguido de store_piece, peça a peça: sem barramento,
+com um barramento sem assinantes e com um assinante de todos os eventos
+que leva 1 ms por evento, em cada política de fila cheia. Com
+'drop-oldest' e 'spill' o cadastro não espera o assinante; com 'block'
+(medido com menos peças) cada cadastro passa a custar o tempo do assinante
+assim que a fila enche.
+
+Uso:
+    python -m benchmarks.events [quantidade]
+"""
+
+import sys
+import time
+from array import array
+
+from src.events import BLOCK, DROP_OLDEST, SPILL, EventBus
+from src.services.quality_service import QualityService
+from src.services.storage_service import StorageService
+
+from .synthetic import SyntheticPieces
+
+
+def _slow_subscriber(event) -> None:
+    time.sleep(0.001)
+
+
+def _latencies(readings, bus=None) -> array:
+    """Latência (s) de cadastro + armazenamento de cada peça."""
+    quality = QualityService(events=bus)
+    storage = StorageService(events=bus)
+    register, store, clock = quality.register_piece, storage.store_piece, time.perf_counter
+    latencies = array("d")
+    for weight, color, length in readings:
+        started = clock()
+        store(register(weight, color, length))
+        latencies.append(clock() - started)
+    return latencies
+
+
+def _percentile(latencies: array, fraction: float) -> float:
+    ordered = sorted(latencies)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def main() -> None:
+    """Compara a latência do cadastro sem barramento e em cada política."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    readings = list(zip(*SyntheticPieces().readings(count)))
+
+    print(f"Peças: {count:,} (assinante de 1 ms/evento, fila de 1024)")
+    print(f"{'situação':<22} {'p50 µs':>8} {'p99 µs':>8} {'máx µs':>9} "
+          f"{'entregues':>10} {'descartados':>12} {'em disco':>9}")
+
+    def report(name, latencies, statistics=None):
+        statistics = statistics or {}
+        print(
+            f"{name:<22} {_percentile(latencies, 0.5) * 1e6:>8.1f} "
+            f"{_percentile(latencies, 0.99) * 1e6:>8.1f} {max(latencies) * 1e6:>9.1f} "
+            f"{statistics.get('delivered', '-'):>10} {statistics.get('dropped', '-'):>12} "
+            f"{statistics.get('on_disk', '-'):>9}"
+        )
+
+    report("sem barramento", _latencies(readings))
+    with EventBus() as bus:
+        report("sem assinantes", _latencies(readings, bus))
+    for policy, pieces in ((DROP_OLDEST, readings), (SPILL, readings), (BLOCK, readings[:2000])):
+        bus = EventBus()
+        subscription = bus.subscribe(_slow_subscriber, policy=policy, name="lento")
+        latencies = _latencies(pieces, bus)
+        report(policy, latencies, subscription.statistics())
+        bus.close(drain=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark de armazenamento paralelo: vazão por número de linhas de embalagem.
+
+Cada thread é uma estação presa a uma linha. Para comparação, o mesmo
+trabalho roda com um StorageService protegido por um único lock global.
+Opcionalmente, cada estação simula o tempo de manuseio da peça (em µs),
+durante o qual o GIL é liberado, como ocorreria com E/S real.
+
+Uso:
+    python -m benchmarks.lanes [peças] [--handling-us 50]
+"""
+
+import argparse
+import threading
+import time
+
+from src.services.lane_storage_service import LaneStorageService
+from src.services.quality_service import QualityService
+from src.services.storage_service import StorageService
+
+
+def _pieces(count: int):
+    quality = QualityService()
+    return quality.register_pieces([100.0] * count, ["azul"] * count, [15.0] * count)
+
+
+def _run(stations: int, pieces, store, handling: float) -> float:
+    """Executa as estações em paralelo e retorna peças por segundo."""
+    def station(number: int) -> None:
+        for piece in pieces[number::stations]:
+            if handling:
+                time.sleep(handling)
+            store(number, piece)
+
+    threads = [threading.Thread(target=station, args=(n,)) for n in range(stations)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(pieces) / (time.perf_counter() - started)
+
+
+def main() -> None:
+    """Compara lock global e lock por linha com 1, 2, 4 e 8 estações."""
+    parser = argparse.ArgumentParser(description="Armazenamento paralelo por linhas")
+    parser.add_argument("count", nargs="?", type=int, default=200_000)
+    parser.add_argument("--handling-us", type=float, default=0.0)
+    args = parser.parse_args()
+
+    pieces = _pieces(args.count)
+    handling = args.handling_us / 1e6
+    print(f"Peças: {args.count}  manuseio: {args.handling_us}µs")
+    print(f"{'estações':>9} {'lock global':>14} {'lock por linha':>15}")
+
+    for stations in (1, 2, 4, 8):
+        single = StorageService()
+        lock = threading.Lock()
+
+        def store_global(_, piece):
+            with lock:
+                single.store_piece(piece)
+
+        lanes = LaneStorageService(lanes=stations)
+
+        def store_lane(number, piece):
+            lanes.store_piece(piece, lane=number)
+
+        global_rate = _run(stations, pieces, store_global, handling)
+        lane_rate = _run(stations, pieces, store_lane, handling)
+        assert lanes.get_total_stored_pieces() == single.get_total_stored_pieces() == len(pieces)
+        print(f"{stations:>9} {global_rate:>12,.0f}/s {lane_rate:>13,.0f}/s")
+
+
+if __name__ == "__main__":
+    main()
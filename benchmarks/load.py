@@ -0,0 +1,126 @@
+"""
+Gerador de carga para o servidor de inspeção.
+
+Abre várias conexões simultâneas, cada uma enviando registros com até
+`window` requisições pendentes, e mede vazão e latência (p50/p99).
+Sem --port, sobe um servidor local em outro processo.
+
+Uso:
+    python -m benchmarks.load [--clients 50] [--requests 2000] [--window 64]
+    python -m benchmarks.load --port 7878
+"""
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import random
+import time
+from collections import deque
+from typing import List
+
+from src.server import InspectionServer
+
+
+def _run_server(connection) -> None:
+    """Processo filho: servidor em memória numa porta livre."""
+
+    async def serve():
+        server = InspectionServer()
+        connection.send(await server.start("127.0.0.1", 0))
+        await server.serve_forever()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+
+
+async def _client(host: str, port: int, requests: int, window: int, seed: int,
+                  latencies: List[float]) -> None:
+    """Uma estação: envia registros e mede a latência de cada resposta."""
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    slots = asyncio.Semaphore(window)
+    sent = deque()
+
+    async def send():
+        for _ in range(requests):
+            await slots.acquire()
+            line = json.dumps({
+                "weight": round(rng.uniform(90, 110), 2),
+                "color": rng.choice(("azul", "verde", "vermelho")),
+                "length": round(rng.uniform(8, 22), 2),
+            })
+            sent.append(time.perf_counter())
+            writer.write(line.encode() + b"\n")
+            await writer.drain()
+
+    async def receive():
+        for _ in range(requests):
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("Servidor encerrou a conexão")
+            latencies.append(time.perf_counter() - sent.popleft())
+            slots.release()
+
+    await asyncio.gather(send(), receive())
+    writer.close()
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def run_load(host: str, port: int, clients: int, requests: int, window: int) -> dict:
+    """Executa a carga e retorna vazão e latências em milissegundos."""
+    latencies: List[float] = []
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, requests, window, seed, latencies) for seed in range(clients)
+    ))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "clients": clients,
+        "requests": len(latencies),
+        "seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+    }
+
+
+def main() -> None:
+    """Lê as opções, sobe o servidor se necessário e imprime o resultado."""
+    parser = argparse.ArgumentParser(description="Carga no servidor de inspeção")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="Servidor existente (padrão: sobe um local)")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=2000, help="Requisições por cliente")
+    parser.add_argument("--window", type=int, default=64, help="Pendentes por cliente")
+    args = parser.parse_args()
+
+    process = None
+    port = args.port
+    if port is None:
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_run_server, args=(child,), daemon=True)
+        process.start()
+        port = parent.recv()
+
+    try:
+        result = asyncio.run(
+            run_load(args.host, port, args.clients, args.requests, args.window)
+        )
+    finally:
+        if process is not None:
+            process.terminate()
+
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
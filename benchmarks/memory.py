@@ -0,0 +1,74 @@
+"""
+Benchmark de memória: bytes por peça em cada forma de armazenamento.
+
+Uso:
+    python -m benchmarks.memory [quantidade]
+"""
+
+import random
+import sys
+import tracemalloc
+from array import array
+
+from src.models.piece import Piece
+from src.models.piece_store import PieceStore
+from src.services.quality_service import QualityService
+
+
+def _readings(count: int, seed: int = 42):
+    """Gera leituras sintéticas em formato colunar."""
+    rng = random.Random(seed)
+    weights = array("d", (rng.uniform(90, 110) for _ in range(count)))
+    colors = [rng.choice(("azul", "verde", "vermelho")) for _ in range(count)]
+    lengths = array("d", (rng.uniform(8, 22) for _ in range(count)))
+    ids = [f"P{number:07d}" for number in range(1, count + 1)]
+    return ids, weights, colors, lengths
+
+
+def _measure(build) -> int:
+    """Mede os bytes retidos pelo objeto construído por build()."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def main(count: int = 200_000) -> None:
+    """Executa o benchmark e imprime bytes por peça."""
+    ids, weights, colors, lengths = _readings(count)
+
+    def piece_objects():
+        return [
+            Piece(piece_id, weight, color, length, "aprovada")
+            for piece_id, weight, color, length in zip(ids, weights, colors, lengths)
+        ]
+
+    def piece_store():
+        store = PieceStore()
+        store.extend(ids, weights, colors, lengths, bytearray(count))
+        return store
+
+    def quality_service():
+        service = QualityService()
+        service.register_pieces(weights, colors, lengths, custom_ids=ids)
+        return service
+
+    print(f"Peças: {count}")
+    for name, build in (
+        ("Piece (objetos com __slots__)", piece_objects),
+        ("PieceStore (colunar)", piece_store),
+        ("QualityService.register_pieces", quality_service),
+    ):
+        total = _measure(build)
+        print(f"  {name:<34} {total / count:8.1f} bytes/peça")
+
+    # IDs são compartilhados entre as medições; informe seu custo à parte
+    id_bytes = sum(sys.getsizeof(piece_id) for piece_id in ids) / count
+    print(f"  (strings de ID, já alocadas: {id_bytes:.1f} bytes/peça)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
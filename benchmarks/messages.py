@@ -0,0 +1,117 @@
+"""
+Benchmark dos motivos de reprovação: texto no cadastro x códigos + texto sob demanda.
+
+Compara, por peça:
+
+- texto no cadastro: monta o motivo de cada reprovada, guarda a string e
+  conta os motivos separando as strings de volta (como um validador que
+  produz texto e estatísticas que o interpretam);
+- códigos: guarda só os bits de falha (um byte por peça) e conta os bits;
+- exibição: monta o texto de uma reprovação com os modelos já memorizados
+  por idioma e, para comparação, montando os modelos a cada vez.
+
+Uso:
+    python -m benchmarks.messages [quantidade]
+"""
+
+import sys
+import time
+import tracemalloc
+from typing import Dict
+
+from src.services.rolling_metrics import count_failures
+from src.validators.messages import LOCALES
+from src.validators.quality_validator import QualityValidator
+
+from .synthetic import SyntheticPieces
+
+
+def _eager(weights, colors, lengths):
+    """Motivo montado e guardado no cadastro; estatísticas lidas das strings."""
+    rules = QualityValidator.rules
+    flags, describe = rules.flags, rules.describe
+    reasons = [
+        describe(flags(weight, color, length), weight, color, length)
+        for weight, color, length in zip(weights, colors, lengths)
+    ]
+    counts: Dict[str, int] = {}
+    for reason in reasons:
+        if reason:
+            for part in reason.split("; "):
+                label = part.split(" (", 1)[0]
+                counts[label] = counts.get(label, 0) + 1
+    return reasons, counts
+
+
+def _structured(weights, colors, lengths):
+    """Bits de falha por peça; estatísticas contadas nos bits."""
+    rules = QualityValidator.rules
+    flags = rules.batch_flags(weights, colors, lengths)
+    labels = rules.labels_for()
+    counts = {
+        labels[rule.bit]: count
+        for rule, count in zip(rules.rules, count_failures(flags)) if count
+    }
+    return flags, counts
+
+
+def _measure(function, *args):
+    """Tempo e memória retida pelo resultado."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+    result = function(*args)
+    elapsed = time.perf_counter() - started
+    retained = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return result, elapsed, retained
+
+
+def main() -> None:
+    """Compara o custo por peça dos dois formatos e o custo de exibição."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    weights, colors, lengths = SyntheticPieces(approval_ratio=0.7).readings(count)
+
+    (_, eager_counts), eager_time, eager_memory = _measure(_eager, weights, colors, lengths)
+    (flags, counts), structured_time, structured_memory = _measure(
+        _structured, weights, colors, lengths
+    )
+    assert counts == eager_counts
+
+    print(f"Peças: {count:,} ({count - flags.count(0):,} reprovadas)")
+    print(f"{'formato':<22} {'ns/peça':>9} {'bytes/peça':>11}")
+    for name, elapsed, memory in (
+        ("texto no cadastro", eager_time, eager_memory),
+        ("códigos (bits)", structured_time, structured_memory),
+    ):
+        print(f"{name:<22} {elapsed / count * 1e9:>9.0f} {memory / count:>11.1f}")
+
+    rules = QualityValidator.rules
+    rejected = [
+        (flag, weight, color, length)
+        for flag, weight, color, length in zip(flags, weights, colors, lengths) if flag
+    ][:50_000]
+    print(f"\nExibição de {len(rejected):,} motivos (ns/motivo):")
+    print(f"{'idioma':<8} {'memorizado':>11} {'sem cache':>10}")
+    for locale in LOCALES:
+        started = time.perf_counter()
+        for flag, weight, color, length in rejected:
+            rules.describe(flag, weight, color, length, locale)
+        cached = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for flag, weight, color, length in rejected:
+            parts = []
+            for rule, value in rules.failures(flag, weight, color, length):
+                prefix, suffix = rule._render_message(locale)
+                parts.append(f"{prefix}{value}{suffix}")
+            "; ".join(parts)
+        uncached = time.perf_counter() - started
+        print(
+            f"{locale:<8} {cached / len(rejected) * 1e9:>11.0f} "
+            f"{uncached / len(rejected) * 1e9:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark das estratégias de empacotamento: caixas usadas e vazão.
+
+As peças têm pesos e comprimentos variados e as caixas, limite de peso e
+de comprimento além da capacidade. Para mostrar o efeito do índice, a
+escolha indexada é comparada com uma varredura linear das caixas abertas
+(a mesma regra de first-fit, sem a árvore de segmentos).
+
+Sem limite de caixas abertas, first-fit e best-fit mantêm abertas todas as
+caixas que ainda têm espaço; a segunda rodada limita as caixas abertas, como
+em uma estação de embalagem real.
+
+Uso:
+    python -m benchmarks.packing [peças] [--max-weight 1000] [--max-open 64]
+"""
+
+import argparse
+import random
+import time
+from typing import Optional
+
+from src.models.piece import Piece
+from src.services.packing import PACKING_STRATEGIES, FirstFitStrategy
+from src.services.storage_service import StorageService
+
+
+class _LinearFirstFit(FirstFitStrategy):
+    """First-fit por varredura das caixas, da mais antiga (referência sem índice)."""
+
+    name = "first-fit (linear)"
+
+    def select(self, piece: Piece, current) -> Optional:
+        for box in self._boxes:
+            if box.fits(piece):
+                return box
+        return None
+
+
+def _pieces(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    return [
+        Piece(f"P{number:07d}", rng.uniform(50, 500), "azul", rng.uniform(5, 30), "aprovada")
+        for number in range(count)
+    ]
+
+
+def _run(strategy, pieces, args, max_open=None) -> dict:
+    storage = StorageService(
+        box_capacity=args.capacity, strategy=strategy,
+        max_weight=args.max_weight, max_length=args.max_length,
+        max_open_boxes=max_open
+    )
+    started = time.perf_counter()
+    stored = storage.store_pieces(pieces)
+    elapsed = time.perf_counter() - started
+    assert stored == len(pieces)
+    result = storage.get_packing_statistics()
+    result["open_boxes"] = storage.get_statistics()["open_boxes"]
+    result["rate"] = len(pieces) / elapsed
+    return result
+
+
+def main() -> None:
+    """Compara as estratégias na mesma sequência de peças."""
+    parser = argparse.ArgumentParser(description="Estratégias de empacotamento")
+    parser.add_argument("count", nargs="?", type=int, default=200_000)
+    parser.add_argument("--capacity", type=int, default=10)
+    parser.add_argument("--max-weight", type=float, default=1000.0)
+    parser.add_argument(
+        "--max-length", type=float, default=90.0,
+        help="Comprimento total máximo por caixa (0 = sem limite)"
+    )
+    parser.add_argument(
+        "--max-open", type=int, default=64,
+        help="Limite de caixas abertas na segunda rodada (padrão: 64)"
+    )
+    parser.add_argument(
+        "--linear-count", type=int, default=20_000,
+        help="Peças para a referência linear (quadrática; padrão: 20000)"
+    )
+    args = parser.parse_args()
+    args.max_length = args.max_length or None
+
+    pieces = _pieces(args.count)
+    print(
+        f"Peças: {args.count:,}  capacidade: {args.capacity}  "
+        f"peso máx.: {args.max_weight}  comprimento máx.: {args.max_length}"
+    )
+    print(
+        f"{'estratégia':<28} {'caixas':>9} {'abertas':>8} {'peças/caixa':>12} "
+        f"{'uso do peso':>12} {'vazão':>14}"
+    )
+
+    runs = [(name, name, pieces, None) for name in PACKING_STRATEGIES]
+    runs += [
+        (f"{name} ≤{args.max_open}", name, pieces, args.max_open)
+        for name in ("first-fit", "best-fit")
+    ]
+    runs.append((_LinearFirstFit.name, _LinearFirstFit(), pieces[:args.linear_count], None))
+    runs.append(("first-fit", "first-fit", pieces[:args.linear_count], None))
+
+    for name, strategy, sample, max_open in runs:
+        result = _run(strategy, sample, args, max_open)
+        label = name if len(sample) == len(pieces) else f"{name} [{len(sample):,}]"
+        print(
+            f"{label:<28} {result['used_boxes']:>9,} {result['open_boxes']:>8,} "
+            f"{result['average_pieces']:>12.2f} {result['weight_utilization']:>11.1f}% "
+            f"{result['rate']:>12,.0f}/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark de recuperação: tempo para reconstruir os serviços a partir do journal.
+
+Uso:
+    python -m benchmarks.recovery [eventos]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from array import array
+
+from src.persistence import open_services
+
+
+def main(events: int = 1_000_000, batch: int = 1000) -> None:
+    """Grava um journal sintético e mede a recuperação."""
+    rng = random.Random(42)
+    directory = tempfile.mkdtemp(prefix="factorysense-")
+
+    quality, storage, journal = open_services(directory, group_size=8192, sync=False)
+    written = 0
+    start = time.perf_counter()
+    while written < events:
+        weights = array("d", (rng.uniform(92, 108) for _ in range(batch)))
+        colors = [rng.choice(("azul", "verde", "vermelho")) for _ in range(batch)]
+        lengths = array("d", (rng.uniform(9, 21) for _ in range(batch)))
+        pieces = quality.register_pieces(weights, colors, lengths)
+        stored = storage.store_pieces(pieces)
+        written += batch + stored
+    journal.close()
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(os.path.join(directory, "journal.log"))
+    print(f"Eventos gravados: {written} em {elapsed:.2f}s ({size / 1e6:.1f} MB)")
+
+    start = time.perf_counter()
+    quality, storage, journal = open_services(directory)
+    elapsed = time.perf_counter() - start
+    journal.close()
+    print(f"Recuperação do journal: {elapsed:.2f}s ({written / elapsed:,.0f} eventos/s)")
+
+    quality, storage, journal = open_services(directory)
+    start = time.perf_counter()
+    journal.checkpoint(quality, storage)
+    print(f"Checkpoint (snapshot): {time.perf_counter() - start:.2f}s")
+    journal.close()
+
+    start = time.perf_counter()
+    quality, storage, journal = open_services(directory)
+    elapsed = time.perf_counter() - start
+    journal.close()
+    print(f"Recuperação do snapshot: {elapsed:.2f}s")
+    print(f"  {quality.get_statistics()['total_pieces']} peças, "
+          f"{storage.get_statistics()['total_boxes']} caixas")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
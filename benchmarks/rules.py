@@ -0,0 +1,81 @@
+"""
+Benchmark do motor de regras: custo por peça conforme o número de regras.
+
+Compara o RuleSet compilado com a avaliação interpretada da mesma
+especificação (laço sobre as regras, como um validador genérico faria).
+
+Uso:
+    python -m benchmarks.rules [quantidade]
+"""
+
+import random
+import sys
+import time
+from array import array
+
+from src.validators.rules import RuleSet
+
+_RULES = [
+    {"field": "weight", "min": 95, "max": 105, "unit": "g"},
+    {"field": "color", "allowed": ["azul", "verde"]},
+    {"field": "length", "min": 10, "max": 20, "unit": "cm"},
+    {"field": "weight", "min": 90, "unit": "g", "label": "Peso mínimo absoluto"},
+    {"field": "length", "max": 25, "unit": "cm", "label": "Comprimento máximo absoluto"},
+    {"field": "color", "allowed": ["azul", "verde", "vermelho"], "label": "Cor catalogada"},
+    {"field": "weight", "max": 110, "unit": "g", "label": "Peso máximo absoluto"},
+    {"field": "length", "min": 5, "unit": "cm", "label": "Comprimento mínimo absoluto"},
+]
+
+
+def _interpreted(rules, weight, color, length) -> int:
+    """Avalia a especificação regra a regra, sem compilação."""
+    values = {"weight": weight, "color": color, "length": length}
+    flags = 0
+    for bit, rule in enumerate(rules):
+        value = values[rule["field"]]
+        if "allowed" in rule:
+            failed = value.lower() not in {a.lower() for a in rule["allowed"]}
+        else:
+            failed = ("min" in rule and value < rule["min"]) or (
+                "max" in rule and value > rule["max"]
+            )
+        if failed:
+            flags |= 1 << bit
+    return flags
+
+
+def _readings(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    weights = array("d", (rng.uniform(90, 110) for _ in range(count)))
+    colors = [rng.choice(("azul", "verde", "vermelho")) for _ in range(count)]
+    lengths = array("d", (rng.uniform(8, 22) for _ in range(count)))
+    return weights, colors, lengths
+
+
+def _per_piece_ns(function, columns) -> float:
+    weights, colors, lengths = columns
+    started = time.perf_counter()
+    for weight, color, length in zip(weights, colors, lengths):
+        function(weight, color, length)
+    return (time.perf_counter() - started) / len(weights) * 1e9
+
+
+def main(count: int = 200_000) -> None:
+    """Executa o benchmark e imprime ns por peça."""
+    columns = _readings(count)
+    print(f"Leituras: {count}")
+    print(f"{'regras':>7} {'interpretado':>14} {'compilado':>11} {'lote':>9}")
+
+    for size in (1, 3, 5, 8):
+        spec = _RULES[:size]
+        rules = RuleSet(spec)
+        interpreted = _per_piece_ns(lambda w, c, l: _interpreted(spec, w, c, l), columns)
+        compiled = _per_piece_ns(rules.flags, columns)
+        started = time.perf_counter()
+        rules.batch_flags(*columns)
+        batch = (time.perf_counter() - started) / count * 1e9
+        print(f"{size:>7} {interpreted:>11,.0f} ns {compiled:>8,.0f} ns {batch:>6,.0f} ns")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,68 @@
+"""
+Benchmark de ingestão em lote particionada entre processos.
+
+Compara um único processo (QualityService + StorageService) com
+ShardedInspection usando 1, 2, 4 e 8 shards, sobre as mesmas leituras.
+
+Uso:
+    python -m benchmarks.sharding [quantidade] [--batch-size 100000]
+"""
+
+import argparse
+import os
+import random
+import time
+from array import array
+
+from src.services.quality_service import QualityService
+from src.services.sharded_service import ShardedInspection
+from src.services.storage_service import StorageService
+
+
+def _readings(count: int, seed: int = 42):
+    """Gera leituras sintéticas em formato colunar."""
+    rng = random.Random(seed)
+    weights = array("d", (rng.uniform(90, 110) for _ in range(count)))
+    colors = [rng.choice(("azul", "verde", "vermelho")) for _ in range(count)]
+    lengths = array("d", (rng.uniform(8, 22) for _ in range(count)))
+    return weights, colors, lengths
+
+
+def _batches(columns, batch_size: int):
+    weights, colors, lengths = columns
+    for start in range(0, len(weights), batch_size):
+        end = start + batch_size
+        yield weights[start:end], colors[start:end], lengths[start:end]
+
+
+def main() -> None:
+    """Executa o benchmark e imprime vazão e aceleração."""
+    parser = argparse.ArgumentParser(description="Ingestão particionada")
+    parser.add_argument("count", nargs="?", type=int, default=2_000_000)
+    parser.add_argument("--batch-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    columns = _readings(args.count)
+    print(f"Leituras: {args.count}  lote: {args.batch_size}  núcleos: {os.cpu_count()}")
+
+    quality, storage = QualityService(), StorageService()
+    started = time.perf_counter()
+    for batch in _batches(columns, args.batch_size):
+        storage.store_pieces(quality.register_pieces(*batch))
+    baseline = args.count / (time.perf_counter() - started)
+    print(f"{'processo único':>16}: {baseline:>12,.0f} leituras/s")
+
+    for shards in (1, 2, 4, 8):
+        with ShardedInspection(shards=shards) as sharded:
+            sharded.quality.get_statistics()  # aquece os processos
+            started = time.perf_counter()
+            for batch in _batches(columns, args.batch_size):
+                sharded.register_pieces(*batch)
+            total = sharded.quality.get_statistics()["total_pieces"]
+            rate = args.count / (time.perf_counter() - started)
+        assert total == args.count
+        print(f"{shards:>9} shards: {rate:>12,.0f} leituras/s  ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Benchmark de snapshots: gravação, tamanho e partida a frio por formato.
+
+Compara o snapshot mapeável (snapshot.bin) com o formato de quadros do
+journal (snapshot.log), com JSON e com pickle. Em JSON e pickle a partida
+recria um objeto Piece por peça e um Box por caixa; o snapshot mapeável só
+copia as colunas numéricas e cria objetos quando eles são consultados.
+
+"Primeiras consultas" mede, logo após a abertura, estatísticas e a busca
+de 1000 peças e de suas caixas por ID.
+
+Uso:
+    python -m benchmarks.snapshot [peças] [--skip-slow]
+"""
+
+import argparse
+import gc
+import json
+import os
+import pickle
+import random
+import shutil
+import tempfile
+import time
+from array import array
+
+from src.models.box import Box
+from src.models.piece import Piece
+from src.persistence.journal import SNAPSHOT_FILE, open_services, write_snapshot
+from src.persistence.mapped_snapshot import MAPPED_SNAPSHOT_FILE, write_mapped_snapshot
+from src.services.quality_service import QualityService
+from src.services.storage_service import StorageService
+
+
+def _services(count: int, seed: int = 42):
+    """Cadastra e armazena peças sintéticas em lotes."""
+    rng = random.Random(seed)
+    quality, storage = QualityService(), StorageService()
+    batch = 100_000
+    for start in range(0, count, batch):
+        size = min(batch, count - start)
+        weights = array("d", (rng.uniform(92, 108) for _ in range(size)))
+        colors = [rng.choice(("azul", "verde", "vermelho")) for _ in range(size)]
+        lengths = array("d", (rng.uniform(9, 21) for _ in range(size)))
+        storage.store_pieces(quality.register_pieces(weights, colors, lengths))
+    return quality, storage
+
+
+def _write_json(path: str, quality, storage) -> None:
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump({
+            "pieces": [
+                [p.piece_id, p.weight, p.color, p.length, p.status,
+                 p.rejection_flags, p.registered_at]
+                for p in quality.get_all_pieces()
+            ],
+            "boxes": [
+                [box.box_id, box.capacity, box.is_closed, [p.piece_id for p in box.pieces]]
+                for box in storage.boxes
+            ],
+        }, handle)
+
+
+def _load_json(path: str):
+    with open(path, encoding="utf-8") as handle:
+        data = json.load(handle)
+    pieces = {
+        piece_id: Piece(piece_id, weight, color, length, status,
+                        rejection_flags=flags, registered_at=registered_at)
+        for piece_id, weight, color, length, status, flags, registered_at in data["pieces"]
+    }
+    boxes = []
+    for box_id, capacity, is_closed, piece_ids in data["boxes"]:
+        box = Box(box_id, capacity)
+        box.restore([pieces[piece_id] for piece_id in piece_ids], is_closed)
+        boxes.append(box)
+    return pieces, boxes
+
+
+def _write_pickle(path: str, quality, storage) -> None:
+    pieces = {
+        p.piece_id: Piece(p.piece_id, p.weight, p.color, p.length, p.status,
+                          rejection_flags=p.rejection_flags, registered_at=p.registered_at)
+        for p in quality.get_all_pieces()
+    }
+    boxes = []
+    for stored in storage.boxes:
+        box = Box(stored.box_id, stored.capacity)
+        box.restore([pieces[p.piece_id] for p in stored.pieces], stored.is_closed)
+        boxes.append(box)
+    with open(path, "wb") as handle:
+        pickle.dump((pieces, boxes), handle, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def _load_pickle(path: str):
+    with open(path, "rb") as handle:
+        return pickle.load(handle)
+
+
+def _query_objects(state, ids) -> None:
+    pieces, boxes = state
+    box_of = {piece.piece_id: box for box in boxes for piece in box.pieces}
+    sum(piece.is_approved() for piece in pieces.values())
+    for piece_id in ids:
+        pieces.get(piece_id)
+        box_of.get(piece_id)
+
+
+def _query_services(state, ids) -> None:
+    quality, storage, journal = state
+    quality.get_statistics()
+    storage.get_statistics()
+    for piece_id in ids:
+        quality.get_piece_by_id(piece_id)
+        storage.find_box_by_piece(piece_id)
+    journal.close()
+
+
+def _timed(function, *args):
+    gc.collect()
+    gc.disable()
+    try:
+        started = time.perf_counter()
+        result = function(*args)
+        return result, time.perf_counter() - started
+    finally:
+        gc.enable()
+
+
+def main() -> None:
+    """Grava o mesmo estado em cada formato e mede a partida a frio."""
+    parser = argparse.ArgumentParser(description="Formatos de snapshot")
+    parser.add_argument("count", nargs="?", type=int, default=1_000_000)
+    parser.add_argument(
+        "--skip-slow", action="store_true",
+        help="Mede apenas o snapshot mapeável (útil para milhões de peças)"
+    )
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    quality, storage = _services(args.count)
+    print(f"Peças: {args.count:,}  caixas: {len(storage.boxes):,}  "
+          f"(geradas em {time.perf_counter() - started:.1f}s)")
+    rng = random.Random(7)
+    ids = [f"P{rng.randint(1, args.count):03d}" for _ in range(1000)]
+
+    root = tempfile.mkdtemp(prefix="factorysense-snapshot-")
+    mapped_dir, frames_dir = os.path.join(root, "mapped"), os.path.join(root, "frames")
+    os.makedirs(mapped_dir)
+    os.makedirs(frames_dir)
+
+    def open_directory(directory):
+        return open_services(directory, flush_interval=None, sync=False)
+
+    formats = [(
+        "mapeável (mmap)", os.path.join(mapped_dir, MAPPED_SNAPSHOT_FILE),
+        lambda path: write_mapped_snapshot(path, 0, quality, storage),
+        lambda path: open_directory(mapped_dir), _query_services
+    )]
+    if not args.skip_slow:
+        formats += [
+            (
+                "quadros do journal", os.path.join(frames_dir, SNAPSHOT_FILE),
+                lambda path: write_snapshot(path, 0, quality, storage),
+                lambda path: open_directory(frames_dir), _query_services
+            ),
+            (
+                "JSON", os.path.join(root, "snapshot.json"),
+                lambda path: _write_json(path, quality, storage), _load_json, _query_objects
+            ),
+            (
+                "pickle", os.path.join(root, "snapshot.pickle"),
+                lambda path: _write_pickle(path, quality, storage), _load_pickle, _query_objects
+            ),
+        ]
+
+    print(f"{'formato':<20} {'gravação':>10} {'tamanho':>10} {'abertura':>10} "
+          f"{'primeiras consultas':>20}")
+    try:
+        for name, path, write, load, query in formats:
+            _, write_time = _timed(write, path)
+            state, load_time = _timed(load, path)
+            _, query_time = _timed(query, state, ids)
+            del state
+            print(
+                f"{name:<20} {write_time:>9.2f}s {os.path.getsize(path) / 1e6:>8.1f}MB "
+                f"{load_time:>9.3f}s {query_time * 1000:>18.1f}ms"
+            )
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,456 @@
+"""
+Suíte de benchmarks dos caminhos críticos, com comparação entre execuções.
+
+Cada benchmark roda para cada quantidade de peças e cada proporção de
+aprovação, sobre peças do gerador sintético (benchmarks/synthetic.py):
+
+    validate                 QualityValidator.validate, uma chamada por peça
+    register_piece           QualityService.register_piece, uma por peça
+    register_pieces          QualityService.register_pieces, um lote de até
+                             100 mil peças por operação
+    get_statistics           QualityService.get_statistics com N peças cadastradas
+    remove_piece             QualityService.remove_piece de todas as N peças
+    store_piece              StorageService.store_piece de todas as N peças
+    generate_summary_report  ReportGenerator.generate_summary_report com N peças
+
+As consultas (get_statistics e o relatório) são repetidas no máximo
+--query-calls vezes, pois o custo não deve depender de N.
+
+O resultado (JSON) traz, por combinação, operações por segundo, latências
+por operação (p50, p90, p99, p99.9 e máxima, em microssegundos) e o pico de
+memória alocada durante as operações (tracemalloc, em uma segunda rodada
+para não distorcer os tempos).
+
+Uso:
+    python -m benchmarks.suite run -o base.json
+    python -m benchmarks.suite run --sizes 1000 100000 --ratios 0.5 -o novo.json
+    python -m benchmarks.suite compare base.json novo.json
+
+O modo compare sai com código 1 se houver regressão acima dos limites.
+"""
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from array import array
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.reports.report_generator import ReportGenerator
+from src.services.quality_service import QualityService
+from src.services.storage_service import StorageService
+from src.validators.quality_validator import QualityValidator
+
+from .synthetic import SyntheticPieces
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+DEFAULT_RATIOS = (0.5, 0.9)
+DEFAULT_QUERY_CALLS = 10_000
+FORMAT_VERSION = 1
+
+_PERCENTILES = (("p50", 0.50), ("p90", 0.90), ("p99", 0.99), ("p999", 0.999))
+
+# Cada preparação recebe (peças, gerador, limite de consultas) e devolve
+# (função que executa as operações registrando cada latência, operações)
+Setup = Callable[[int, SyntheticPieces, int], Tuple[Callable[[Callable], None], int]]
+
+
+def _registered(count: int, generator: SyntheticPieces) -> QualityService:
+    """Serviço com as peças já cadastradas (em lote, fora da medição)."""
+    service = QualityService()
+    weights, colors, lengths = generator.readings(count)
+    batch = 100_000
+    for start in range(0, count, batch):
+        service.register_pieces(
+            weights[start:start + batch], colors[start:start + batch],
+            lengths[start:start + batch]
+        )
+    return service
+
+
+def _setup_validate(count, generator, query_calls):
+    pieces = generator.pieces(count)
+    validate, clock = QualityValidator.validate, time.perf_counter
+
+    def run(record):
+        for piece in pieces:
+            start = clock()
+            validate(piece)
+            record(clock() - start)
+    return run, count
+
+
+def _setup_register_piece(count, generator, query_calls):
+    service = QualityService()
+    readings = list(zip(*generator.readings(count)))
+    register, clock = service.register_piece, time.perf_counter
+
+    def run(record):
+        for weight, color, length in readings:
+            start = clock()
+            register(weight, color, length)
+            record(clock() - start)
+    return run, count
+
+
+def _setup_register_pieces(count, generator, query_calls):
+    service = QualityService()
+    weights, colors, lengths = generator.readings(count)
+    batch = 100_000
+    batches = [
+        (weights[start:start + batch], colors[start:start + batch], lengths[start:start + batch])
+        for start in range(0, count, batch)
+    ]
+    register, clock = service.register_pieces, time.perf_counter
+
+    def run(record):
+        for readings in batches:
+            start = clock()
+            register(*readings)
+            record(clock() - start)
+    return run, len(batches)
+
+
+def _setup_get_statistics(count, generator, query_calls):
+    service = _registered(count, generator)
+    calls = min(count, query_calls)
+    get_statistics, clock = service.get_statistics, time.perf_counter
+
+    def run(record):
+        for _ in range(calls):
+            start = clock()
+            get_statistics()
+            record(clock() - start)
+    return run, calls
+
+
+def _setup_remove_piece(count, generator, query_calls):
+    service = _registered(count, generator)
+    piece_ids = generator.shuffled(piece.piece_id for piece in service.get_all_pieces())
+    remove, clock = service.remove_piece, time.perf_counter
+
+    def run(record):
+        for piece_id in piece_ids:
+            start = clock()
+            remove(piece_id)
+            record(clock() - start)
+    return run, count
+
+
+def _setup_store_piece(count, generator, query_calls):
+    pieces = _registered(count, generator).get_all_pieces()
+    storage = StorageService()
+    store, clock = storage.store_piece, time.perf_counter
+
+    def run(record):
+        for piece in pieces:
+            start = clock()
+            store(piece)
+            record(clock() - start)
+    return run, count
+
+
+def _setup_generate_summary_report(count, generator, query_calls):
+    quality = _registered(count, generator)
+    storage = StorageService()
+    storage.store_pieces(quality.get_approved_pieces())
+    calls = min(count, query_calls)
+    report, clock = ReportGenerator(quality, storage).generate_summary_report, time.perf_counter
+
+    def run(record):
+        for _ in range(calls):
+            start = clock()
+            report()
+            record(clock() - start)
+    return run, calls
+
+
+BENCHMARKS: Dict[str, Setup] = {
+    "validate": _setup_validate,
+    "register_piece": _setup_register_piece,
+    "register_pieces": _setup_register_pieces,
+    "get_statistics": _setup_get_statistics,
+    "remove_piece": _setup_remove_piece,
+    "store_piece": _setup_store_piece,
+    "generate_summary_report": _setup_generate_summary_report,
+}
+
+
+def _percentiles(latencies: array) -> Dict[str, float]:
+    """Percentis das latências, em microssegundos."""
+    ordered = sorted(latencies)
+    if not ordered:
+        return {}
+    result = {
+        name: ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1e6
+        for name, fraction in _PERCENTILES
+    }
+    result["max"] = ordered[-1] * 1e6
+    return result
+
+
+def measure(
+    name: str,
+    count: int,
+    approval_ratio: float,
+    seed: int = 42,
+    query_calls: int = DEFAULT_QUERY_CALLS,
+    memory: bool = True
+) -> Dict[str, Any]:
+    """
+    Executa um benchmark para uma quantidade de peças e proporção de aprovação.
+
+    Args:
+        name: Nome em BENCHMARKS
+        count: Quantidade de peças
+        approval_ratio: Proporção de aprovação do gerador
+        seed: Semente do gerador
+        query_calls: Limite de repetições das consultas
+        memory: Medir o pico de memória (segunda rodada com tracemalloc)
+
+    Returns:
+        Resultado com operations, seconds, ops_per_sec, latency_us e
+        peak_memory_bytes (None se memory=False)
+    """
+    setup = BENCHMARKS[name]
+    generator = SyntheticPieces(seed, approval_ratio)
+
+    run, operations = setup(count, generator, query_calls)
+    latencies = array("d")
+    gc.collect()
+    started = time.perf_counter()
+    run(latencies.append)
+    seconds = time.perf_counter() - started
+    del run
+
+    peak = None
+    if memory:
+        run, _ = setup(count, generator, query_calls)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run(deque(maxlen=0).append)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        del run
+
+    return {
+        "benchmark": name,
+        "pieces": count,
+        "approval_ratio": approval_ratio,
+        "operations": operations,
+        "seconds": seconds,
+        "ops_per_sec": operations / seconds if seconds else 0.0,
+        "latency_us": _percentiles(latencies),
+        "peak_memory_bytes": peak,
+    }
+
+
+def run_suite(
+    sizes=DEFAULT_SIZES,
+    ratios=DEFAULT_RATIOS,
+    benchmarks: Optional[List[str]] = None,
+    seed: int = 42,
+    query_calls: int = DEFAULT_QUERY_CALLS,
+    memory: bool = True,
+    progress: Callable[[Dict[str, Any]], None] = lambda result: None
+) -> Dict[str, Any]:
+    """
+    Executa todas as combinações e devolve o documento de resultados.
+
+    Returns:
+        Dicionário com "meta" (ambiente e parâmetros) e "results"
+    """
+    names = benchmarks or list(BENCHMARKS)
+    results = []
+    for name in names:
+        for count in sizes:
+            for ratio in ratios:
+                result = measure(name, count, ratio, seed, query_calls, memory)
+                progress(result)
+                results.append(result)
+    return {
+        "meta": {
+            "format_version": FORMAT_VERSION,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "seed": seed,
+            "sizes": list(sizes),
+            "ratios": list(ratios),
+            "query_calls": query_calls,
+        },
+        "results": results,
+    }
+
+
+def _key(result: Dict[str, Any]) -> Tuple[str, int, float]:
+    return result["benchmark"], result["pieces"], result["approval_ratio"]
+
+
+def compare(
+    baseline: Dict[str, Any],
+    current: Dict[str, Any],
+    throughput_threshold: float = 0.10,
+    latency_threshold: float = 0.25,
+    memory_threshold: float = 0.10
+) -> List[Dict[str, Any]]:
+    """
+    Compara dois documentos de resultados combinação a combinação.
+
+    Uma regressão é uma queda de ops/s, ou um aumento do p99 ou do pico de
+    memória, acima do limite relativo correspondente.
+
+    Returns:
+        Uma linha por combinação presente nos dois documentos, com as
+        variações relativas e a lista "regressions" (vazia se não houver)
+    """
+    previous = {_key(result): result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        old = previous.get(_key(result))
+        if old is None:
+            continue
+
+        def change(new_value, old_value):
+            if new_value is None or not old_value:
+                return None
+            return new_value / old_value - 1
+
+        throughput = change(result["ops_per_sec"], old["ops_per_sec"])
+        latency = change(result["latency_us"].get("p99"), old["latency_us"].get("p99"))
+        memory = change(result["peak_memory_bytes"], old["peak_memory_bytes"])
+
+        regressions = []
+        if throughput is not None and throughput < -throughput_threshold:
+            regressions.append("ops/s")
+        if latency is not None and latency > latency_threshold:
+            regressions.append("p99")
+        if memory is not None and memory > memory_threshold:
+            regressions.append("memória")
+        rows.append({
+            "benchmark": result["benchmark"],
+            "pieces": result["pieces"],
+            "approval_ratio": result["approval_ratio"],
+            "ops_per_sec_change": throughput,
+            "p99_change": latency,
+            "peak_memory_change": memory,
+            "regressions": regressions,
+        })
+    return rows
+
+
+def _format_change(value: Optional[float]) -> str:
+    return "—" if value is None else f"{value * 100:+.1f}%"
+
+
+def _print_result(result: Dict[str, Any]) -> None:
+    latency = result["latency_us"]
+    peak = result["peak_memory_bytes"]
+    print(
+        f"{result['benchmark']:<24} {result['pieces']:>9,} {result['approval_ratio']:>6.2f} "
+        f"{result['ops_per_sec']:>14,.0f} {latency.get('p50', 0):>9.2f} "
+        f"{latency.get('p99', 0):>9.2f} "
+        f"{'—' if peak is None else f'{peak / 1e6:.1f}MB':>10}",
+        file=sys.stderr, flush=True
+    )
+
+
+def _run_command(args: argparse.Namespace) -> int:
+    for name in args.only or ():
+        if name not in BENCHMARKS:
+            print(f"Benchmark desconhecido: {name} (use {', '.join(BENCHMARKS)})", file=sys.stderr)
+            return 2
+    print(
+        f"{'benchmark':<24} {'peças':>9} {'aprov.':>6} {'ops/s':>14} {'p50 µs':>9} "
+        f"{'p99 µs':>9} {'memória':>10}",
+        file=sys.stderr
+    )
+    document = run_suite(
+        args.sizes, args.ratios, args.only, args.seed, args.query_calls,
+        not args.no_memory, _print_result
+    )
+    with open(args.output, "w", encoding="utf-8") as handle:
+        json.dump(document, handle, indent=2)
+    print(f"Resultados gravados em {args.output}", file=sys.stderr)
+    return 0
+
+
+def _compare_command(args: argparse.Namespace) -> int:
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    with open(args.current, encoding="utf-8") as handle:
+        current = json.load(handle)
+
+    rows = compare(
+        baseline, current, args.threshold, args.latency_threshold, args.memory_threshold
+    )
+    print(
+        f"{'benchmark':<24} {'peças':>9} {'aprov.':>6} {'ops/s':>9} {'p99':>9} "
+        f"{'memória':>9}  situação"
+    )
+    for row in rows:
+        print(
+            f"{row['benchmark']:<24} {row['pieces']:>9,} {row['approval_ratio']:>6.2f} "
+            f"{_format_change(row['ops_per_sec_change']):>9} "
+            f"{_format_change(row['p99_change']):>9} "
+            f"{_format_change(row['peak_memory_change']):>9}  "
+            f"{'REGRESSÃO: ' + ', '.join(row['regressions']) if row['regressions'] else 'ok'}"
+        )
+    regressions = sum(1 for row in rows if row["regressions"])
+    if not rows:
+        print("Nenhuma combinação em comum entre os arquivos.")
+    print(f"\n{regressions} regressão(ões) em {len(rows)} combinação(ões).")
+    return 1 if regressions else 0
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Lê as opções de linha de comando (sem subcomando, executa run)."""
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks do FactorySense")
+    commands = parser.add_subparsers(dest="command")
+
+    run = commands.add_parser("run", help="Executa a suíte e grava os resultados em JSON")
+    run.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES))
+    run.add_argument("--ratios", type=float, nargs="+", default=list(DEFAULT_RATIOS),
+                     help="Proporções de aprovação do gerador sintético")
+    run.add_argument("--only", nargs="+", metavar="BENCHMARK",
+                     help=f"Benchmarks a executar ({', '.join(BENCHMARKS)})")
+    run.add_argument("--seed", type=int, default=42)
+    run.add_argument("--query-calls", type=int, default=DEFAULT_QUERY_CALLS,
+                     help="Máximo de repetições das consultas (padrão: %(default)s)")
+    run.add_argument("--no-memory", action="store_true",
+                     help="Não medir o pico de memória (pula a segunda rodada)")
+    run.add_argument("-o", "--output", default="benchmark_results.json")
+
+    comparison = commands.add_parser("compare", help="Compara dois arquivos de resultados")
+    comparison.add_argument("baseline")
+    comparison.add_argument("current")
+    comparison.add_argument("--threshold", type=float, default=0.10,
+                            help="Queda máxima de ops/s (padrão: 0.10 = 10%%)")
+    comparison.add_argument("--latency-threshold", type=float, default=0.25,
+                            help="Aumento máximo do p99 (padrão: 0.25)")
+    comparison.add_argument("--memory-threshold", type=float, default=0.10,
+                            help="Aumento máximo do pico de memória (padrão: 0.10)")
+
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or argv[0] not in ("run", "compare", "-h", "--help"):
+        argv.insert(0, "run")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """Ponto de entrada da suíte."""
+    args = parse_args(argv)
+    if args.command == "compare":
+        return _compare_command(args)
+    return _run_command(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
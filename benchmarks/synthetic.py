@@ -0,0 +1,88 @@
+"""
+Gerador determinístico de peças sintéticas para os benchmarks.
+
+A mesma semente gera sempre as mesmas leituras. A proporção de aprovação é
+configurável: cada leitura é aprovada com probabilidade approval_ratio; as
+demais violam uma combinação sorteada de regras (peso, cor, comprimento)
+das regras padrão de QualityValidator.
+"""
+
+import random
+from array import array
+from typing import List, Sequence, Tuple
+
+from src.models.piece import Piece
+from src.validators.quality_validator import QualityValidator
+
+_VALID_COLORS = tuple(sorted(QualityValidator.VALID_COLORS))
+_INVALID_COLORS = ("vermelho", "preto", "amarelo")
+
+
+class SyntheticPieces:
+    """
+    Leituras sintéticas com proporção de aprovação configurada.
+
+    Args:
+        seed: Semente do gerador
+        approval_ratio: Fração esperada de peças aprovadas (0 a 1)
+
+    Raises:
+        ValueError: Se approval_ratio estiver fora de [0, 1]
+    """
+
+    def __init__(self, seed: int = 42, approval_ratio: float = 0.9):
+        if not 0.0 <= approval_ratio <= 1.0:
+            raise ValueError("approval_ratio deve estar entre 0 e 1")
+        self.seed = seed
+        self.approval_ratio = approval_ratio
+
+    def _out_of_range(self, rng: random.Random, low: float, high: float) -> float:
+        """Valor fora de [low, high], abaixo ou acima com a mesma chance."""
+        margin = (high - low) / 2
+        if rng.random() < 0.5:
+            return rng.uniform(low - margin, low - 0.01)
+        return rng.uniform(high + 0.01, high + margin)
+
+    def readings(self, count: int) -> Tuple[array, List[str], array]:
+        """
+        Gera leituras em formato colunar.
+
+        Returns:
+            Tupla (weights, colors, lengths)
+        """
+        rng = random.Random(self.seed)
+        weights, lengths = array("d"), array("d")
+        colors: List[str] = []
+        validator = QualityValidator
+        for _ in range(count):
+            failures = 0 if rng.random() < self.approval_ratio else rng.randint(1, 7)
+            if failures & validator.FLAG_WEIGHT:
+                weights.append(self._out_of_range(rng, validator.MIN_WEIGHT, validator.MAX_WEIGHT))
+            else:
+                weights.append(rng.uniform(validator.MIN_WEIGHT, validator.MAX_WEIGHT))
+            colors.append(rng.choice(
+                _INVALID_COLORS if failures & validator.FLAG_COLOR else _VALID_COLORS
+            ))
+            if failures & validator.FLAG_LENGTH:
+                lengths.append(self._out_of_range(rng, validator.MIN_LENGTH, validator.MAX_LENGTH))
+            else:
+                lengths.append(rng.uniform(validator.MIN_LENGTH, validator.MAX_LENGTH))
+        return weights, colors, lengths
+
+    def ids(self, count: int) -> List[str]:
+        """IDs no formato dos IDs automáticos (P0000001, ...)."""
+        return [f"P{number:07d}" for number in range(1, count + 1)]
+
+    def pieces(self, count: int) -> List[Piece]:
+        """Gera peças avulsas (ainda não validadas)."""
+        weights, colors, lengths = self.readings(count)
+        return [
+            Piece(piece_id, weight, color, length)
+            for piece_id, weight, color, length in zip(self.ids(count), weights, colors, lengths)
+        ]
+
+    def shuffled(self, items: Sequence) -> list:
+        """Cópia embaralhada de forma determinística (ordem de remoção, ...)."""
+        shuffled = list(items)
+        random.Random(self.seed + 1).shuffle(shuffled)
+        return shuffled
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+FactorySense - Exportação em fluxo dos dados consolidados
+
+Lê o snapshot e o journal de um diretório de dados (ou arquivos avulsos),
+ou um banco SQLite, sem carregar os serviços e grava as peças em NDJSON,
+CSV ou JSON, com memória constante.
+
+Exemplos:
+    python export.py --data-dir dados/ --format csv -o pecas.csv
+    python export.py --file dados/snapshot.bin --format json | gzip > consolidado.json.gz
+    python export.py --data-dir dados/ --report
+    python export.py --db fabrica.db --format csv -o pecas.csv
+"""
+
+import argparse
+import io
+import os
+import sys
+
+from src.models.box import Box
+from src.persistence import JournalReader, SQLiteRepository
+from src.reports.export import EXPORT_FORMATS
+from src.reports.report_generator import ReportGenerator
+
+# Buffer de escrita da saída (os escritores já gravam em blocos)
+_BUFFER_SIZE = 1 << 20
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Lê as opções de linha de comando."""
+    parser = argparse.ArgumentParser(description="FactorySense - exportação de dados")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data-dir", help="Diretório de dados (snapshot + journal)")
+    source.add_argument(
+        "--file", action="append",
+        help="Arquivo de snapshot ou journal, lido na ordem informada (repetível)"
+    )
+    source.add_argument("--db", help="Banco SQLite (consultado com agregações SQL)")
+    parser.add_argument(
+        "--format", choices=EXPORT_FORMATS, default="ndjson",
+        help="Formato da exportação (padrão: ndjson)"
+    )
+    parser.add_argument("-o", "--output", help="Arquivo de saída (padrão: saída padrão)")
+    parser.add_argument(
+        "--box-capacity", type=int, default=Box.DEFAULT_CAPACITY,
+        help=f"Capacidade das caixas usada no journal (padrão: {Box.DEFAULT_CAPACITY})"
+    )
+    parser.add_argument(
+        "--report", action="store_true",
+        help="Exibir o relatório resumido em vez de exportar as peças"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    """Exporta os dados ou exibe o relatório."""
+    args = parse_args(argv)
+    try:
+        if args.db:
+            if not os.path.exists(args.db):
+                raise FileNotFoundError(f"Banco não encontrado: {args.db}")
+            reader = SQLiteRepository(
+                args.db, box_capacity=args.box_capacity, flush_interval=None
+            )
+        elif args.data_dir:
+            reader = JournalReader.from_directory(args.data_dir, box_capacity=args.box_capacity)
+        else:
+            reader = JournalReader(args.file, box_capacity=args.box_capacity)
+        generator = ReportGenerator(reader.quality, reader.storage)
+
+        if args.report:
+            print(generator.generate_summary_report())
+            return 0
+
+        if args.output:
+            stream = open(args.output, "w", encoding="utf-8", newline="", buffering=_BUFFER_SIZE)
+        else:
+            stream = io.TextIOWrapper(
+                sys.stdout.buffer, encoding="utf-8", newline="", write_through=False
+            )
+        try:
+            count = generator.export(stream, args.format)
+        finally:
+            stream.flush()
+            if args.output:
+                stream.close()
+            else:
+                stream.detach()
+    except OSError as e:
+        print(f"✗ Erro: {e}", file=sys.stderr)
+        return 1
+
+    print(f"{count:,} peças exportadas", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
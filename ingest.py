@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+FactorySense - Ingestão em lote de leituras de sensores
+
+Lê um arquivo CSV ou NDJSON (ou a entrada padrão) em lotes, valida, registra
+e armazena as peças, informando o progresso e a vazão ao final.
+
+Exemplos:
+    python ingest.py leituras.csv --data-dir dados/
+    cat leituras.ndjson | python ingest.py - --format ndjson --validate-only
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+
+from src.ingestion.stream import DEFAULT_BATCH_SIZE, READERS, IngestionPipeline
+from src.services.packing import PACKING_STRATEGIES
+from src.services.quality_service import QualityService
+from src.services.storage_service import StorageService
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Lê as opções de linha de comando."""
+    parser = argparse.ArgumentParser(description="FactorySense - ingestão de leituras")
+    parser.add_argument("path", help="Arquivo de leituras ('-' para a entrada padrão)")
+    parser.add_argument(
+        "--format", choices=sorted(READERS),
+        help="Formato do arquivo (padrão: deduzido da extensão; csv para stdin)"
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+        help=f"Leituras por lote (padrão: {DEFAULT_BATCH_SIZE})"
+    )
+    storage = parser.add_mutually_exclusive_group()
+    storage.add_argument(
+        "--data-dir",
+        help="Diretório de dados: recupera o estado e grava journal + snapshot"
+    )
+    storage.add_argument("--db", help="Banco SQLite: recupera o estado e grava as peças e caixas")
+    parser.add_argument(
+        "--packing", choices=list(PACKING_STRATEGIES), default="next-fit",
+        help="Estratégia de empacotamento (padrão: next-fit)"
+    )
+    parser.add_argument("--max-weight", type=float, help="Peso total máximo por caixa")
+    parser.add_argument("--max-length", type=float, help="Comprimento total máximo por caixa")
+    parser.add_argument(
+        "--max-open-boxes", type=int,
+        help="Limite de caixas abertas ao mesmo tempo (first-fit e best-fit)"
+    )
+    parser.add_argument(
+        "--validate-only", action="store_true",
+        help="Apenas valida e conta, sem reter as peças (memória constante)"
+    )
+    parser.add_argument("--quiet", action="store_true", help="Não exibir progresso")
+    return parser.parse_args(argv)
+
+
+def detect_format(path: str) -> str:
+    """Deduz o formato pela extensão do arquivo."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".ndjson", ".jsonl", ".json"):
+        return "ndjson"
+    return "csv"
+
+
+def report_progress(summary: dict) -> None:
+    """Exibe o progresso na saída de erro."""
+    print(
+        f"  {summary['rows']:,} linhas  "
+        f"({summary['rows_per_second']:,.0f} linhas/s)",
+        file=sys.stderr
+    )
+
+
+def main(argv=None) -> int:
+    """Executa a ingestão e imprime o resumo em JSON."""
+    args = parse_args(argv)
+    file_format = args.format or detect_format(args.path)
+    journal = None
+
+    packing = {
+        "strategy": args.packing, "max_weight": args.max_weight,
+        "max_length": args.max_length, "max_open_boxes": args.max_open_boxes,
+    }
+    if args.data_dir and not args.validate_only:
+        from src.persistence import open_services
+        quality_service, storage_service, journal = open_services(args.data_dir, **packing)
+    elif args.db and not args.validate_only:
+        from src.persistence import open_sqlite_services
+        quality_service, storage_service, journal = open_sqlite_services(args.db, **packing)
+    else:
+        quality_service = QualityService()
+        storage_service = StorageService(**packing)
+
+    if args.path == "-":
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+    else:
+        stream = open(args.path, encoding="utf-8", newline="")
+
+    pipeline = IngestionPipeline(quality_service, storage_service, args.validate_only)
+    try:
+        summary = pipeline.run(
+            READERS[file_format](stream, args.batch_size),
+            progress=None if args.quiet else report_progress
+        )
+    except ValueError as e:
+        print(f"✗ Erro: {e}", file=sys.stderr)
+        return 1
+    finally:
+        stream.close()
+        if journal is not None:
+            journal.checkpoint(quality_service, storage_service)
+            journal.close()
+
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
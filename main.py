@@ -4,34 +4,122 @@ FactorySense - Sistema de Automação para Controle de Qualidade e Armazenamento
 
 Aplicação principal que inicializa o sistema de controle de qualidade industrial.
 
+Sem subcomando, abre o menu interativo. Com um subcomando (ingest, register,
+remove, boxes, query, report, export ou run), executa em lote sem interação; veja
+src/cli/batch.py ou "python main.py run --help".
+
 Autor: João Paulo
 Versão: 1.0
 Data: 2025
 """
 
+import argparse
 import sys
-from src.cli.menu import Menu
+
+# Subcomandos do modo em lote (src/cli/batch.py)
+BATCH_COMMANDS = ("ingest", "register", "remove", "boxes", "query", "report", "export", "run")
+
+# Opções globais que recebem valor (para achar o subcomando na linha)
+_VALUE_OPTIONS = (
+    "--data-dir", "--db", "--box-capacity", "--packing", "--locale", "--events-log",
+    "-o", "--output"
+)
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Lê as opções de linha de comando."""
+    parser = argparse.ArgumentParser(description="FactorySense - controle de qualidade")
+    storage = parser.add_mutually_exclusive_group()
+    storage.add_argument(
+        "--data-dir",
+        help="Diretório de dados: recupera o estado do snapshot + journal e "
+             "registra cada operação (sem esta opção, os dados ficam só em memória)"
+    )
+    storage.add_argument(
+        "--db",
+        help="Banco SQLite: recupera o estado e grava cada operação, permitindo "
+             "consultas externas ao banco"
+    )
+    parser.add_argument(
+        "--locale",
+        help="Idioma dos motivos de reprovação: pt-BR (padrão), en ou es"
+    )
+    parser.add_argument(
+        "--events-log",
+        help="Grava os eventos de peças e caixas (NDJSON) neste arquivo"
+    )
+    return parser.parse_args(argv)
+
+
+def batch_command(argv) -> bool:
+    """Indica se a linha de comando traz um subcomando do modo em lote."""
+    expects_value = False
+    for token in argv:
+        if expects_value:
+            expects_value = False
+        elif token in _VALUE_OPTIONS:
+            expects_value = True
+        elif not token.startswith("-"):
+            return token in BATCH_COMMANDS
+    return False
 
 
-def main():
+def main(argv=None):
     """
     Função principal que inicializa o sistema FactorySense.
     """
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if batch_command(argv):
+        from src.cli.batch import main as batch_main
+        sys.exit(batch_main(argv))
+
+    from src.cli.menu import Menu
+    from src.events import attach_event_bus
+    args = parse_args(argv)
+    menu = bus = None
+
     try:
-        # Inicializar e executar o menu interativo
-        menu = Menu()
+        if args.locale:
+            from src.validators.messages import set_locale
+            set_locale(args.locale)
+
+        # Recuperar estado persistido, se configurado
+        if args.data_dir:
+            from src.persistence import open_services
+            quality_service, storage_service, journal = open_services(args.data_dir)
+            menu = Menu(quality_service, storage_service, journal)
+        elif args.db:
+            from src.persistence import open_sqlite_services
+            quality_service, storage_service, repository = open_sqlite_services(args.db)
+            menu = Menu(quality_service, storage_service, repository)
+        else:
+            menu = Menu()
+
+        # Barramento de eventos (sem assinantes, a menos que --events-log)
+        bus = attach_event_bus(menu.quality_service, menu.storage_service, args.events_log)
+
+        # Executar o menu interativo
         menu.run()
 
     except KeyboardInterrupt:
+        if menu is not None:
+            menu.shutdown()
         print("\n\nSistema interrompido pelo usuário.")
         print("Encerrando FactorySense...\n")
         sys.exit(0)
 
     except Exception as e:
+        if menu is not None and menu.journal is not None:
+            menu.journal.close()
         print(f"\n✗ Erro crítico no sistema: {str(e)}")
         print("Por favor, verifique a configuração e tente novamente.\n")
         sys.exit(1)
 
+    finally:
+        # Também na saída pelo menu (sys.exit): entrega os eventos pendentes
+        if bus is not None:
+            bus.close()
+
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+FactorySense - Servidor de inspeção para estações de linha
+
+Aceita registros de peças de várias estações ao mesmo tempo por TCP
+(uma requisição JSON por linha). Veja src/server/inspection_server.py
+para o protocolo.
+
+Exemplo:
+    python server.py --port 7878 --data-dir dados/
+    python server.py --metrics-port 9100   # métricas em http://127.0.0.1:9100/metrics
+    python server.py --events-log eventos.ndjson   # eventos de peças e caixas
+"""
+
+import argparse
+import asyncio
+import sys
+
+from src.events import attach_event_bus
+from src.models.box import Box
+from src.server import DEFAULT_PORT, InspectionServer
+from src.services.packing import PACKING_STRATEGIES
+from src.services.quality_service import QualityService
+from src.services.storage_service import StorageService
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Lê as opções de linha de comando."""
+    parser = argparse.ArgumentParser(description="FactorySense - servidor de inspeção")
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço (padrão: 127.0.0.1)")
+    parser.add_argument(
+        "--port", type=int, default=DEFAULT_PORT, help=f"Porta (padrão: {DEFAULT_PORT})"
+    )
+    parser.add_argument(
+        "--box-capacity", type=int, default=Box.DEFAULT_CAPACITY,
+        help=f"Capacidade das caixas (padrão: {Box.DEFAULT_CAPACITY})"
+    )
+    parser.add_argument(
+        "--packing", choices=list(PACKING_STRATEGIES), default="next-fit",
+        help="Estratégia de empacotamento (padrão: next-fit)"
+    )
+    parser.add_argument("--max-weight", type=float, help="Peso total máximo por caixa")
+    parser.add_argument("--max-length", type=float, help="Comprimento total máximo por caixa")
+    parser.add_argument(
+        "--max-open-boxes", type=int,
+        help="Limite de caixas abertas ao mesmo tempo (first-fit e best-fit)"
+    )
+    parser.add_argument(
+        "--data-dir",
+        help="Diretório de dados: recupera o estado e grava journal + snapshot"
+    )
+    parser.add_argument(
+        "--metrics-port", type=int,
+        help="Liga a instrumentação e expõe /metrics e /metrics.json nesta porta"
+    )
+    parser.add_argument(
+        "--metrics-host", default="127.0.0.1",
+        help="Endereço do endpoint de métricas (padrão: 127.0.0.1)"
+    )
+    parser.add_argument(
+        "--events-log",
+        help="Grava os eventos de peças e caixas (NDJSON) neste arquivo"
+    )
+    return parser.parse_args(argv)
+
+
+async def serve(args: argparse.Namespace) -> None:
+    """Executa o servidor até ser interrompido."""
+    journal = None
+    if args.data_dir:
+        from src.persistence import open_services
+        quality_service, storage_service, journal = open_services(
+            args.data_dir, box_capacity=args.box_capacity,
+            strategy=args.packing, max_weight=args.max_weight,
+            max_length=args.max_length, max_open_boxes=args.max_open_boxes
+        )
+    else:
+        quality_service = QualityService()
+        storage_service = StorageService(
+            box_capacity=args.box_capacity,
+            strategy=args.packing, max_weight=args.max_weight,
+            max_length=args.max_length, max_open_boxes=args.max_open_boxes
+        )
+
+    # Barramento de eventos (sem assinantes, a menos que --events-log)
+    bus = attach_event_bus(quality_service, storage_service, args.events_log)
+
+    instrumentation = metrics_server = None
+    if args.metrics_port is not None:
+        from src.instrumentation import Instrumentation, MetricsHTTPServer
+        instrumentation = Instrumentation().enable()
+        metrics_server = MetricsHTTPServer(
+            instrumentation.registry, args.metrics_host, args.metrics_port
+        )
+        metrics_port = metrics_server.start()
+        print(
+            f"Métricas em http://{args.metrics_host}:{metrics_port}/metrics",
+            file=sys.stderr
+        )
+
+    server = InspectionServer(quality_service, storage_service)
+    port = await server.start(args.host, args.port)
+    print(f"FactorySense ouvindo em {args.host}:{port}", file=sys.stderr)
+
+    try:
+        await server.serve_forever()
+    finally:
+        await server.stop()
+        bus.close()
+        if metrics_server is not None:
+            metrics_server.stop()
+            instrumentation.disable()
+        if journal is not None:
+            journal.checkpoint(quality_service, storage_service)
+            journal.close()
+
+
+def main(argv=None) -> int:
+    """Ponto de entrada do servidor."""
+    args = parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("\nServidor encerrado.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
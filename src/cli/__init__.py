@@ -1,8 +1,19 @@
 # -*- coding: utf-8 -*-
 """
 Interface de linha de comando do sistema FactorySense.
+
+Menu é importado sob demanda: o modo em lote (batch) não carrega o menu
+nem os serviços que ele não usa.
 """
 
-from .menu import Menu
+__all__ = ['Menu', 'BatchSession']
+
 
-__all__ = ['Menu']
+def __getattr__(name):
+    if name == 'Menu':
+        from .menu import Menu
+        return Menu
+    if name == 'BatchSession':
+        from .batch import BatchSession
+        return BatchSession
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,580 @@
+"""
+Modo em lote (não interativo) da linha de comando.
+
+Executa as mesmas operações do menu a partir de argumentos ou de um arquivo
+de comandos, sem input() e sem exibir cada peça:
+
+    python main.py --data-dir dados/ ingest leituras.csv
+    python main.py --data-dir dados/ register 100 azul 15 --id P001
+    python main.py --data-dir dados/ remove P001 --reopen
+    python main.py --data-dir dados/ boxes --closed --limit 20
+    python main.py --data-dir dados/ query falha=peso cor=verde "comprimento>18"
+    python main.py --json --data-dir dados/ report
+    python main.py --data-dir dados/ export --format csv -o pecas.csv
+    python main.py --data-dir dados/ run turno.txt
+
+Arquivo de comandos: um comando por linha, com a mesma sintaxe dos
+subcomandos; linhas vazias e iniciadas por '#' são ignoradas. Linhas
+"register PESO COR COMPRIMENTO [ID]" consecutivas são acumuladas e
+registradas em lote pelo IngestionPipeline, de modo que repetir um dia de
+leituras custa o mesmo que ingerir um CSV.
+
+A saída é bufferizada; com --json cada comando produz um objeto JSON por
+linha (NDJSON). Os módulos de cada subcomando são importados sob demanda.
+"""
+
+import argparse
+import io
+import json
+import shlex
+import sys
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+
+COMMANDS = ("ingest", "register", "remove", "boxes", "query", "report", "export", "run")
+
+# Buffer de escrita da saída
+_BUFFER_SIZE = 1 << 20
+
+
+class _ScriptParser(argparse.ArgumentParser):
+    """Parser das linhas do arquivo de comandos: erros viram ValueError."""
+
+    def error(self, message: str) -> None:
+        raise ValueError(message)
+
+
+def _add_commands(subparsers, script: bool = False) -> None:
+    """Declara os subcomandos (o arquivo de comandos não aceita run)."""
+    ingest = subparsers.add_parser("ingest", help="Registra as leituras de um CSV/NDJSON")
+    ingest.add_argument("path", help="Arquivo de leituras ('-' para a entrada padrão)")
+    ingest.add_argument("--format", choices=("csv", "ndjson"), help="Padrão: pela extensão")
+    ingest.add_argument("--batch-size", type=int, default=10_000)
+    ingest.add_argument("--validate-only", action="store_true",
+                        help="Apenas valida e conta, sem reter as peças")
+
+    register = subparsers.add_parser("register", help="Registra (e armazena) uma peça")
+    register.add_argument("weight", type=float, help="Peso em gramas")
+    register.add_argument("color", help="Cor")
+    register.add_argument("length", type=float, help="Comprimento em centímetros")
+    register.add_argument("--id", dest="piece_id", help="ID (padrão: automático)")
+
+    remove = subparsers.add_parser("remove", help="Remove uma peça do registro e da caixa")
+    remove.add_argument("piece_id")
+    remove.add_argument("--reopen", action="store_true",
+                        help="Reabre a caixa se ela estiver fechada")
+
+    boxes = subparsers.add_parser("boxes", help="Lista caixas")
+    which = boxes.add_mutually_exclusive_group()
+    which.add_argument("--closed", action="store_true",
+                       help="Fechadas, das mais recentes para as antigas (padrão)")
+    which.add_argument("--open", action="store_true", help="Abertas")
+    which.add_argument("--current", action="store_true", help="Somente a caixa atual")
+    boxes.add_argument("--limit", type=int, default=50)
+    boxes.add_argument("--offset", type=int, default=0)
+
+    query = subparsers.add_parser("query", help="Consulta peças por critérios")
+    query.add_argument(
+        "filters", nargs="*", metavar="FILTRO",
+        help="Critérios campo OP valor: status=, cor=, falha=peso, peso>=, "
+             "comprimento>, since=10:00, until=11:00 (todos combinados com E)"
+    )
+    query.add_argument("--limit", type=int, help="Máximo de peças listadas")
+    query.add_argument("--count", action="store_true", help="Apenas conta as peças")
+
+    subparsers.add_parser("report", help="Relatório resumido (estatísticas com --json)")
+
+    export = subparsers.add_parser("export", help="Exporta as peças em fluxo")
+    export.add_argument("--format", choices=("ndjson", "csv", "json"), default="ndjson")
+    export.add_argument("-o", "--output", help="Arquivo de saída (padrão: a saída do lote)")
+
+    if not script:
+        run = subparsers.add_parser("run", help="Executa um arquivo de comandos")
+        run.add_argument("script", help="Arquivo de comandos ('-' para a entrada padrão)")
+        run.add_argument("--batch-size", type=int, default=10_000,
+                         help="Linhas register acumuladas por lote (padrão: 10000)")
+        run.add_argument("--stop-on-error", action="store_true",
+                         help="Interrompe no primeiro comando com erro")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Parser da linha de comando do modo em lote."""
+    parser = argparse.ArgumentParser(
+        prog="main.py", description="FactorySense - modo em lote"
+    )
+    storage = parser.add_mutually_exclusive_group()
+    storage.add_argument("--data-dir", help="Diretório de dados (snapshot + journal)")
+    storage.add_argument("--db", help="Banco SQLite")
+    parser.add_argument("--box-capacity", type=int, help="Capacidade das caixas")
+    parser.add_argument("--packing", help="Estratégia de empacotamento (padrão: next-fit)")
+    parser.add_argument("--locale",
+                        help="Idioma dos motivos de reprovação: pt-BR (padrão), en ou es")
+    parser.add_argument("--json", action="store_true",
+                        help="Saída em NDJSON: um objeto por comando")
+    parser.add_argument("-o", "--output", help="Arquivo da saída do lote (padrão: stdout)")
+    parser.add_argument("--events-log",
+                        help="Grava os eventos de peças e caixas (NDJSON) neste arquivo")
+    _add_commands(parser.add_subparsers(dest="command", required=True))
+    return parser
+
+
+def _script_parser() -> _ScriptParser:
+    parser = _ScriptParser(prog="", add_help=False)
+    _add_commands(parser.add_subparsers(dest="command", required=True), script=True)
+    return parser
+
+
+def _box_record(box) -> Dict[str, Any]:
+    return {
+        "box_id": box.box_id,
+        "capacity": box.capacity,
+        "pieces": box.get_piece_count(),
+        "closed": box.is_closed,
+        "piece_ids": [piece.piece_id for piece in box.pieces],
+    }
+
+
+def _format_text(record: Dict[str, Any]) -> str:
+    """Linha de texto de um resultado (modo sem --json)."""
+    command = record["command"]
+    if "error" in record:
+        where = f" (linha {record['line']})" if "line" in record else ""
+        return f"✗ {command}{where}: {record['error']}"
+    if command in ("ingest", "register_batch"):
+        return (
+            f"{command}: {record['rows']:,} peças, {record['approved']:,} aprovadas, "
+            f"{record['rejected']:,} reprovadas, {record['stored']:,} armazenadas, "
+            f"{record['invalid_rows']:,} linhas inválidas"
+        )
+    if command == "register":
+        text = f"register: {record['id']} {record['status']}"
+        if record["rejection_reason"]:
+            text += f" ({record['rejection_reason']})"
+        if record["box_id"] is not None:
+            text += f" -> caixa #{record['box_id']}"
+        return text
+    if command == "remove":
+        if not record["removed"]:
+            return f"remove: {record['id']} não encontrada"
+        box = f", retirada da caixa #{record['box_id']}" if record["box_id"] is not None else ""
+        return f"remove: {record['id']} removida{box}"
+    if command == "box":
+        state = "fechada" if record["closed"] else "aberta"
+        return (
+            f"caixa #{record['box_id']} {state} {record['pieces']}/{record['capacity']}: "
+            f"{', '.join(record['piece_ids'])}"
+        )
+    if command == "piece":
+        text = (
+            f"{record['id']} {record['status']} {record['weight']:g}g "
+            f"{record['color']} {record['length']:g}cm"
+        )
+        if record["rejection_reason"]:
+            text += f" ({record['rejection_reason']})"
+        return text
+    if command == "query":
+        return f"query: {record['matches']:,} peça(s)"
+    if command == "export":
+        return f"export: {record['pieces']:,} peças em {record['output']} ({record['format']})"
+    return json.dumps(record, ensure_ascii=False)
+
+
+class BatchOutput:
+    """
+    Saída bufferizada do modo em lote.
+
+    Com json=True cada resultado é um objeto JSON por linha; sem ele, uma
+    linha de texto (ou o texto do relatório).
+    """
+
+    def __init__(self, stream: TextIO, json_mode: bool = False):
+        self.stream = stream
+        self.json = json_mode
+        self.errors = 0
+
+    def record(self, record: Dict[str, Any]) -> None:
+        """Grava o resultado de um comando."""
+        if "error" in record:
+            self.errors += 1
+        if self.json:
+            self.stream.write(json.dumps(record, ensure_ascii=False))
+        else:
+            self.stream.write(_format_text(record))
+        self.stream.write("\n")
+
+    def text(self, text: str) -> None:
+        """Grava texto livre (relatório no modo texto)."""
+        self.stream.write(text)
+        self.stream.write("\n")
+
+
+class BatchSession:
+    """
+    Executa os comandos do modo em lote sobre um par de serviços.
+
+    Args:
+        quality_service: Serviço de qualidade
+        storage_service: Serviço de armazenamento
+        output: Destino dos resultados
+    """
+
+    def __init__(self, quality_service, storage_service, output: BatchOutput):
+        self.quality_service = quality_service
+        self.storage_service = storage_service
+        self.output = output
+
+    def ingest(
+        self,
+        path: str,
+        file_format: Optional[str] = None,
+        batch_size: int = 10_000,
+        validate_only: bool = False
+    ) -> Dict[str, Any]:
+        """Registra e armazena as leituras de um arquivo (como ingest.py)."""
+        from ..ingestion.stream import READERS, IngestionPipeline
+
+        if file_format is None:
+            file_format = "ndjson" if path.lower().endswith((".ndjson", ".jsonl", ".json")) else "csv"
+        if path == "-":
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8", newline="")
+        else:
+            stream = open(path, encoding="utf-8", newline="")
+        try:
+            pipeline = IngestionPipeline(
+                self.quality_service, self.storage_service, validate_only
+            )
+            summary = pipeline.run(READERS[file_format](stream, batch_size))
+        finally:
+            if path == "-":
+                stream.detach()
+            else:
+                stream.close()
+        record = dict(command="ingest", path=path, **summary)
+        self.output.record(record)
+        return record
+
+    def register(
+        self, weight: float, color: str, length: float, piece_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Registra uma peça e armazena se aprovada (como a opção 1 do menu)."""
+        piece = self.quality_service.register_piece(weight, color, length, piece_id)
+        box_id = None
+        if piece.is_approved() and self.storage_service.store_piece(piece):
+            box = self.storage_service.find_box_by_piece(piece.piece_id)
+            box_id = box.box_id if box is not None else None
+        record = {
+            "command": "register",
+            "id": piece.piece_id,
+            "status": piece.status,
+            "rejection_reason": piece.rejection_reason,
+            "box_id": box_id,
+        }
+        self.output.record(record)
+        return record
+
+    def register_batch(self, batch) -> Dict[str, Any]:
+        """Registra um lote de linhas register (ReadingBatch) de uma vez."""
+        from ..ingestion.stream import IngestionPipeline
+
+        pipeline = IngestionPipeline(self.quality_service, self.storage_service)
+        pipeline.process(batch)
+        record = {
+            "command": "register_batch",
+            "rows": pipeline.rows,
+            "approved": pipeline.approved,
+            "rejected": pipeline.rejected,
+            "stored": pipeline.stored,
+            "invalid_rows": pipeline.invalid_rows,
+        }
+        self.output.record(record)
+        return record
+
+    def remove(self, piece_id: str, reopen: bool = False) -> Dict[str, Any]:
+        """Remove a peça do registro e da caixa (como a opção 4 do menu)."""
+        from ..services.removal import withdraw_piece
+
+        removed, box = withdraw_piece(
+            self.quality_service, self.storage_service, piece_id, reopen=reopen
+        )
+        record = {
+            "command": "remove",
+            "id": piece_id,
+            "removed": removed,
+            "box_id": box.box_id if box is not None else None,
+        }
+        self.output.record(record)
+        return record
+
+    def boxes(
+        self, which: str = "closed", limit: int = 50, offset: int = 0
+    ) -> List[Dict[str, Any]]:
+        """Lista caixas fechadas (recentes primeiro), abertas ou a atual."""
+        storage = self.storage_service
+        if which == "current":
+            current = storage.get_current_box()
+            boxes = [current] if current is not None else []
+        elif which == "open":
+            boxes = storage.get_open_boxes()[offset:offset + limit]
+        else:
+            boxes = storage.list_closed_boxes(limit, offset)
+        records = []
+        for box in boxes:
+            record = dict(command="box", **_box_record(box))
+            self.output.record(record)
+            records.append(record)
+        return records
+
+    def query(
+        self, filters: Iterable[str], limit: Optional[int] = None, count_only: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Lista as peças que atendem aos filtros (ver PieceQuery.parse).
+
+        Cada peça gera um registro "piece", seguido do total em "query".
+        """
+        from ..services.piece_query import PieceQuery
+
+        pieces = self.quality_service.query(PieceQuery.parse(filters))
+        if not count_only:
+            for piece in pieces if limit is None else pieces[:limit]:
+                self.output.record({
+                    "command": "piece",
+                    "id": piece.piece_id,
+                    "weight": piece.weight,
+                    "color": piece.color,
+                    "length": piece.length,
+                    "status": piece.status,
+                    "rejection_reason": piece.rejection_reason,
+                    "registered_at": piece.registered_at,
+                })
+        record = {"command": "query", "matches": len(pieces)}
+        self.output.record(record)
+        return record
+
+    def report(self) -> None:
+        """Relatório resumido (texto) ou estatísticas consolidadas (--json)."""
+        report_statistics(self.quality_service, self.storage_service, self.output)
+
+    def export(self, file_format: str = "ndjson", path: Optional[str] = None) -> int:
+        """Exporta as peças em fluxo para path (ou para a saída do lote)."""
+        return export_pieces(
+            self.quality_service, self.storage_service, self.output, file_format, path
+        )
+
+    def execute(self, args: argparse.Namespace) -> None:
+        """Executa um subcomando já interpretado (exceto run)."""
+        command = args.command
+        if command == "ingest":
+            self.ingest(args.path, args.format, args.batch_size, args.validate_only)
+        elif command == "register":
+            self.register(args.weight, args.color, args.length, args.piece_id)
+        elif command == "remove":
+            self.remove(args.piece_id, args.reopen)
+        elif command == "boxes":
+            which = "open" if args.open else "current" if args.current else "closed"
+            self.boxes(which, args.limit, args.offset)
+        elif command == "query":
+            self.query(args.filters, args.limit, args.count)
+        elif command == "report":
+            self.report()
+        elif command == "export":
+            self.export(args.format, args.output)
+
+    def run_script(
+        self,
+        lines: Iterable[str],
+        batch_size: int = 10_000,
+        stop_on_error: bool = False
+    ) -> int:
+        """
+        Executa um arquivo de comandos.
+
+        Linhas register consecutivas são acumuladas em um ReadingBatch e
+        registradas em lote; o lote é gravado ao atingir batch_size e antes
+        de qualquer outro comando, de modo que a ordem das operações é
+        preservada. Linhas register malformadas ou com ID repetido contam
+        como inválidas, como na ingestão.
+
+        Returns:
+            Quantidade de comandos (fora register) que falharam
+        """
+        from ..ingestion.stream import ReadingBatch
+
+        parser = _script_parser()
+        errors = 0
+        batch = ReadingBatch()
+
+        def flush() -> None:
+            nonlocal batch
+            if len(batch) or batch.invalid_rows:
+                self.register_batch(batch)
+                batch = ReadingBatch()
+
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            fields = line.split()
+            if fields[0] == "register" and 4 <= len(fields) <= 5 and "--id" not in fields:
+                try:
+                    batch.append(
+                        fields[4] if len(fields) == 5 else None,
+                        float(fields[1]), fields[2], float(fields[3])
+                    )
+                except ValueError:
+                    batch.invalid_rows += 1
+                if len(batch) >= batch_size:
+                    flush()
+                continue
+
+            flush()
+            try:
+                args = parser.parse_args(shlex.split(line))
+                self.execute(args)
+            except (ValueError, OSError) as e:
+                errors += 1
+                self.output.record({
+                    "command": fields[0], "line": number, "error": str(e)
+                })
+                if stop_on_error:
+                    break
+        flush()
+        return errors
+
+
+def report_statistics(quality, storage, output: BatchOutput) -> None:
+    """Grava o relatório resumido ou, com --json, as estatísticas."""
+    if output.json:
+        record = {
+            "command": "report",
+            "quality": quality.get_statistics(),
+            "storage": storage.get_statistics(),
+        }
+        capability = getattr(quality, "get_process_capability", None)
+        if capability is not None:
+            record["process_capability"] = capability()
+        output.record(record)
+        return
+    from ..reports.report_generator import ReportGenerator
+    output.text(ReportGenerator(quality, storage).generate_summary_report())
+
+
+def export_pieces(quality, storage, output: BatchOutput, file_format: str, path=None) -> int:
+    """
+    Exporta as peças; sem path, os dados vão para a saída do lote.
+
+    Returns:
+        Quantidade de peças exportadas
+    """
+    from ..reports.export import export
+
+    if path is None:
+        return export(quality, storage, output.stream, file_format)
+    with open(path, "w", encoding="utf-8", newline="", buffering=_BUFFER_SIZE) as stream:
+        count = export(quality, storage, stream, file_format)
+    output.record({
+        "command": "export", "format": file_format, "output": path, "pieces": count
+    })
+    return count
+
+
+def _open_services(args: argparse.Namespace):
+    """Serviços do lote: recuperados do diretório/banco ou em memória."""
+    options: Dict[str, Any] = {}
+    if args.box_capacity is not None:
+        options["box_capacity"] = args.box_capacity
+    if args.packing is not None:
+        options["strategy"] = args.packing
+    if args.data_dir:
+        from ..persistence import open_services
+        return open_services(args.data_dir, **options)
+    if args.db:
+        from ..persistence import open_sqlite_services
+        return open_sqlite_services(args.db, **options)
+    from ..services.quality_service import QualityService
+    from ..services.storage_service import StorageService
+    return QualityService(), StorageService(**options), None
+
+
+def _open_reader(args: argparse.Namespace):
+    """
+    Leitor somente leitura para report/export sobre dados persistidos.
+
+    Assim como export.py, não carrega os serviços. Devolve None sem
+    --data-dir/--db.
+    """
+    options = {} if args.box_capacity is None else {"box_capacity": args.box_capacity}
+    if args.data_dir:
+        from ..persistence.reader import JournalReader
+        return JournalReader.from_directory(args.data_dir, **options)
+    if args.db:
+        import os
+        from ..persistence.sqlite_store import SQLiteRepository
+        if not os.path.exists(args.db):
+            raise FileNotFoundError(f"Banco não encontrado: {args.db}")
+        return SQLiteRepository(args.db, flush_interval=None, **options)
+    return None
+
+
+def _run(args: argparse.Namespace, output: BatchOutput) -> int:
+    if args.command in ("report", "export"):
+        reader = _open_reader(args)
+        if reader is not None:
+            if args.command == "report":
+                report_statistics(reader.quality, reader.storage, output)
+            else:
+                export_pieces(reader.quality, reader.storage, output, args.format, args.output)
+            return 0
+
+    from ..events import attach_event_bus
+
+    quality, storage, repository = _open_services(args)
+    bus = attach_event_bus(quality, storage, args.events_log)
+    session = BatchSession(quality, storage, output)
+    try:
+        if args.command != "run":
+            session.execute(args)
+            return 0
+        if args.script == "-":
+            stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+        else:
+            stream = open(args.script, encoding="utf-8")
+        try:
+            return 1 if session.run_script(stream, args.batch_size, args.stop_on_error) else 0
+        finally:
+            if args.script == "-":
+                stream.detach()
+            else:
+                stream.close()
+    finally:
+        bus.close()
+        if repository is not None:
+            repository.checkpoint(quality, storage)
+            repository.close()
+
+
+def main(argv=None) -> int:
+    """Ponto de entrada do modo em lote (chamado por main.py)."""
+    args = build_parser().parse_args(argv)
+    if args.output:
+        stream = open(args.output, "w", encoding="utf-8", buffering=_BUFFER_SIZE)
+    else:
+        stream = io.TextIOWrapper(
+            sys.stdout.buffer, encoding="utf-8", newline="", write_through=False
+        )
+    output = BatchOutput(stream, args.json)
+    try:
+        if args.locale:
+            from ..validators.messages import set_locale
+            set_locale(args.locale)
+        return _run(args, output)
+    except (ValueError, OSError) as e:
+        stream.flush()
+        print(f"✗ Erro: {e}", file=sys.stderr)
+        return 1
+    finally:
+        stream.flush()
+        if args.output:
+            stream.close()
+        else:
+            stream.detach()
@@ -6,6 +6,7 @@ import sys
 from typing import Optional
 from ..services.quality_service import QualityService
 from ..services.storage_service import StorageService
+from ..services.removal import withdraw_piece
 from ..reports.report_generator import ReportGenerator
 
 
@@ -14,9 +15,15 @@ class Menu:
     Menu interativo para navegação no sistema.
     """
 
-    def __init__(self):
-        self.quality_service = QualityService()
-        self.storage_service = StorageService()
+    def __init__(
+        self,
+        quality_service: Optional[QualityService] = None,
+        storage_service: Optional[StorageService] = None,
+        journal=None
+    ):
+        self.quality_service = quality_service or QualityService()
+        self.storage_service = storage_service or StorageService()
+        self.journal = journal
         self.report_generator = ReportGenerator(
             self.quality_service,
             self.storage_service
@@ -121,13 +128,13 @@ class Menu:
             else:
                 # Tentar armazenar peça aprovada
                 if self.storage_service.store_piece(piece):
-                    current_box = self.storage_service.get_current_box()
-                    if current_box:
-                        print(f"  ✓ Peça armazenada na caixa #{current_box.box_id}")
-                        print(f"  Ocupação: {current_box.get_piece_count()}/{current_box.capacity}")
+                    box = self.storage_service.find_box_by_piece(piece.piece_id)
+                    if box:
+                        print(f"  ✓ Peça armazenada na caixa #{box.box_id}")
+                        print(f"  Ocupação: {box.get_piece_count()}/{box.capacity}")
 
-                        if current_box.is_closed:
-                            print(f"  ✓ Caixa #{current_box.box_id} foi fechada (completa)!")
+                        if box.is_closed:
+                            print(f"  ✓ Caixa #{box.box_id} foi fechada (completa)!")
 
         except Exception as e:
             print(f"  ✗ Erro ao cadastrar peça: {str(e)}")
@@ -185,33 +192,58 @@ class Menu:
         if not piece_id:
             return
 
-        if self.quality_service.remove_piece(piece_id):
-            print(f"  ✓ Peça {piece_id} removida com sucesso!")
-        else:
+        if self.quality_service.get_piece_by_id(piece_id) is None:
             print(f"  ✗ Peça {piece_id} não encontrada.")
+            return
 
-    def list_closed_boxes(self) -> None:
-        """Lista todas as caixas fechadas."""
+        # A peça sai do registro e da caixa juntas; a caixa fechada só é
+        # reaberta se o operador pedir
+        box = self.storage_service.find_box_by_piece(piece_id)
+        reopen = False
+        if box is not None and box.is_closed:
+            answer = self.get_input(
+                f"  A caixa #{box.box_id} está fechada. Reabrir? (s/N): ", allow_empty=True
+            )
+            reopen = answer is not None and answer.lower() == "s"
+        _, box = withdraw_piece(self.quality_service, self.storage_service, piece_id, reopen)
+        print(f"  ✓ Peça {piece_id} removida com sucesso!")
+        if box is not None:
+            print(f"  ✓ Peça retirada da caixa #{box.box_id} "
+                  f"({box.get_piece_count()}/{box.capacity})")
+
+    def list_closed_boxes(self, page_size: int = 20) -> None:
+        """Lista as caixas fechadas em páginas, das mais recentes para as antigas."""
         print("\n" + "-" * 60)
         print("CAIXAS FECHADAS")
         print("-" * 60)
 
-        closed_boxes = self.storage_service.get_closed_boxes()
+        total = self.storage_service.get_statistics()["closed_boxes"]
 
-        if not closed_boxes:
+        if not total:
             print("  Nenhuma caixa fechada no momento.")
             return
 
-        print(f"\n  Total: {len(closed_boxes)} caixa(s)\n")
-        for box in closed_boxes:
-            print(f"  • {box}")
-            # Mostrar primeiras peças da caixa
-            if box.pieces:
-                print(f"    Peças: {', '.join([p.piece_id for p in box.pieces[:5]])}", end="")
-                if len(box.pieces) > 5:
-                    print(f" ... (+{len(box.pieces) - 5})")
-                else:
-                    print()
+        print(f"\n  Total: {total} caixa(s)\n")
+        offset = 0
+        while offset < total:
+            for box in self.storage_service.list_closed_boxes(page_size, offset):
+                print(f"  • {box}")
+                # Mostrar primeiras peças da caixa
+                if box.pieces:
+                    print(f"    Peças: {', '.join([p.piece_id for p in box.pieces[:5]])}", end="")
+                    if len(box.pieces) > 5:
+                        print(f" ... (+{len(box.pieces) - 5})")
+                    else:
+                        print()
+            offset += page_size
+
+            if offset < total:
+                more = self.get_input(
+                    f"\n  Exibidas {offset} de {total}. Enter para mais, 'q' para voltar: ",
+                    allow_empty=True
+                )
+                if more is not None and more.lower() == "q":
+                    return
 
     def show_current_box_status(self) -> None:
         """Mostra o status da caixa atual."""
@@ -278,4 +310,12 @@ class Menu:
         print("Obrigado por usar nosso sistema!")
         print("=" * 60 + "\n")
         self.running = False
+        self.shutdown()
         sys.exit(0)
+
+    def shutdown(self) -> None:
+        """Grava um snapshot e fecha o journal, se houver persistência."""
+        if self.journal is not None:
+            self.journal.checkpoint(self.quality_service, self.storage_service)
+            self.journal.close()
+            self.journal = None
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""
+Barramento de eventos do sistema FactorySense (publicacao/assinatura).
+"""
+
+from .bus import (
+    BLOCK,
+    BOX_CLOSED,
+    DROP_OLDEST,
+    EVENT_KINDS,
+    PIECE_REGISTERED,
+    PIECE_REJECTED,
+    PIECE_REMOVED,
+    PIECE_STORED,
+    POLICIES,
+    SPILL,
+    AsyncSubscription,
+    Event,
+    EventBus,
+    EventLog,
+    Subscription,
+    attach_event_bus,
+)
+
+__all__ = [
+    'AsyncSubscription', 'BLOCK', 'BOX_CLOSED', 'DROP_OLDEST', 'EVENT_KINDS', 'Event',
+    'EventBus', 'EventLog', 'PIECE_REGISTERED', 'PIECE_REJECTED', 'PIECE_REMOVED',
+    'PIECE_STORED', 'POLICIES', 'SPILL', 'Subscription', 'attach_event_bus',
+]
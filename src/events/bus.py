@@ -0,0 +1,756 @@
+"""
+Barramento de eventos em processo (publicação/assinatura) com filas limitadas.
+
+Os serviços publicam eventos de peças e caixas no barramento ligado ao
+atributo `events` (como fazem com o `journal`); cada assinante tem a sua
+fila limitada e o seu consumidor (uma thread ou uma tarefa asyncio), de
+modo que notificações ao CLP, impressão de etiquetas e análises rodam fora
+do caminho de inspeção.
+
+Publicar custa uma inserção por fila interessada no tipo do evento. Quando
+a fila de um assinante está cheia, a política dele decide o que acontece:
+
+    block        o publicador espera espaço na fila (contrapressão explícita;
+                 o único modo em que um assinante lento atrasa o cadastro)
+    drop-oldest  o evento mais antigo da fila é descartado
+    spill        os eventos excedentes vão para um arquivo temporário e são
+                 entregues depois, na ordem (padrão)
+
+Eventos publicados pelos serviços (ver os métodos piece_registered,
+pieces_registered, piece_removed, pieces_stored e box_closed):
+
+    PieceRegistered  piece_id, weight, color, length, flags, registered_at
+    PieceRejected    os mesmos campos, apenas para as peças reprovadas
+    PieceRemoved     piece_id
+    PieceStored      piece_id, box_id
+    BoxClosed        box_id, piece_ids, total_weight, total_length
+"""
+
+import asyncio
+import itertools
+import json
+import pickle
+import struct
+import tempfile
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+PIECE_REGISTERED = "PieceRegistered"
+PIECE_REJECTED = "PieceRejected"
+PIECE_REMOVED = "PieceRemoved"
+PIECE_STORED = "PieceStored"
+BOX_CLOSED = "BoxClosed"
+
+EVENT_KINDS = (PIECE_REGISTERED, PIECE_REJECTED, PIECE_REMOVED, PIECE_STORED, BOX_CLOSED)
+
+BLOCK = "block"
+DROP_OLDEST = "drop-oldest"
+SPILL = "spill"
+
+POLICIES = (BLOCK, DROP_OLDEST, SPILL)
+
+# Registro do arquivo de transbordo: tamanho do evento serializado + pickle
+_RECORD = struct.Struct("<I")
+
+
+class Event:
+    """
+    Evento publicado no barramento.
+
+    Atributos:
+        kind: Tipo do evento (ex.: 'PieceRegistered')
+        sequence: Número de sequência no barramento (crescente)
+        timestamp: Instante da publicação (clock do barramento)
+        data: Campos do evento
+    """
+
+    __slots__ = ("kind", "sequence", "timestamp", "data")
+
+    def __init__(self, kind: str, sequence: int, timestamp: float, data: Dict[str, Any]):
+        self.kind = kind
+        self.sequence = sequence
+        self.timestamp = timestamp
+        self.data = data
+
+    def __getitem__(self, field: str) -> Any:
+        return self.data[field]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Converte o evento para dicionário."""
+        return {"kind": self.kind, "sequence": self.sequence,
+                "timestamp": self.timestamp, **self.data}
+
+    def __repr__(self) -> str:
+        return f"Event({self.kind!r}, sequence={self.sequence}, data={self.data!r})"
+
+
+class Subscription:
+    """
+    Fila limitada e consumidor (thread) de um assinante.
+
+    Criada por EventBus.subscribe. Os eventos são entregues ao handler na
+    ordem de publicação, em lotes de até batch_size retirados da fila de uma
+    vez; exceções do handler são contadas e não interrompem o consumidor.
+
+    Atributos:
+        name: Nome do assinante (único no barramento)
+        kinds: Tipos de evento assinados (None = todos)
+        policy: Política com a fila cheia ('block', 'drop-oldest', 'spill')
+        capacity: Tamanho máximo da fila em memória
+        delivered: Eventos entregues ao handler
+        dropped: Eventos descartados (fila cheia ou fechamento sem drenar)
+        spilled: Eventos que passaram pelo arquivo de transbordo
+        errors: Exceções levantadas pelo handler
+        last_error: Representação da última exceção (ou None)
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Event], Any],
+        name: str,
+        kinds: Optional[Tuple[str, ...]] = None,
+        capacity: int = 1024,
+        policy: str = SPILL,
+        batch_size: int = 256,
+        spill_dir: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+        on_close: Optional[Callable[[], Any]] = None
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"Política desconhecida: {policy} (use {', '.join(POLICIES)})")
+        if capacity < 1 or batch_size < 1:
+            raise ValueError("capacity e batch_size devem ser positivos")
+
+        self.handler = handler
+        self.name = name
+        self.kinds = kinds
+        self.capacity = capacity
+        self.policy = policy
+        self.batch_size = batch_size
+        self.spill_dir = spill_dir
+        self.clock = clock
+        self._on_close = on_close
+
+        self.delivered = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.max_lag_seconds = 0.0
+
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._idle = threading.Condition(self._lock)
+        self._queue: Deque[Event] = deque()
+        # Eventos aceitos e ainda não entregues (fila, arquivo e lote em curso)
+        self._pending = 0
+        # Instante de publicação do evento mais antigo ainda não entregue
+        self._head = 0.0
+        self._closed = False
+
+        # Transbordo: arquivo com os eventos excedentes, lido na ordem. O
+        # arquivo tem lock próprio: serialização e E/S não seguram self._lock
+        self._file_lock = threading.Lock()
+        self._spill_file = None
+        self._on_disk = 0
+        # Eventos destinados ao arquivo com a gravação em curso
+        self._spilling = 0
+        self._discard = False
+        self._read_at = self._write_at = 0
+
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Inicia o consumidor."""
+        self._thread = threading.Thread(
+            target=self._run, name=f"factorysense-events-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    # Publicação (qualquer thread)
+
+    def offer(self, event: Event) -> None:
+        """Coloca um evento na fila, aplicando a política se ela estiver cheia."""
+        spill = False
+        with self._lock:
+            if self._closed:
+                self.dropped += 1
+                return
+            if self._on_disk or self._spilling or len(self._queue) >= self.capacity:
+                if self.policy == DROP_OLDEST:
+                    self._queue.popleft()
+                    self.dropped += 1
+                    self._pending -= 1
+                elif self.policy == SPILL:
+                    # O lock do arquivo é tomado antes de soltar self._lock:
+                    # os publicadores gravam na ordem em que publicaram
+                    self._file_lock.acquire()
+                    self._spilling += 1
+                    spill = True
+                else:
+                    while len(self._queue) >= self.capacity and not self._closed:
+                        self._not_full.wait()
+                    if self._closed:
+                        self.dropped += 1
+                        return
+            if not self._pending:
+                self._head = event.timestamp
+            self._pending += 1
+            if not spill:
+                self._queue.append(event)
+                self._wake()
+        if spill:
+            self._spill(event)
+
+    def _spill(self, event: Event) -> None:
+        """
+        Grava um evento excedente no arquivo de transbordo.
+
+        Roda com o lock do arquivo (tomado em offer) e sem self._lock, que
+        só é retomado para contar o evento no arquivo.
+        """
+        written = False
+        try:
+            data = pickle.dumps(event, pickle.HIGHEST_PROTOCOL)
+            if self._spill_file is None:
+                self._spill_file = tempfile.TemporaryFile(
+                    prefix=f"factorysense-events-{self.name}-", dir=self.spill_dir
+                )
+            self._spill_file.seek(self._write_at)
+            self._spill_file.write(_RECORD.pack(len(data)) + data)
+            self._write_at = self._spill_file.tell()
+            written = True
+        finally:
+            self._file_lock.release()
+            with self._lock:
+                self._spilling -= 1
+                if written and not self._discard:
+                    self._on_disk += 1
+                    self.spilled += 1
+                else:
+                    self.dropped += 1
+                    self._delivered(1)
+                self._wake()
+
+    def _wake(self) -> None:
+        """Acorda o consumidor (com o lock)."""
+        self._not_empty.notify()
+
+    # Consumo
+
+    def _take(self) -> Union[List[Event], int, None]:
+        """
+        Retira o próximo lote (com o lock): primeiro a fila em memória, que
+        só guarda eventos mais antigos que os do arquivo, depois o arquivo.
+
+        Do arquivo só é reservada a quantidade de eventos; a leitura fica
+        para _load, fora do lock.
+
+        Returns:
+            Lote de eventos, quantidade a ler do arquivo ou None se não
+            houver nada pendente
+        """
+        if self._queue:
+            if len(self._queue) <= self.batch_size:
+                batch = list(self._queue)
+                self._queue.clear()
+            else:
+                popleft = self._queue.popleft
+                batch = [popleft() for _ in range(self.batch_size)]
+            self._not_full.notify_all()
+            return batch
+
+        if self._on_disk:
+            count = min(self._on_disk, self.batch_size)
+            self._on_disk -= count
+            return count
+        return None
+
+    def _load(self, batch: Union[List[Event], int]) -> List[Event]:
+        """
+        Completa o lote retirado por _take (sem self._lock): uma quantidade
+        é lida do arquivo com o lock dele e desserializada depois.
+        """
+        if not isinstance(batch, int):
+            return batch
+        records = []
+        with self._file_lock:
+            spill_file = self._spill_file
+            spill_file.seek(self._read_at)
+            for _ in range(batch):
+                size, = _RECORD.unpack(spill_file.read(_RECORD.size))
+                records.append(spill_file.read(size))
+            self._read_at = spill_file.tell()
+            if self._read_at == self._write_at:
+                spill_file.seek(0)
+                spill_file.truncate()
+                self._read_at = self._write_at = 0
+        return [pickle.loads(record) for record in records]
+
+    def _deliver(self, event: Event) -> Any:
+        """Chama o handler para um evento, contando atrasos e exceções."""
+        self._head = event.timestamp
+        lag = self.clock() - event.timestamp
+        if lag > self.max_lag_seconds:
+            self.max_lag_seconds = lag
+        self.delivered += 1
+        try:
+            return self.handler(event)
+        except Exception as error:
+            self.errors += 1
+            self.last_error = repr(error)
+            return None
+
+    def _delivered(self, count: int) -> None:
+        """Libera um lote entregue dos pendentes (com o lock)."""
+        self._pending -= count
+        if not self._pending:
+            self._idle.notify_all()
+
+    def _run(self) -> None:
+        """Laço do consumidor em thread."""
+        while True:
+            with self._lock:
+                batch = self._take()
+                while batch is None:
+                    if self._closed and not self._spilling:
+                        return
+                    self._not_empty.wait()
+                    batch = self._take()
+            batch = self._load(batch)
+            for event in batch:
+                self._deliver(event)
+            with self._lock:
+                self._delivered(len(batch))
+
+    # Estado
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera até todos os eventos aceitos serem entregues.
+
+        Returns:
+            False se o tempo limite acabou antes
+        """
+        with self._lock:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def close(self, drain: bool = True, timeout: Optional[float] = None) -> None:
+        """
+        Para de aceitar eventos e encerra o consumidor.
+
+        Args:
+            drain: Entregar os eventos pendentes antes de encerrar; se False,
+                eles são descartados (contados em dropped)
+            timeout: Tempo máximo de espera pelo consumidor
+        """
+        with self._lock:
+            self._closed = True
+            if not drain:
+                self._discard = True
+                discarded = len(self._queue) + self._on_disk
+                self._queue.clear()
+                self._on_disk = 0
+                self.dropped += discarded
+                self._pending -= discarded
+                if not self._pending:
+                    self._idle.notify_all()
+            self._not_full.notify_all()
+            self._wake()
+        self._join(timeout)
+        with self._lock:
+            if self._spill_file is not None and not self._on_disk and not self._spilling:
+                with self._file_lock:
+                    self._spill_file.close()
+                    self._spill_file = None
+            on_close, self._on_close = self._on_close, None
+        if on_close is not None:
+            on_close()
+
+    def _join(self, timeout: Optional[float]) -> None:
+        """Espera o consumidor terminar."""
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def statistics(self) -> Dict[str, Any]:
+        """
+        Estado do assinante.
+
+        Returns:
+            Dicionário com fila, pendentes, entregues, descartados,
+            transbordados, erros e atraso (lag_seconds: idade do evento mais
+            antigo ainda não entregue; max_lag_seconds: maior atraso entre
+            publicação e entrega)
+        """
+        with self._lock:
+            pending = self._pending
+            lag = self.clock() - self._head if pending else 0.0
+            return {
+                "kinds": list(self.kinds) if self.kinds is not None else None,
+                "policy": self.policy,
+                "capacity": self.capacity,
+                "queued": len(self._queue),
+                "on_disk": self._on_disk,
+                "pending": pending,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "spilled": self.spilled,
+                "errors": self.errors,
+                "last_error": self.last_error,
+                "lag_seconds": max(lag, 0.0),
+                "max_lag_seconds": self.max_lag_seconds,
+            }
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(name={self.name!r}, policy={self.policy!r})"
+
+
+class AsyncSubscription(Subscription):
+    """
+    Assinante consumido por uma tarefa em um loop asyncio.
+
+    O handler pode ser uma função comum ou uma corrotina. A política
+    'block' não é aceita: um publicador no próprio loop esperaria uma
+    tarefa que só roda quando ele devolve o controle.
+    """
+
+    def __init__(self, handler, name: str, loop: asyncio.AbstractEventLoop, **options):
+        if options.get("policy") == BLOCK:
+            raise ValueError("A política 'block' exige um assinante em thread")
+        super().__init__(handler, name, **options)
+        self.loop = loop
+        self._ready: Optional[asyncio.Event] = None
+        self._sleeping = False
+        self._future = None
+
+    def start(self) -> None:
+        """Agenda a tarefa consumidora no loop."""
+        self._future = asyncio.run_coroutine_threadsafe(self._run_async(), self.loop)
+
+    def _wake(self) -> None:
+        """Acorda a tarefa apenas quando ela está esperando (com o lock)."""
+        if self._sleeping:
+            self._sleeping = False
+            self.loop.call_soon_threadsafe(self._ready.set)
+
+    async def _run_async(self) -> None:
+        """Laço do consumidor no loop asyncio."""
+        self._ready = asyncio.Event()
+        while True:
+            with self._lock:
+                batch = self._take()
+                if batch is None:
+                    if self._closed and not self._spilling:
+                        return
+                    self._ready.clear()
+                    self._sleeping = True
+            if batch is None:
+                await self._ready.wait()
+                continue
+            batch = self._load(batch)
+            for event in batch:
+                result = self._deliver(event)
+                if asyncio.iscoroutine(result):
+                    try:
+                        await result
+                    except Exception as error:
+                        self.errors += 1
+                        self.last_error = repr(error)
+            with self._lock:
+                self._delivered(len(batch))
+
+    def _join(self, timeout: Optional[float]) -> None:
+        """Espera a tarefa terminar (exceto quando chamado no próprio loop)."""
+        try:
+            in_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            in_loop = False
+        if self._future is not None and not in_loop:
+            self._future.result(timeout)
+
+
+class EventBus:
+    """
+    Barramento de eventos com uma fila limitada por assinante.
+
+    Publicar não espera nenhum consumidor (exceto assinantes com a política
+    'block'); tipos sem assinantes custam uma busca em dicionário. A tabela
+    tipo -> assinantes é trocada por inteiro a cada assinatura, então
+    publicar não precisa de lock.
+
+    Também funciona como context manager (close ao sair).
+
+    Args:
+        clock: Relógio dos instantes de publicação e do atraso
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self.clock = clock
+        self._subscriptions: Dict[str, Subscription] = {}
+        self._routes: Dict[str, Tuple[Subscription, ...]] = {}
+        self._catch_all: Tuple[Subscription, ...] = ()
+        self._sequence = itertools.count(1)
+        self._last_sequence = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def subscribe(
+        self,
+        handler: Callable[[Event], Any],
+        kinds: Optional[Iterable[str]] = None,
+        name: Optional[str] = None,
+        capacity: int = 1024,
+        policy: str = SPILL,
+        batch_size: int = 256,
+        spill_dir: Optional[str] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        on_close: Optional[Callable[[], Any]] = None
+    ) -> Subscription:
+        """
+        Registra um assinante e inicia o seu consumidor.
+
+        Args:
+            handler: Função chamada com cada Event (ou corrotina, com loop)
+            kinds: Tipos de evento assinados (None = todos)
+            name: Nome do assinante (padrão: nome do handler)
+            capacity: Tamanho máximo da fila em memória
+            policy: 'block', 'drop-oldest' ou 'spill' (fila cheia)
+            batch_size: Eventos retirados da fila por vez
+            spill_dir: Diretório do arquivo de transbordo (padrão: temporário)
+            loop: Loop asyncio que consome os eventos (None = thread própria)
+            on_close: Chamada depois da última entrega, ao encerrar a
+                assinatura (ex.: fechar o arquivo do handler)
+
+        Returns:
+            Assinatura (ver Subscription.statistics)
+
+        Raises:
+            ValueError: Nome repetido, política ou tipo de evento inválidos
+            RuntimeError: Se o barramento já foi fechado
+        """
+        if kinds is not None:
+            kinds = (kinds,) if isinstance(kinds, str) else tuple(kinds)
+            unknown = sorted(set(kinds) - set(EVENT_KINDS))
+            if unknown:
+                raise ValueError(f"Tipos de evento desconhecidos: {', '.join(unknown)}")
+        options = dict(kinds=kinds, capacity=capacity, policy=policy,
+                       batch_size=batch_size, spill_dir=spill_dir, clock=self.clock,
+                       on_close=on_close)
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("O barramento de eventos já foi fechado")
+            if name is None:
+                base = getattr(handler, "__name__", "assinante")
+                name = base
+                for number in itertools.count(2):
+                    if name not in self._subscriptions:
+                        break
+                    name = f"{base}-{number}"
+            elif name in self._subscriptions:
+                raise ValueError(f"Já existe um assinante chamado '{name}'")
+
+            if loop is None:
+                subscription = Subscription(handler, name, **options)
+            else:
+                subscription = AsyncSubscription(handler, name, loop, **options)
+            self._subscriptions[name] = subscription
+            self._rebuild_routes()
+        subscription.start()
+        return subscription
+
+    def unsubscribe(
+        self, subscription: Subscription, drain: bool = True, timeout: Optional[float] = None
+    ) -> None:
+        """Remove um assinante, entregando (ou descartando) os pendentes."""
+        with self._lock:
+            if self._subscriptions.get(subscription.name) is not subscription:
+                return
+            del self._subscriptions[subscription.name]
+            self._rebuild_routes()
+        subscription.close(drain, timeout)
+
+    def _rebuild_routes(self) -> None:
+        """Monta a tabela tipo -> assinantes (com o lock)."""
+        subscriptions = list(self._subscriptions.values())
+        self._routes = {
+            kind: tuple(s for s in subscriptions if s.kinds is None or kind in s.kinds)
+            for kind in EVENT_KINDS
+        }
+        self._catch_all = tuple(s for s in subscriptions if s.kinds is None)
+
+    @property
+    def subscriptions(self) -> List[Subscription]:
+        """Assinantes ativos, na ordem de assinatura."""
+        return list(self._subscriptions.values())
+
+    def wants(self, kind: str) -> bool:
+        """Indica se algum assinante recebe eventos do tipo."""
+        return bool(self._routes.get(kind, self._catch_all))
+
+    def publish(self, kind: str, data: Dict[str, Any]) -> Optional[Event]:
+        """
+        Publica um evento para os assinantes do tipo.
+
+        Returns:
+            Evento publicado, ou None se ninguém assina o tipo
+        """
+        targets = self._routes.get(kind, self._catch_all)
+        if not targets:
+            return None
+        event = Event(kind, next(self._sequence), self.clock(), data)
+        self._last_sequence = event.sequence
+        for subscription in targets:
+            subscription.offer(event)
+        return event
+
+    # Eventos dos serviços
+
+    def piece_registered(self, piece) -> None:
+        """Publica o cadastro de uma peça já validada."""
+        self.pieces_registered(
+            (piece.piece_id,), (piece.weight,), (piece.color,), (piece.length,),
+            (piece.rejection_flags,), (piece.registered_at,)
+        )
+
+    def pieces_registered(
+        self,
+        piece_ids: Sequence[str],
+        weights: Sequence[float],
+        colors: Sequence[str],
+        lengths: Sequence[float],
+        flags: Sequence[int],
+        timestamps: Sequence[float]
+    ) -> None:
+        """Publica PieceRegistered (e PieceRejected para as reprovadas) de um lote."""
+        registered, rejected = self.wants(PIECE_REGISTERED), self.wants(PIECE_REJECTED)
+        if not registered and not rejected:
+            return
+        publish = self.publish
+        for piece_id, weight, color, length, flag, timestamp in zip(
+            piece_ids, weights, colors, lengths, flags, timestamps
+        ):
+            data = {"piece_id": piece_id, "weight": weight, "color": color,
+                    "length": length, "flags": flag, "registered_at": timestamp}
+            if registered:
+                publish(PIECE_REGISTERED, data)
+            if rejected and flag:
+                publish(PIECE_REJECTED, data)
+
+    def piece_removed(self, piece_id: str) -> None:
+        """Publica a remoção de uma peça do registro."""
+        self.publish(PIECE_REMOVED, {"piece_id": piece_id})
+
+    def pieces_stored(self, piece_ids: Sequence[str], box_id: int) -> None:
+        """Publica o armazenamento de peças em uma caixa."""
+        if self.wants(PIECE_STORED):
+            for piece_id in piece_ids:
+                self.publish(PIECE_STORED, {"piece_id": piece_id, "box_id": box_id})
+
+    def box_closed(self, box) -> None:
+        """Publica o fechamento de uma caixa (com as peças dela)."""
+        if self.wants(BOX_CLOSED):
+            self.publish(BOX_CLOSED, {
+                "box_id": box.box_id,
+                "piece_ids": tuple(piece.piece_id for piece in box.pieces),
+                "total_weight": box.total_weight,
+                "total_length": box.total_length,
+            })
+
+    # Estado
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera todos os assinantes entregarem os eventos já publicados.
+
+        Não deve ser chamado de dentro do loop de um assinante asyncio.
+
+        Returns:
+            False se o tempo limite acabou antes
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for subscription in self.subscriptions:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0.0)
+            if not subscription.wait_idle(remaining):
+                return False
+        return True
+
+    def statistics(self) -> Dict[str, Any]:
+        """
+        Estado do barramento.
+
+        Returns:
+            Dicionário com o total publicado e o estado de cada assinante
+            (ver Subscription.statistics)
+        """
+        subscriptions = self.subscriptions
+        return {
+            "published": self._last_sequence,
+            "subscribers": {s.name: s.statistics() for s in subscriptions},
+        }
+
+    def close(self, drain: bool = True, timeout: Optional[float] = None) -> None:
+        """Fecha o barramento e encerra todos os consumidores."""
+        with self._lock:
+            self._closed = True
+            subscriptions = list(self._subscriptions.values())
+            self._subscriptions.clear()
+            self._rebuild_routes()
+        for subscription in subscriptions:
+            subscription.close(drain, timeout)
+
+    def __enter__(self) -> "EventBus":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"EventBus(subscribers={len(self._subscriptions)})"
+
+
+class EventLog:
+    """
+    Assinante que acrescenta cada evento a um arquivo NDJSON.
+
+    Uma linha por evento (Event.to_dict), gravada pelo consumidor do
+    assinante, fora do caminho de inspeção.
+
+    Args:
+        path: Arquivo de saída (aberto para acréscimo)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __call__(self, event: Event) -> None:
+        self._file.write(json.dumps(event.to_dict(), ensure_ascii=False, default=str) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def attach_event_bus(quality_service, storage_service, log_path: Optional[str] = None) -> EventBus:
+    """
+    Cria um barramento e o liga ao atributo events dos serviços.
+
+    Usado pelos pontos de entrada (main.py e server.py). Sem log_path o
+    barramento fica sem assinantes, e publicar custa uma busca em
+    dicionário por evento; com log_path, um EventLog assina todos os
+    eventos (fechado junto com o barramento).
+
+    Returns:
+        Barramento criado (feche com EventBus.close ao encerrar)
+    """
+    bus = EventBus()
+    if log_path:
+        log = EventLog(log_path)
+        bus.subscribe(log, name="events-log", on_close=log.close)
+    quality_service.events = bus
+    storage_service.events = bus
+    return bus
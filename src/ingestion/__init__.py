@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+Ingestao em fluxo de leituras de sensores do sistema FactorySense.
+"""
+
+from .stream import (
+    IngestionPipeline,
+    ReadingBatch,
+    read_csv_batches,
+    read_ndjson_batches,
+)
+
+__all__ = ['IngestionPipeline', 'ReadingBatch', 'read_csv_batches', 'read_ndjson_batches']
@@ -0,0 +1,281 @@
+"""
+Ingestão em fluxo de leituras de sensores (CSV e NDJSON).
+
+Os arquivos são lidos em lotes de tamanho fixo, de modo que a memória usada
+pela leitura não depende do tamanho do arquivo. Cada lote segue em formato
+colunar para QualityService.register_pieces e as peças aprovadas vão
+direto para o StorageService.
+"""
+
+import csv
+import json
+import time
+from array import array
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from ..services.quality_service import QualityService
+from ..services.storage_service import StorageService
+from ..validators.quality_validator import QualityValidator
+
+# Nomes aceitos para cada coluna (português, como em Piece.to_dict, ou inglês)
+FIELD_ALIASES = {
+    "id": ("id", "piece_id"),
+    "weight": ("peso", "weight"),
+    "color": ("cor", "color"),
+    "length": ("comprimento", "length"),
+}
+
+DEFAULT_BATCH_SIZE = 10_000
+
+
+class ReadingBatch:
+    """
+    Lote de leituras em formato colunar.
+
+    Atributos:
+        ids: IDs informados (None quando a leitura não traz ID)
+        weights: Pesos em gramas
+        colors: Cores
+        lengths: Comprimentos em centímetros
+        invalid_rows: Linhas descartadas por estarem malformadas
+    """
+
+    __slots__ = ("ids", "weights", "colors", "lengths", "invalid_rows")
+
+    def __init__(self):
+        self.ids: List[Optional[str]] = []
+        self.weights = array("d")
+        self.colors: List[str] = []
+        self.lengths = array("d")
+        self.invalid_rows = 0
+
+    def append(self, piece_id: Optional[str], weight: float, color: str, length: float) -> None:
+        """Acrescenta uma leitura ao lote."""
+        self.ids.append(piece_id or None)
+        self.weights.append(weight)
+        self.colors.append(color)
+        self.lengths.append(length)
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+
+def _resolve_columns(header: List[str]) -> Dict[str, Optional[int]]:
+    """Mapeia cada campo para o índice da coluna no cabeçalho CSV."""
+    normalized = [name.strip().lower() for name in header]
+    columns: Dict[str, Optional[int]] = {}
+    for field, aliases in FIELD_ALIASES.items():
+        columns[field] = next(
+            (normalized.index(alias) for alias in aliases if alias in normalized), None
+        )
+    missing = [field for field in ("weight", "color", "length") if columns[field] is None]
+    if missing:
+        raise ValueError(f"Cabeçalho CSV sem as colunas: {', '.join(missing)}")
+    return columns
+
+
+def read_csv_batches(stream: TextIO, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[ReadingBatch]:
+    """
+    Lê um CSV com cabeçalho em lotes.
+
+    Args:
+        stream: Arquivo de texto (ou stdin)
+        batch_size: Leituras por lote
+
+    Yields:
+        Lotes de leituras; linhas malformadas são contadas em invalid_rows
+
+    Raises:
+        ValueError: Se o cabeçalho não tiver as colunas obrigatórias
+    """
+    reader = csv.reader(stream)
+    header = next(reader, None)
+    if header is None:
+        return
+
+    columns = _resolve_columns(header)
+    id_index = columns["id"]
+    weight_index = columns["weight"]
+    color_index = columns["color"]
+    length_index = columns["length"]
+
+    while True:
+        rows = list(islice(reader, batch_size))
+        if not rows:
+            return
+
+        batch = ReadingBatch()
+        ids, colors = batch.ids, batch.colors
+        weights, lengths = batch.weights, batch.lengths
+        for row in rows:
+            try:
+                weight = float(row[weight_index])
+                color = row[color_index].strip()
+                length = float(row[length_index])
+                piece_id = row[id_index].strip() if id_index is not None else None
+            except (IndexError, ValueError):
+                if row:
+                    batch.invalid_rows += 1
+                continue
+            ids.append(piece_id or None)
+            weights.append(weight)
+            colors.append(color)
+            lengths.append(length)
+        yield batch
+
+
+def _field(record: Dict[str, Any], field: str) -> Any:
+    """Obtém um campo de um registro JSON aceitando os nomes alternativos."""
+    for alias in FIELD_ALIASES[field]:
+        if alias in record:
+            return record[alias]
+    return None
+
+
+def read_ndjson_batches(stream: TextIO, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[ReadingBatch]:
+    """
+    Lê NDJSON (um objeto JSON por linha) em lotes.
+
+    Args:
+        stream: Arquivo de texto (ou stdin)
+        batch_size: Leituras por lote
+
+    Yields:
+        Lotes de leituras; linhas malformadas são contadas em invalid_rows
+    """
+    loads = json.loads
+
+    while True:
+        lines = list(islice(stream, batch_size))
+        if not lines:
+            return
+
+        batch = ReadingBatch()
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                record = loads(line)
+                piece_id = _field(record, "id")
+                batch.append(
+                    None if piece_id is None else str(piece_id),
+                    float(_field(record, "weight")),
+                    str(_field(record, "color")),
+                    float(_field(record, "length"))
+                )
+            except (TypeError, ValueError, AttributeError):
+                batch.invalid_rows += 1
+        yield batch
+
+
+READERS: Dict[str, Callable[..., Iterator[ReadingBatch]]] = {
+    "csv": read_csv_batches,
+    "ndjson": read_ndjson_batches,
+}
+
+
+class IngestionPipeline:
+    """
+    Encadeia leitura em lotes, validação, registro e armazenamento.
+
+    Com validate_only=True as leituras são apenas validadas e contadas, sem
+    serem retidas nos serviços: o consumo de memória fica constante mesmo
+    para arquivos maiores que a RAM.
+    """
+
+    def __init__(
+        self,
+        quality_service: QualityService,
+        storage_service: StorageService,
+        validate_only: bool = False
+    ):
+        self.quality_service = quality_service
+        self.storage_service = storage_service
+        self.validate_only = validate_only
+
+        self.rows = 0
+        self.approved = 0
+        self.rejected = 0
+        self.stored = 0
+        self.invalid_rows = 0
+        self.started_at: Optional[float] = None
+
+    def process(self, batch: ReadingBatch) -> None:
+        """Processa um lote de leituras."""
+        self.invalid_rows += batch.invalid_rows
+        if not len(batch):
+            return
+
+        if self.validate_only:
+            mask, _ = QualityValidator.validate_batch(
+                batch.weights, batch.colors, batch.lengths, self.quality_service.rules
+            )
+            approved = mask.count(1)
+            self._count(len(batch), approved, 0)
+            return
+
+        # Sem nenhum ID informado, o serviço gera todos de uma vez
+        custom_ids = batch.ids if any(batch.ids) else None
+        try:
+            pieces = self.quality_service.register_pieces(
+                batch.weights, batch.colors, batch.lengths, custom_ids=custom_ids
+            )
+        except ValueError:
+            # IDs repetidos no lote: registrar uma a uma e descartar as repetidas
+            pieces = []
+            for piece_id, weight, color, length in zip(
+                batch.ids, batch.weights, batch.colors, batch.lengths
+            ):
+                try:
+                    pieces.append(
+                        self.quality_service.register_piece(weight, color, length, piece_id)
+                    )
+                except ValueError:
+                    self.invalid_rows += 1
+
+        approved = [piece for piece in pieces if piece.is_approved()]
+        stored = self.storage_service.store_pieces(approved)
+        self._count(len(pieces), len(approved), stored)
+
+    def _count(self, rows: int, approved: int, stored: int) -> None:
+        self.rows += rows
+        self.approved += approved
+        self.rejected += rows - approved
+        self.stored += stored
+
+    def run(
+        self,
+        batches: Iterable[ReadingBatch],
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        progress_interval: float = 1.0
+    ) -> Dict[str, Any]:
+        """
+        Processa todos os lotes, chamando progress periodicamente.
+
+        Returns:
+            Resumo final (ver summary)
+        """
+        self.started_at = time.perf_counter()
+        next_report = self.started_at + progress_interval
+
+        for batch in batches:
+            self.process(batch)
+            if progress is not None and time.perf_counter() >= next_report:
+                progress(self.summary())
+                next_report = time.perf_counter() + progress_interval
+
+        return self.summary()
+
+    def summary(self) -> Dict[str, Any]:
+        """Retorna contadores e vazão (linhas por segundo) até o momento."""
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        return {
+            "rows": self.rows,
+            "approved": self.approved,
+            "rejected": self.rejected,
+            "stored": self.stored,
+            "invalid_rows": self.invalid_rows,
+            "seconds": elapsed,
+            "rows_per_second": self.rows / elapsed if elapsed else 0.0,
+        }
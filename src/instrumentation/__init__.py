@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentacao do sistema FactorySense (contadores, histogramas e exposicao).
+"""
+
+from .metrics import DEFAULT_BUCKETS, Counter, Histogram, MetricsRegistry, Timer
+from .hot_paths import HOT_PATHS, Instrumentation
+from .exposition import MetricsHTTPServer, render_prometheus, snapshot
+
+__all__ = [
+    'Counter', 'DEFAULT_BUCKETS', 'HOT_PATHS', 'Histogram', 'Instrumentation',
+    'MetricsHTTPServer', 'MetricsRegistry', 'Timer', 'render_prometheus', 'snapshot',
+]
@@ -0,0 +1,169 @@
+"""
+Exposição das métricas: texto do Prometheus, JSON e endpoint HTTP local.
+
+O endpoint usa apenas http.server em uma thread própria:
+
+    GET /metrics        formato texto do Prometheus (0.0.4)
+    GET /metrics.json   o mesmo conteúdo em JSON (snapshot())
+"""
+
+import json
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+from .metrics import Labels, MetricsRegistry
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [
+        '{}="{}"'.format(
+            name, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        )
+        for name, value in labels
+    ]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def render_prometheus(registry: MetricsRegistry) -> str:
+    """
+    Gera o snapshot no formato texto do Prometheus.
+
+    Returns:
+        Texto com # HELP / # TYPE por métrica e uma linha por série
+        (histogramas com _bucket acumulado, _sum e _count)
+    """
+    lines: List[str] = []
+    described = set()
+    for metric in registry:
+        if metric.name not in described:
+            described.add(metric.name)
+            if metric.help:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+
+        if metric.kind == "counter":
+            lines.append(
+                f"{metric.name}{_format_labels(metric.labels)} {_format_value(metric.value)}"
+            )
+            continue
+
+        cumulative = metric.cumulative()
+        for bound, count in zip(metric.bounds + (math.inf,), cumulative):
+            labels = _format_labels(metric.labels, f'le="{_format_value(bound)}"')
+            lines.append(f"{metric.name}_bucket{labels} {count}")
+        labels = _format_labels(metric.labels)
+        lines.append(f"{metric.name}_sum{labels} {_format_value(metric.sum)}")
+        lines.append(f"{metric.name}_count{labels} {cumulative[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+def snapshot(registry: MetricsRegistry) -> Dict[str, Any]:
+    """
+    Snapshot das métricas em estrutura serializável em JSON.
+
+    Returns:
+        {"metrics": [...]} com name, type, labels e value (contadores) ou
+        count, sum, mean, p50, p99 e buckets acumulados (histogramas)
+    """
+    metrics = []
+    for metric in registry:
+        entry: Dict[str, Any] = {
+            "name": metric.name,
+            "type": metric.kind,
+            "labels": dict(metric.labels),
+        }
+        if metric.kind == "counter":
+            entry["value"] = metric.value
+        else:
+            cumulative = metric.cumulative()
+            count = cumulative[-1]
+            entry.update({
+                "count": count,
+                "sum": metric.sum,
+                "mean": metric.sum / count if count else None,
+                "p50": metric.quantile(0.5),
+                "p99": metric.quantile(0.99),
+                "buckets": {
+                    _format_value(bound): total
+                    for bound, total in zip(metric.bounds + (math.inf,), cumulative)
+                },
+            })
+        metrics.append(entry)
+    return {"metrics": metrics}
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Responde /metrics e /metrics.json a partir do registro do servidor."""
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body = render_prometheus(self.server.registry).encode("utf-8")
+            content_type = PROMETHEUS_CONTENT_TYPE
+        elif path == "/metrics.json":
+            body = json.dumps(snapshot(self.server.registry)).encode("utf-8")
+            content_type = "application/json"
+        else:
+            self.send_error(404, "Use /metrics ou /metrics.json")
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args) -> None:
+        """Sem log por requisição (o endpoint é consultado periodicamente)."""
+
+
+class MetricsHTTPServer(ThreadingHTTPServer):
+    """
+    Servidor HTTP local das métricas, executado em uma thread daemon.
+
+    Args:
+        registry: Registro exposto
+        host: Endereço (padrão: somente local)
+        port: Porta (0 escolhe uma livre; veja self.port após start)
+    """
+
+    daemon_threads = True
+
+    def __init__(self, registry: MetricsRegistry, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), _MetricsHandler)
+        self.registry = registry
+        self._thread = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> int:
+        """Passa a atender em segundo plano e devolve a porta."""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self.serve_forever, name="factorysense-metrics", daemon=True
+            )
+            self._thread.start()
+        return self.port
+
+    def stop(self) -> None:
+        """Para de atender e libera a porta."""
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
@@ -0,0 +1,153 @@
+"""
+Instrumentação dos caminhos críticos (validação, cadastro, caixas, relatórios).
+
+Enquanto está desligada, nenhum código de medição fica no caminho: enable()
+troca os métodos listados em HOT_PATHS por versões cronometradas e
+disable() devolve os originais. Com isso o custo desligado é zero, e o
+custo ligado é uma leitura de relógio e uma observação por chamada.
+"""
+
+import functools
+import threading
+import time
+from typing import Any, List, Optional, Sequence, Tuple
+
+from ..reports.report_generator import ReportGenerator
+from ..services.lane_storage_service import LaneStorageService
+from ..services.quality_service import QualityService
+from ..services.storage_service import StorageService
+from ..validators.quality_validator import QualityValidator
+from .metrics import DEFAULT_BUCKETS, Counter, Histogram, MetricsRegistry
+
+# (etapa, classe, método) de cada ponto medido
+HOT_PATHS: Tuple[Tuple[str, type, str], ...] = (
+    ("validate", QualityValidator, "validate"),
+    ("apply_validation", QualityValidator, "apply_validation"),
+    ("validate_batch", QualityValidator, "validate_batch"),
+    ("register_piece", QualityService, "register_piece"),
+    ("register_pieces", QualityService, "register_pieces"),
+    ("remove_piece", QualityService, "remove_piece"),
+    ("store_piece", StorageService, "store_piece"),
+    ("store_pieces", StorageService, "store_pieces"),
+    ("create_box", StorageService, "_create_new_box"),
+    ("store_piece", LaneStorageService, "store_piece"),
+    ("store_pieces", LaneStorageService, "store_pieces"),
+    ("create_box", LaneStorageService, "_create_new_box"),
+    ("summary_report", ReportGenerator, "generate_summary_report"),
+    ("consolidated_data", ReportGenerator, "get_consolidated_data"),
+    ("export", ReportGenerator, "export"),
+)
+
+STAGE_SECONDS = "factorysense_stage_seconds"
+STAGE_ERRORS = "factorysense_stage_errors_total"
+
+# Instrumentação ativa no processo (a troca de métodos é global)
+_active: Optional["Instrumentation"] = None
+_active_lock = threading.Lock()
+
+
+def _timed(function, histogram: Histogram, errors: Counter):
+    """Envolve function registrando a duração de cada chamada."""
+    observe, fail, clock = histogram.observe, errors.inc, time.perf_counter
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = clock()
+        try:
+            return function(*args, **kwargs)
+        except BaseException:
+            fail()
+            raise
+        finally:
+            observe(clock() - start)
+
+    wrapper.__instrumented__ = True
+    return wrapper
+
+
+class Instrumentation:
+    """
+    Liga e desliga a medição dos caminhos críticos.
+
+    Cada etapa tem um histograma de latência (factorysense_stage_seconds,
+    rótulo stage) cuja contagem é também o número de chamadas, e um
+    contador de exceções (factorysense_stage_errors_total). Chamadas
+    aninhadas são medidas em cada etapa (register_piece inclui
+    apply_validation).
+
+    Só uma instância pode estar ligada por vez, pois os métodos são
+    trocados nas classes. Também funciona como context manager.
+
+    Args:
+        registry: Registro das métricas (padrão: um novo MetricsRegistry)
+        bounds: Limites dos baldes de latência, em segundos
+        hot_paths: Pontos medidos (padrão: HOT_PATHS)
+    """
+
+    def __init__(
+        self,
+        registry: Optional[MetricsRegistry] = None,
+        bounds: Sequence[float] = DEFAULT_BUCKETS,
+        hot_paths: Sequence[Tuple[str, type, str]] = HOT_PATHS
+    ):
+        self.registry = registry if registry is not None else MetricsRegistry()
+        self._patches: List[Tuple[type, str, Any, Any]] = []
+
+        for stage, owner, name in hot_paths:
+            original = owner.__dict__.get(name)
+            if original is None:
+                raise AttributeError(f"{owner.__name__} não define {name}")
+            histogram = self.registry.histogram(
+                STAGE_SECONDS, "Latência por etapa, em segundos",
+                {"stage": stage}, bounds
+            )
+            errors = self.registry.counter(
+                STAGE_ERRORS, "Exceções por etapa", {"stage": stage}
+            )
+            if isinstance(original, (classmethod, staticmethod)):
+                patched = type(original)(_timed(original.__func__, histogram, errors))
+            else:
+                patched = _timed(original, histogram, errors)
+            self._patches.append((owner, name, original, patched))
+
+    @property
+    def enabled(self) -> bool:
+        return _active is self
+
+    def enable(self) -> "Instrumentation":
+        """
+        Instala a medição nas classes.
+
+        Raises:
+            RuntimeError: Se outra instância já estiver ligada
+        """
+        global _active
+        with _active_lock:
+            if _active is self:
+                return self
+            if _active is not None:
+                raise RuntimeError("Outra instrumentação já está ligada")
+            for owner, name, _, patched in self._patches:
+                setattr(owner, name, patched)
+            _active = self
+        return self
+
+    def disable(self) -> None:
+        """Restaura os métodos originais (sem efeito se já desligada)."""
+        global _active
+        with _active_lock:
+            if _active is not self:
+                return
+            for owner, name, original, _ in reversed(self._patches):
+                setattr(owner, name, original)
+            _active = None
+
+    def stage(self, stage: str) -> Histogram:
+        """Histograma de latência de uma etapa."""
+        return self.registry.histogram(STAGE_SECONDS, labels={"stage": stage})
+
+    def __enter__(self) -> "Instrumentation":
+        return self.enable()
+
+    def __exit__(self, *exc_info) -> None:
+        self.disable()
@@ -0,0 +1,222 @@
+"""
+Contadores e histogramas de latência com memória fixa.
+
+Um histograma guarda as contagens em um array de baldes com limites fixos,
+alocado na criação; registrar uma observação apenas localiza o balde
+(busca binária nos limites) e soma 1, sem criar listas nem dicionários.
+"""
+
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Limites padrão (segundos) dos histogramas de latência: de 1µs a 10s
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4,
+    1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> Labels:
+    """Rótulos em forma canônica (tupla ordenada), usada como chave."""
+    return tuple(sorted((labels or {}).items()))
+
+
+class Counter:
+    """
+    Contador monotônico.
+
+    Sem lock: incrementos simultâneos de várias threads podem, raramente,
+    se perder, o que é aceitável para métricas de observação.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str = "", labels: Labels = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._value = array("d", [0.0])
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Soma amount ao contador."""
+        self._value[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._value[0]
+
+    def reset(self) -> None:
+        self._value[0] = 0.0
+
+
+class Histogram:
+    """
+    Histograma de baldes fixos (semântica "le" do Prometheus).
+
+    O balde i conta as observações <= bounds[i]; o último balde, além dos
+    limites, conta as demais (+Inf). As contagens ficam em um array('Q')
+    e a soma em um array('d'), ambos alocados na criação.
+
+    Args:
+        name: Nome da métrica
+        help_text: Descrição
+        labels: Rótulos canônicos (ver MetricsRegistry)
+        bounds: Limites superiores dos baldes, em ordem crescente
+
+    Raises:
+        ValueError: Se os limites estiverem vazios ou fora de ordem
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str = "",
+        labels: Labels = (),
+        bounds: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        bounds = tuple(float(bound) for bound in bounds)
+        if not bounds or any(a >= b for a, b in zip(bounds, bounds[1:])):
+            raise ValueError("Os limites dos baldes devem ser crescentes e não vazios")
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.bounds = bounds
+        self._counts = array("Q", bytes(8 * (len(bounds) + 1)))
+        self._sum = array("d", [0.0])
+
+    def observe(self, value: float) -> None:
+        """Registra uma observação (em segundos, para latências)."""
+        self._counts[bisect_left(self.bounds, value)] += 1
+        self._sum[0] += value
+
+    def time(self) -> "Timer":
+        """Context manager que observa a duração do bloco."""
+        return Timer(self)
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    @property
+    def sum(self) -> float:
+        return self._sum[0]
+
+    def cumulative(self) -> List[int]:
+        """Contagens acumuladas por limite, terminando no total (+Inf)."""
+        total, result = 0, []
+        for count in self._counts:
+            total += count
+            result.append(total)
+        return result
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """
+        Estimativa de um quantil pelo limite superior do balde que o contém.
+
+        Returns:
+            Limite do balde (o maior limite, se cair em +Inf) ou None sem
+            observações
+        """
+        cumulative = self.cumulative()
+        total = cumulative[-1]
+        if not total:
+            return None
+        target = fraction * total
+        for bound, count in zip(self.bounds, cumulative):
+            if count >= target:
+                return bound
+        return self.bounds[-1]
+
+    def reset(self) -> None:
+        for index in range(len(self._counts)):
+            self._counts[index] = 0
+        self._sum[0] = 0.0
+
+
+class Timer:
+    """Context manager que registra a duração do bloco em um histograma."""
+
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: Histogram):
+        self._histogram = histogram
+        self._start = 0.0
+
+    def __enter__(self) -> "Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+class MetricsRegistry:
+    """
+    Conjunto de métricas identificadas por nome e rótulos.
+
+    counter() e histogram() devolvem a métrica já registrada com o mesmo
+    nome e rótulos, de modo que podem ser chamados na preparação sem
+    duplicar séries. Crie as métricas fora do caminho crítico e guarde a
+    referência: a busca no registro não é feita a cada observação.
+
+    Raises:
+        ValueError: Se um nome for reutilizado com outro tipo de métrica
+    """
+
+    def __init__(self):
+        self._metrics: Dict[Tuple[str, Labels], object] = {}
+        self._kinds: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, factory, name: str, help_text: str, labels, **options):
+        key = (name, _labels(labels))
+        with self._lock:
+            kind = self._kinds.setdefault(name, factory.kind)
+            if kind != factory.kind:
+                raise ValueError(f"A métrica '{name}' já existe como {kind}")
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = factory(name, help_text, key[1], **options)
+            return metric
+
+    def counter(
+        self, name: str, help_text: str = "", labels: Optional[Dict[str, str]] = None
+    ) -> Counter:
+        """Obtém (ou cria) um contador."""
+        return self._get(Counter, name, help_text, labels)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str = "",
+        labels: Optional[Dict[str, str]] = None,
+        bounds: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        """Obtém (ou cria) um histograma com os limites informados."""
+        return self._get(Histogram, name, help_text, labels, bounds=bounds)
+
+    def timer(self, name: str, labels: Optional[Dict[str, str]] = None) -> Timer:
+        """Mede a duração de um bloco no histograma name (limites padrão)."""
+        return Timer(self.histogram(name, labels=labels))
+
+    def __iter__(self) -> Iterator:
+        """Métricas agrupadas por nome, na ordem de criação."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        order = {}
+        for metric in metrics:
+            order.setdefault(metric.name, []).append(metric)
+        for group in order.values():
+            yield from group
+
+    def reset(self) -> None:
+        """Zera todas as métricas (mantendo-as registradas)."""
+        for metric in self:
+            metric.reset()
@@ -5,5 +5,6 @@ Modelos de dominio do sistema FactorySense.
 
 from .piece import Piece
 from .box import Box
+from .piece_store import PieceStore, PieceStatus, StoredPiece
 
-__all__ = ['Piece', 'Box']
+__all__ = ['Piece', 'Box', 'PieceStore', 'PieceStatus', 'StoredPiece']
@@ -2,7 +2,7 @@
 Modelo de domínio para representar caixas de armazenamento de peças.
 """
 
-from typing import List
+from typing import List, Optional, Sequence
 from .piece import Piece
 
 
@@ -15,15 +15,51 @@ class Box:
         capacity: Capacidade máxima de peças (padrão: 10)
         pieces: Lista de peças armazenadas
         is_closed: Indica se a caixa está fechada
+        max_weight: Peso total máximo (None = sem limite)
+        max_length: Comprimento total máximo (None = sem limite)
+        total_weight: Soma dos pesos das peças na caixa
+        total_length: Soma dos comprimentos das peças na caixa
     """
 
     DEFAULT_CAPACITY = 10
 
-    def __init__(self, box_id: int, capacity: int = DEFAULT_CAPACITY):
+    def __init__(
+        self,
+        box_id: int,
+        capacity: int = DEFAULT_CAPACITY,
+        max_weight: Optional[float] = None,
+        max_length: Optional[float] = None
+    ):
         self.box_id = box_id
         self.capacity = capacity
+        self.max_weight = max_weight
+        self.max_length = max_length
         self.pieces: List[Piece] = []
         self.is_closed = False
+        self.total_weight = 0.0
+        self.total_length = 0.0
+
+    def fits(self, piece: Piece) -> bool:
+        """Verifica se a peça cabe na caixa (quantidade, peso e comprimento)."""
+        if self.is_closed or len(self.pieces) >= self.capacity:
+            return False
+        if self.max_weight is not None and self.total_weight + piece.weight > self.max_weight:
+            return False
+        if self.max_length is not None and self.total_length + piece.length > self.max_length:
+            return False
+        return True
+
+    def _fitting_prefix(self, pieces: Sequence[Piece]) -> int:
+        """Quantidade de peças do início da sequência que cabem nos limites."""
+        weight, length = self.total_weight, self.total_length
+        max_weight = self.max_weight if self.max_weight is not None else float("inf")
+        max_length = self.max_length if self.max_length is not None else float("inf")
+        for count, piece in enumerate(pieces):
+            weight += piece.weight
+            length += piece.length
+            if weight > max_weight or length > max_length:
+                return count
+        return len(pieces)
 
     def add_piece(self, piece: Piece) -> bool:
         """
@@ -34,20 +70,91 @@ class Box:
 
         Returns:
             True se a peça foi adicionada, False se a caixa está cheia
+            (ou a peça excede os limites de peso/comprimento)
         """
-        if self.is_full() or self.is_closed:
+        if not self.fits(piece):
             return False
 
         if not piece.is_approved():
             return False
 
         self.pieces.append(piece)
+        self.total_weight += piece.weight
+        self.total_length += piece.length
 
         if self.is_full():
             self.close()
 
         return True
 
+    def add_pieces(self, pieces: Sequence[Piece]) -> int:
+        """
+        Adiciona, em bloco, as primeiras peças da sequência que couberem.
+
+        Args:
+            pieces: Peças aprovadas, na ordem de armazenamento
+
+        Returns:
+            Quantidade de peças adicionadas (o maior prefixo de pieces que
+            cabe na capacidade e nos limites de peso/comprimento)
+
+        Raises:
+            ValueError: Se alguma peça do bloco não estiver aprovada
+        """
+        if self.is_closed:
+            return 0
+
+        chunk = pieces[:self.get_available_space()]
+        if not all(piece.is_approved() for piece in chunk):
+            raise ValueError("Apenas peças aprovadas podem ser armazenadas")
+        if self.max_weight is not None or self.max_length is not None:
+            chunk = chunk[:self._fitting_prefix(chunk)]
+
+        self.pieces.extend(chunk)
+        self.total_weight += sum(piece.weight for piece in chunk)
+        self.total_length += sum(piece.length for piece in chunk)
+
+        if self.is_full():
+            self.close()
+
+        return len(chunk)
+
+    def remove_piece(self, piece_id: str) -> Optional[Piece]:
+        """
+        Retira uma peça da caixa (custo proporcional à capacidade).
+
+        A caixa não é reaberta; use reopen() para voltar a aceitar peças.
+
+        Args:
+            piece_id: ID da peça
+
+        Returns:
+            Peça retirada ou None se não estiver na caixa
+        """
+        for index, piece in enumerate(self.pieces):
+            if piece.piece_id == piece_id:
+                self.total_weight -= piece.weight
+                self.total_length -= piece.length
+                return self.pieces.pop(index)
+        return None
+
+    def restore(self, pieces: Sequence[Piece], is_closed: bool) -> None:
+        """
+        Repõe o conteúdo de um snapshot, sem aplicar capacidade nem limites.
+
+        Args:
+            pieces: Peças contidas na caixa
+            is_closed: Se a caixa estava fechada
+        """
+        self.pieces.extend(pieces)
+        self.total_weight += sum(piece.weight for piece in pieces)
+        self.total_length += sum(piece.length for piece in pieces)
+        self.is_closed = is_closed
+
+    def reopen(self) -> None:
+        """Reabre a caixa para receber peças até completar a capacidade."""
+        self.is_closed = False
+
     def is_full(self) -> bool:
         """Verifica se a caixa está cheia."""
         return len(self.pieces) >= self.capacity
@@ -64,6 +171,12 @@ class Box:
         """Retorna o espaço disponível na caixa."""
         return self.capacity - len(self.pieces)
 
+    def get_remaining_weight(self) -> float:
+        """Retorna o peso que ainda cabe na caixa (infinito se sem limite)."""
+        if self.max_weight is None:
+            return float("inf")
+        return self.max_weight - self.total_weight
+
     def __repr__(self) -> str:
         status = "FECHADA" if self.is_closed else "ABERTA"
         return f"Box(id={self.box_id}, pieces={len(self.pieces)}/{self.capacity}, status={status})"
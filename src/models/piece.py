@@ -2,6 +2,7 @@
 Modelo de domínio para representar uma peça no sistema de controle de qualidade.
 """
 
+import sys
 from typing import Optional, Dict, Any
 
 
@@ -15,9 +16,24 @@ class Piece:
         color: Cor da peça
         length: Comprimento em centímetros
         status: Status de aprovação ('aprovada' ou 'reprovada')
-        rejection_reason: Motivo da reprovação (se aplicável)
+        rejection_reason: Motivo da reprovação no idioma padrão (se aplicável;
+            ver describe_rejection)
+        rejection_flags: Bits de falha por regra (ver QualityValidator.FLAG_*)
+        registered_at: Instante do cadastro (segundos desde a época; None se
+            a peça ainda não foi cadastrada)
     """
 
+    __slots__ = (
+        "piece_id",
+        "weight",
+        "color",
+        "length",
+        "status",
+        "rejection_flags",
+        "registered_at",
+        "_rejection_reason",
+    )
+
     def __init__(
         self,
         piece_id: str,
@@ -25,40 +41,80 @@ class Piece:
         color: str,
         length: float,
         status: str = "pendente",
-        rejection_reason: Optional[str] = None
+        rejection_reason: Optional[str] = None,
+        rejection_flags: int = 0,
+        registered_at: Optional[float] = None
     ):
         self.piece_id = piece_id
         self.weight = weight
-        self.color = color.lower()
+        self.color = sys.intern(color.lower())
         self.length = length
         self.status = status
-        self.rejection_reason = rejection_reason
+        self.rejection_flags = rejection_flags
+        self.registered_at = registered_at
+        self._rejection_reason = rejection_reason
+
+    @property
+    def rejection_reason(self) -> Optional[str]:
+        """Motivo da reprovação no idioma padrão, montado a cada consulta."""
+        return self.describe_rejection()
+
+    @rejection_reason.setter
+    def rejection_reason(self, reason: Optional[str]) -> None:
+        self._rejection_reason = reason
+
+    @property
+    def rules(self):
+        """Regras que interpretam os bits de falha (as regras padrão)."""
+        from ..validators.quality_validator import QualityValidator
+        return QualityValidator.rules
+
+    def describe_rejection(self, locale: Optional[str] = None) -> Optional[str]:
+        """
+        Motivo da reprovação no idioma informado.
+
+        Um motivo explícito (reject(reason=...)) é retornado como está; os
+        demais são montados a partir dos bits de falha e dos valores medidos
+        e não ficam guardados na peça.
+
+        Args:
+            locale: 'pt-BR', 'en' ou 'es' (None = idioma padrão)
+        """
+        if self._rejection_reason is not None or not self.rejection_flags:
+            return self._rejection_reason
+        from ..validators.quality_validator import QualityValidator
+        return QualityValidator.describe_failures(
+            self.rejection_flags, self.weight, self.color, self.length, locale
+        )
 
-    def to_dict(self) -> Dict[str, Any]:
-        """Converte a peça para dicionário."""
+    def to_dict(self, locale: Optional[str] = None) -> Dict[str, Any]:
+        """Converte a peça para dicionário (motivo no idioma informado)."""
         return {
             "id": self.piece_id,
             "peso": self.weight,
             "cor": self.color,
             "comprimento": self.length,
             "status": self.status,
-            "motivo_reprovacao": self.rejection_reason
+            "motivo_reprovacao": self.describe_rejection(locale)
         }
 
     def approve(self) -> None:
         """Marca a peça como aprovada."""
         self.status = "aprovada"
-        self.rejection_reason = None
+        self.rejection_flags = 0
+        self._rejection_reason = None
 
-    def reject(self, reason: str) -> None:
+    def reject(self, reason: Optional[str] = None, flags: int = 0) -> None:
         """
         Marca a peça como reprovada.
 
         Args:
-            reason: Motivo da reprovação
+            reason: Motivo da reprovação (montado a partir de flags se omitido)
+            flags: Bits de falha por regra
         """
         self.status = "reprovada"
-        self.rejection_reason = reason
+        self.rejection_flags = flags
+        self._rejection_reason = reason
 
     def is_approved(self) -> bool:
         """Verifica se a peça está aprovada."""
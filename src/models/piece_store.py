@@ -0,0 +1,745 @@
+"""
+Armazenamento colunar e compacto de peças.
+
+Cada coluna é um array tipado (peso, comprimento, código de cor, status,
+bits de falha e instante do cadastro); apenas o ID continua sendo uma string por peça. As peças são
+expostas como StoredPiece, uma visão leve sobre a linha correspondente.
+"""
+
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Sequence as SequenceABC
+from enum import IntEnum
+from functools import partial
+from operator import eq
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .piece import Piece
+
+
+class PieceStatus(IntEnum):
+    """Status de uma peça codificado em um byte."""
+
+    PENDENTE = 0
+    APROVADA = 1
+    REPROVADA = 2
+
+    @property
+    def label(self) -> str:
+        """Rótulo textual usado por Piece.status."""
+        return STATUS_LABELS[self]
+
+    @classmethod
+    def from_label(cls, label: str) -> "PieceStatus":
+        """Converte o rótulo textual ('aprovada', ...) no código."""
+        return cls(STATUS_LABELS.index(label))
+
+
+STATUS_LABELS = ("pendente", "aprovada", "reprovada")
+
+# Colunas públicas (PieceStore.column) -> atributo interno
+COLUMNS = {
+    "weight": "_weights",
+    "length": "_lengths",
+    "registered_at": "_timestamps",
+    "color": "_colors",
+    "status": "_statuses",
+    "flags": "_flags",
+}
+
+# Tradução bits de falha -> status (0 aprovada, qualquer bit reprovada)
+_FLAGS_TO_STATUS = bytes([PieceStatus.APROVADA] + [PieceStatus.REPROVADA] * 255)
+
+
+class StoredPiece(Piece):
+    """
+    Visão de uma linha do PieceStore com a mesma interface de Piece.
+
+    Leituras e alterações vão direto para as colunas do armazenamento;
+    duas visões da mesma linha são iguais.
+    """
+
+    __slots__ = ("_store", "_row")
+
+    def __init__(self, store: "PieceStore", row: int):
+        self._store = store
+        self._row = row
+
+    @property
+    def piece_id(self) -> str:
+        return self._store._ids[self._row]
+
+    @property
+    def weight(self) -> float:
+        return self._store._weights[self._row]
+
+    @weight.setter
+    def weight(self, value: float) -> None:
+        self._store._weights[self._row] = value
+        self._store._revision += 1
+
+    @property
+    def color(self) -> str:
+        return self._store._color_table[self._store._colors[self._row]]
+
+    @color.setter
+    def color(self, value: str) -> None:
+        self._store._colors[self._row] = self._store._color_code(value)
+        self._store._revision += 1
+
+    @property
+    def length(self) -> float:
+        return self._store._lengths[self._row]
+
+    @length.setter
+    def length(self, value: float) -> None:
+        self._store._lengths[self._row] = value
+        self._store._revision += 1
+
+    @property
+    def status(self) -> str:
+        return STATUS_LABELS[self._store._statuses[self._row]]
+
+    @status.setter
+    def status(self, value: str) -> None:
+        self._store._statuses[self._row] = PieceStatus.from_label(value)
+        self._store._revision += 1
+
+    @property
+    def rejection_flags(self) -> int:
+        return self._store._flags[self._row]
+
+    @rejection_flags.setter
+    def rejection_flags(self, value: int) -> None:
+        self._store._flags[self._row] = value
+        self._store._revision += 1
+
+    @property
+    def registered_at(self) -> Optional[float]:
+        return self._store._timestamps[self._row] or None
+
+    @registered_at.setter
+    def registered_at(self, value: Optional[float]) -> None:
+        self._store._timestamps[self._row] = value or 0.0
+        self._store._revision += 1
+
+    @property
+    def rules(self):
+        """Regras que produziram os bits de falha desta peça."""
+        return self._store.rules_for_row(self._row)
+
+    @property
+    def rejection_reason(self) -> Optional[str]:
+        """Motivo da reprovação no idioma padrão, montado a cada consulta."""
+        return self.describe_rejection()
+
+    def describe_rejection(self, locale: Optional[str] = None) -> Optional[str]:
+        """Motivo da reprovação no idioma, pelas regras que validaram a peça."""
+        reason = self._store._reasons.get(self._row)
+        if reason is None and self.rejection_flags:
+            reason = self.rules.describe(
+                self.rejection_flags, self.weight, self.color, self.length, locale
+            )
+        return reason
+
+    @rejection_reason.setter
+    def rejection_reason(self, reason: Optional[str]) -> None:
+        self._store._set_reason(self._row, reason)
+
+    def approve(self) -> None:
+        """Marca a peça como aprovada."""
+        self._store._statuses[self._row] = PieceStatus.APROVADA
+        self._store._flags[self._row] = 0
+        self._store._revision += 1
+        self._store._set_reason(self._row, None)
+
+    def reject(self, reason: Optional[str] = None, flags: int = 0) -> None:
+        """Marca a peça como reprovada."""
+        self._store._statuses[self._row] = PieceStatus.REPROVADA
+        self._store._flags[self._row] = flags
+        self._store._revision += 1
+        self._store._set_reason(self._row, reason)
+
+    def is_approved(self) -> bool:
+        return self._store._statuses[self._row] == PieceStatus.APROVADA
+
+    def is_rejected(self) -> bool:
+        return self._store._statuses[self._row] == PieceStatus.REPROVADA
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, StoredPiece):
+            return self._store is other._store and self._row == other._row
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((id(self._store), self._row))
+
+
+class StoredPieces(SequenceABC):
+    """
+    Sequência somente leitura de visões sobre linhas do PieceStore.
+
+    As visões (StoredPiece) são criadas apenas quando acessadas, de modo
+    que devolver um lote de um milhão de linhas não custa um objeto por
+    linha. Fatias retornam outra StoredPieces.
+    """
+
+    __slots__ = ("_store", "_rows")
+
+    def __init__(self, store: "PieceStore", rows: Sequence[int]):
+        self._store = store
+        self._rows = rows
+
+    @property
+    def rows(self) -> Sequence[int]:
+        """Linhas do armazenamento, na ordem da sequência."""
+        return self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, index: Union[int, slice]):
+        if isinstance(index, slice):
+            return StoredPieces(self._store, self._rows[index])
+        return StoredPiece(self._store, self._rows[index])
+
+    def __iter__(self) -> Iterator[StoredPiece]:
+        return map(partial(StoredPiece, self._store), self._rows)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, SequenceABC) and not isinstance(other, (str, bytes)):
+            return len(self) == len(other) and all(map(eq, self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"StoredPieces({len(self)} peças)"
+
+
+class LiveRows(SequenceABC):
+    """
+    Linhas das peças ativas de um PieceStore, em ordem de cadastro.
+
+    Acompanha o armazenamento (não é uma cópia). Tamanho e iteração custam
+    O(1) por linha; o acesso por posição é O(1) enquanto não houver
+    lápides e, com remoções, usa uma lista das linhas ativas montada uma
+    vez e refeita só depois de novas inclusões ou remoções.
+    """
+
+    __slots__ = ("_store",)
+
+    def __init__(self, store: "PieceStore"):
+        self._store = store
+
+    def __len__(self) -> int:
+        return len(self._store._rows)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._store._rows.values())
+
+    def __getitem__(self, index: Union[int, slice]):
+        rows = self._store._rows
+        if isinstance(index, slice):
+            return list(rows.values())[index]
+        size = len(rows)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("posição fora das peças ativas")
+        if size == len(self._store._ids):
+            return index
+        return self._store._live_list()[index]
+
+
+class PieceStore:
+    """
+    Armazena peças em colunas tipadas, indexadas por ID.
+
+    Remoções apenas retiram o ID do índice (a linha vira "lápide"), de modo
+    que visões já entregues, como as guardadas em caixas, continuam válidas.
+
+    Os bits de falha só têm sentido junto com as regras que os produziram
+    (cada bit é a posição de uma regra no RuleSet). Trocar `rules` abre uma
+    nova geração: as linhas já gravadas continuam ligadas às regras
+    anteriores (ver rules_for_row) e só as novas usam as regras atuais.
+    Como as linhas só são acrescentadas, cada geração é um intervalo de
+    linhas e basta guardar onde cada uma começa.
+
+    Atributos:
+        rules: RuleSet das novas linhas (None usa as regras padrão de
+            QualityValidator)
+    """
+
+    def __init__(self, rules=None):
+        # Gerações de regras: primeira linha de cada uma e o RuleSet
+        self._generation_starts: List[int] = [0]
+        self._generation_rules: List = [rules]
+        self._ids: List[str] = []
+        self._weights = array("d")
+        self._lengths = array("d")
+        self._colors = array("H")
+        self._statuses = array("B")
+        self._flags = array("B")
+        # Instante do cadastro (0.0 quando desconhecido)
+        self._timestamps = array("d")
+        self._color_table: List[str] = []
+        self._color_codes: Dict[str, int] = {}
+        self._reasons: Dict[int, str] = {}
+        self._rows: Dict[str, int] = {}
+        # Linhas ativas em lista, para acesso por posição com lápides
+        self._live_cache: Optional[Tuple[Tuple[int, int], List[int]]] = None
+        # Alterações feitas por visões (invalidam índices secundários)
+        self._revision = 0
+
+    @property
+    def rules(self):
+        """RuleSet aplicado às linhas acrescentadas a partir de agora."""
+        return self._generation_rules[-1]
+
+    @rules.setter
+    def rules(self, rules) -> None:
+        if rules is self._generation_rules[-1]:
+            return
+        if self._generation_starts[-1] == len(self._ids):
+            # Geração ainda sem linhas: basta trocar as regras (ou voltar
+            # para a anterior, se ela já usa estas regras)
+            if len(self._generation_rules) > 1 and self._generation_rules[-2] is rules:
+                self._generation_starts.pop()
+                self._generation_rules.pop()
+            else:
+                self._generation_rules[-1] = rules
+        else:
+            self._generation_starts.append(len(self._ids))
+            self._generation_rules.append(rules)
+
+    def rules_for_row(self, row: int):
+        """RuleSet que validou a linha (regras padrão se nenhum foi definido)."""
+        rules = self._generation_rules[bisect_right(self._generation_starts, row) - 1]
+        if rules is None:
+            from ..validators.quality_validator import QualityValidator
+            rules = QualityValidator.rules
+        return rules
+
+    def generations(self) -> List[Tuple[range, object]]:
+        """
+        Gerações de regras do armazenamento.
+
+        Returns:
+            Pares (intervalo de linhas, RuleSet), na ordem das linhas
+        """
+        ends = self._generation_starts[1:] + [len(self._ids)]
+        return [
+            (range(start, end), self.rules_for_row(start))
+            for start, end in zip(self._generation_starts, ends)
+        ]
+
+    def restore_generations(self, generations: Sequence[Tuple[int, object]]) -> None:
+        """
+        Repõe as gerações de regras gravadas (snapshot).
+
+        Args:
+            generations: Pares (primeira linha, RuleSet), a partir da linha 0
+        """
+        if not generations or generations[0][0] != 0:
+            raise ValueError("A primeira geração deve começar na linha 0")
+        self._generation_starts = [start for start, _ in generations]
+        self._generation_rules = [rules for _, rules in generations]
+
+    # Leitura das colunas (índices secundários, verificações)
+
+    def column(self, name: str) -> array:
+        """
+        Coluna de todas as linhas ocupadas, lápides incluídas, sem cópia.
+
+        Args:
+            name: 'weight', 'length', 'registered_at', 'color' (códigos, ver
+                color_code), 'status' (PieceStatus) ou 'flags'
+
+        Raises:
+            KeyError: Se a coluna não existir
+        """
+        return getattr(self, COLUMNS[name])
+
+    @property
+    def row_count(self) -> int:
+        """Linhas ocupadas, incluindo as lápides das peças removidas."""
+        return len(self._ids)
+
+    @property
+    def revision(self) -> int:
+        """Contador de alterações feitas por visões nas linhas existentes."""
+        return self._revision
+
+    def live_rows(self) -> LiveRows:
+        """Linhas das peças ativas, em ordem de cadastro (ver LiveRows)."""
+        return LiveRows(self)
+
+    def _live_list(self) -> List[int]:
+        """Lista das linhas ativas, refeita quando linhas entram ou saem."""
+        # IDs só crescem e remoções só diminuem o índice: o par muda a
+        # cada inclusão ou remoção
+        key = (len(self._ids), len(self._rows))
+        cache = self._live_cache
+        if cache is None or cache[0] != key:
+            cache = self._live_cache = (key, list(self._rows.values()))
+        return cache[1]
+
+    def is_live(self, row: int) -> bool:
+        """Indica se a linha ainda pertence a uma peça ativa."""
+        return self._rows.get(self._ids[row]) == row
+
+    def color_code(self, color: str) -> Optional[int]:
+        """Código de uma cor já cadastrada (None se nenhuma peça a usou)."""
+        code = self._color_codes.get(color)
+        if code is None:
+            code = self._color_codes.get(color.lower())
+        return code
+
+    def count_by_status(self) -> Dict[PieceStatus, int]:
+        """Peças ativas por status (percorre a coluna de status)."""
+        statuses = self._statuses
+        counts = dict.fromkeys(PieceStatus, 0)
+        for row in self._rows.values():
+            counts[PieceStatus(statuses[row])] += 1
+        return counts
+
+    def _color_code(self, color: str) -> int:
+        """Retorna o código da cor, cadastrando-a na tabela se for nova."""
+        code = self._color_codes.get(color)
+        if code is None:
+            normalized = sys.intern(color.lower())
+            code = self._color_codes.get(normalized)
+            if code is None:
+                code = len(self._color_table)
+                self._color_table.append(normalized)
+                self._color_codes[normalized] = code
+            self._color_codes[color] = code
+        return code
+
+    def _set_reason(self, row: int, reason: Optional[str]) -> None:
+        """Guarda um motivo explícito (raro) fora das colunas."""
+        if reason is None:
+            self._reasons.pop(row, None)
+        else:
+            self._reasons[row] = reason
+
+    def append(
+        self,
+        piece_id: str,
+        weight: float,
+        color: str,
+        length: float,
+        status: int = PieceStatus.PENDENTE,
+        flags: int = 0,
+        timestamp: Optional[float] = None
+    ) -> StoredPiece:
+        """
+        Acrescenta uma linha ao armazenamento.
+
+        Raises:
+            ValueError: Se o ID já estiver presente
+        """
+        if piece_id in self._rows:
+            raise ValueError(f"Já existe uma peça com o ID '{piece_id}'")
+
+        row = len(self._ids)
+        self._ids.append(piece_id)
+        self._weights.append(weight)
+        self._lengths.append(length)
+        self._colors.append(self._color_code(color))
+        self._statuses.append(status)
+        self._flags.append(flags)
+        self._timestamps.append(timestamp or 0.0)
+        self._rows[piece_id] = row
+        return StoredPiece(self, row)
+
+    def add(self, piece: Piece) -> StoredPiece:
+        """Copia uma peça avulsa para o armazenamento e retorna sua visão."""
+        stored = self.append(
+            piece.piece_id,
+            piece.weight,
+            piece.color,
+            piece.length,
+            PieceStatus.from_label(piece.status),
+            piece.rejection_flags,
+            piece.registered_at
+        )
+        if not piece.rejection_flags and piece.rejection_reason is not None:
+            self._set_reason(stored._row, piece.rejection_reason)
+        return stored
+
+    def extend(
+        self,
+        piece_ids: Sequence[str],
+        weights: Sequence[float],
+        colors: Sequence[str],
+        lengths: Sequence[float],
+        flags: bytearray,
+        timestamps: Optional[Sequence[float]] = None
+    ) -> range:
+        """
+        Acrescenta um lote já validado, coluna a coluna.
+
+        O status de cada linha é derivado dos bits de falha.
+
+        Args:
+            timestamps: Instante do cadastro de cada linha (opcional)
+
+        Returns:
+            Intervalo de linhas ocupadas pelo lote
+        """
+        start = len(self._ids)
+        self._ids.extend(piece_ids)
+        self._weights.extend(array("d", weights))
+        self._lengths.extend(array("d", lengths))
+        codes = {color: self._color_code(color) for color in set(colors)}
+        self._colors.extend(array("H", map(codes.__getitem__, colors)))
+        self._statuses.frombytes(flags.translate(_FLAGS_TO_STATUS))
+        self._flags.frombytes(flags)
+        if timestamps is None:
+            self._timestamps.extend(array("d", [0.0]) * len(flags))
+        else:
+            self._timestamps.extend(array("d", timestamps))
+        self._rows.update(zip(piece_ids, range(start, len(self._ids))))
+        return range(start, len(self._ids))
+
+    def view(self, row: int) -> StoredPiece:
+        """Retorna a visão de uma linha."""
+        return StoredPiece(self, row)
+
+    def views(self, rows: Sequence[int]) -> StoredPieces:
+        """Retorna as visões de várias linhas, criadas sob demanda."""
+        return StoredPieces(self, rows)
+
+    def contains_any(self, piece_ids: Iterable[str]) -> bool:
+        """Indica se algum dos IDs pertence a uma peça ativa."""
+        return not self._rows.keys().isdisjoint(piece_ids)
+
+    def get(self, piece_id: str) -> Optional[StoredPiece]:
+        """Busca uma peça ativa por ID."""
+        row = self._rows.get(piece_id)
+        return None if row is None else StoredPiece(self, row)
+
+    def get_many(self, piece_ids: Sequence[str]) -> List[Optional[StoredPiece]]:
+        """Busca várias peças ativas por ID (None para as ausentes)."""
+        return [
+            None if row is None else StoredPiece(self, row)
+            for row in map(self._rows.get, piece_ids)
+        ]
+
+    def remove(self, piece_id: str) -> Optional[StoredPiece]:
+        """
+        Retira uma peça do índice, retornando sua visão (ou None).
+
+        A linha fica como lápide (visões em caixas continuam legíveis), mas
+        o motivo explícito é descartado: a visão passa a descrever a
+        reprovação pelos bits de falha.
+        """
+        row = self._rows.pop(piece_id, None)
+        if row is None:
+            return None
+        self._reasons.pop(row, None)
+        return StoredPiece(self, row)
+
+    def select(self, status: PieceStatus) -> List[StoredPiece]:
+        """Retorna as peças ativas com o status informado."""
+        statuses = self._statuses
+        return [
+            StoredPiece(self, row) for row in self._rows.values()
+            if statuses[row] == status
+        ]
+
+    def iter_records(self, status: Optional[PieceStatus] = None) -> Iterator[Tuple]:
+        """
+        Percorre as peças ativas como tuplas, sem criar visões.
+
+        O motivo de reprovação é montado linha a linha, então a memória não
+        cresce com a quantidade de peças. O armazenamento não deve ser
+        alterado durante a iteração.
+
+        Args:
+            status: Filtra pelo status (None para todas)
+
+        Yields:
+            Tuplas (id, peso, cor, comprimento, status, motivo_reprovacao)
+        """
+        rules_for_row, reasons = self.rules_for_row, self._reasons
+        ids, weights, lengths = self._ids, self._weights, self._lengths
+        colors, color_table = self._colors, self._color_table
+        statuses, flags = self._statuses, self._flags
+
+        for row in self._rows.values():
+            code = statuses[row]
+            if status is not None and code != status:
+                continue
+            color = color_table[colors[row]]
+            reason = reasons.get(row) if reasons else None
+            if reason is None and flags[row]:
+                reason = rules_for_row(row).describe(
+                    flags[row], weights[row], color, lengths[row]
+                )
+            yield ids[row], weights[row], color, lengths[row], STATUS_LABELS[code], reason
+
+    def export_columns(self):
+        """
+        Retorna as colunas das peças ativas, na ordem de cadastro.
+
+        Returns:
+            Tupla (ids, weights, colors, lengths, flags, timestamps)
+        """
+        if len(self._rows) == len(self._ids):
+            return self._columns(None)
+        return self._columns(list(self._rows.values()))
+
+    def export_generations(self) -> List[Tuple[object, tuple]]:
+        """
+        Retorna as colunas das peças ativas separadas por geração de regras.
+
+        Os bits de falha de cada parte só podem ser lidos com o RuleSet que
+        a acompanha.
+
+        Returns:
+            Pares (RuleSet, colunas como em export_columns), na ordem de
+            cadastro, sem as gerações que não têm peças ativas
+        """
+        generations = self.generations()
+        if len(generations) == 1:
+            return [(generations[0][1], self.export_columns())]
+        rows = list(self._rows.values())
+        exported = []
+        for span, rules in generations:
+            low = bisect_left(rows, span.start)
+            high = bisect_left(rows, span.stop, low)
+            if high > low:
+                exported.append((rules, self._columns(rows[low:high])))
+        return exported
+
+    def _columns(self, rows: Optional[List[int]]):
+        """Copia as colunas das linhas informadas (None para todas)."""
+        if rows is None:
+            ids = list(self._ids)
+            codes = self._colors
+            weights, lengths = array("d", self._weights), array("d", self._lengths)
+            flags = bytearray(self._flags)
+            timestamps = array("d", self._timestamps)
+        else:
+            ids = list(map(self._ids.__getitem__, rows))
+            codes = map(self._colors.__getitem__, rows)
+            weights = array("d", map(self._weights.__getitem__, rows))
+            lengths = array("d", map(self._lengths.__getitem__, rows))
+            flags = bytearray(map(self._flags.__getitem__, rows))
+            timestamps = array("d", map(self._timestamps.__getitem__, rows))
+        colors = list(map(self._color_table.__getitem__, codes))
+        return ids, weights, colors, lengths, flags, timestamps
+
+    # Snapshot: colunas como estão na memória
+
+    def export_rows(self, rows: Optional[Sequence[int]] = None):
+        """
+        Copia as colunas de várias linhas, com as cores como códigos.
+
+        Args:
+            rows: Linhas, em ordem (None para todas as linhas ocupadas)
+
+        Returns:
+            Tupla (ids, weights, lengths, timestamps, colors, flags,
+            statuses): IDs em lista e as demais colunas em arrays, com as
+            cores como posições de color_table()
+        """
+        if rows is None:
+            return (
+                list(self._ids), array("d", self._weights), array("d", self._lengths),
+                array("d", self._timestamps), array("H", self._colors),
+                array("B", self._flags), array("B", self._statuses),
+            )
+        return (
+            list(map(self._ids.__getitem__, rows)),
+            array("d", map(self._weights.__getitem__, rows)),
+            array("d", map(self._lengths.__getitem__, rows)),
+            array("d", map(self._timestamps.__getitem__, rows)),
+            array("H", map(self._colors.__getitem__, rows)),
+            array("B", map(self._flags.__getitem__, rows)),
+            array("B", map(self._statuses.__getitem__, rows)),
+        )
+
+    def color_table(self) -> List[str]:
+        """Cores cadastradas, na ordem dos códigos da coluna 'color'."""
+        return list(self._color_table)
+
+    def explicit_reasons(self) -> Dict[int, str]:
+        """Motivos explícitos (reject(reason=...)) das peças ativas, por linha."""
+        return dict(self._reasons)
+
+    def row_of(self, piece: Piece) -> Optional[int]:
+        """Linha da peça, se ela for uma visão deste armazenamento (senão None)."""
+        if isinstance(piece, StoredPiece) and piece._store is self:
+            return piece._row
+        return None
+
+    def restore_rows(
+        self,
+        ids: Sequence[str],
+        columns: Dict[str, array],
+        color_table: Sequence[str],
+        reasons: Dict[int, str],
+        index,
+        generations: Sequence[Tuple[int, object]]
+    ) -> None:
+        """
+        Carrega linhas gravadas por um snapshot em um armazenamento vazio.
+
+        As estruturas são usadas como recebidas, sem cópia: IDs e índice
+        podem ser sequências e mapeamentos sob demanda sobre o arquivo.
+
+        Args:
+            ids: ID de cada linha
+            columns: Nome da coluna (ver COLUMNS) -> array com uma entrada
+                por linha
+            color_table: Cores na ordem dos códigos da coluna 'color'
+            reasons: Linha -> motivo explícito
+            index: Mapeamento ID -> linha das peças ativas, na ordem de
+                cadastro
+            generations: Pares (primeira linha, RuleSet); ver
+                restore_generations
+
+        Raises:
+            ValueError: Se o armazenamento já tiver linhas
+        """
+        if self._ids:
+            raise ValueError("restore_rows exige um armazenamento vazio")
+        self._ids = ids
+        for name, attribute in COLUMNS.items():
+            setattr(self, attribute, columns[name])
+        self._color_table = []
+        self._color_codes = {}
+        for color in color_table:
+            self._color_code(color)
+        self._reasons = reasons
+        self._rows = index
+        self._live_cache = None
+        self.restore_generations(generations)
+
+    def nbytes(self) -> int:
+        """Estimativa de memória ocupada pelas colunas, IDs e índice."""
+        columns = sum(
+            column.itemsize * len(column)
+            for column in (
+                self._weights, self._lengths, self._colors, self._statuses,
+                self._flags, self._timestamps
+            )
+        )
+        ids = sys.getsizeof(self._ids) + sum(sys.getsizeof(i) for i in self._ids)
+        index = sys.getsizeof(self._rows) + sum(
+            sys.getsizeof(row) for row in self._rows.values()
+        )
+        return columns + ids + index
+
+    def __contains__(self, piece_id: str) -> bool:
+        return piece_id in self._rows
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self) -> Iterator[StoredPiece]:
+        for row in self._rows.values():
+            yield StoredPiece(self, row)
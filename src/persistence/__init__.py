@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""
+Persistencia do sistema FactorySense (journal e snapshots, ou SQLite).
+"""
+
+from .journal import Journal, open_services, write_snapshot
+from .mapped_snapshot import MappedSnapshot, load_mapped_snapshot, write_mapped_snapshot
+from .reader import JournalReader
+from .repository import Repository
+from .sqlite_store import SQLiteRepository, open_sqlite_services
+
+__all__ = [
+    'Journal', 'JournalReader', 'MappedSnapshot', 'Repository', 'SQLiteRepository',
+    'load_mapped_snapshot', 'open_services', 'open_sqlite_services',
+    'write_mapped_snapshot', 'write_snapshot',
+]
@@ -0,0 +1,689 @@
+"""
+Journal de escrita antecipada (write-ahead) para os serviços do FactorySense.
+
+O arquivo é uma sequência de quadros binários:
+
+    [tipo: 1 byte][tamanho do conteúdo: uint32][crc32 do conteúdo: uint32][conteúdo]
+
+Tipos de quadro:
+
+    G  geração do arquivo (cabeçalho)
+    N  próximo número de ID automático
+    Q  regras dos cadastros seguintes (especificação JSON do RuleSet)
+    R  lote de peças registradas (colunas de IDs, cores, pesos, comprimentos,
+       bits e instantes do cadastro)
+    X  IDs removidos
+    S  IDs armazenados em uma caixa
+    U  ID retirado de uma caixa (com indicação de reabertura)
+    C  caixa fechada
+    Z  clear_all de um serviço ('quality' ou 'storage')
+    B  caixa completa (apenas no snapshot)
+
+Os bits de falha de um quadro R são lidos com as regras do último quadro Q
+anterior (ou, em arquivos sem quadros Q, com as regras da recuperação).
+Textos (IDs e cores) são gravados em UTF-8 separados por NUL. Eventos
+consecutivos do mesmo tipo são agrupados no mesmo quadro, de modo que a
+recuperação processa colunas inteiras em vez de uma linha por evento.
+
+O checkpoint grava o estado compactado no snapshot binário mapeável
+(mapped_snapshot.py, arquivo snapshot.bin), aberto sob demanda na
+recuperação; o journal guarda apenas os eventos posteriores ao snapshot da
+mesma geração. Snapshots antigos no formato do journal (snapshot.log)
+continuam sendo lidos.
+"""
+
+import gc
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+from array import array
+from itertools import groupby
+from operator import attrgetter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..models.box import Box
+from ..models.piece import Piece
+from ..services.quality_service import QualityService
+from ..services.storage_service import StorageService
+from ..validators.rules import RuleSet
+from .repository import Repository
+
+JOURNAL_FILE = "journal.log"
+SNAPSHOT_FILE = "snapshot.log"
+
+_FRAME = struct.Struct("<cII")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+_BOX = struct.Struct("<IIB")
+_UNSTORE = struct.Struct("<IB")
+_SEPARATOR = "\x00"
+
+# Tamanho máximo de um lote de cadastros no snapshot
+_SNAPSHOT_BATCH = 1 << 16
+
+
+def _join(texts: Sequence[str]) -> bytes:
+    """Codifica textos separados por NUL."""
+    return _SEPARATOR.join(texts).encode("utf-8")
+
+
+def _split(data) -> List[str]:
+    """Desfaz _join."""
+    return bytes(data).decode("utf-8").split(_SEPARATOR) if len(data) else []
+
+
+def _frame(kind: bytes, payload: bytes) -> bytes:
+    """Monta um quadro com cabeçalho e CRC."""
+    return _FRAME.pack(kind, len(payload), zlib.crc32(payload)) + payload
+
+
+def _register_frame(ids, weights, colors, lengths, flags, timestamps) -> bytes:
+    """Monta o quadro de um lote de cadastros."""
+    ids_data = _join(ids)
+    colors_data = _join(colors)
+    return _frame(b"R", b"".join((
+        _U32.pack(len(ids)),
+        _U32.pack(len(ids_data)), ids_data,
+        _U32.pack(len(colors_data)), colors_data,
+        array("d", weights).tobytes(),
+        array("d", lengths).tobytes(),
+        bytes(flags),
+        array("d", timestamps).tobytes(),
+    )))
+
+
+def rules_spec(rules: RuleSet) -> str:
+    """Especificação JSON canônica de um RuleSet (identifica as regras gravadas)."""
+    return json.dumps(rules.to_dict(), sort_keys=True, ensure_ascii=False)
+
+
+def _rules_frame(spec: str) -> bytes:
+    """Monta o quadro Q com a especificação das regras."""
+    return _frame(b"Q", spec.encode("utf-8"))
+
+
+class RuleSetCache:
+    """
+    RuleSets por especificação gravada, compilados uma vez.
+
+    Especificações iguais às de regras conhecidas (ex.: as da recuperação)
+    devolvem o próprio objeto, de modo que o PieceStore não abre gerações
+    novas para as mesmas regras.
+    """
+
+    def __init__(self, *known: RuleSet):
+        self._by_spec: Dict[str, RuleSet] = {rules_spec(rules): rules for rules in known}
+
+    def get(self, spec: str) -> RuleSet:
+        """RuleSet da especificação (JSON), compilando-o no primeiro uso."""
+        rules = self._by_spec.get(spec)
+        if rules is None:
+            rules = self._by_spec[spec] = RuleSet.from_dict(json.loads(spec))
+        return rules
+
+
+def _fsync_directory(directory: str) -> None:
+    """Garante que renomeações no diretório cheguem ao disco (quando suportado)."""
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def _write_atomically(path: str, frames) -> None:
+    """Grava os quadros em um temporário e substitui o arquivo de forma atômica."""
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as handle:
+        for frame in frames:
+            handle.write(frame)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(temporary, path)
+    _fsync_directory(os.path.dirname(os.path.abspath(path)))
+
+
+class Journal(Repository):
+    """
+    Journal de eventos com commit em grupo.
+
+    Os eventos são acumulados em memória e gravados (write + fsync) em
+    grupo: quando há group_size eventos pendentes ou, em segundo plano,
+    a cada flush_interval segundos. Assim a durabilidade não custa um fsync
+    por peça; no pior caso um crash perde o último grupo não confirmado.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        generation: int = 0,
+        group_size: int = 512,
+        flush_interval: Optional[float] = 0.05,
+        sync: bool = True
+    ):
+        self.path = path
+        self.generation = generation
+        self.group_size = group_size
+        self.flush_interval = flush_interval
+        self.sync = sync
+
+        self._lock = threading.Lock()
+        self._frames: List[bytes] = []
+        self._pending_events = 0
+        # Lotes abertos: cadastros (R) e armazenamentos em uma caixa (S)
+        self._registers: Optional[tuple] = None
+        self._stores: Optional[Tuple[int, List[str]]] = None
+        # Especificação do último quadro Q deste arquivo
+        self._rules_spec: Optional[str] = None
+        self._file = self._open(generation)
+
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if flush_interval:
+            self._flusher = threading.Thread(
+                target=self._run_flusher, name="journal-flusher", daemon=True
+            )
+            self._flusher.start()
+
+    def _open(self, generation: int):
+        """Abre o arquivo para acréscimo, gravando o cabeçalho se estiver vazio."""
+        handle = open(self.path, "ab")
+        if handle.tell() == 0:
+            handle.write(_frame(b"G", _U64.pack(generation)))
+            handle.flush()
+            if self.sync:
+                os.fsync(handle.fileno())
+        return handle
+
+    def _run_flusher(self) -> None:
+        """Confirma periodicamente os eventos pendentes."""
+        while not self._stop.wait(self.flush_interval):
+            self.commit()
+
+    def _seal_locked(self) -> None:
+        """Fecha os lotes abertos em quadros, cadastros antes de armazenamentos."""
+        if self._registers is not None:
+            self._frames.append(_register_frame(*self._registers))
+            self._registers = None
+        if self._stores is not None:
+            box_id, ids = self._stores
+            self._frames.append(_frame(b"S", _U32.pack(box_id) + _join(ids)))
+            self._stores = None
+
+    def _added_locked(self, count: int) -> None:
+        self._pending_events += count
+        if self._pending_events >= self.group_size:
+            self._commit_locked()
+
+    def _commit_locked(self) -> None:
+        self._seal_locked()
+        if not self._frames:
+            return
+        self._file.write(b"".join(self._frames))
+        self._frames.clear()
+        self._pending_events = 0
+        self._file.flush()
+        if self.sync:
+            os.fsync(self._file.fileno())
+
+    def commit(self) -> None:
+        """Grava e sincroniza em disco todos os eventos pendentes."""
+        with self._lock:
+            if not self._file.closed:
+                self._commit_locked()
+
+    def close(self) -> None:
+        """Confirma os eventos pendentes e fecha o arquivo."""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            if not self._file.closed:
+                self._commit_locked()
+                self._file.close()
+
+    # Eventos
+
+    def record_registers(
+        self,
+        piece_ids: Sequence[str],
+        weights: Sequence[float],
+        colors: Sequence[str],
+        lengths: Sequence[float],
+        flags: Sequence[int],
+        timestamps: Sequence[float]
+    ) -> None:
+        """Registra um lote de cadastros."""
+        with self._lock:
+            if self._registers is None:
+                self._registers = ([], array("d"), [], array("d"), bytearray(), array("d"))
+            (ids, batch_weights, batch_colors, batch_lengths,
+             batch_flags, batch_timestamps) = self._registers
+            ids.extend(piece_ids)
+            batch_weights.extend(weights)
+            batch_colors.extend(color.lower() for color in colors)
+            batch_lengths.extend(lengths)
+            batch_flags.extend(flags)
+            batch_timestamps.extend(timestamps)
+            self._added_locked(len(piece_ids))
+
+    def record_remove(self, piece_id: str) -> None:
+        """Registra a remoção de uma peça."""
+        with self._lock:
+            self._seal_locked()
+            self._frames.append(_frame(b"X", _join((piece_id,))))
+            self._added_locked(1)
+
+    def record_rules(self, rules: RuleSet) -> None:
+        """Registra as regras dos próximos cadastros (se mudaram)."""
+        spec = rules_spec(rules)
+        with self._lock:
+            if spec == self._rules_spec:
+                return
+            self._seal_locked()
+            self._frames.append(_rules_frame(spec))
+            self._rules_spec = spec
+            self._added_locked(1)
+
+    def record_stores(self, piece_ids: Sequence[str], box_id: int) -> None:
+        """Registra o armazenamento de várias peças na mesma caixa."""
+        with self._lock:
+            if self._stores is not None and self._stores[0] != box_id:
+                self._seal_locked()
+            if self._stores is None:
+                self._stores = (box_id, [])
+            self._stores[1].extend(piece_ids)
+            self._added_locked(len(piece_ids))
+
+    def record_unstore(self, piece_id: str, box_id: int, reopen: bool) -> None:
+        """Registra a retirada de uma peça de uma caixa."""
+        with self._lock:
+            self._seal_locked()
+            self._frames.append(
+                _frame(b"U", _UNSTORE.pack(box_id, reopen) + _join((piece_id,)))
+            )
+            self._added_locked(1)
+
+    def record_close(self, box_id: int) -> None:
+        """Registra o fechamento de uma caixa."""
+        with self._lock:
+            self._seal_locked()
+            self._frames.append(_frame(b"C", _U32.pack(box_id)))
+            self._added_locked(1)
+
+    def record_clear(self, service: str) -> None:
+        """Registra um clear_all ('quality' ou 'storage')."""
+        with self._lock:
+            self._seal_locked()
+            self._frames.append(_frame(b"Z", service.encode("utf-8")))
+            self._added_locked(1)
+
+    # Snapshot
+
+    def checkpoint(self, quality_service: QualityService, storage_service: StorageService) -> None:
+        """
+        Grava um snapshot do estado atual e inicia um journal vazio.
+
+        O snapshot da nova geração é gravado de forma atômica antes de o
+        journal ser trocado; se houver crash no meio, a recuperação descarta
+        o journal da geração anterior, já contido no snapshot.
+        """
+        from .mapped_snapshot import MAPPED_SNAPSHOT_FILE, write_mapped_snapshot
+
+        with self._lock:
+            self._commit_locked()
+            generation = self.generation + 1
+            directory = os.path.dirname(os.path.abspath(self.path))
+
+            write_mapped_snapshot(
+                os.path.join(directory, MAPPED_SNAPSHOT_FILE),
+                generation,
+                quality_service,
+                storage_service
+            )
+
+            # O novo journal começa com as regras atuais: os cadastros
+            # seguintes não dependem das regras passadas na recuperação
+            self._rules_spec = rules_spec(quality_service.rules)
+            self._file.close()
+            _write_atomically(self.path, [
+                _frame(b"G", _U64.pack(generation)), _rules_frame(self._rules_spec)
+            ])
+            self.generation = generation
+            self._file = self._open(generation)
+
+            # O snapshot no formato do journal, se houver, ficou obsoleto
+            legacy = os.path.join(directory, SNAPSHOT_FILE)
+            if os.path.exists(legacy):
+                os.remove(legacy)
+
+
+def write_snapshot(
+    path: str,
+    generation: int,
+    quality_service: QualityService,
+    storage_service: StorageService
+) -> None:
+    """
+    Grava o estado completo dos serviços no formato do journal.
+
+    É o formato de snapshot anterior ao snapshot mapeável; continua útil
+    para exportar o estado como um fluxo de quadros.
+    """
+
+    def frames():
+        yield _frame(b"G", _U64.pack(generation))
+        yield _frame(b"N", _U64.pack(quality_service.next_piece_number))
+
+        for rules, columns in quality_service.store.export_generations():
+            yield _rules_frame(rules_spec(rules))
+            for start in range(0, len(columns[0]), _SNAPSHOT_BATCH):
+                yield _register_frame(
+                    *(column[start:start + _SNAPSHOT_BATCH] for column in columns)
+                )
+
+        for box in storage_service.boxes:
+            # Peças removidas do registro mas ainda guardadas na caixa
+            orphans = [
+                piece for piece in box.pieces
+                if quality_service.get_piece_by_id(piece.piece_id) is None
+            ]
+            for rules, group in groupby(orphans, key=attrgetter("rules")):
+                group = list(group)
+                yield _rules_frame(rules_spec(rules))
+                yield _register_frame(
+                    [piece.piece_id for piece in group],
+                    [piece.weight for piece in group],
+                    [piece.color for piece in group],
+                    [piece.length for piece in group],
+                    [piece.rejection_flags for piece in group],
+                    [piece.registered_at or 0.0 for piece in group]
+                )
+            for piece in orphans:
+                yield _frame(b"X", _join((piece.piece_id,)))
+
+            yield _frame(
+                b"B",
+                _BOX.pack(box.box_id, box.capacity, box.is_closed)
+                + _join([piece.piece_id for piece in box.pieces])
+            )
+
+    _write_atomically(path, frames())
+
+
+def iter_frames(path: str) -> Iterator[Tuple[bytes, memoryview, int]]:
+    """
+    Percorre os quadros íntegros de um arquivo de journal ou snapshot.
+
+    O arquivo é mapeado em memória; a leitura para no primeiro quadro
+    incompleto ou com CRC inválido. O conteúdo entregue só é válido até
+    o próximo quadro (copie o que precisar guardar).
+
+    Yields:
+        Tuplas (tipo, conteúdo, posição final do quadro no arquivo)
+    """
+    with open(path, "rb") as handle:
+        if os.fstat(handle.fileno()).st_size == 0:
+            return
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            view = memoryview(data)
+            size = len(data)
+            offset = 0
+            try:
+                while offset + _FRAME.size <= size:
+                    kind, length, crc = _FRAME.unpack_from(data, offset)
+                    start = offset + _FRAME.size
+                    payload = view[start:start + length]
+                    if len(payload) != length or zlib.crc32(payload) != crc:
+                        payload.release()
+                        break
+                    offset = start + length
+                    try:
+                        yield kind, payload, offset
+                    finally:
+                        payload.release()
+            finally:
+                view.release()
+
+
+def decode_ids(payload) -> List[str]:
+    """Decodifica uma lista de IDs (quadros X, ou S/C após o ID da caixa)."""
+    return _split(payload)
+
+
+def decode_registers(payload):
+    """
+    Decodifica um quadro R coluna a coluna.
+
+    Quadros gravados antes da coluna de instantes são aceitos; nesse caso
+    timestamps é None.
+
+    Returns:
+        Tupla (ids, weights, colors, lengths, flags, timestamps)
+    """
+    count = _U32.unpack_from(payload)[0]
+    position = 4
+
+    ids_length = _U32.unpack_from(payload, position)[0]
+    position += 4
+    ids = _split(payload[position:position + ids_length])
+    position += ids_length
+
+    colors_length = _U32.unpack_from(payload, position)[0]
+    position += 4
+    colors = _split(payload[position:position + colors_length])
+    position += colors_length
+
+    weights = array("d")
+    weights.frombytes(payload[position:position + 8 * count])
+    position += 8 * count
+    lengths = array("d")
+    lengths.frombytes(payload[position:position + 8 * count])
+    position += 8 * count
+    flags = bytearray(payload[position:position + count])
+    position += count
+
+    timestamps = None
+    if len(payload) >= position + 8 * count:
+        timestamps = array("d")
+        timestamps.frombytes(payload[position:position + 8 * count])
+
+    return ids, weights, colors, lengths, flags, timestamps
+
+
+class _Replayer:
+    """Aplica os quadros de snapshot/journal aos serviços."""
+
+    def __init__(self, quality_service: QualityService, storage_service: StorageService):
+        self.quality = quality_service
+        self.storage = storage_service
+        self.removed: Dict[str, Piece] = {}
+        self.highest_auto_number = 0
+        self.generation = 0
+        self.rule_sets = RuleSetCache(quality_service.rules)
+
+    def _pieces(self, piece_ids: List[str]) -> List[Piece]:
+        """Resolve IDs para peças, incluindo as removidas durante a recuperação."""
+        pieces = self.quality.get_pieces_by_ids(piece_ids)
+        if self.removed:
+            pieces = [
+                self.removed.get(piece_id) if piece is None else piece
+                for piece_id, piece in zip(piece_ids, pieces)
+            ]
+        return [piece for piece in pieces if piece is not None]
+
+    def replay(self, path: str, track_auto_ids: bool = False) -> Tuple[int, int, int]:
+        """
+        Aplica todos os quadros íntegros de um arquivo.
+
+        A leitura para no primeiro quadro incompleto ou com CRC inválido
+        (escrita interrompida por um crash).
+
+        Returns:
+            Tupla (geração, quadros aplicados, bytes válidos)
+        """
+        frames = 0
+        offset = 0
+        for kind, payload, offset in iter_frames(path):
+            self._apply(kind, payload, track_auto_ids)
+            frames += 1
+        return self.generation, frames, offset
+
+    def _apply(self, kind: bytes, payload: memoryview, track_auto_ids: bool) -> None:
+        if kind == b"R":
+            self._apply_registers(payload, track_auto_ids)
+        elif kind == b"S":
+            self.storage.restore_stores(
+                _U32.unpack_from(payload)[0], self._pieces(_split(payload[4:]))
+            )
+        elif kind == b"X":
+            for piece_id in _split(payload):
+                piece = self.quality.get_piece_by_id(piece_id)
+                if piece is not None:
+                    self.quality.remove_piece(piece_id)
+                    self.removed[piece_id] = piece
+        elif kind == b"C":
+            self.storage.close_box(_U32.unpack_from(payload)[0])
+        elif kind == b"U":
+            _, reopen = _UNSTORE.unpack_from(payload)
+            for piece_id in _split(payload[_UNSTORE.size:]):
+                self.storage.remove_piece(piece_id, bool(reopen))
+        elif kind == b"B":
+            box_id, capacity, is_closed = _BOX.unpack_from(payload)
+            self.storage.restore_box(
+                box_id, capacity, bool(is_closed),
+                self._pieces(_split(payload[_BOX.size:]))
+            )
+        elif kind == b"G":
+            self.generation = _U64.unpack_from(payload)[0]
+        elif kind == b"N":
+            self.quality.restore_next_piece_number(_U64.unpack_from(payload)[0])
+        elif kind == b"Q":
+            self.quality.rules = self.rule_sets.get(bytes(payload).decode("utf-8"))
+        elif kind == b"Z":
+            if bytes(payload) == b"quality":
+                self.quality.clear_all()
+            else:
+                self.storage.clear_all()
+
+    def _apply_registers(self, payload: memoryview, track_auto_ids: bool) -> None:
+        """Reaplica um lote de cadastros coluna a coluna."""
+        ids, weights, colors, lengths, flags, timestamps = decode_registers(payload)
+        self.quality.restore_pieces(ids, weights, colors, lengths, flags, timestamps)
+
+        if track_auto_ids:
+            # IDs automáticos são crescentes: basta o último do lote
+            for piece_id in reversed(ids):
+                if piece_id[:1] == "P" and piece_id[1:].isdigit():
+                    self.highest_auto_number = max(self.highest_auto_number, int(piece_id[1:]))
+                    break
+
+
+def _read_generation(path: str) -> Optional[int]:
+    """Lê a geração no cabeçalho de um arquivo (None se vazio/inválido)."""
+    with open(path, "rb") as handle:
+        header = handle.read(_FRAME.size + _U64.size)
+    if len(header) < _FRAME.size + _U64.size:
+        return None
+    kind, _, crc = _FRAME.unpack_from(header)
+    payload = header[_FRAME.size:]
+    if kind != b"G" or zlib.crc32(payload) != crc:
+        return None
+    return _U64.unpack(payload)[0]
+
+
+def open_services(
+    directory: str,
+    box_capacity: int = Box.DEFAULT_CAPACITY,
+    strategy: Optional[str] = None,
+    max_weight: Optional[float] = None,
+    max_length: Optional[float] = None,
+    max_open_boxes: Optional[int] = None,
+    rules: Optional[RuleSet] = None,
+    **journal_options
+) -> Tuple[QualityService, StorageService, Journal]:
+    """
+    Recupera os serviços a partir do snapshot e do journal de um diretório.
+
+    Abre o snapshot mais recente, reaplica o final do journal da mesma
+    geração (descartando um eventual quadro incompleto) e devolve os
+    serviços já ligados a um Journal aberto para novos eventos. O snapshot
+    mapeável (snapshot.bin) é lido sob demanda, de modo que a abertura não
+    cria objetos por peça ou por caixa; o formato antigo (snapshot.log) é
+    reaplicado quadro a quadro.
+
+    Args:
+        directory: Diretório de dados (criado se não existir)
+        box_capacity: Capacidade das novas caixas
+        strategy: Estratégia de empacotamento (padrão: next-fit)
+        max_weight: Peso total máximo por caixa (None = sem limite)
+        max_length: Comprimento total máximo por caixa (None = sem limite)
+        max_open_boxes: Limite de caixas abertas (first-fit e best-fit)
+        rules: Regras de qualidade dos novos cadastros (padrão:
+            QualityValidator.rules); as peças recuperadas usam as regras
+            gravadas com elas, ou estas em arquivos sem regras gravadas
+        **journal_options: Repassados para Journal (group_size, ...)
+
+    Returns:
+        Tupla (quality_service, storage_service, journal)
+    """
+    from .mapped_snapshot import MAPPED_SNAPSHOT_FILE, load_mapped_snapshot
+
+    os.makedirs(directory, exist_ok=True)
+    mapped_path = os.path.join(directory, MAPPED_SNAPSHOT_FILE)
+    snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+    journal_path = os.path.join(directory, JOURNAL_FILE)
+
+    quality_service = QualityService(rules=rules)
+    rules = quality_service.rules
+    storage_service = StorageService(
+        box_capacity=box_capacity, strategy=strategy,
+        max_weight=max_weight, max_length=max_length, max_open_boxes=max_open_boxes
+    )
+    replayer = _Replayer(quality_service, storage_service)
+
+    # A carga só cria objetos sem ciclos; o coletor de ciclos apenas
+    # re-percorreria milhões de visões a cada geração
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        generation = 0
+        if os.path.exists(mapped_path):
+            generation = load_mapped_snapshot(
+                mapped_path, quality_service, storage_service, replayer.rule_sets
+            ).generation
+        elif os.path.exists(snapshot_path):
+            generation, _, _ = replayer.replay(snapshot_path)
+            quality_service.rules = rules
+
+        if os.path.exists(journal_path):
+            if _read_generation(journal_path) == generation:
+                _, _, valid_bytes = replayer.replay(journal_path, track_auto_ids=True)
+                with open(journal_path, "r+b") as handle:
+                    handle.truncate(valid_bytes)
+            else:
+                # Journal de geração anterior: já incorporado ao snapshot
+                _write_atomically(journal_path, [_frame(b"G", _U64.pack(generation))])
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+    quality_service.restore_next_piece_number(max(
+        quality_service.next_piece_number, replayer.highest_auto_number + 1
+    ))
+    # Peças recuperadas ficam com as regras gravadas; as novas usam as da recuperação
+    quality_service.rules = rules
+
+    journal = Journal(journal_path, generation, **journal_options)
+    quality_service.journal = journal
+    storage_service.journal = journal
+    journal.record_rules(rules)
+    return quality_service, storage_service, journal
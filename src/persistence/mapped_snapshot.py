@@ -0,0 +1,868 @@
+"""
+Snapshot binário de largura fixa, aberto com mmap e lido sob demanda.
+
+O arquivo tem um cabeçalho, uma tabela de seções e as seções de dados,
+alinhadas em 8 bytes (inteiros e floats little-endian, como o journal):
+
+    cabeçalho   magic, versão, geração, próximo número de ID automático,
+                contadores de peças, de caixas e de aprovação
+    seções      (posição, tamanho) de cada seção de _SECTIONS
+    crc32       do cabeçalho e da tabela de seções
+
+As peças ocupam linhas: primeiro as cadastradas, na ordem de cadastro, e em
+seguida as "órfãs" (removidas do registro mas ainda guardadas em caixas).
+A seção de regras lista as gerações (primeira linha e especificação do
+RuleSet que lê os bits de falha); snapshots da versão 1 não a têm e usam
+as regras da recuperação.
+Cada coluna numérica é um array empacotado; os IDs e os motivos ficam em
+tabelas de strings (posições + bytes UTF-8), e uma tabela hash (crc32 do
+ID, sondagem linear) localiza a linha de um ID sem ler os demais.
+
+Na abertura (load_mapped_snapshot) apenas as colunas numéricas são copiadas
+para os arrays do PieceStore (cópia de memória, sem objetos por peça). IDs,
+índice por ID, caixas e índices de caixas passam a ser estruturas sob
+demanda sobre o mapeamento, com as alterações posteriores guardadas em
+memória à parte; os objetos Box e as visões das peças só são criados quando
+acessados. A integridade dos dados depende da gravação atômica (arquivo
+temporário + fsync + rename); o crc cobre apenas o cabeçalho.
+"""
+
+import json
+import mmap
+import operator
+import struct
+import zlib
+from array import array
+from bisect import bisect_left
+from collections.abc import MutableMapping, Sequence
+from itertools import accumulate, islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ..models.box import Box
+from ..models.piece_store import PieceStatus, PieceStore
+from ..services.quality_service import QualityService
+from ..services.rolling_metrics import count_failures
+from ..services.storage_service import StorageService
+from ..validators.rules import MAX_RULES, RuleSet
+from .journal import RuleSetCache, _write_atomically, rules_spec
+
+MAPPED_SNAPSHOT_FILE = "snapshot.bin"
+
+_MAGIC = b"FSNAPBIN"
+_VERSION = 2
+_HEADER = struct.Struct("<8sIIQQQQQQQQQqQdB7x")
+_SECTION = struct.Struct("<QQ")
+_CRC = struct.Struct("<I")
+
+_SECTIONS = (
+    "id_offsets",      # Q[linhas + 1]
+    "id_data",         # UTF-8
+    "weights",         # d[linhas]
+    "lengths",         # d[linhas]
+    "timestamps",      # d[linhas]
+    "colors",          # H[linhas]
+    "flags",           # B[linhas]
+    "statuses",        # B[linhas] (PieceStatus)
+    "color_table",     # UTF-8 separado por NUL
+    "reason_rows",     # I[motivos]
+    "reason_texts",    # UTF-8 separado por NUL
+    "failures",        # Q[gerações * MAX_RULES], por geração na ordem de FLAG_BITS
+    "id_table",        # I[posições] (linha + 1; 0 = vazia)
+    "box_ids",         # I[caixas], na ordem de StorageService.boxes
+    "box_capacities",  # I[caixas]
+    "box_closed",      # B[caixas]
+    "box_offsets",     # Q[caixas + 1] em box_members
+    "box_members",     # I[armazenadas] (linhas)
+    "box_of_row",      # i[linhas] (índice da caixa, -1 se não armazenada)
+    "box_order",       # I[caixas] índices ordenados por ID da caixa
+    "closed_order",    # I[fechadas] índices na ordem de fechamento
+    "closed_rank",     # I[caixas] posição em closed_order (_NOT_CLOSED se aberta)
+    "metrics",         # JSON de RollingQualityMetrics.get_state (+ "spc": ProcessControl)
+    "rules",           # JSON [[primeira linha, especificação do RuleSet], ...]
+)
+# Seções gravadas por versão (a versão 1 não tem "rules")
+_SECTION_COUNTS = {1: len(_SECTIONS) - 1, 2: len(_SECTIONS)}
+_NOT_CLOSED = 0xFFFFFFFF
+_ALIGNMENT = 8
+_SEPARATOR = "\x00"
+
+
+def _split(data) -> List[str]:
+    """Decodifica textos separados por NUL."""
+    return bytes(data).decode("utf-8").split(_SEPARATOR) if len(data) else []
+
+
+def _table_size(count: int) -> int:
+    """Tamanho (potência de 2) da tabela hash, com ocupação de até 60%."""
+    return 1 << max(3, (count * 5 // 3).bit_length())
+
+
+def _id_table(encoded: List[bytes]) -> array:
+    """Monta a tabela hash de IDs (linha + 1 por posição, sondagem linear)."""
+    size = _table_size(len(encoded))
+    mask = size - 1
+    table = array("I", bytes(4 * size))
+    crc32 = zlib.crc32
+    for row, key in enumerate(encoded, 1):
+        slot = crc32(key) & mask
+        while table[slot]:
+            slot = (slot + 1) & mask
+        table[slot] = row
+    return table
+
+
+def write_mapped_snapshot(
+    path: str,
+    generation: int,
+    quality_service: QualityService,
+    storage_service: StorageService
+) -> None:
+    """
+    Grava o estado completo dos serviços no formato mapeável, de forma atômica.
+
+    Args:
+        path: Arquivo de destino (substituído apenas ao final)
+        generation: Geração do snapshot (a mesma do journal que o segue)
+        quality_service: Serviço de qualidade
+        storage_service: Serviço de armazenamento
+    """
+    store = quality_service.store
+    live_rows = list(store.live_rows())
+    live = len(live_rows)
+
+    # Linha de origem -> linha no snapshot (-1 para lápides)
+    new_row_of = array("i", [-1]) * store.row_count
+    for new_row, row in enumerate(live_rows):
+        new_row_of[row] = new_row
+
+    color_table = store.color_table()
+    color_codes = {color: code for code, color in enumerate(color_table)}
+
+    ids, weights, lengths, timestamps, colors, flags, statuses = store.export_rows(
+        None if live == store.row_count else live_rows
+    )
+    reasons = {
+        new_row_of[row]: reason for row, reason in store.explicit_reasons().items()
+        if new_row_of[row] >= 0
+    }
+
+    # Caixas; peças guardadas fora do registro viram linhas órfãs no final
+    boxes = list(storage_service.boxes)
+    box_ids = array("I", (box.box_id for box in boxes))
+    box_of_row = array("i", [-1]) * live
+    box_offsets = array("Q", [0])
+    members = array("I")
+    orphan_rules = []
+    for index, box in enumerate(boxes):
+        for piece in box.pieces:
+            row = store.row_of(piece)
+            if row is not None:
+                row = new_row_of[row]
+            if row is None or row < 0 or box_of_row[row] >= 0:
+                row = len(ids)
+                ids.append(piece.piece_id)
+                weights.append(piece.weight)
+                lengths.append(piece.length)
+                timestamps.append(piece.registered_at or 0.0)
+                code = color_codes.get(piece.color)
+                if code is None:
+                    code = color_codes[piece.color] = len(color_table)
+                    color_table.append(piece.color)
+                colors.append(code)
+                flags.append(piece.rejection_flags)
+                statuses.append(PieceStatus.from_label(piece.status))
+                box_of_row.append(-1)
+                orphan_rules.append(piece.rules)
+                if not piece.rejection_flags and piece.rejection_reason is not None:
+                    reasons[row] = piece.rejection_reason
+            box_of_row[row] = index
+            members.append(row)
+        box_offsets.append(len(members))
+
+    positions = {box.box_id: index for index, box in enumerate(boxes)}
+    closed_order = array("I", (positions[box.box_id] for box in storage_service.get_closed_boxes()))
+    closed_rank = array("I", [_NOT_CLOSED]) * len(boxes)
+    for rank, index in enumerate(closed_order):
+        closed_rank[index] = rank
+    current = storage_service.current_box
+    current_index = positions.get(current.box_id, -1) if current is not None else -1
+
+    # Gerações de regras na numeração do snapshot; as reprovações contam só
+    # as peças cadastradas
+    generations: List[Tuple[int, RuleSet]] = []
+
+    def add_generation(start: int, rules: RuleSet) -> None:
+        if generations and generations[-1][0] == start:
+            generations.pop()  # geração anterior sem linhas no snapshot
+        if not generations or generations[-1][1] is not rules:
+            generations.append((start, rules))
+
+    for span, rules in store.generations():
+        add_generation(bisect_left(live_rows, span.start), rules)
+    for row, rules in enumerate(orphan_rules, live):
+        add_generation(row, rules)
+    failures = array("Q")
+    ends = [start for start, _ in generations[1:]] + [len(ids)]
+    for (start, _), end in zip(generations, ends):
+        failures.extend(count_failures(bytearray(flags[min(start, live):min(end, live)])))
+
+    encoded = [piece_id.encode("utf-8") for piece_id in ids]
+    live_timestamps = timestamps[:live]
+    reason_rows = sorted(reasons)
+
+    sections = {
+        "id_offsets": array("Q", [0]) + array("Q", accumulate(map(len, encoded))),
+        "id_data": b"".join(encoded),
+        "weights": weights,
+        "lengths": lengths,
+        "timestamps": timestamps,
+        "colors": colors,
+        "flags": flags,
+        "statuses": statuses,
+        "color_table": _SEPARATOR.join(color_table).encode("utf-8"),
+        "reason_rows": array("I", reason_rows),
+        "reason_texts": _SEPARATOR.join(reasons[row] for row in reason_rows).encode("utf-8"),
+        "failures": failures,
+        "id_table": _id_table(encoded[:live]),
+        "box_ids": box_ids,
+        "box_capacities": array("I", (box.capacity for box in boxes)),
+        "box_closed": bytes(box.is_closed for box in boxes),
+        "box_offsets": box_offsets,
+        "box_members": members,
+        "box_of_row": box_of_row,
+        "box_order": array("I", sorted(range(len(boxes)), key=box_ids.__getitem__)),
+        "closed_order": closed_order,
+        "closed_rank": closed_rank,
+        "metrics": json.dumps(
+            dict(quality_service.metrics.get_state(), spc=quality_service.spc.get_state())
+        ).encode("utf-8"),
+        "rules": json.dumps(
+            [[start, rules_spec(rules)] for start, rules in generations]
+        ).encode("utf-8"),
+    }
+
+    statistics = quality_service.get_statistics()
+    header = _HEADER.pack(
+        _MAGIC, _VERSION, len(_SECTIONS), generation,
+        quality_service.next_piece_number,
+        len(ids), live,
+        statistics["approved_count"], statistics["rejected_count"],
+        len(boxes), len(members), storage_service.next_box_id, current_index,
+        len(sections["id_table"]),
+        max(live_timestamps) if live else 0.0,
+        all(map(operator.le, live_timestamps, islice(live_timestamps, 1, None)))
+    )
+
+    # Posições das seções, cada uma alinhada em _ALIGNMENT bytes
+    table = []
+    offset = _HEADER.size + _SECTION.size * len(_SECTIONS) + _CRC.size
+    for name in _SECTIONS:
+        offset += -offset % _ALIGNMENT
+        size = len(memoryview(sections[name]).cast("B"))
+        table.append(_SECTION.pack(offset, size))
+        offset += size
+    preamble = header + b"".join(table)
+
+    def chunks():
+        yield preamble + _CRC.pack(zlib.crc32(preamble))
+        position = len(preamble) + _CRC.size
+        for name in _SECTIONS:
+            padding = -position % _ALIGNMENT
+            data = memoryview(sections[name]).cast("B")
+            yield b"\x00" * padding
+            yield data
+            position += padding + len(data)
+
+    _write_atomically(path, chunks())
+
+
+def is_mapped_snapshot(path: str) -> bool:
+    """Verifica se o arquivo começa com a assinatura do snapshot mapeável."""
+    with open(path, "rb") as handle:
+        return handle.read(len(_MAGIC)) == _MAGIC
+
+
+def read_mapped_generation(path: str) -> Optional[int]:
+    """Lê a geração no cabeçalho (None se o arquivo for inválido)."""
+    with open(path, "rb") as handle:
+        preamble = handle.read(_HEADER.size)
+        if len(preamble) < _HEADER.size or preamble[:len(_MAGIC)] != _MAGIC:
+            return None
+        section_count = _HEADER.unpack_from(preamble)[2]
+        preamble += handle.read(_SECTION.size * section_count + _CRC.size)
+    size = _HEADER.size + _SECTION.size * section_count + _CRC.size
+    if len(preamble) < size:
+        return None
+    if _CRC.unpack_from(preamble, size - _CRC.size)[0] != zlib.crc32(preamble[:-_CRC.size]):
+        return None
+    return _HEADER.unpack_from(preamble)[3]
+
+
+class MappedSnapshot:
+    """
+    Snapshot aberto com mmap, com acesso às seções sem copiá-las.
+
+    O mapeamento fica aberto enquanto houver estruturas que o usem; no
+    Linux o arquivo pode ser substituído por um novo snapshot nesse meio
+    tempo, pois o mapeamento continua apontando para o arquivo antigo.
+
+    Atributos:
+        generation: Geração do snapshot
+        next_piece_number: Próximo número de ID automático
+        rows: Linhas de peças (cadastradas + órfãs)
+        live: Peças cadastradas (as primeiras linhas)
+        box_count: Quantidade de caixas
+        stored: Peças guardadas em caixas
+
+    Raises:
+        ValueError: Se o arquivo não for um snapshot válido desta versão
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        data = self._mmap
+
+        if len(data) < _HEADER.size or data[:len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"{path} não é um snapshot mapeável")
+        (
+            _, version, section_count, self.generation, self.next_piece_number,
+            self.rows, self.live, self.approved, self.rejected,
+            self.box_count, self.stored, self.next_box_id, self.current_box,
+            table_size, self.max_timestamp, self.timestamps_sorted
+        ) = _HEADER.unpack_from(data)
+        if _SECTION_COUNTS.get(version) != section_count:
+            raise ValueError(f"Versão de snapshot não suportada em {path}: {version}")
+        self.version = version
+        preamble_size = _HEADER.size + _SECTION.size * section_count
+        if (
+            len(data) < preamble_size + _CRC.size
+            or _CRC.unpack_from(data, preamble_size)[0] != zlib.crc32(data[:preamble_size])
+        ):
+            raise ValueError(f"Cabeçalho corrompido em {path}")
+
+        view = memoryview(data)
+        self._sections = {name: view[:0] for name in _SECTIONS[section_count:]}
+        for index, name in enumerate(_SECTIONS[:section_count]):
+            offset, size = _SECTION.unpack_from(data, _HEADER.size + index * _SECTION.size)
+            if offset + size > len(data):
+                raise ValueError(f"Seção {name} fora do arquivo em {path}")
+            self._sections[name] = view[offset:offset + size]
+
+        self.id_offsets = self.section("id_offsets", "Q")
+        self.id_data_offset = _SECTION.unpack_from(data, _HEADER.size + _SECTION.size)[0]
+        self.id_table = self.section("id_table", "I")
+        self._mask = table_size - 1
+        self.box_ids = self.section("box_ids", "I")
+        self.box_capacities = self.section("box_capacities", "I")
+        self.box_closed = self.section("box_closed")
+        self.box_offsets = self.section("box_offsets", "Q")
+        self.box_members = self.section("box_members", "I")
+        self.box_of_row = self.section("box_of_row", "i")
+        self.box_order = self.section("box_order", "I")
+        self.closed_order = self.section("closed_order", "I")
+        self.closed_rank = self.section("closed_rank", "I")
+
+    def section(self, name: str, typecode: str = "B") -> memoryview:
+        """Visão somente leitura de uma seção, como valores do tipo informado."""
+        view = self._sections[name]
+        return view.cast(typecode) if typecode != "B" else view
+
+    def column(self, name: str, typecode: str) -> array:
+        """Copia uma seção para um array (cópia de memória, sem objetos por item)."""
+        column = array(typecode)
+        column.frombytes(self._sections[name])
+        return column
+
+    def texts(self, name: str) -> List[str]:
+        """Decodifica uma seção de textos separados por NUL."""
+        return _split(self._sections[name])
+
+    def piece_id(self, row: int) -> str:
+        """ID da peça de uma linha."""
+        base = self.id_data_offset
+        return self._mmap[base + self.id_offsets[row]:base + self.id_offsets[row + 1]].decode("utf-8")
+
+    def find_row(self, piece_id: str) -> Optional[int]:
+        """Linha de uma peça cadastrada no snapshot (None se não estiver)."""
+        key = piece_id.encode("utf-8")
+        table, mask, offsets = self.id_table, self._mask, self.id_offsets
+        data, base = self._mmap, self.id_data_offset
+        slot = zlib.crc32(key) & mask
+        while True:
+            row = table[slot]
+            if not row:
+                return None
+            row -= 1
+            if data[base + offsets[row]:base + offsets[row + 1]] == key:
+                return row
+            slot = (slot + 1) & mask
+
+    def find_box(self, box_id: int) -> Optional[int]:
+        """Índice da caixa com o ID informado (None se não estiver)."""
+        box_ids, order = self.box_ids, self.box_order
+        count = len(order)
+        if not count:
+            return None
+        # IDs consecutivos (o caso comum) dispensam a busca binária
+        index = box_id - box_ids[0]
+        if 0 <= index < count and box_ids[index] == box_id:
+            return index
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            if box_ids[order[middle]] < box_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < count and box_ids[order[low]] == box_id:
+            return order[low]
+        return None
+
+    def rule_generations(
+        self, rule_sets: RuleSetCache, default: RuleSet
+    ) -> List[Tuple[range, RuleSet]]:
+        """
+        Gerações de regras das linhas (cadastradas e órfãs).
+
+        Args:
+            rule_sets: Cache que compila as especificações gravadas
+            default: Regras das linhas de snapshots sem regras gravadas
+
+        Returns:
+            Pares (intervalo de linhas, RuleSet), na ordem das linhas
+        """
+        data = bytes(self._sections["rules"])
+        if not data:
+            return [(range(0, self.rows), default)]
+        starts = json.loads(data.decode("utf-8"))
+        ends = [start for start, _ in starts[1:]] + [self.rows]
+        return [
+            (range(start, end), rule_sets.get(spec))
+            for (start, spec), end in zip(starts, ends)
+        ]
+
+    def iter_registers(self, batch: int = 1 << 16, rows: Optional[range] = None) -> Iterator[Tuple]:
+        """
+        Percorre as peças cadastradas em lotes colunares.
+
+        Args:
+            batch: Peças por lote
+            rows: Intervalo de linhas (padrão: todas as cadastradas)
+
+        Yields:
+            Tuplas (ids, weights, colors, lengths, flags, timestamps), como
+            decode_registers
+        """
+        if rows is None:
+            rows = range(0, self.live)
+        color_table = self.texts("color_table")
+        weights, lengths = self.section("weights", "d"), self.section("lengths", "d")
+        timestamps, colors = self.section("timestamps", "d"), self.section("colors", "H")
+        flags = self.section("flags")
+        last = min(rows.stop, self.live)
+        for start in range(rows.start, last, batch):
+            end = min(start + batch, last)
+            yield (
+                [self.piece_id(row) for row in range(start, end)],
+                array("d", weights[start:end]),
+                [color_table[code] for code in colors[start:end]],
+                array("d", lengths[start:end]),
+                bytearray(flags[start:end]),
+                array("d", timestamps[start:end]),
+            )
+
+    def iter_boxes(self) -> Iterator[Tuple[int, int, bool, int]]:
+        """Percorre as caixas como tuplas (ID, capacidade, fechada, peças)."""
+        offsets = self.box_offsets
+        for index in range(self.box_count):
+            yield (
+                self.box_ids[index], self.box_capacities[index],
+                bool(self.box_closed[index]), offsets[index + 1] - offsets[index]
+            )
+
+
+# Estruturas sob demanda usadas pelos serviços após load_mapped_snapshot
+
+_MISSING = object()
+
+
+class _LazyList(Sequence):
+    """Lista com os primeiros itens lidos do snapshot e os novos em memória."""
+
+    def __init__(self, base_length: int):
+        self._base_length = base_length
+        self._tail: list = []
+
+    def _base_item(self, index: int):
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return self._base_length + len(self._tail)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+            if index < 0:
+                raise IndexError(index)
+        if index < self._base_length:
+            return self._base_item(index)
+        return self._tail[index - self._base_length]
+
+    def __iter__(self):
+        for index in range(self._base_length):
+            yield self._base_item(index)
+        yield from self._tail
+
+    def append(self, item) -> None:
+        self._tail.append(item)
+
+    def extend(self, items) -> None:
+        self._tail.extend(items)
+
+    def clear(self) -> None:
+        self._base_length = 0
+        self._tail.clear()
+
+    def copy(self) -> list:
+        return list(self)
+
+
+class _MappedIds(_LazyList):
+    """IDs das linhas do PieceStore, decodificados a cada acesso."""
+
+    def __init__(self, snapshot: MappedSnapshot):
+        super().__init__(snapshot.rows)
+        self._base_item = snapshot.piece_id
+
+
+class _MappedBoxes(_LazyList):
+    """StorageService.boxes: caixas do snapshot criadas no primeiro acesso."""
+
+    def __init__(self, snapshot: MappedSnapshot, store: PieceStore, storage: StorageService):
+        super().__init__(snapshot.box_count)
+        self._snapshot = snapshot
+        self._store = store
+        self._storage = storage
+        self._cache: Dict[int, Box] = {}
+
+    def _base_item(self, index: int) -> Box:
+        box = self._cache.get(index)
+        if box is None:
+            snapshot, store = self._snapshot, self._store
+            box = Box(
+                snapshot.box_ids[index], snapshot.box_capacities[index],
+                self._storage.max_weight, self._storage.max_length
+            )
+            members = snapshot.box_members[
+                snapshot.box_offsets[index]:snapshot.box_offsets[index + 1]
+            ]
+            box.restore([store.view(row) for row in members], bool(snapshot.box_closed[index]))
+            self._cache[index] = box
+        return box
+
+
+class _ClosedLog(_LazyList):
+    """Caixas fechadas na ordem de fechamento (closed_log de restore_indexes)."""
+
+    def __init__(self, snapshot: MappedSnapshot, boxes: _MappedBoxes):
+        super().__init__(len(snapshot.closed_order))
+        self._order = snapshot.closed_order
+        self._boxes = boxes
+
+    def _base_item(self, index: int) -> Box:
+        return self._boxes._base_item(self._order[index])
+
+
+class _OverlayMapping(MutableMapping):
+    """
+    Dicionário com chaves somente leitura no snapshot e alterações em memória.
+
+    Novas chaves ficam em _overlay; chaves do snapshot removidas ou
+    substituídas ficam em _hidden (com o valor antigo), de modo que a
+    contagem continua exata. Os valores nunca são None.
+    """
+
+    def __init__(self, base_length: int):
+        self._base_length = base_length
+        self._overlay: dict = {}
+        self._hidden: dict = {}
+
+    def _base_get(self, key):
+        """Valor da chave no snapshot, ou None."""
+        raise NotImplementedError
+
+    def _base_items(self) -> Iterator[Tuple]:
+        """Pares (chave, valor) do snapshot, na ordem original."""
+        raise NotImplementedError
+
+    def get(self, key, default=None):
+        value = self._overlay.get(key)
+        if value is not None:
+            return value
+        if key in self._hidden:
+            return default
+        value = self._base_get(key)
+        return default if value is None else value
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def __setitem__(self, key, value) -> None:
+        if key not in self._overlay and key not in self._hidden:
+            base = self._base_get(key)
+            if base is not None:
+                self._hidden[key] = base
+        self._overlay[key] = value
+
+    def __delitem__(self, key) -> None:
+        if self._overlay.pop(key, None) is not None:
+            return
+        if key not in self._hidden:
+            base = self._base_get(key)
+            if base is not None:
+                self._hidden[key] = base
+                return
+        raise KeyError(key)
+
+    def pop(self, key, default=_MISSING):
+        value = self.get(key)
+        if value is None:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        del self[key]
+        return value
+
+    def __len__(self) -> int:
+        return self._base_length - len(self._hidden) + len(self._overlay)
+
+    def __iter__(self):
+        hidden = self._hidden
+        for key, _ in self._base_items():
+            if key not in hidden:
+                yield key
+        yield from self._overlay
+
+
+class _RowIndex(_OverlayMapping):
+    """Índice ID -> linha (PieceStore.restore_rows), pela tabela hash do snapshot."""
+
+    def __init__(self, snapshot: MappedSnapshot):
+        super().__init__(snapshot.live)
+        self._snapshot = snapshot
+        self._base_get = snapshot.find_row
+
+    def _base_items(self):
+        piece_id = self._snapshot.piece_id
+        return ((piece_id(row), row) for row in range(self._snapshot.live))
+
+    def values(self):
+        """Linhas na ordem de cadastro, sem decodificar os IDs."""
+        hidden = set(self._hidden.values())
+        for row in range(self._snapshot.live):
+            if row not in hidden:
+                yield row
+        yield from self._overlay.values()
+
+
+class _BoxById(_OverlayMapping):
+    """ID -> caixa (StorageService.restore_indexes) sobre o índice de caixas do snapshot."""
+
+    def __init__(self, snapshot: MappedSnapshot, boxes: _MappedBoxes):
+        super().__init__(snapshot.box_count)
+        self._snapshot = snapshot
+        self._boxes = boxes
+
+    def _base_get(self, box_id):
+        index = self._snapshot.find_box(box_id)
+        return None if index is None else self._boxes._base_item(index)
+
+    def _base_items(self):
+        return ((box.box_id, box) for box in islice(self._boxes, self._snapshot.box_count))
+
+
+class _BoxOfPiece(_OverlayMapping):
+    """ID da peça -> caixa (StorageService.restore_indexes), pela coluna box_of_row."""
+
+    def __init__(self, snapshot: MappedSnapshot, boxes: _MappedBoxes, orphans: Dict[str, int]):
+        super().__init__(snapshot.stored)
+        self._snapshot = snapshot
+        self._boxes = boxes
+        self._orphans = orphans
+
+    def _base_get(self, piece_id):
+        snapshot = self._snapshot
+        row = snapshot.find_row(piece_id)
+        index = -1 if row is None else snapshot.box_of_row[row]
+        if index < 0:
+            row = self._orphans.get(piece_id)
+            index = -1 if row is None else snapshot.box_of_row[row]
+        return self._boxes._base_item(index) if index >= 0 else None
+
+    def _base_items(self):
+        snapshot = self._snapshot
+        for box in islice(self._boxes, snapshot.box_count):
+            for piece in box.pieces:
+                yield piece.piece_id, box
+
+
+class _ClosedPositions(_OverlayMapping):
+    """ID da caixa -> posição no log de fechadas (StorageService.restore_indexes)."""
+
+    def __init__(self, snapshot: MappedSnapshot):
+        super().__init__(len(snapshot.closed_order))
+        self._snapshot = snapshot
+
+    def _base_get(self, box_id):
+        snapshot = self._snapshot
+        index = snapshot.find_box(box_id)
+        if index is None:
+            return None
+        rank = snapshot.closed_rank[index]
+        return None if rank == _NOT_CLOSED else rank
+
+    def _base_items(self):
+        snapshot = self._snapshot
+        return (
+            (snapshot.box_ids[index], rank)
+            for rank, index in enumerate(snapshot.closed_order)
+        )
+
+
+def load_mapped_snapshot(
+    path: str,
+    quality_service: QualityService,
+    storage_service: StorageService,
+    rule_sets: Optional[RuleSetCache] = None
+) -> MappedSnapshot:
+    """
+    Liga serviços vazios ao conteúdo de um snapshot mapeável.
+
+    O custo não depende da quantidade de caixas e, nas peças, se resume a
+    copiar as colunas numéricas: IDs, índices e caixas são lidos do
+    mapeamento conforme são consultados.
+
+    As linhas ficam com as regras gravadas no snapshot; os próximos
+    cadastros continuam com as regras do serviço.
+
+    Args:
+        path: Arquivo do snapshot
+        quality_service: Serviço de qualidade recém-criado
+        storage_service: Serviço de armazenamento recém-criado
+        rule_sets: Cache de RuleSets por especificação (padrão: um novo,
+            que reaproveita as regras atuais do serviço)
+
+    Returns:
+        Snapshot aberto (geração e contadores no cabeçalho)
+
+    Raises:
+        ValueError: Se o arquivo não for um snapshot válido
+    """
+    snapshot = MappedSnapshot(path)
+
+    # Peças: colunas copiadas, IDs e índice por ID sob demanda
+    if rule_sets is None:
+        rule_sets = RuleSetCache(quality_service.rules)
+    generations = snapshot.rule_generations(rule_sets, quality_service.rules)
+    store = quality_service.store
+    store.restore_rows(
+        _MappedIds(snapshot),
+        {
+            "weight": snapshot.column("weights", "d"),
+            "length": snapshot.column("lengths", "d"),
+            "registered_at": snapshot.column("timestamps", "d"),
+            "color": snapshot.column("colors", "H"),
+            "flags": snapshot.column("flags", "B"),
+            "status": snapshot.column("statuses", "B"),
+        },
+        snapshot.texts("color_table"),
+        dict(zip(snapshot.section("reason_rows", "I").tolist(), snapshot.texts("reason_texts"))),
+        _RowIndex(snapshot),
+        [(span.start, rules) for span, rules in generations]
+    )
+    # Os próximos cadastros continuam com as regras do serviço
+    store.rules = quality_service.rules
+
+    quality_service.restore_next_piece_number(snapshot.next_piece_number)
+    failures = snapshot.section("failures", "Q").tolist()
+    quality_service.restore_counters(snapshot.approved, snapshot.rejected, [
+        (rules, failures[index * MAX_RULES:(index + 1) * MAX_RULES])
+        for index, (_, rules) in enumerate(generations)
+    ])
+    _restore_metrics(quality_service, snapshot, store)
+
+    # Caixas: apenas as abertas e a atual são criadas agora
+    boxes = _MappedBoxes(snapshot, store, storage_service)
+    orphans = {snapshot.piece_id(row): row for row in range(snapshot.live, snapshot.rows)}
+    closed = snapshot.box_closed.tobytes()
+    open_boxes = []
+    index = closed.find(0)
+    while index >= 0:
+        open_boxes.append(boxes[index])
+        index = closed.find(0, index + 1)
+    storage_service.restore_indexes(
+        boxes,
+        _BoxById(snapshot, boxes),
+        _BoxOfPiece(snapshot, boxes, orphans),
+        _ClosedLog(snapshot, boxes),
+        _ClosedPositions(snapshot),
+        open_boxes,
+        boxes[snapshot.current_box] if snapshot.current_box >= 0 else None,
+        snapshot.stored,
+        snapshot.next_box_id
+    )
+
+    return snapshot
+
+
+def _restore_metrics(
+    quality_service: QualityService,
+    snapshot: MappedSnapshot,
+    store: PieceStore
+) -> None:
+    """
+    Repõe as janelas móveis e o CEP salvos no snapshot.
+
+    Se a configuração das janelas mudou, refaz as métricas a partir dos
+    cadastros recentes; sem estado do CEP (snapshots anteriores), refaz o
+    CEP a partir das colunas de peso e comprimento.
+    """
+    state = json.loads(bytes(snapshot.section("metrics")).decode("utf-8"))
+    spc = quality_service.spc
+    if not spc.set_state(state.get("spc", {})):
+        spc.clear()
+        spc.record_batch(
+            store.column("weight")[:snapshot.live], store.column("length")[:snapshot.live]
+        )
+
+    metrics = quality_service.metrics
+    if metrics.set_state(state):
+        return
+    if not snapshot.live or not metrics.windows:
+        return
+    cutoff = metrics.clock() - max(window.seconds for window in metrics.windows.values())
+    if snapshot.max_timestamp < cutoff:
+        return
+
+    timestamps = store.column("registered_at")
+    flags = store.column("flags")
+    start, end = 0, snapshot.live
+    if snapshot.timestamps_sorted:
+        start = bisect_left(timestamps, cutoff, 0, end)
+    # Cada geração é rotulada com as regras que validaram as suas peças
+    for rows, rules in store.generations():
+        low, high = max(rows.start, start), min(rows.stop, end)
+        if low < high:
+            metrics.set_labels(rules.labels_for())
+            metrics.record_series(timestamps[low:high], bytearray(flags[low:high]))
+    metrics.set_labels(quality_service.rules.labels_for())
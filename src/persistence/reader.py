@@ -0,0 +1,392 @@
+"""
+Leitura de journal e snapshot sem carregar os serviços.
+
+O JournalReader percorre os arquivos em duas passadas com memória limitada:
+a primeira anota apenas remoções, limpezas e o estado compacto das caixas;
+a segunda entrega, em fluxo, as peças que continuam cadastradas. Com isso o
+relatório e a exportação funcionam sobre arquivos de qualquer tamanho.
+"""
+
+import os
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..models.box import Box
+from ..models.piece import Piece
+from ..validators.quality_validator import QualityValidator
+from ..validators.rules import RuleSet
+from .journal import (
+    JOURNAL_FILE, SNAPSHOT_FILE, _BOX, _U32, _UNSTORE, RuleSetCache, _read_generation,
+    decode_ids, decode_registers, iter_frames
+)
+from .mapped_snapshot import (
+    MAPPED_SNAPSHOT_FILE, MappedSnapshot, is_mapped_snapshot, read_mapped_generation
+)
+
+_STATUS_LABELS = ("aprovada", "reprovada")
+
+
+class JournalReader:
+    """
+    Consulta somente leitura sobre arquivos de snapshot e journal.
+
+    Os arquivos são lidos na ordem informada, como na recuperação. Os
+    resultados refletem o estado que open_services recuperaria, sem manter
+    as peças em memória. Os bits de falha são lidos com as regras gravadas
+    nos arquivos; `rules` vale para os lotes gravados sem regras.
+
+    Atributos:
+        quality: Visão com a interface de consulta de QualityService
+        storage: Visão com get_statistics de StorageService
+    """
+
+    def __init__(
+        self,
+        paths: Sequence[str],
+        box_capacity: int = Box.DEFAULT_CAPACITY,
+        rules: Optional[RuleSet] = None
+    ):
+        self.paths = list(paths)
+        self.box_capacity = box_capacity
+        self.rules = rules if rules is not None else QualityValidator.rules
+        self._rule_sets = RuleSetCache(self.rules)
+        self._scanned = False
+        self.quality = _FileQualityView(self)
+        self.storage = _FileStorageView(self)
+
+    @classmethod
+    def from_directory(cls, directory: str, **options) -> "JournalReader":
+        """
+        Cria um leitor para um diretório de dados (snapshot + journal).
+
+        O snapshot mapeável (snapshot.bin) tem preferência sobre o formato
+        antigo (snapshot.log). O journal só é lido se for da mesma geração
+        do snapshot; caso contrário ele já está incorporado ao snapshot.
+
+        Raises:
+            FileNotFoundError: Se o diretório não tiver snapshot nem journal
+        """
+        mapped_path = os.path.join(directory, MAPPED_SNAPSHOT_FILE)
+        snapshot_path = os.path.join(directory, SNAPSHOT_FILE)
+        journal_path = os.path.join(directory, JOURNAL_FILE)
+
+        paths = []
+        generation = 0
+        if os.path.exists(mapped_path):
+            paths.append(mapped_path)
+            generation = read_mapped_generation(mapped_path) or 0
+        elif os.path.exists(snapshot_path):
+            paths.append(snapshot_path)
+            generation = _read_generation(snapshot_path) or 0
+        if os.path.exists(journal_path) and _read_generation(journal_path) == generation:
+            paths.append(journal_path)
+        if not paths:
+            raise FileNotFoundError(f"Nenhum snapshot ou journal em {directory}")
+        return cls(paths, **options)
+
+    def _frames(self) -> Iterator[Tuple[int, bytes, Any]]:
+        """
+        Percorre os quadros de todos os arquivos com um índice global.
+
+        Um snapshot mapeável é entregue como quadros já decodificados:
+        "q" com o RuleSet de cada geração, "r" com as colunas de um lote de
+        peças cadastradas (como decode_registers) e "b" com (ID,
+        capacidade, fechada, peças) de cada caixa. Cada arquivo começa com
+        um quadro "q" das regras do leitor, como na recuperação.
+        """
+        index = 0
+        for path in self.paths:
+            yield index, b"q", self.rules
+            index += 1
+            if is_mapped_snapshot(path):
+                snapshot = MappedSnapshot(path)
+                for rows, rules in snapshot.rule_generations(self._rule_sets, self.rules):
+                    if rows.start >= snapshot.live:
+                        break
+                    yield index, b"q", rules
+                    index += 1
+                    for columns in snapshot.iter_registers(rows=rows):
+                        yield index, b"r", columns
+                        index += 1
+                for box in snapshot.iter_boxes():
+                    yield index, b"b", box
+                    index += 1
+                continue
+            for kind, payload, _ in iter_frames(path):
+                yield index, kind, payload
+                index += 1
+
+    def _scan(self) -> None:
+        """
+        Primeira passada: remoções, limpezas, caixas e contadores de qualidade.
+
+        Guarda apenas o índice da última remoção de cada ID removido e um
+        registro compacto por caixa; as peças não ficam em memória.
+        """
+        if self._scanned:
+            return
+
+        last_removal: Dict[str, int] = {}
+        quality_cleared = -1
+        boxes = _BoxTally(self.box_capacity)
+
+        for index, kind, payload in self._frames():
+            if kind == b"X":
+                for piece_id in decode_ids(payload):
+                    last_removal[piece_id] = index
+            elif kind == b"S":
+                boxes.store(_U32.unpack_from(payload)[0], len(decode_ids(payload[4:])))
+            elif kind == b"C":
+                boxes.close(_U32.unpack_from(payload)[0])
+            elif kind == b"U":
+                box_id, reopen = _UNSTORE.unpack_from(payload)
+                boxes.unstore(
+                    box_id, len(decode_ids(payload[_UNSTORE.size:])), bool(reopen)
+                )
+            elif kind == b"B":
+                box_id, capacity, is_closed = _BOX.unpack_from(payload)
+                boxes.restore(
+                    box_id, capacity, bool(is_closed), len(decode_ids(payload[_BOX.size:]))
+                )
+            elif kind == b"b":
+                boxes.restore(*payload)
+            elif kind == b"Z":
+                if bytes(payload) == b"quality":
+                    quality_cleared = index
+                    last_removal.clear()
+                else:
+                    boxes.clear()
+
+        self._last_removal = last_removal
+        self._quality_cleared = quality_cleared
+        self._boxes = boxes
+
+        # Contadores de qualidade a partir das colunas (sem montar registros),
+        # com as reprovações por bit de cada RuleSet
+        approved = rejected = 0
+        failure_counts: Dict[RuleSet, Dict[int, int]] = {}
+        for rules, _, _, _, _, flags, rows in self._registers():
+            counts = failure_counts.setdefault(rules, {})
+            for row in rows:
+                value = flags[row]
+                if not value:
+                    approved += 1
+                    continue
+                rejected += 1
+                bit = 1
+                while bit <= value:
+                    if value & bit:
+                        counts[bit] = counts.get(bit, 0) + 1
+                    bit <<= 1
+        self._approved = approved
+        self._rejected = rejected
+        self._failure_counts = failure_counts
+        self._scanned = True
+
+    def _registers(self) -> Iterator[Tuple]:
+        """
+        Segunda passada: lotes de cadastro com as linhas que sobreviveram.
+
+        Uma linha sobrevive se veio depois da última limpeza da qualidade e
+        se o seu ID não foi removido depois dela.
+
+        Yields:
+            Tuplas (RuleSet, ids, weights, colors, lengths, flags, linhas)
+        """
+        cleared, last_removal = self._quality_cleared, self._last_removal
+        rules = self.rules
+        for index, kind, payload in self._frames():
+            if kind == b"q":
+                rules = payload
+                continue
+            if kind == b"Q":
+                rules = self._rule_sets.get(bytes(payload).decode("utf-8"))
+                continue
+            if kind not in (b"R", b"r") or index <= cleared:
+                continue
+            if kind == b"R":
+                payload = decode_registers(payload)
+            ids, weights, colors, lengths, flags, _ = payload
+            if last_removal:
+                rows = [
+                    row for row, piece_id in enumerate(ids)
+                    if last_removal.get(piece_id, -1) < index
+                ]
+            else:
+                rows = range(len(ids))
+            yield rules, ids, weights, colors, lengths, flags, rows
+
+    def iter_records(self, status: Optional[str] = None) -> Iterator[Tuple]:
+        """
+        Percorre as peças cadastradas, na ordem de cadastro.
+
+        Args:
+            status: 'aprovada', 'reprovada' ou None para todas
+
+        Yields:
+            Tuplas (id, peso, cor, comprimento, status, motivo_reprovacao),
+            como QualityService.iter_records
+        """
+        self._scan()
+        for rules, ids, weights, colors, lengths, flags, rows in self._registers():
+            describe = rules.describe
+            for row in rows:
+                value = flags[row]
+                label = _STATUS_LABELS[value != 0]
+                if status is not None and label != status:
+                    continue
+                reason = (
+                    describe(value, weights[row], colors[row], lengths[row]) if value else None
+                )
+                yield ids[row], weights[row], colors[row], lengths[row], label, reason
+
+    def quality_statistics(self) -> Dict[str, Any]:
+        """Estatísticas de qualidade no formato de QualityService.get_statistics."""
+        self._scan()
+        total = self._approved + self._rejected
+        # Rótulos de gerações diferentes iguais são somados, como no serviço
+        rejection_reasons: Dict[str, int] = {}
+        for rules, counts in self._failure_counts.items():
+            labels = rules.labels_for()
+            for flag, count in sorted(counts.items()):
+                label = labels.get(flag, f"Regra {flag}")
+                rejection_reasons[label] = rejection_reasons.get(label, 0) + count
+        return {
+            "total_pieces": total,
+            "approved_count": self._approved,
+            "rejected_count": self._rejected,
+            "rejection_reasons": rejection_reasons,
+            "approval_rate": self._approved / total * 100 if total else 0
+        }
+
+    def storage_statistics(self) -> Dict[str, Any]:
+        """Estatísticas de caixas no formato de StorageService.get_statistics."""
+        self._scan()
+        return self._boxes.statistics()
+
+
+class _BoxTally:
+    """
+    Estado compacto das caixas: [peças, capacidade, fechada] por ID.
+
+    Reproduz as regras de StorageService na recuperação, inclusive a caixa
+    vazia aberta quando a atual fecha, para que as estatísticas coincidam.
+    """
+
+    def __init__(self, box_capacity: int):
+        self.box_capacity = box_capacity
+        self.clear()
+
+    def clear(self) -> None:
+        self.boxes: Dict[int, List] = {}
+        self.current: Optional[int] = None
+        self.next_box_id = 1
+        self.stored = 0
+        self.closed = 0
+
+    def _open(self, box_id: int, capacity: int) -> List:
+        box = self.boxes[box_id] = [0, capacity, False]
+        self.next_box_id = max(self.next_box_id, box_id + 1)
+        return box
+
+    def _current_closed(self) -> bool:
+        return self.current is None or self.boxes[self.current][2]
+
+    def _replace_current(self) -> None:
+        """Abre a próxima caixa quando a atual fecha (StorageService._create_new_box)."""
+        box_id = self.next_box_id
+        self._open(box_id, self.box_capacity)
+        self.current = box_id
+
+    def store(self, box_id: int, count: int) -> None:
+        box = self.boxes.get(box_id)
+        if box is None:
+            box = self._open(box_id, self.box_capacity)
+            if self._current_closed() or box_id > self.current:
+                self.current = box_id
+        if box[2]:
+            return
+
+        added = min(count, box[1] - box[0])
+        box[0] += added
+        self.stored += added
+        if added and box[0] >= box[1]:
+            box[2] = True
+            self.closed += 1
+            if box_id == self.current:
+                self._replace_current()
+
+    def close(self, box_id: int) -> None:
+        box = self.boxes.get(box_id)
+        if box is None or box[2]:
+            return
+        box[2] = True
+        self.closed += 1
+        if box_id == self.current:
+            self._replace_current()
+
+    def unstore(self, box_id: int, count: int, reopen: bool) -> None:
+        box = self.boxes.get(box_id)
+        if box is None:
+            return
+        removed = min(count, box[0])
+        box[0] -= removed
+        self.stored -= removed
+        if reopen and box[2]:
+            box[2] = False
+            self.closed -= 1
+
+    def restore(self, box_id: int, capacity: int, is_closed: bool, count: int) -> None:
+        box = self._open(box_id, capacity)
+        box[0] = count
+        box[2] = is_closed
+        self.current = box_id
+        self.stored += count
+        if is_closed:
+            self.closed += 1
+
+    def statistics(self) -> Dict[str, Any]:
+        current = self.boxes[self.current] if self.current is not None else None
+        return {
+            "total_boxes": len(self.boxes),
+            "closed_boxes": self.closed,
+            "open_boxes": len(self.boxes) - self.closed,
+            "total_stored_pieces": self.stored,
+            "current_box_fill": current[0] if current else 0,
+            "current_box_capacity": current[1] if current else 0,
+        }
+
+
+class _FileQualityView:
+    """Expõe as consultas de QualityService sobre os arquivos."""
+
+    def __init__(self, reader: JournalReader):
+        self._reader = reader
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return self._reader.quality_statistics()
+
+    def iter_records(self, status: Optional[str] = None) -> Iterator[Tuple]:
+        return self._reader.iter_records(status)
+
+    def _pieces(self, status: str) -> List[Piece]:
+        return [
+            Piece(piece_id, weight, color, length, label, rejection_reason=reason)
+            for piece_id, weight, color, length, label, reason
+            in self._reader.iter_records(status)
+        ]
+
+    def get_approved_pieces(self) -> List[Piece]:
+        return self._pieces("aprovada")
+
+    def get_rejected_pieces(self) -> List[Piece]:
+        return self._pieces("reprovada")
+
+
+class _FileStorageView:
+    """Expõe get_statistics de StorageService sobre os arquivos."""
+
+    def __init__(self, reader: JournalReader):
+        self._reader = reader
+
+    def get_statistics(self) -> Dict[str, Any]:
+        return self._reader.storage_statistics()
@@ -0,0 +1,89 @@
+"""
+Interface dos repositórios de persistência usados pelos serviços.
+
+QualityService e StorageService mantêm o estado em memória e notificam o
+repositório ligado ao atributo `journal` a cada operação. Sem repositório
+(o padrão), os dados ficam apenas em memória. Implementações:
+
+    Journal           journal binário + snapshot (journal.py)
+    SQLiteRepository  banco SQLite em modo WAL (sqlite_store.py)
+"""
+
+from typing import Sequence
+
+from ..models.piece import Piece
+
+
+class Repository:
+    """
+    Eventos que os serviços enviam ao repositório.
+
+    As implementações podem acumular os eventos e gravá-los em grupo;
+    commit() garante que os pendentes foram gravados.
+    """
+
+    def record_register(self, piece: Piece) -> None:
+        """Registra o cadastro de uma peça já validada."""
+        self.record_registers(
+            (piece.piece_id,), (piece.weight,), (piece.color,),
+            (piece.length,), (piece.rejection_flags,), (piece.registered_at or 0.0,)
+        )
+
+    def record_registers(
+        self,
+        piece_ids: Sequence[str],
+        weights: Sequence[float],
+        colors: Sequence[str],
+        lengths: Sequence[float],
+        flags: Sequence[int],
+        timestamps: Sequence[float]
+    ) -> None:
+        """Registra um lote de cadastros."""
+        raise NotImplementedError
+
+    def record_remove(self, piece_id: str) -> None:
+        """Registra a remoção de uma peça."""
+        raise NotImplementedError
+
+    def record_rules(self, rules) -> None:
+        """
+        Registra as regras que validam os próximos cadastros.
+
+        Os bits de falha só têm sentido com as regras que os produziram;
+        repositórios que as gravam recuperam cada lote com as suas regras.
+        """
+
+    def record_open(self, box_id: int, capacity: int) -> None:
+        """Registra a abertura de uma caixa."""
+
+    def record_store(self, piece_id: str, box_id: int) -> None:
+        """Registra o armazenamento de uma peça em uma caixa."""
+        self.record_stores((piece_id,), box_id)
+
+    def record_stores(self, piece_ids: Sequence[str], box_id: int) -> None:
+        """Registra o armazenamento de várias peças na mesma caixa."""
+        raise NotImplementedError
+
+    def record_unstore(self, piece_id: str, box_id: int, reopen: bool) -> None:
+        """Registra a retirada de uma peça de uma caixa."""
+        raise NotImplementedError
+
+    def record_close(self, box_id: int) -> None:
+        """Registra o fechamento de uma caixa."""
+        raise NotImplementedError
+
+    def record_clear(self, service: str) -> None:
+        """Registra um clear_all ('quality' ou 'storage')."""
+        raise NotImplementedError
+
+    def commit(self) -> None:
+        """Grava os eventos pendentes."""
+        raise NotImplementedError
+
+    def checkpoint(self, quality_service, storage_service) -> None:
+        """Consolida o estado persistido (snapshot, compactação)."""
+        self.commit()
+
+    def close(self) -> None:
+        """Grava os eventos pendentes e libera os recursos."""
+        raise NotImplementedError
@@ -0,0 +1,557 @@
+"""
+Repositório SQLite (modo WAL) para os serviços do FactorySense.
+
+Tabelas:
+
+    pieces     id, peso, cor, comprimento, status (0 aprovada, 1 reprovada),
+               bits de falha, instante do cadastro, caixa e posição na caixa
+               e regras que leem os bits; peças removidas do registro mas
+               ainda guardadas numa caixa ficam marcadas com removed = 1 até
+               saírem da caixa
+    rule_sets  especificações JSON dos RuleSets usados nos cadastros
+    boxes      id, capacidade, fechada, quantidade de peças
+    meta       próximo número de ID automático
+
+Os eventos dos serviços são acumulados e gravados em grupo, em uma única
+transação, com executemany por sequência de eventos do mesmo tipo. As
+estatísticas são calculadas por agregações SQL, sem carregar as linhas.
+"""
+
+import os
+import sqlite3
+import threading
+from array import array
+from itertools import groupby
+from operator import itemgetter
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from ..models.box import Box
+from ..models.piece import Piece
+from ..services.quality_service import QualityService
+from ..services.storage_service import StorageService
+from ..validators.quality_validator import QualityValidator
+from ..validators.rules import RuleSet
+from .journal import RuleSetCache, rules_spec
+from .reader import _FileQualityView, _FileStorageView
+from .repository import Repository
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pieces (
+    id TEXT PRIMARY KEY,
+    weight REAL NOT NULL,
+    color TEXT NOT NULL,
+    length REAL NOT NULL,
+    status INTEGER NOT NULL,
+    flags INTEGER NOT NULL,
+    registered_at REAL NOT NULL,
+    box_id INTEGER,
+    slot INTEGER,
+    removed INTEGER NOT NULL DEFAULT 0,
+    rules_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS pieces_status ON pieces (removed, status);
+CREATE INDEX IF NOT EXISTS pieces_box ON pieces (box_id, slot);
+CREATE TABLE IF NOT EXISTS boxes (
+    id INTEGER PRIMARY KEY,
+    capacity INTEGER NOT NULL,
+    is_closed INTEGER NOT NULL DEFAULT 0,
+    piece_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS rule_sets (
+    id INTEGER PRIMARY KEY,
+    spec TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+_INSERT_PIECE = (
+    "INSERT OR REPLACE INTO pieces "
+    "(id, weight, color, length, status, flags, registered_at, rules_id) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_REMOVE_PIECE = "UPDATE pieces SET removed = 1 WHERE id = ?"
+_OPEN_BOX = "INSERT OR REPLACE INTO boxes (id, capacity) VALUES (?, ?)"
+_ENSURE_BOX = "INSERT OR IGNORE INTO boxes (id, capacity) VALUES (?, ?)"
+_STORE_PIECE = "UPDATE pieces SET box_id = ?, slot = ? WHERE id = ?"
+_COUNT_STORED = "UPDATE boxes SET piece_count = piece_count + ? WHERE id = ?"
+_UNSTORE_PIECE = "UPDATE pieces SET box_id = NULL, slot = NULL WHERE id = ?"
+_UNSTORE_BOX = (
+    "UPDATE boxes SET piece_count = piece_count - 1, "
+    "is_closed = CASE WHEN ? THEN 0 ELSE is_closed END WHERE id = ?"
+)
+_CLOSE_BOX = "UPDATE boxes SET is_closed = 1 WHERE id = ?"
+_SET_META = "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)"
+_RAISE_NEXT_NUMBER = (
+    "INSERT OR REPLACE INTO meta (key, value) VALUES ('next_piece_number', MAX(?, "
+    "COALESCE((SELECT value FROM meta WHERE key = 'next_piece_number'), 0)))"
+)
+_PURGE_REMOVED = "DELETE FROM pieces WHERE removed = 1 AND box_id IS NULL"
+
+_STATUS_LABELS = ("aprovada", "reprovada")
+
+
+class SQLiteRepository(Repository):
+    """
+    Repositório em um banco SQLite, com commit em grupo.
+
+    Os eventos são acumulados em memória e gravados em uma transação quando
+    há group_size eventos pendentes ou, em segundo plano, a cada
+    flush_interval segundos, como no Journal. As consultas (estatísticas e
+    iter_records) confirmam antes os eventos pendentes.
+
+    Atributos:
+        quality: Visão com a interface de consulta de QualityService
+        storage: Visão com get_statistics de StorageService
+
+    Args:
+        path: Arquivo do banco (criado se não existir)
+        box_capacity: Capacidade usada para caixas não registradas
+        rules: Regras dos rótulos e motivos das peças gravadas sem regras
+            (bancos anteriores à tabela rule_sets) e dos próximos cadastros
+            até record_rules
+        group_size: Eventos pendentes que disparam uma gravação
+        flush_interval: Intervalo da gravação em segundo plano (None = nunca)
+        sync: Sincronizar cada transação em disco (synchronous=FULL)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        box_capacity: int = Box.DEFAULT_CAPACITY,
+        rules: Optional[RuleSet] = None,
+        group_size: int = 4096,
+        flush_interval: Optional[float] = 0.05,
+        sync: bool = True
+    ):
+        self.path = path
+        self.box_capacity = box_capacity
+        self.rules = rules if rules is not None else QualityValidator.rules
+        self.group_size = group_size
+        self.flush_interval = flush_interval
+
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(f"PRAGMA synchronous={'FULL' if sync else 'NORMAL'}")
+        self._connection.executescript(_SCHEMA)
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(pieces)")}
+        if "rules_id" not in columns:
+            self._connection.execute("ALTER TABLE pieces ADD COLUMN rules_id INTEGER")
+
+        # RuleSets gravados: cache por especificação e por id na tabela
+        self._rule_sets = RuleSetCache(self.rules)
+        self._rules_by_id: Dict[int, RuleSet] = {}
+        self._current_rules = self.rules
+        self._rules_id = self._rule_set_id(self.rules)
+
+        self._lock = threading.Lock()
+        # Operações pendentes: (sql, linhas), na ordem dos eventos
+        self._operations: List[Tuple[str, List[tuple]]] = []
+        self._pending_events = 0
+        self._stores: Optional[Tuple[int, List[str]]] = None
+        self._slot = self._connection.execute(
+            "SELECT COALESCE(MAX(slot), 0) FROM pieces"
+        ).fetchone()[0]
+        self._highest_auto_number = 0
+        self._closed = False
+
+        self.quality = _FileQualityView(self)
+        self.storage = _FileStorageView(self)
+
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if flush_interval:
+            self._flusher = threading.Thread(
+                target=self._run_flusher, name="sqlite-flusher", daemon=True
+            )
+            self._flusher.start()
+
+    def _run_flusher(self) -> None:
+        """Confirma periodicamente os eventos pendentes."""
+        while not self._stop.wait(self.flush_interval):
+            self.commit()
+
+    # Gravação em grupo
+
+    def _add_locked(self, sql: str, rows: List[tuple]) -> None:
+        """Enfileira linhas, juntando-as à operação anterior se for a mesma."""
+        if self._operations and self._operations[-1][0] == sql:
+            self._operations[-1][1].extend(rows)
+        else:
+            self._operations.append((sql, rows))
+
+    def _seal_locked(self) -> None:
+        """Converte o lote aberto de armazenamentos em operações."""
+        if self._stores is None:
+            return
+        box_id, ids = self._stores
+        self._stores = None
+        first = self._slot + 1
+        self._slot += len(ids)
+        self._add_locked(_ENSURE_BOX, [(box_id, self.box_capacity)])
+        self._add_locked(
+            _STORE_PIECE, [(box_id, slot, piece_id) for slot, piece_id in enumerate(ids, first)]
+        )
+        self._add_locked(_COUNT_STORED, [(len(ids), box_id)])
+
+    def _added_locked(self, count: int) -> None:
+        self._pending_events += count
+        if self._pending_events >= self.group_size:
+            self._commit_locked()
+
+    def _commit_locked(self) -> None:
+        self._seal_locked()
+        if not self._operations:
+            return
+        connection = self._connection
+        connection.execute("BEGIN")
+        try:
+            for sql, rows in self._operations:
+                connection.executemany(sql, rows)
+            if self._highest_auto_number:
+                connection.execute(_RAISE_NEXT_NUMBER, (self._highest_auto_number + 1,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self._operations = []
+        self._pending_events = 0
+
+    def commit(self) -> None:
+        """Grava em uma transação todos os eventos pendentes."""
+        with self._lock:
+            if not self._closed:
+                self._commit_locked()
+
+    def close(self) -> None:
+        """Confirma os eventos pendentes e fecha o banco."""
+        self._stop.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._lock:
+            if not self._closed:
+                self._commit_locked()
+                self._connection.close()
+                self._closed = True
+
+    def checkpoint(self, quality_service, storage_service) -> None:
+        """
+        Grava os pendentes, descarta peças removidas que já saíram das
+        caixas e incorpora o WAL ao banco.
+        """
+        with self._lock:
+            self._commit_locked()
+            self._connection.execute(_PURGE_REMOVED)
+            self._connection.execute(
+                _SET_META, ("next_piece_number", quality_service.next_piece_number)
+            )
+            self._connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    # Regras
+
+    def _rule_set_id(self, rules: RuleSet) -> int:
+        """Id do RuleSet na tabela rule_sets, gravando-o se for novo."""
+        spec = rules_spec(rules)
+        self._connection.execute("INSERT OR IGNORE INTO rule_sets (spec) VALUES (?)", (spec,))
+        rules_id = self._connection.execute(
+            "SELECT id FROM rule_sets WHERE spec = ?", (spec,)
+        ).fetchone()[0]
+        self._rules_by_id[rules_id] = rules
+        return rules_id
+
+    def _rules_for(self, rules_id: Optional[int]) -> RuleSet:
+        """RuleSet de um id da tabela rule_sets (None: as regras do repositório)."""
+        if rules_id is None:
+            return self.rules
+        rules = self._rules_by_id.get(rules_id)
+        if rules is None:
+            spec = self._connection.execute(
+                "SELECT spec FROM rule_sets WHERE id = ?", (rules_id,)
+            ).fetchone()[0]
+            rules = self._rules_by_id[rules_id] = self._rule_sets.get(spec)
+        return rules
+
+    # Eventos
+
+    def record_rules(self, rules: RuleSet) -> None:
+        """Registra as regras dos próximos cadastros."""
+        with self._lock:
+            if rules is not self._current_rules:
+                self._rules_id = self._rule_set_id(rules)
+                self._current_rules = rules
+
+    def record_registers(
+        self,
+        piece_ids: Sequence[str],
+        weights: Sequence[float],
+        colors: Sequence[str],
+        lengths: Sequence[float],
+        flags: Sequence[int],
+        timestamps: Sequence[float]
+    ) -> None:
+        """Registra um lote de cadastros."""
+        rules_id = self._rules_id
+        rows = [
+            (piece_id, weight, color.lower(), length, 1 if value else 0, value, timestamp,
+             rules_id)
+            for piece_id, weight, color, length, value, timestamp
+            in zip(piece_ids, weights, colors, lengths, flags, timestamps)
+        ]
+        # IDs automáticos são crescentes: basta o último do lote
+        last = piece_ids[-1] if len(piece_ids) else ""
+        with self._lock:
+            self._seal_locked()
+            self._add_locked(_INSERT_PIECE, rows)
+            if last[:1] == "P" and last[1:].isdigit():
+                self._highest_auto_number = max(self._highest_auto_number, int(last[1:]))
+            self._added_locked(len(rows))
+
+    def record_remove(self, piece_id: str) -> None:
+        """Registra a remoção de uma peça."""
+        with self._lock:
+            self._seal_locked()
+            self._add_locked(_REMOVE_PIECE, [(piece_id,)])
+            self._added_locked(1)
+
+    def record_open(self, box_id: int, capacity: int) -> None:
+        """Registra a abertura de uma caixa."""
+        with self._lock:
+            self._seal_locked()
+            self._add_locked(_OPEN_BOX, [(box_id, capacity)])
+            self._added_locked(1)
+
+    def record_stores(self, piece_ids: Sequence[str], box_id: int) -> None:
+        """Registra o armazenamento de várias peças na mesma caixa."""
+        with self._lock:
+            if self._stores is not None and self._stores[0] != box_id:
+                self._seal_locked()
+            if self._stores is None:
+                self._stores = (box_id, [])
+            self._stores[1].extend(piece_ids)
+            self._added_locked(len(piece_ids))
+
+    def record_unstore(self, piece_id: str, box_id: int, reopen: bool) -> None:
+        """Registra a retirada de uma peça de uma caixa."""
+        with self._lock:
+            self._seal_locked()
+            self._add_locked(_UNSTORE_PIECE, [(piece_id,)])
+            self._add_locked(_UNSTORE_BOX, [(reopen, box_id)])
+            self._added_locked(1)
+
+    def record_close(self, box_id: int) -> None:
+        """Registra o fechamento de uma caixa."""
+        with self._lock:
+            self._seal_locked()
+            self._add_locked(_CLOSE_BOX, [(box_id,)])
+            self._added_locked(1)
+
+    def record_clear(self, service: str) -> None:
+        """Registra um clear_all ('quality' ou 'storage')."""
+        with self._lock:
+            self._seal_locked()
+            if service == "quality":
+                self._add_locked("UPDATE pieces SET removed = 1", [()])
+                self._add_locked(_PURGE_REMOVED, [()])
+            else:
+                self._add_locked("DELETE FROM boxes", [()])
+                self._add_locked("UPDATE pieces SET box_id = NULL, slot = NULL", [()])
+                self._add_locked(_PURGE_REMOVED, [()])
+            self._added_locked(1)
+
+    # Consultas (agregações SQL)
+
+    def _query(self, sql: str, parameters: tuple = ()) -> sqlite3.Cursor:
+        """Confirma os pendentes e executa uma consulta."""
+        self.commit()
+        return self._connection.execute(sql, parameters)
+
+    def quality_statistics(self) -> Dict[str, Any]:
+        """Estatísticas de qualidade no formato de QualityService.get_statistics."""
+        total, approved = self._query(
+            "SELECT COUNT(*), COALESCE(SUM(status = 0), 0) FROM pieces WHERE removed = 0"
+        ).fetchone()
+
+        # Uma linha por regras e combinação de bits; os bits são separados
+        # aqui e rotulados pelas regras que os produziram
+        rejection_reasons: Dict[str, int] = {}
+        for rules_id, group in groupby(self._query(
+            "SELECT rules_id, flags, COUNT(*) FROM pieces WHERE removed = 0 AND status = 1 "
+            "GROUP BY rules_id, flags ORDER BY rules_id, flags"
+        ), key=itemgetter(0)):
+            failure_counts: Dict[int, int] = {}
+            for _, flags, count in group:
+                bit = 1
+                while bit <= flags:
+                    if flags & bit:
+                        failure_counts[bit] = failure_counts.get(bit, 0) + count
+                    bit <<= 1
+            labels = self._rules_for(rules_id).labels_for()
+            for flag, count in sorted(failure_counts.items()):
+                label = labels.get(flag, f"Regra {flag}")
+                rejection_reasons[label] = rejection_reasons.get(label, 0) + count
+
+        return {
+            "total_pieces": total,
+            "approved_count": approved,
+            "rejected_count": total - approved,
+            "rejection_reasons": rejection_reasons,
+            "approval_rate": approved / total * 100 if total else 0
+        }
+
+    def storage_statistics(self) -> Dict[str, Any]:
+        """Estatísticas de caixas no formato de StorageService.get_statistics."""
+        total, closed, stored = self._query(
+            "SELECT COUNT(*), COALESCE(SUM(is_closed), 0), COALESCE(SUM(piece_count), 0) "
+            "FROM boxes"
+        ).fetchone()
+        current = self._query(
+            "SELECT piece_count, capacity FROM boxes ORDER BY id DESC LIMIT 1"
+        ).fetchone()
+        return {
+            "total_boxes": total,
+            "closed_boxes": closed,
+            "open_boxes": total - closed,
+            "total_stored_pieces": stored,
+            "current_box_fill": current[0] if current else 0,
+            "current_box_capacity": current[1] if current else 0,
+        }
+
+    def iter_records(self, status: Optional[str] = None) -> Iterator[Tuple]:
+        """
+        Percorre as peças cadastradas, na ordem de cadastro, em fluxo.
+
+        Args:
+            status: 'aprovada', 'reprovada' ou None para todas
+
+        Yields:
+            Tuplas (id, peso, cor, comprimento, status, motivo_reprovacao),
+            como QualityService.iter_records
+        """
+        sql = "SELECT id, weight, color, length, flags, rules_id FROM pieces WHERE removed = 0"
+        parameters: tuple = ()
+        if status is not None:
+            sql += " AND status = ?"
+            parameters = (_STATUS_LABELS.index(status),)
+        rules_for = self._rules_for
+        cursor = self._query(sql + " ORDER BY rowid", parameters)
+        cursor.arraysize = 4096
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                return
+            for piece_id, weight, color, length, flags, rules_id in rows:
+                reason = (
+                    rules_for(rules_id).describe(flags, weight, color, length) if flags else None
+                )
+                yield piece_id, weight, color, length, _STATUS_LABELS[flags != 0], reason
+
+    # Carga
+
+    def load(self, quality_service: QualityService, storage_service: StorageService) -> None:
+        """
+        Recarrega nos serviços (vazios) o estado gravado no banco.
+
+        Cada lote de peças volta com as regras gravadas com ele; os próximos
+        cadastros continuam com as regras do serviço.
+        """
+        rules = quality_service.rules
+        rows = self._query(
+            "SELECT rules_id, id, weight, color, length, flags, registered_at FROM pieces "
+            "WHERE removed = 0 ORDER BY rowid"
+        ).fetchall()
+        for rules_id, group in groupby(rows, key=itemgetter(0)):
+            _, ids, weights, colors, lengths, flags, timestamps = zip(*group)
+            quality_service.rules = self._rules_for(rules_id)
+            quality_service.restore_pieces(
+                list(ids), array("d", weights), list(colors), array("d", lengths),
+                bytearray(flags), array("d", timestamps)
+            )
+        quality_service.rules = rules
+
+        # Peças removidas do registro mas ainda guardadas em uma caixa
+        orphans = {
+            piece_id: Piece(
+                piece_id, weight, color, length, "aprovada", rejection_flags=flags,
+                rejection_reason=(
+                    self._rules_for(rules_id).describe(flags, weight, color, length)
+                    if flags else None
+                )
+            )
+            for piece_id, weight, color, length, flags, rules_id in self._query(
+                "SELECT id, weight, color, length, flags, rules_id FROM pieces "
+                "WHERE removed = 1 AND box_id IS NOT NULL"
+            )
+        }
+
+        contents: Dict[int, List[Piece]] = {}
+        stored = self._query(
+            "SELECT box_id, id FROM pieces WHERE box_id IS NOT NULL ORDER BY box_id, slot"
+        )
+        for box_id, rows in groupby(stored, key=itemgetter(0)):
+            ids = [row[1] for row in rows]
+            pieces = quality_service.get_pieces_by_ids(ids)
+            if orphans:
+                pieces = [
+                    orphans[piece_id] if piece_id in orphans else piece
+                    for piece_id, piece in zip(ids, pieces)
+                ]
+            contents[box_id] = pieces
+
+        for box_id, capacity, is_closed in self._query(
+            "SELECT id, capacity, is_closed FROM boxes ORDER BY id"
+        ):
+            storage_service.restore_box(box_id, capacity, bool(is_closed), contents.get(box_id, []))
+
+        row = self._query("SELECT value FROM meta WHERE key = 'next_piece_number'").fetchone()
+        if row is not None:
+            quality_service.restore_next_piece_number(
+                max(quality_service.next_piece_number, row[0])
+            )
+
+
+def open_sqlite_services(
+    path: str,
+    box_capacity: int = Box.DEFAULT_CAPACITY,
+    strategy: Optional[str] = None,
+    max_weight: Optional[float] = None,
+    max_length: Optional[float] = None,
+    max_open_boxes: Optional[int] = None,
+    rules: Optional[RuleSet] = None,
+    **repository_options
+) -> Tuple[QualityService, StorageService, SQLiteRepository]:
+    """
+    Recupera os serviços de um banco SQLite e os liga ao repositório.
+
+    Args:
+        path: Arquivo do banco (criado se não existir)
+        box_capacity: Capacidade das novas caixas
+        strategy: Estratégia de empacotamento (padrão: next-fit)
+        max_weight: Peso total máximo por caixa (None = sem limite)
+        max_length: Comprimento total máximo por caixa (None = sem limite)
+        max_open_boxes: Limite de caixas abertas (first-fit e best-fit)
+        rules: Regras de qualidade dos novos cadastros (padrão:
+            QualityValidator.rules); as peças recuperadas usam as regras
+            gravadas com elas, ou estas nos bancos sem regras gravadas
+        **repository_options: Repassados para SQLiteRepository (group_size, ...)
+
+    Returns:
+        Tupla (quality_service, storage_service, repository)
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+
+    quality_service = QualityService(rules=rules)
+    storage_service = StorageService(
+        box_capacity=box_capacity, strategy=strategy,
+        max_weight=max_weight, max_length=max_length, max_open_boxes=max_open_boxes
+    )
+    repository_options.setdefault("rules", rules)
+    repository = SQLiteRepository(path, box_capacity=box_capacity, **repository_options)
+    repository.load(quality_service, storage_service)
+
+    quality_service.journal = repository
+    storage_service.journal = repository
+    repository.record_rules(quality_service.rules)
+    return quality_service, storage_service, repository
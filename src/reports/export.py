@@ -0,0 +1,143 @@
+"""
+Exportação em fluxo dos dados consolidados (NDJSON, CSV e JSON em blocos).
+
+Os escritores consomem registros (id, peso, cor, comprimento, status,
+motivo_reprovacao), como os de QualityService.iter_records, e gravam em
+blocos de CHUNK_SIZE registros. A memória usada não depende da quantidade
+de peças exportadas.
+"""
+
+import csv
+import json
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, TextIO, Tuple
+
+EXPORT_FORMATS = ("ndjson", "csv", "json")
+
+# Mesmas chaves de Piece.to_dict
+FIELDNAMES = ("id", "peso", "cor", "comprimento", "status", "motivo_reprovacao")
+
+CHUNK_SIZE = 4096
+
+Record = Tuple[str, float, str, float, str, Any]
+
+
+def _chunks(records: Iterable[Record]) -> Iterator[List[Record]]:
+    """Agrupa os registros em listas de até CHUNK_SIZE."""
+    iterator = iter(records)
+    while True:
+        chunk = list(islice(iterator, CHUNK_SIZE))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _json_lines(chunk: List[Record], separator: str) -> str:
+    dumps = json.dumps
+    return separator.join(
+        dumps(dict(zip(FIELDNAMES, record)), ensure_ascii=False) for record in chunk
+    )
+
+
+def write_ndjson(records: Iterable[Record], stream: TextIO) -> int:
+    """
+    Grava um objeto JSON por linha.
+
+    Args:
+        records: Registros de peças
+        stream: Arquivo de texto de destino
+
+    Returns:
+        Quantidade de registros gravados
+    """
+    count = 0
+    for chunk in _chunks(records):
+        stream.write(_json_lines(chunk, "\n") + "\n")
+        count += len(chunk)
+    return count
+
+
+def write_csv(records: Iterable[Record], stream: TextIO) -> int:
+    """
+    Grava CSV com cabeçalho (motivo vazio para peças aprovadas).
+
+    Args:
+        records: Registros de peças
+        stream: Arquivo de texto de destino (aberto com newline="")
+
+    Returns:
+        Quantidade de registros gravados
+    """
+    writer = csv.writer(stream)
+    writer.writerow(FIELDNAMES)
+    count = 0
+    for chunk in _chunks(records):
+        writer.writerows(chunk)
+        count += len(chunk)
+    return count
+
+
+def _write_array(records: Iterable[Record], stream: TextIO) -> int:
+    """Grava os registros como um array JSON, bloco a bloco."""
+    stream.write("[")
+    count = 0
+    for chunk in _chunks(records):
+        if count:
+            stream.write(",")
+        stream.write("\n    " + _json_lines(chunk, ",\n    "))
+        count += len(chunk)
+    stream.write("\n  ]" if count else "]")
+    return count
+
+
+def write_json(quality, storage, stream: TextIO) -> int:
+    """
+    Grava o mesmo documento de ReportGenerator.get_consolidated_data,
+    com as listas de peças montadas em blocos.
+
+    Args:
+        quality: Serviço (ou visão) com get_statistics e iter_records
+        storage: Serviço (ou visão) com get_statistics
+        stream: Arquivo de texto de destino
+
+    Returns:
+        Quantidade de peças gravadas
+    """
+    header: Dict[str, Any] = {
+        "quality": quality.get_statistics(),
+        "storage": storage.get_statistics(),
+    }
+    stream.write(json.dumps(header, ensure_ascii=False)[:-1])
+    stream.write(', "pieces": {\n  "approved": ')
+    count = _write_array(quality.iter_records("aprovada"), stream)
+    stream.write(',\n  "rejected": ')
+    count += _write_array(quality.iter_records("reprovada"), stream)
+    stream.write("\n}}\n")
+    return count
+
+
+def export(quality, storage, stream: TextIO, fmt: str = "ndjson") -> int:
+    """
+    Exporta as peças no formato pedido.
+
+    NDJSON e CSV trazem apenas as peças; o JSON traz também as estatísticas.
+
+    Args:
+        quality: QualityService ou JournalReader.quality
+        storage: StorageService ou visão equivalente (usado no JSON)
+        stream: Arquivo de texto de destino
+        fmt: Um de EXPORT_FORMATS
+
+    Returns:
+        Quantidade de peças gravadas
+
+    Raises:
+        ValueError: Se o formato não for suportado
+    """
+    if fmt == "ndjson":
+        return write_ndjson(quality.iter_records(), stream)
+    if fmt == "csv":
+        return write_csv(quality.iter_records(), stream)
+    if fmt == "json":
+        return write_json(quality, storage, stream)
+    raise ValueError(f"Formato de exportação inválido: {fmt} (use {', '.join(EXPORT_FORMATS)})")
@@ -2,11 +2,15 @@
 Gerador de relatórios do sistema de controle de qualidade.
 """
 
-from typing import Dict, Any
+from typing import Any, Dict, List, TextIO
 from ..services.quality_service import QualityService
 from ..services.storage_service import StorageService
 
 
+# Rótulo e unidade de cada campo acompanhado pelo CEP
+_SPC_LABELS = {"weight": ("Peso", "g"), "length": ("Comprimento", "cm")}
+
+
 class ReportGenerator:
     """
     Gera relatórios consolidados do sistema.
@@ -52,6 +56,23 @@ class ReportGenerator:
                 report_lines.append(f"  • {reason}: {count} peça(s)")
             report_lines.append("")
 
+        # Adicionar métricas das janelas móveis
+        rolling_statistics = getattr(self.quality_service, "get_rolling_statistics", None)
+        if rolling_statistics is not None:
+            report_lines.extend(self.format_rolling_statistics(rolling_statistics()))
+
+        # Adicionar capacidade do processo (CEP)
+        spc = getattr(self.quality_service, "spc", None)
+        if spc is not None:
+            report_lines.extend(
+                self.format_process_capability(spc.capability(), spc.alarm_counts)
+            )
+
+        # Adicionar o resumo de cada linha (LineRegistry)
+        line_statistics = getattr(self.quality_service, "line_statistics", None)
+        if line_statistics is not None:
+            report_lines.extend(self.format_line_statistics(line_statistics()))
+
         # Adicionar informações de armazenamento
         report_lines.extend([
             "ARMAZENAMENTO:",
@@ -74,14 +95,117 @@ class ReportGenerator:
 
         return "\n".join(report_lines)
 
+    @staticmethod
+    def format_rolling_statistics(windows: Dict[str, Dict[str, Any]]) -> List[str]:
+        """
+        Formata as métricas das janelas móveis para o relatório.
+
+        Args:
+            windows: Resultado de QualityService.get_rolling_statistics
+
+        Returns:
+            Linhas do relatório (vazio se nenhuma janela tiver cadastros)
+        """
+        if not any(window["total_pieces"] for window in windows.values()):
+            return []
+
+        lines = ["JANELAS MÓVEIS:"]
+        for name, window in windows.items():
+            lines.append(
+                f"  • {name}: {window['total_pieces']} peça(s), "
+                f"{window['pieces_per_minute']:.1f} peças/min, "
+                f"aprovação {window['approval_rate']:.1f}%"
+            )
+            for reason, rate in sorted(
+                window["failure_rates"].items(), key=lambda x: x[1], reverse=True
+            ):
+                lines.append(f"      - {reason}: {rate:.1f}%")
+        lines.append("")
+        return lines
+
+    @staticmethod
+    def format_process_capability(
+        capability: Dict[str, Dict[str, Any]],
+        alarm_counts: Dict[str, int]
+    ) -> List[str]:
+        """
+        Formata os índices de capacidade e os alarmes do CEP para o relatório.
+
+        Args:
+            capability: Resultado de QualityService.get_process_capability
+            alarm_counts: Alarmes por carta e campo ("cusum:weight", ...)
+
+        Returns:
+            Linhas do relatório (vazio se nenhum campo tiver leituras)
+        """
+        if not any(field["count"] > 1 for field in capability.values()):
+            return []
+
+        def index(value) -> str:
+            return "—" if value is None else f"{value:.2f}"
+
+        lines = ["CAPACIDADE DO PROCESSO:"]
+        for field, stats in capability.items():
+            if stats["count"] < 2:
+                continue
+            label, unit = _SPC_LABELS.get(field, (field, ""))
+            limits = " a ".join(
+                "—" if limit is None else f"{limit:g}{unit}"
+                for limit in (stats["lower"], stats["upper"])
+            )
+            lines.append(
+                f"  • {label}: média {stats['mean']:.2f}{unit}, "
+                f"desvio {stats['stdev']:.3f}{unit} (especificação {limits}) - "
+                f"Cp {index(stats['cp'])}, Cpk {index(stats['cpk'])}"
+            )
+            alarms = [
+                f"{chart.upper()} {alarm_counts[f'{chart}:{field}']}"
+                for chart in ("cusum", "ewma") if alarm_counts.get(f"{chart}:{field}")
+            ]
+            if alarms:
+                lines.append(f"      - Alarmes de deriva: {', '.join(alarms)}")
+        lines.append("")
+        return lines
+
+    @staticmethod
+    def format_line_statistics(lines: List[Dict[str, Any]]) -> List[str]:
+        """
+        Formata o resumo por linha de produção para o relatório.
+
+        Args:
+            lines: Resultado de LineRegistry.line_statistics
+
+        Returns:
+            Linhas do relatório (vazio se não houver linhas)
+        """
+        if not lines:
+            return []
+
+        report_lines = ["LINHAS DE PRODUÇÃO:"]
+        for line in lines:
+            quality, storage = line["quality"], line["storage"]
+            product = f" ({line['product']})" if line["product"] else ""
+            report_lines.append(
+                f"  • {line['line']}{product}: {quality['total_pieces']} peça(s), "
+                f"aprovação {quality['approval_rate']:.1f}%, "
+                f"{storage['total_stored_pieces']} armazenada(s) em "
+                f"{storage['total_boxes']} caixa(s)"
+            )
+        report_lines.append("")
+        return report_lines
+
     def get_consolidated_data(self) -> Dict[str, Any]:
         """
         Retorna dados consolidados em formato estruturado.
 
+        Com serviços particionados (ShardedInspection) ou várias linhas
+        (LineRegistry), as estatísticas já chegam somadas e o detalhe de
+        cada shard vai em "shards" e o de cada linha em "lines".
+
         Returns:
             Dicionário com todos os dados do sistema
         """
-        return {
+        data = {
             "quality": self.quality_service.get_statistics(),
             "storage": self.storage_service.get_statistics(),
             "pieces": {
@@ -89,3 +213,73 @@ class ReportGenerator:
                 "rejected": [p.to_dict() for p in self.quality_service.get_rejected_pieces()],
             }
         }
+
+        shard_statistics = getattr(self.quality_service, "shard_statistics", None)
+        if shard_statistics is not None:
+            data["shards"] = shard_statistics()
+
+        line_statistics = getattr(self.quality_service, "line_statistics", None)
+        if line_statistics is not None:
+            data["lines"] = line_statistics()
+
+        return data
+
+    def export(self, stream: TextIO, fmt: str = "ndjson") -> int:
+        """
+        Exporta os dados consolidados em fluxo, sem montar as listas de peças.
+
+        Args:
+            stream: Arquivo de texto de destino (ou sys.stdout)
+            fmt: 'ndjson', 'csv' ou 'json' (mesmo documento de get_consolidated_data)
+
+        Returns:
+            Quantidade de peças gravadas
+        """
+        from .export import export
+        return export(self.quality_service, self.storage_service, stream, fmt)
+
+    @staticmethod
+    def merge_quality_statistics(shards: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Soma as estatísticas de qualidade de vários shards.
+
+        Args:
+            shards: Resultados de QualityService.get_statistics
+
+        Returns:
+            Estatísticas no mesmo formato, com o histograma de motivos somado
+        """
+        total = sum(shard["total_pieces"] for shard in shards)
+        approved = sum(shard["approved_count"] for shard in shards)
+        reasons: Dict[str, int] = {}
+        for shard in shards:
+            for reason, count in shard["rejection_reasons"].items():
+                reasons[reason] = reasons.get(reason, 0) + count
+
+        return {
+            "total_pieces": total,
+            "approved_count": approved,
+            "rejected_count": sum(shard["rejected_count"] for shard in shards),
+            "rejection_reasons": reasons,
+            "approval_rate": approved / total * 100 if total else 0
+        }
+
+    @staticmethod
+    def merge_storage_statistics(shards: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Soma as estatísticas de armazenamento de vários shards.
+
+        Cada shard tem sua caixa atual; current_box_fill e
+        current_box_capacity passam a ser a soma delas.
+
+        Args:
+            shards: Resultados de StorageService.get_statistics
+
+        Returns:
+            Estatísticas no mesmo formato
+        """
+        keys = (
+            "total_boxes", "closed_boxes", "open_boxes", "total_stored_pieces",
+            "current_box_fill", "current_box_capacity"
+        )
+        return {key: sum(shard[key] for shard in shards) for key in keys}
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor de rede do sistema FactorySense.
+"""
+
+from .inspection_server import DEFAULT_PORT, InspectionServer
+
+__all__ = ['DEFAULT_PORT', 'InspectionServer']
@@ -0,0 +1,350 @@
+"""
+Servidor de inspeção assíncrono (asyncio) para várias estações de linha.
+
+Protocolo TCP de linhas JSON: cada linha enviada pelo cliente é uma
+requisição e recebe exatamente uma linha de resposta, na mesma ordem.
+O cliente pode enviar várias requisições sem esperar as respostas.
+
+Requisições:
+    {"weight": 100, "color": "azul", "length": 15}          registra uma peça
+    {"id": "A1", "weight": 100, "color": "azul", "length": 15}
+    {"op": "stats"}                                          estatísticas
+    {"op": "remove", "id": "A1", "reopen": false}            remove uma peça
+
+Todas as conexões entregam as leituras a uma única tarefa de escrita, que
+as agrupa em lotes para QualityService.register_pieces e
+StorageService.store_pieces. Como só essa tarefa altera os serviços, a
+atribuição de caixas segue a ordem de chegada e é determinística. Remoções
+passam pela mesma tarefa (withdraw_piece, registro e caixa juntos), depois
+dos cadastros recebidos antes delas.
+
+A resposta de um cadastro traz a caixa de cada peça aprovada (box_id). Uma
+peça aprovada que não cabe nem em uma caixa vazia (limites de peso ou
+comprimento por caixa) volta com box_id null e o motivo em storage_error.
+"""
+
+import asyncio
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..services.quality_service import QualityService
+from ..services.removal import withdraw_piece
+from ..services.storage_service import StorageService
+
+DEFAULT_PORT = 7878
+
+# Leitura pendente: (id, peso, cor, comprimento, futuro da resposta)
+_Pending = Tuple[Optional[str], float, str, float, "asyncio.Future"]
+
+# Remoção pendente: (id, reabrir a caixa, futuro da resposta)
+_Removal = Tuple[str, bool, "asyncio.Future"]
+
+
+class InspectionServer:
+    """
+    Front end de rede para QualityService e StorageService.
+
+    Args:
+        quality_service: Serviço de qualidade
+        storage_service: Serviço de armazenamento
+        max_batch: Máximo de leituras processadas por lote pela tarefa de escrita
+        window: Máximo de respostas pendentes por conexão; acima disso o
+            servidor para de ler a conexão (contrapressão)
+    """
+
+    def __init__(
+        self,
+        quality_service: Optional[QualityService] = None,
+        storage_service: Optional[StorageService] = None,
+        max_batch: int = 4096,
+        window: int = 1024
+    ):
+        self.quality_service = quality_service or QualityService()
+        self.storage_service = storage_service or StorageService()
+        self.max_batch = max_batch
+        self.window = window
+
+        self.batches = 0
+        self.registrations = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: Dict[asyncio.StreamReader, asyncio.Task] = {}
+
+    async def start(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT) -> int:
+        """
+        Inicia a tarefa de escrita e passa a aceitar conexões.
+
+        Returns:
+            Porta efetivamente usada (útil com port=0)
+        """
+        self._queue = asyncio.Queue()
+        self._writer_task = asyncio.ensure_future(self._writer())
+        self._server = await asyncio.start_server(self._handle_client, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self) -> None:
+        """Atende conexões até a tarefa ser cancelada."""
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self) -> None:
+        """
+        Para de aceitar conexões e encerra as abertas.
+
+        As requisições já lidas são processadas e respondidas antes de cada
+        conexão ser fechada.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        for reader in list(self._connections):
+            reader.feed_eof()
+        if self._connections:
+            await asyncio.gather(*self._connections.values(), return_exceptions=True)
+        if self._writer_task is not None:
+            self._queue.put_nowait(None)
+            await self._writer_task
+            self._writer_task = None
+
+    def submit(
+        self,
+        piece_id: Optional[str],
+        weight: float,
+        color: str,
+        length: float
+    ) -> "asyncio.Future":
+        """
+        Enfileira uma leitura para a tarefa de escrita.
+
+        Returns:
+            Futuro resolvido com o dicionário de resposta
+        """
+        future = asyncio.get_event_loop().create_future()
+        self._queue.put_nowait((piece_id, weight, color, length, future))
+        return future
+
+    def submit_removal(self, piece_id: str, reopen: bool = False) -> "asyncio.Future":
+        """
+        Enfileira a remoção de uma peça para a tarefa de escrita.
+
+        Returns:
+            Futuro resolvido com o dicionário de resposta
+        """
+        future = asyncio.get_event_loop().create_future()
+        self._queue.put_nowait((piece_id, reopen, future))
+        return future
+
+    async def _writer(self) -> None:
+        """
+        Tarefa única que aplica as leituras aos serviços, em lotes.
+
+        Uma remoção encerra o lote em formação: os cadastros anteriores são
+        processados antes dela.
+        """
+        queue = self._queue
+        while True:
+            item = await queue.get()
+            batch: List[_Pending] = []
+            removal: Optional[_Removal] = None
+            stopping = False
+            while True:
+                if item is None:
+                    stopping = True
+                    break
+                if len(item) == 3:
+                    removal = item
+                    break
+                batch.append(item)
+                if len(batch) >= self.max_batch or queue.empty():
+                    break
+                item = queue.get_nowait()
+
+            if batch:
+                try:
+                    self._process(batch)
+                except Exception as error:
+                    # Uma falha inesperada derruba só o lote, não a tarefa
+                    for *_, future in batch:
+                        if not future.done():
+                            future.set_exception(error)
+            if removal is not None:
+                piece_id, reopen, future = removal
+                try:
+                    response = self._remove(piece_id, reopen)
+                    if not future.done():
+                        future.set_result(response)
+                except Exception as error:
+                    if not future.done():
+                        future.set_exception(error)
+            if stopping:
+                return
+
+    def _process(self, batch: List[_Pending]) -> None:
+        """Registra e armazena um lote, resolvendo os futuros na ordem."""
+        ids = [item[0] for item in batch]
+        weights = [item[1] for item in batch]
+        colors = [item[2] for item in batch]
+        lengths = [item[3] for item in batch]
+
+        try:
+            pieces = self.quality_service.register_pieces(
+                weights, colors, lengths, custom_ids=ids if any(ids) else None
+            )
+            results: List[Any] = list(pieces)
+        except ValueError:
+            # ID repetido no lote: registrar uma a uma para isolar o erro
+            results = []
+            for piece_id, weight, color, length, _ in batch:
+                try:
+                    results.append(
+                        self.quality_service.register_piece(weight, color, length, piece_id)
+                    )
+                except ValueError as e:
+                    results.append(str(e))
+
+        approved = [
+            piece for piece in results
+            if not isinstance(piece, str) and piece.is_approved()
+        ]
+        self.storage_service.store_pieces(approved)
+        find_box = self.storage_service.find_box_by_piece
+
+        for (_, _, _, _, future), piece in zip(batch, results):
+            if isinstance(piece, str):
+                response = {"ok": False, "error": piece}
+            else:
+                box = find_box(piece.piece_id) if piece.is_approved() else None
+                response = {
+                    "ok": True,
+                    "id": piece.piece_id,
+                    "status": piece.status,
+                    "box_id": None if box is None else box.box_id,
+                    "rejection_reason": piece.rejection_reason,
+                }
+                if box is None and piece.is_approved():
+                    response["storage_error"] = self._storage_error(piece)
+            if not future.done():
+                future.set_result(response)
+
+        self.batches += 1
+        self.registrations += sum(1 for piece in results if not isinstance(piece, str))
+
+    def _remove(self, piece_id: str, reopen: bool) -> Dict[str, Any]:
+        """Remove a peça do registro e da caixa."""
+        removed, box = withdraw_piece(
+            self.quality_service, self.storage_service, piece_id, reopen
+        )
+        return {
+            "ok": True,
+            "id": piece_id,
+            "removed": removed,
+            "box_id": None if box is None else box.box_id,
+        }
+
+    def _storage_error(self, piece) -> str:
+        """Motivo de uma peça aprovada ter ficado fora das caixas."""
+        storage = self.storage_service
+        limits = []
+        if storage.max_weight is not None and piece.weight > storage.max_weight:
+            limits.append(f"peso {piece.weight}g > {storage.max_weight}g")
+        if storage.max_length is not None and piece.length > storage.max_length:
+            limits.append(f"comprimento {piece.length}cm > {storage.max_length}cm")
+        detail = f" ({', '.join(limits)})" if limits else ""
+        return f"Peça não cabe em uma caixa vazia{detail}"
+
+    def _statistics(self) -> Dict[str, Any]:
+        return {
+            "ok": True,
+            "quality": self.quality_service.get_statistics(),
+            "storage": self.storage_service.get_statistics(),
+        }
+
+    def _parse(self, line: bytes):
+        """
+        Interpreta uma linha de requisição.
+
+        Returns:
+            Futuro da resposta ou dicionário com a resposta imediata
+        """
+        try:
+            request = json.loads(line)
+            op = request.get("op", "register")
+            if op == "stats":
+                return self._statistics()
+            if op == "remove":
+                return self.submit_removal(str(request["id"]), bool(request.get("reopen")))
+            piece_id = request.get("id")
+            return self.submit(
+                None if piece_id is None else str(piece_id),
+                float(request["weight"]),
+                str(request["color"]),
+                float(request["length"])
+            )
+        except (KeyError, TypeError, ValueError, AttributeError):
+            return {"ok": False, "error": "Requisição inválida"}
+
+    async def _handle_client(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter
+    ) -> None:
+        """Lê requisições de uma conexão; as respostas saem em outra tarefa."""
+        pending: asyncio.Queue = asyncio.Queue(maxsize=self.window)
+        responder = asyncio.ensure_future(self._respond(pending, writer))
+        self._connections[reader] = asyncio.current_task()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                if line.strip():
+                    await pending.put(self._parse(line))
+        except ConnectionError:
+            pass
+        finally:
+            await pending.put(None)
+            await responder
+            writer.close()
+            del self._connections[reader]
+
+    async def _respond(self, pending: asyncio.Queue, writer: asyncio.StreamWriter) -> None:
+        """
+        Escreve as respostas de uma conexão na ordem das requisições.
+
+        Respostas já prontas são acumuladas e enviadas numa única escrita;
+        o acumulado é enviado antes de esperar por uma resposta pendente.
+        """
+        dumps = json.dumps
+        chunks: List[bytes] = []
+        connected = True
+
+        async def flush() -> bool:
+            data = b"".join(chunks)
+            chunks.clear()
+            if not connected:
+                # Cliente desconectado: apenas esvaziar a fila
+                return False
+            try:
+                writer.write(data)
+                await writer.drain()
+                return True
+            except ConnectionError:
+                return False
+
+        while True:
+            if chunks and pending.empty():
+                connected = await flush()
+            response = await pending.get()
+            if response is None:
+                if chunks:
+                    await flush()
+                return
+            if isinstance(response, asyncio.Future):
+                if not response.done() and chunks:
+                    connected = await flush()
+                try:
+                    response = await response
+                except Exception as error:
+                    response = {"ok": False, "error": f"Erro interno: {error}"}
+            chunks.append(dumps(response).encode() + b"\n")
@@ -5,5 +5,16 @@ Servicos de negocio do sistema FactorySense.
 
 from .quality_service import QualityService
 from .storage_service import StorageService
+from .lane_storage_service import LaneStorageService
+from .sharded_service import ShardedInspection
+from .line_registry import LineRegistry
+from .rolling_metrics import RollingQualityMetrics
+from .process_control import ProcessControl
+from .consistency import check_consistency
+from .removal import withdraw_piece
 
-__all__ = ['QualityService', 'StorageService']
+__all__ = [
+    'QualityService', 'StorageService', 'LaneStorageService', 'ShardedInspection',
+    'LineRegistry', 'RollingQualityMetrics', 'ProcessControl', 'check_consistency',
+    'withdraw_piece',
+]
@@ -0,0 +1,101 @@
+"""
+Verificação de consistência entre o registro de peças e as caixas.
+"""
+
+from typing import List
+
+from .quality_service import QualityService
+from .storage_service import StorageService
+
+
+def check_consistency(
+    quality_service: QualityService,
+    storage_service: StorageService
+) -> List[str]:
+    """
+    Confere registro, caixas, índices e contadores em uma única passada.
+
+    O custo é linear no número de peças e caixas, de modo que pode ser
+    executado sobre o estado completo recuperado de um snapshot
+    (open_services) ou periodicamente durante a operação.
+
+    Verifica:
+        - IDs de caixa únicos e índice de caixas por ID
+        - caixas acima da capacidade e índice de caixas abertas/fechadas
+        - peças guardadas que não estão no registro ou não estão aprovadas
+        - peças em mais de uma caixa e o índice peça -> caixa
+        - contadores de peças armazenadas e de aprovadas/reprovadas
+
+    Args:
+        quality_service: Serviço de qualidade
+        storage_service: Serviço de armazenamento
+
+    Returns:
+        Lista de problemas encontrados (vazia se estiver consistente)
+    """
+    problems: List[str] = []
+    seen_boxes = set()
+    stored = 0
+    open_count = closed_count = 0
+
+    for box in storage_service.boxes:
+        if box.box_id in seen_boxes:
+            problems.append(f"Caixa #{box.box_id} aparece mais de uma vez")
+        seen_boxes.add(box.box_id)
+        if storage_service.get_box(box.box_id) is not box:
+            problems.append(f"Caixa #{box.box_id} fora do índice por ID")
+        if len(box.pieces) > box.capacity:
+            problems.append(
+                f"Caixa #{box.box_id} com {len(box.pieces)} peças (capacidade {box.capacity})"
+            )
+
+        if box.is_closed:
+            closed_count += 1
+        else:
+            open_count += 1
+
+        piece_ids = [piece.piece_id for piece in box.pieces]
+        registered = quality_service.get_pieces_by_ids(piece_ids)
+        for piece_id, piece in zip(piece_ids, registered):
+            if piece is None:
+                problems.append(f"Peça {piece_id} na caixa #{box.box_id} não está no registro")
+            elif not piece.is_approved():
+                problems.append(f"Peça {piece_id} na caixa #{box.box_id} não está aprovada")
+            if storage_service.find_box_by_piece(piece_id) is not box:
+                problems.append(
+                    f"Peça {piece_id} da caixa #{box.box_id} fora do índice peça -> caixa "
+                    "(ou em mais de uma caixa)"
+                )
+        stored += len(piece_ids)
+
+    statistics = storage_service.get_statistics()
+    if statistics["closed_boxes"] != closed_count or statistics["open_boxes"] != open_count:
+        problems.append(
+            f"Índice de caixas com {statistics['closed_boxes']} fechadas e "
+            f"{statistics['open_boxes']} abertas; o esperado é {closed_count} e {open_count}"
+        )
+    if len(storage_service.get_open_boxes()) != open_count:
+        problems.append("Índice de caixas abertas desatualizado")
+    if statistics["total_stored_pieces"] != stored:
+        problems.append(
+            f"Contador de armazenadas em {statistics['total_stored_pieces']}; "
+            f"as caixas guardam {stored}"
+        )
+    indexed = storage_service.indexed_piece_count()
+    if indexed != stored:
+        problems.append(
+            f"Índice peça -> caixa com {indexed} entradas; as caixas guardam {stored}"
+        )
+
+    # Contadores do registro contra as colunas de status
+    counts = quality_service.count_by_status()
+    quality = quality_service.get_statistics()
+    for status, counter in (("aprovada", "approved_count"), ("reprovada", "rejected_count")):
+        if quality[counter] != counts[status]:
+            problems.append(
+                f"Contador de {status}s em {quality[counter]}; o registro tem {counts[status]}"
+            )
+    if quality["approved_count"] + quality["rejected_count"] != quality["total_pieces"]:
+        problems.append("Aprovadas + reprovadas diferente do total de peças")
+
+    return problems
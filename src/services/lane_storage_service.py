@@ -0,0 +1,303 @@
+"""
+Serviço de armazenamento thread-safe com várias linhas de embalagem.
+"""
+
+import itertools
+import threading
+from collections import deque
+from contextlib import nullcontext
+from typing import Deque, Dict, List, Optional, Sequence, Set
+
+from ..models.box import Box
+from ..models.piece import Piece
+from .storage_service import StorageService
+
+
+class LaneStorageService(StorageService):
+    """
+    Armazena peças aprovadas em várias caixas abertas ao mesmo tempo,
+    uma por linha (lane) de embalagem, com um lock por linha.
+
+    Estações em linhas diferentes não disputam o mesmo lock; apenas a
+    abertura e o fechamento de uma caixa (uma vez a cada `box_capacity`
+    peças) passam pelo lock global das caixas. Uma peça é armazenada no máximo
+    uma vez, mesmo se enviada por duas estações.
+
+    Cada caixa aberta por uma linha pertence a ela, e as peças da caixa
+    entram no contador dessa linha; caixas restauradas do journal ou do
+    snapshot ficam no contador geral. Uma caixa fechada reaberta na
+    remoção de uma peça (reopen=True) volta para a fila da linha dona (ou
+    de uma linha em rodízio, se não tiver dona) e é completada antes de a
+    linha abrir uma caixa nova.
+
+    Ordem de aquisição dos locks: linha -> alocação de caixas.
+    """
+
+    def __init__(
+        self,
+        box_capacity: int = Box.DEFAULT_CAPACITY,
+        lanes: int = 4,
+        journal=None,
+        events=None
+    ):
+        if lanes < 1:
+            raise ValueError("É necessária ao menos uma linha de embalagem")
+
+        super().__init__(box_capacity=box_capacity, journal=journal, events=events)
+        self.lanes = lanes
+        self._lane_locks = [threading.Lock() for _ in range(lanes)]
+        self._lane_boxes: List[Optional[Box]] = [None] * lanes
+
+        # Contadores por linha, somados nas estatísticas (sem disputa entre linhas)
+        self._lane_stored = [0] * lanes
+        # Linha dona de cada caixa (ID -> linha) e caixas reabertas à espera
+        self._box_lanes: Dict[int, int] = {}
+        self._reopened: List[Deque[Box]] = [deque() for _ in range(lanes)]
+
+        self._box_lock = threading.Lock()
+        self._claims_lock = threading.Lock()
+        self._claimed: Set[str] = set()
+        self._round_robin = itertools.count()
+
+    def _pick_lane(self, lane: Optional[int]) -> int:
+        """Valida a linha informada ou escolhe uma em rodízio."""
+        if lane is None:
+            return next(self._round_robin) % self.lanes
+        if not 0 <= lane < self.lanes:
+            raise ValueError(f"Linha inválida: {lane} (existem {self.lanes})")
+        return lane
+
+    def _claim(self, pieces: Sequence[Piece]) -> List[Piece]:
+        """Reserva as peças aprovadas ainda não armazenadas."""
+        with self._claims_lock:
+            claimed = []
+            for piece in pieces:
+                if piece.is_approved() and piece.piece_id not in self._claimed:
+                    self._claimed.add(piece.piece_id)
+                    claimed.append(piece)
+            return claimed
+
+    def _create_new_box(self) -> Box:
+        """Aloca uma caixa com ID único (thread-safe)."""
+        with self._box_lock:
+            box = self._new_box(self._next_box_id)
+            self._next_box_id += 1
+            self._add_box(box)
+            self.current_box = box
+        if self.journal is not None:
+            self.journal.record_open(box.box_id, box.capacity)
+        return box
+
+    def _box_closed(self, box: Box) -> None:
+        """Registra o fechamento de uma caixa nos índices e no journal."""
+        with self._box_lock:
+            self._mark_closed(box)
+        if self.journal is not None:
+            self.journal.record_close(box.box_id)
+        if self.events is not None:
+            self.events.box_closed(box)
+
+    def _lane_box(self, lane: int) -> Box:
+        """
+        Retorna a caixa aberta da linha (com o lock da linha).
+
+        Se a caixa atual estiver fechada, usa a próxima caixa reaberta da
+        linha que continuar aberta ou abre uma nova.
+        """
+        box = self._lane_boxes[lane]
+        if box is None or box.is_closed:
+            reopened = self._reopened[lane]
+            while reopened and reopened[0].is_closed:
+                reopened.popleft()
+            if reopened:
+                box = reopened.popleft()
+            else:
+                box = self._create_new_box()
+                self._box_lanes[box.box_id] = lane
+            self._lane_boxes[lane] = box
+        return box
+
+    def store_piece(self, piece: Piece, lane: Optional[int] = None) -> bool:
+        """
+        Armazena uma peça aprovada na caixa aberta de uma linha.
+
+        Args:
+            piece: Peça a ser armazenada
+            lane: Linha de embalagem (padrão: rodízio entre as linhas)
+
+        Returns:
+            True se armazenada, False se não aprovada ou já armazenada
+
+        Raises:
+            ValueError: Se a linha não existir
+        """
+        if not piece.is_approved():
+            return False
+        lane = self._pick_lane(lane)
+
+        with self._claims_lock:
+            if piece.piece_id in self._claimed:
+                return False
+            self._claimed.add(piece.piece_id)
+
+        with self._lane_locks[lane]:
+            box = self._lane_box(lane)
+            box.add_piece(piece)
+            self._lane_stored[lane] += 1
+            self._box_of_piece[piece.piece_id] = box
+            if self.journal is not None:
+                self.journal.record_store(piece.piece_id, box.box_id)
+            if self.events is not None:
+                self.events.pieces_stored((piece.piece_id,), box.box_id)
+
+            if box.is_closed:
+                self._box_closed(box)
+        return True
+
+    def store_pieces(self, pieces: Sequence[Piece], lane: Optional[int] = None) -> int:
+        """
+        Armazena um lote de peças nas caixas de uma linha, em ordem.
+
+        Args:
+            pieces: Peças a armazenar (não aprovadas e repetidas são ignoradas)
+            lane: Linha de embalagem (padrão: rodízio entre as linhas)
+
+        Returns:
+            Quantidade de peças armazenadas
+
+        Raises:
+            ValueError: Se a linha não existir
+        """
+        lane = self._pick_lane(lane)
+        pieces = self._claim(pieces)
+        position = 0
+
+        with self._lane_locks[lane]:
+            while position < len(pieces):
+                box = self._lane_box(lane)
+                added = box.add_pieces(pieces[position:position + box.get_available_space()])
+
+                piece_ids = [piece.piece_id for piece in pieces[position:position + added]]
+                self._index_pieces(box, piece_ids)
+                if self.journal is not None:
+                    self.journal.record_stores(piece_ids, box.box_id)
+                if self.events is not None:
+                    self.events.pieces_stored(piece_ids, box.box_id)
+                position += added
+                self._lane_stored[lane] += added
+
+                if box.is_closed:
+                    self._box_closed(box)
+
+        return position
+
+    def get_lane_box(self, lane: int) -> Optional[Box]:
+        """Retorna a caixa aberta de uma linha (None se ainda não houver)."""
+        box = self._lane_boxes[self._pick_lane(lane)]
+        return None if box is None or box.is_closed else box
+
+    def close_box(self, box_id: int) -> bool:
+        """
+        Fecha uma caixa pelo ID; a linha dona abre outra no próximo armazenamento.
+
+        Returns:
+            True se a caixa foi fechada agora, False caso contrário
+        """
+        for lane, lock in enumerate(self._lane_locks):
+            with lock:
+                box = self._lane_boxes[lane]
+                if box is not None and box.box_id == box_id:
+                    if box.is_closed:
+                        return False
+                    box.close()
+                    self._box_closed(box)
+                    return True
+
+        # Caixas fora das linhas (restauradas ou já substituídas)
+        box = self.get_box(box_id)
+        if box is None or box.is_closed:
+            return False
+        box.close()
+        self._box_closed(box)
+        return True
+
+    def remove_piece(self, piece_id: str, reopen: bool = False) -> Optional[Box]:
+        """
+        Retira uma peça da caixa que a guarda (thread-safe).
+
+        Se a caixa pertence a uma linha, a retirada acontece com o lock
+        dessa linha, que também protege o contador em que a peça entrou.
+        Uma caixa fechada reaberta (reopen=True) volta para a fila da linha
+        dona; uma caixa sem dona passa a ser de uma linha escolhida em
+        rodízio, levando suas peças do contador geral para o dela.
+
+        Returns:
+            Caixa de onde a peça saiu, ou None se a peça não estava armazenada
+        """
+        box = self._box_of_piece.get(piece_id)
+        if box is None:
+            return None
+
+        lane = self._box_lanes.get(box.box_id)
+        if lane is None and reopen and box.is_closed:
+            lane = self._pick_lane(None)
+        with self._lane_locks[lane] if lane is not None else nullcontext():
+            with self._box_lock:
+                closed = box.is_closed
+                removed = self._unstore(box, piece_id, reopen)
+                if removed and reopen and closed:
+                    if box.box_id not in self._box_lanes:
+                        self._box_lanes[box.box_id] = lane
+                        self._stored_count -= len(box.pieces)
+                        self._lane_stored[lane] += len(box.pieces)
+                    self._reopened[lane].append(box)
+        if not removed:
+            return None
+
+        with self._claims_lock:
+            self._claimed.discard(piece_id)
+        if self.journal is not None:
+            self.journal.record_unstore(piece_id, box.box_id, reopen)
+        return box
+
+    def restore_stores(self, box_id: int, pieces: Sequence[Piece]) -> int:
+        """Reaplica um armazenamento do journal, marcando as peças como armazenadas."""
+        added = super().restore_stores(box_id, pieces)
+        with self._claims_lock:
+            self._claimed.update(piece.piece_id for piece in pieces[:added])
+        return added
+
+    def restore_box(self, box_id: int, capacity: int, is_closed: bool, pieces) -> Box:
+        """Recria uma caixa do snapshot, marcando as peças como armazenadas."""
+        box = super().restore_box(box_id, capacity, is_closed, pieces)
+        with self._claims_lock:
+            self._claimed.update(piece.piece_id for piece in box.pieces)
+        return box
+
+    def _count_removal(self, box: Box) -> None:
+        """Desconta a peça do contador da linha dona da caixa (ou do geral)."""
+        lane = self._box_lanes.get(box.box_id)
+        if lane is None:
+            self._stored_count -= 1
+        else:
+            self._lane_stored[lane] -= 1
+
+    def get_total_stored_pieces(self) -> int:
+        """Retorna o total de peças armazenadas em todas as caixas."""
+        return self._stored_count + sum(self._lane_stored)
+
+    def clear_all(self) -> None:
+        """Limpa todos os registros de caixas e linhas."""
+        for lock in self._lane_locks:
+            lock.acquire()
+        try:
+            super().clear_all()
+            self._lane_boxes = [None] * self.lanes
+            self._lane_stored = [0] * self.lanes
+            self._box_lanes = {}
+            self._reopened = [deque() for _ in range(self.lanes)]
+            with self._claims_lock:
+                self._claimed.clear()
+        finally:
+            for lock in self._lane_locks:
+                lock.release()
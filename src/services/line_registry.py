@@ -0,0 +1,443 @@
+"""
+Várias linhas de produção (e produtos) no mesmo processo.
+
+Cada linha tem seu próprio QualityService e StorageService, com as regras
+do seu produto e sua capacidade de caixa. O registro encaminha cada
+cadastro pelo ID da linha (um acesso a dicionário) e, com um diretório de
+dados, carrega os serviços de uma linha só no primeiro uso e os descarrega
+quando ficam ociosos, gravando antes um checkpoint no diretório da linha.
+
+As estatísticas por linha e da planta inteira vêm dos contadores de cada
+serviço (e, para linhas descarregadas, do resumo guardado no descarte), sem
+percorrer as peças.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from ..models.box import Box
+from ..models.piece import Piece
+from ..validators.rules import RuleRegistry, RuleSet
+from .quality_service import QualityService
+from .storage_service import StorageService
+
+
+class LineConfig:
+    """
+    Configuração de uma linha de produção.
+
+    Args:
+        line_id: Identificador da linha (também o nome do seu subdiretório)
+        product: Produto fabricado (regras buscadas no RuleRegistry)
+        rules: Regras da linha (têm precedência sobre as do produto)
+        box_capacity: Capacidade das novas caixas
+        strategy: Estratégia de empacotamento (padrão: next-fit)
+        max_weight: Peso total máximo por caixa (None = sem limite)
+        max_length: Comprimento total máximo por caixa (None = sem limite)
+    """
+
+    __slots__ = (
+        "line_id", "product", "rules", "box_capacity", "strategy", "max_weight", "max_length"
+    )
+
+    def __init__(
+        self,
+        line_id: str,
+        product: Optional[str] = None,
+        rules: Optional[RuleSet] = None,
+        box_capacity: int = Box.DEFAULT_CAPACITY,
+        strategy: Optional[str] = None,
+        max_weight: Optional[float] = None,
+        max_length: Optional[float] = None
+    ):
+        self.line_id = line_id
+        self.product = product
+        self.rules = rules
+        self.box_capacity = box_capacity
+        self.strategy = strategy
+        self.max_weight = max_weight
+        self.max_length = max_length
+
+
+class ProductionLine:
+    """Serviços carregados de uma linha e o instante do último uso."""
+
+    __slots__ = ("config", "quality", "storage", "journal", "last_used")
+
+    def __init__(
+        self,
+        config: LineConfig,
+        quality: QualityService,
+        storage: StorageService,
+        journal=None,
+        last_used: float = 0.0
+    ):
+        self.config = config
+        self.quality = quality
+        self.storage = storage
+        self.journal = journal
+        self.last_used = last_used
+
+    def summary(self) -> Dict[str, Any]:
+        """Estatísticas da linha (contadores dos serviços, O(1))."""
+        return {
+            "line": self.config.line_id,
+            "product": self.config.product,
+            "quality": self.quality.get_statistics(),
+            "storage": self.storage.get_statistics(),
+        }
+
+
+class LineRegistry:
+    """
+    Linhas de produção isoladas, encaminhadas pelo ID da linha.
+
+    Sem data_dir, as linhas ficam sempre em memória. Com data_dir, cada
+    linha persiste em data_dir/<linha> (journal + snapshot, ver
+    open_services), é carregada no primeiro uso e descarregada quando passa
+    idle_seconds sem uso ou quando há mais de max_loaded linhas carregadas
+    (a menos usada recentemente sai primeiro).
+
+    As operações são serializadas por um lock do registro; os serviços
+    retornados por line() não são thread-safe.
+
+    Atributos:
+        quality: Visão de qualidade da planta (interface de QualityService
+            usada pelo ReportGenerator)
+        storage: Visão de armazenamento da planta
+
+    Args:
+        rule_registry: Regras por produto (acompanhadas nas recargas)
+        data_dir: Diretório de dados das linhas (None = só memória)
+        idle_seconds: Ociosidade após a qual a linha é descarregada
+        max_loaded: Máximo de linhas carregadas ao mesmo tempo
+        clock: Relógio usado para medir a ociosidade
+
+    Raises:
+        ValueError: Se idle_seconds ou max_loaded forem usados sem data_dir
+    """
+
+    def __init__(
+        self,
+        rule_registry: Optional[RuleRegistry] = None,
+        data_dir: Optional[str] = None,
+        idle_seconds: Optional[float] = None,
+        max_loaded: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if data_dir is None and (idle_seconds is not None or max_loaded is not None):
+            raise ValueError("Descarregar linhas exige um diretório de dados")
+        if max_loaded is not None and max_loaded < 1:
+            raise ValueError("max_loaded deve ser positivo")
+        self.rule_registry = rule_registry
+        self.data_dir = data_dir
+        self.idle_seconds = idle_seconds
+        self.max_loaded = max_loaded
+        self.clock = clock
+        self._configs: Dict[str, LineConfig] = {}
+        self._loaded: "OrderedDict[str, ProductionLine]" = OrderedDict()
+        self._summaries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        self.quality = _PlantQualityView(self)
+        self.storage = _PlantStorageView(self)
+
+    def add_line(
+        self,
+        line_id: str,
+        product: Optional[str] = None,
+        rules: Optional[RuleSet] = None,
+        box_capacity: int = Box.DEFAULT_CAPACITY,
+        strategy: Optional[str] = None,
+        max_weight: Optional[float] = None,
+        max_length: Optional[float] = None
+    ) -> LineConfig:
+        """
+        Cadastra uma linha (os serviços só são criados no primeiro uso).
+
+        Raises:
+            ValueError: Se a linha já existir ou o ID não servir como nome
+                de diretório
+        """
+        if not line_id or line_id in (".", "..") or os.sep in line_id or "/" in line_id:
+            raise ValueError(f"ID de linha inválido: {line_id!r}")
+        config = LineConfig(
+            line_id, product, rules, box_capacity, strategy, max_weight, max_length
+        )
+        with self._lock:
+            if line_id in self._configs:
+                raise ValueError(f"Linha já cadastrada: {line_id}")
+            self._configs[line_id] = config
+        return config
+
+    def line(self, line_id: str) -> ProductionLine:
+        """
+        Retorna a linha, carregando seus serviços se necessário.
+
+        Raises:
+            KeyError: Se a linha não estiver cadastrada
+        """
+        with self._lock:
+            line = self._loaded.get(line_id)
+            if line is None:
+                line = self._load(line_id)
+            else:
+                self._loaded.move_to_end(line_id)
+            line.last_used = self.clock()
+            return line
+
+    def _load(self, line_id: str) -> ProductionLine:
+        config = self._configs.get(line_id)
+        if config is None:
+            raise KeyError(f"Linha não cadastrada: {line_id}")
+
+        rules = self._rules_for(config)
+        bound = (
+            config.rules is None and config.product is not None and self.rule_registry is not None
+        )
+
+        journal = None
+        if self.data_dir is None:
+            quality = QualityService(rules=rules)
+            storage = StorageService(
+                box_capacity=config.box_capacity, strategy=config.strategy,
+                max_weight=config.max_weight, max_length=config.max_length
+            )
+        else:
+            from ..persistence.journal import open_services
+            quality, storage, journal = open_services(
+                os.path.join(self.data_dir, line_id),
+                box_capacity=config.box_capacity, strategy=config.strategy,
+                max_weight=config.max_weight, max_length=config.max_length, rules=rules
+            )
+
+        # As peças recuperadas já são interpretadas com as regras da linha
+        if bound:
+            self.rule_registry.bind(config.product, quality)
+
+        line = ProductionLine(config, quality, storage, journal, self.clock())
+        self._loaded[line_id] = line
+        self._summaries.pop(line_id, None)
+        self._evict_excess(line_id)
+        return line
+
+    def _rules_for(self, config: LineConfig) -> Optional[RuleSet]:
+        """Regras da linha: as próprias ou as do produto (None = padrão)."""
+        if config.rules is None and config.product is not None and self.rule_registry is not None:
+            return self.rule_registry.get(config.product)
+        return config.rules
+
+    def _reader(self, line_id: str):
+        """
+        Leitor somente leitura dos arquivos de uma linha não carregada.
+
+        Returns:
+            JournalReader do diretório da linha, ou None se ela ainda não
+            gravou nada (ou não há data_dir)
+        """
+        if self.data_dir is None:
+            return None
+        from ..persistence.reader import JournalReader
+        config = self._configs[line_id]
+        try:
+            return JournalReader.from_directory(
+                os.path.join(self.data_dir, line_id),
+                box_capacity=config.box_capacity, rules=self._rules_for(config)
+            )
+        except FileNotFoundError:
+            return None
+
+    def _evict_excess(self, keep: str) -> None:
+        """Descarrega as linhas ociosas e as que excedem max_loaded."""
+        if self.idle_seconds is not None:
+            self.evict_idle()
+        if self.max_loaded is not None:
+            while len(self._loaded) > self.max_loaded:
+                oldest = next(iter(self._loaded))
+                if oldest == keep:
+                    break
+                self.evict(oldest)
+
+    def evict(self, line_id: str) -> bool:
+        """
+        Descarrega uma linha: grava um checkpoint, fecha o journal e guarda
+        o resumo das estatísticas.
+
+        Returns:
+            False se a linha não estiver carregada ou não houver data_dir
+        """
+        with self._lock:
+            line = self._loaded.get(line_id)
+            if line is None or line.journal is None:
+                return False
+            line.journal.checkpoint(line.quality, line.storage)
+            line.journal.close()
+            config, rule_registry = line.config, self.rule_registry
+            if config.rules is None and config.product is not None and rule_registry is not None:
+                rule_registry.unbind(config.product, line.quality)
+            self._summaries[line_id] = line.summary()
+            del self._loaded[line_id]
+            return True
+
+    def evict_idle(self, now: Optional[float] = None) -> List[str]:
+        """
+        Descarrega as linhas sem uso há mais de idle_seconds.
+
+        As linhas ficam em ordem de uso, então a varredura para na primeira
+        linha ainda ativa.
+
+        Returns:
+            IDs das linhas descarregadas
+        """
+        if self.idle_seconds is None:
+            return []
+        with self._lock:
+            limit = (self.clock() if now is None else now) - self.idle_seconds
+            idle = []
+            for line_id, line in self._loaded.items():
+                if line.last_used > limit:
+                    break
+                idle.append(line_id)
+            return [line_id for line_id in idle if self.evict(line_id)]
+
+    def register_piece(
+        self,
+        line_id: str,
+        weight: float,
+        color: str,
+        length: float,
+        custom_id: Optional[str] = None
+    ) -> Piece:
+        """
+        Registra uma peça na linha e a armazena, se aprovada.
+
+        Raises:
+            KeyError: Se a linha não estiver cadastrada
+            ValueError: Se o ID já existir na linha
+        """
+        with self._lock:
+            line = self.line(line_id)
+            piece = line.quality.register_piece(weight, color, length, custom_id)
+            line.storage.store_piece(piece)
+            return piece
+
+    def register_pieces(
+        self,
+        line_id: str,
+        weights: Sequence[float],
+        colors: Sequence[str],
+        lengths: Sequence[float],
+        custom_ids: Optional[Sequence[str]] = None
+    ) -> List[Piece]:
+        """
+        Registra um lote na linha e armazena as peças aprovadas.
+
+        Raises:
+            KeyError: Se a linha não estiver cadastrada
+            ValueError: Se algum ID estiver repetido no lote ou na linha
+        """
+        with self._lock:
+            line = self.line(line_id)
+            pieces = line.quality.register_pieces(weights, colors, lengths, custom_ids)
+            line.storage.store_pieces(pieces)
+            return pieces
+
+    def line_statistics(self) -> List[Dict[str, Any]]:
+        """
+        Estatísticas de cada linha, na ordem de cadastro.
+
+        Linhas descarregadas usam o resumo guardado no descarte; uma linha
+        ainda não carregada neste processo é carregada para a consulta.
+        Cada item tem "line", "product", "loaded", "quality" e "storage".
+        """
+        with self._lock:
+            result = []
+            for line_id in list(self._configs):
+                line = self._loaded.get(line_id)
+                summary = self._summaries.get(line_id)
+                if line is not None or summary is None:
+                    summary = (line or self.line(line_id)).summary()
+                result.append(dict(summary, loaded=line_id in self._loaded))
+            return result
+
+    def lines(self) -> List[str]:
+        """IDs das linhas cadastradas, na ordem de cadastro."""
+        return list(self._configs)
+
+    def loaded_lines(self) -> List[str]:
+        """IDs das linhas carregadas, da menos para a mais usada recentemente."""
+        return list(self._loaded)
+
+    def close(self) -> None:
+        """Descarrega todas as linhas persistidas (checkpoint e journal fechado)."""
+        with self._lock:
+            for line_id in list(self._loaded):
+                self.evict(line_id)
+
+    def __contains__(self, line_id: str) -> bool:
+        return line_id in self._configs
+
+    def __len__(self) -> int:
+        return len(self._configs)
+
+    def __enter__(self) -> "LineRegistry":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class _PlantQualityView:
+    """Expõe as consultas de QualityService somando as linhas."""
+
+    def __init__(self, owner: LineRegistry):
+        self._owner = owner
+
+    def get_statistics(self) -> Dict[str, Any]:
+        from ..reports.report_generator import ReportGenerator
+        return ReportGenerator.merge_quality_statistics(
+            [line["quality"] for line in self._owner.line_statistics()]
+        )
+
+    def line_statistics(self) -> List[Dict[str, Any]]:
+        return self._owner.line_statistics()
+
+    def _pieces(self, approved: bool) -> List[Piece]:
+        # Linhas descarregadas são lidas dos seus arquivos, sem carregá-las
+        # (o que descarregaria outras linhas)
+        pieces = []
+        with self._owner._lock:
+            for line_id in self._owner.lines():
+                line = self._owner._loaded.get(line_id)
+                if line is not None:
+                    quality = line.quality
+                else:
+                    reader = self._owner._reader(line_id)
+                    if reader is None:
+                        continue
+                    quality = reader.quality
+                pieces.extend(
+                    quality.get_approved_pieces() if approved else quality.get_rejected_pieces()
+                )
+        return pieces
+
+    def get_approved_pieces(self) -> List[Piece]:
+        return self._pieces(True)
+
+    def get_rejected_pieces(self) -> List[Piece]:
+        return self._pieces(False)
+
+
+class _PlantStorageView:
+    """Expõe as estatísticas de StorageService somando as linhas."""
+
+    def __init__(self, owner: LineRegistry):
+        self._owner = owner
+
+    def get_statistics(self) -> Dict[str, Any]:
+        from ..reports.report_generator import ReportGenerator
+        return ReportGenerator.merge_storage_statistics(
+            [line["storage"] for line in self._owner.line_statistics()]
+        )
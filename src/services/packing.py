@@ -0,0 +1,292 @@
+"""
+Estratégias de empacotamento (bin packing online) para o StorageService.
+
+Cada estratégia escolhe, entre as caixas abertas, a que recebe a próxima
+peça. As caixas candidatas ficam em índices mantidos pelo StorageService a
+cada abertura, armazenamento, retirada e fechamento, de modo que a escolha
+custa O(log B) em vez de percorrer as B caixas:
+
+    next-fit   apenas a caixa atual; se a peça não couber, a caixa é
+               fechada e outra é aberta (comportamento original)
+    first-fit  a caixa aberta mais antiga em que a peça cabe (árvore de
+               segmentos com o peso e o comprimento restantes máximos
+               por intervalo)
+    best-fit   a caixa com o menor peso restante em que a peça cabe
+               (lista ordenada por peso restante, com busca binária; o
+               comprimento, quando limitado, é conferido nas candidatas)
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple, Type, Union
+
+from ..models.box import Box
+from ..models.piece import Piece
+
+# Chave das caixas que não aceitam peças (fechadas ou cheias)
+_NO_ROOM = -1.0
+
+
+def _room(box: Box) -> float:
+    """Peso restante da caixa, ou _NO_ROOM se ela não aceita mais peças."""
+    if box.is_closed or box.is_full():
+        return _NO_ROOM
+    return box.get_remaining_weight()
+
+
+def _remaining_length(box: Box) -> float:
+    """Comprimento que ainda cabe na caixa (infinito se sem limite)."""
+    if box.max_length is None:
+        return float("inf")
+    return box.max_length - box.total_length
+
+
+class PackingStrategy:
+    """
+    Interface das estratégias de empacotamento.
+
+    Uma instância guarda os índices de um único StorageService e não deve
+    ser compartilhada.
+
+    Atributos:
+        name: Nome da estratégia em PACKING_STRATEGIES
+        max_open_boxes: Limite de caixas abertas ao mesmo tempo (None = sem
+            limite); ao atingi-lo, uma caixa é fechada antes de abrir outra
+    """
+
+    name = ""
+    # Se as peças podem ser guardadas em blocos, na ordem, na caixa atual
+    sequential = False
+
+    def __init__(self, max_open_boxes: Optional[int] = None):
+        if max_open_boxes is not None and max_open_boxes < 1:
+            raise ValueError("O limite de caixas abertas deve ser ao menos 1")
+        self.max_open_boxes = max_open_boxes
+
+    def update(self, box: Box) -> None:
+        """Atualiza os índices após a caixa abrir, mudar de conteúdo ou fechar."""
+
+    def clear(self) -> None:
+        """Descarta os índices."""
+
+    def select(self, piece: Piece, current: Optional[Box]) -> Optional[Box]:
+        """
+        Escolhe a caixa aberta que recebe a peça.
+
+        Args:
+            piece: Peça aprovada a armazenar
+            current: Caixa atual (a aberta mais recentemente)
+
+        Returns:
+            Caixa escolhida, ou None se nenhuma caixa aberta comporta a peça
+        """
+        raise NotImplementedError
+
+    def evict(self, current: Optional[Box], open_boxes: int) -> Optional[Box]:
+        """
+        Indica a caixa a fechar quando nenhuma comporta a peça.
+
+        Args:
+            current: Caixa atual
+            open_boxes: Quantidade de caixas abertas
+
+        Returns:
+            Caixa a fechar antes de abrir uma nova, ou None
+        """
+        if self.max_open_boxes is None or open_boxes < self.max_open_boxes:
+            return None
+        return self._victim()
+
+    def _victim(self) -> Optional[Box]:
+        return None
+
+
+class NextFitStrategy(PackingStrategy):
+    """
+    Enche apenas a caixa atual, na ordem de chegada.
+
+    Sem índices: O(1) por peça. É a estratégia padrão e a única que permite
+    o armazenamento em blocos de store_pieces.
+    """
+
+    name = "next-fit"
+    sequential = True
+
+    def __init__(self):
+        super().__init__(max_open_boxes=1)
+
+    def select(self, piece: Piece, current: Optional[Box]) -> Optional[Box]:
+        if current is not None and current.fits(piece):
+            return current
+        return None
+
+    def evict(self, current: Optional[Box], open_boxes: int) -> Optional[Box]:
+        if current is not None and not current.is_closed and current.pieces:
+            return current
+        return None
+
+
+class FirstFitStrategy(PackingStrategy):
+    """
+    Coloca a peça na caixa aberta mais antiga em que ela cabe.
+
+    Cada caixa ocupa uma folha de uma árvore de segmentos (na ordem de
+    abertura) com o seu peso e comprimento restantes; cada nó guarda o
+    máximo de cada dimensão nos filhos. A busca desce pela esquerda e só
+    entra em subárvores que comportem a peça nas duas dimensões.
+    """
+
+    name = "first-fit"
+
+    def __init__(self, max_open_boxes: Optional[int] = None):
+        super().__init__(max_open_boxes)
+        self.clear()
+
+    def clear(self) -> None:
+        self._size = 1
+        self._weights: List[float] = [_NO_ROOM, _NO_ROOM]
+        self._lengths: List[float] = [_NO_ROOM, _NO_ROOM]
+        self._slots: Dict[int, int] = {}
+        self._boxes: List[Box] = []
+
+    def _grow(self) -> None:
+        """Dobra o número de folhas, reconstruindo os nós internos."""
+        size = self._size * 2
+        trees = []
+        for old in (self._weights, self._lengths):
+            tree = [_NO_ROOM] * size + old[self._size:] + [_NO_ROOM] * self._size
+            for node in range(size - 1, 0, -1):
+                tree[node] = max(tree[2 * node], tree[2 * node + 1])
+            trees.append(tree)
+        self._size = size
+        self._weights, self._lengths = trees
+
+    def update(self, box: Box) -> None:
+        slot = self._slots.get(box.box_id)
+        weight = _room(box)
+        if slot is None:
+            if weight == _NO_ROOM:
+                return
+            slot = self._slots[box.box_id] = len(self._boxes)
+            self._boxes.append(box)
+            if slot >= self._size:
+                self._grow()
+        length = _NO_ROOM if weight == _NO_ROOM else _remaining_length(box)
+
+        weights, lengths = self._weights, self._lengths
+        node = slot + self._size
+        weights[node], lengths[node] = weight, length
+        node >>= 1
+        while node:
+            left, right = 2 * node, 2 * node + 1
+            weight = max(weights[left], weights[right])
+            length = max(lengths[left], lengths[right])
+            if weights[node] == weight and lengths[node] == length:
+                break
+            weights[node], lengths[node] = weight, length
+            node >>= 1
+
+    def _find(self, weight: float, length: float) -> int:
+        """Primeira folha com peso e comprimento restantes suficientes (-1 se nenhuma)."""
+        weights, lengths, size = self._weights, self._lengths, self._size
+        stack = [1]
+        while stack:
+            node = stack.pop()
+            if weights[node] < weight or lengths[node] < length:
+                continue
+            if node >= size:
+                return node - size
+            stack.append(2 * node + 1)
+            stack.append(2 * node)
+        return -1
+
+    def select(self, piece: Piece, current: Optional[Box]) -> Optional[Box]:
+        slot = self._find(piece.weight, piece.length)
+        return self._boxes[slot] if slot >= 0 else None
+
+    def _victim(self) -> Optional[Box]:
+        # A caixa aberta mais antiga (espaço restante >= 0)
+        slot = self._find(0.0, 0.0)
+        return self._boxes[slot] if slot >= 0 else None
+
+
+class BestFitStrategy(PackingStrategy):
+    """
+    Coloca a peça na caixa aberta que ficará com o menor peso restante.
+
+    As caixas abertas ficam em uma lista ordenada por (peso restante, ID);
+    a candidata é encontrada por busca binária. Empates (por exemplo, sem
+    limite de peso) ficam com a caixa mais antiga.
+    """
+
+    name = "best-fit"
+
+    def __init__(self, max_open_boxes: Optional[int] = None):
+        super().__init__(max_open_boxes)
+        self.clear()
+
+    def clear(self) -> None:
+        self._keys: List[Tuple[float, int]] = []
+        self._key_of: Dict[int, Tuple[float, int]] = {}
+        self._boxes: Dict[int, Box] = {}
+
+    def update(self, box: Box) -> None:
+        old = self._key_of.pop(box.box_id, None)
+        if old is not None:
+            del self._keys[bisect_left(self._keys, old)]
+        room = _room(box)
+        if room == _NO_ROOM:
+            self._boxes.pop(box.box_id, None)
+            return
+        key = (room, box.box_id)
+        insort(self._keys, key)
+        self._key_of[box.box_id] = key
+        self._boxes[box.box_id] = box
+
+    def select(self, piece: Piece, current: Optional[Box]) -> Optional[Box]:
+        keys = self._keys
+        for position in range(bisect_left(keys, (piece.weight, 0)), len(keys)):
+            box = self._boxes[keys[position][1]]
+            if box.fits(piece):
+                return box
+        return None
+
+    def _victim(self) -> Optional[Box]:
+        # A caixa mais cheia (menor peso restante)
+        return self._boxes[self._keys[0][1]] if self._keys else None
+
+
+PACKING_STRATEGIES: Dict[str, Type[PackingStrategy]] = {
+    strategy.name: strategy
+    for strategy in (NextFitStrategy, FirstFitStrategy, BestFitStrategy)
+}
+
+
+def make_strategy(
+    strategy: Union[str, PackingStrategy, None],
+    max_open_boxes: Optional[int] = None
+) -> PackingStrategy:
+    """
+    Cria a estratégia a partir do nome (ou devolve a instância recebida).
+
+    Args:
+        strategy: Nome em PACKING_STRATEGIES, instância ou None (next-fit)
+        max_open_boxes: Limite de caixas abertas para first-fit e best-fit
+
+    Returns:
+        Estratégia pronta para um StorageService
+
+    Raises:
+        ValueError: Se o nome não for conhecido
+    """
+    if strategy is None or strategy == NextFitStrategy.name:
+        return NextFitStrategy()
+    if isinstance(strategy, PackingStrategy):
+        return strategy
+    try:
+        factory = PACKING_STRATEGIES[strategy]
+    except KeyError:
+        raise ValueError(
+            f"Estratégia de empacotamento inválida: {strategy} "
+            f"(use {', '.join(PACKING_STRATEGIES)})"
+        ) from None
+    return factory(max_open_boxes)
@@ -0,0 +1,493 @@
+"""
+Consultas ao histórico de peças com índices secundários.
+
+Os índices são montados sob demanda sobre as colunas do PieceStore, apenas
+para os campos consultados, e acompanham os novos cadastros de forma
+incremental (o armazenamento só acrescenta linhas; remoções viram lápides):
+
+- status, cor e bits de falha: listas de linhas por valor (arrays de
+  linhas em ordem de cadastro); os bits são traduzidos em campos pelas
+  regras de cada geração de linhas (ver PieceStore.generations), para que
+  uma recarga das regras não mude o sentido das peças já cadastradas;
+- peso, comprimento e instante do cadastro: linhas ordenadas pelo valor,
+  em duas sequências ordenadas (principal e recente), para consultas por
+  faixa com busca binária.
+
+Uma consulta parte do critério mais seletivo e confere os demais apenas
+nas linhas candidatas, sem percorrer o armazenamento.
+"""
+
+import math
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from itertools import compress, repeat
+from operator import and_, ge, gt, le, lt
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from ..models.piece_store import PieceStatus, PieceStore
+
+# Campos numéricos consultáveis por faixa (colunas do PieceStore)
+RANGE_COLUMNS = ("weight", "length", "registered_at")
+
+# Nomes aceitos nas expressões (em português ou inglês)
+_ALIASES = {
+    "peso": "weight", "comprimento": "length", "cor": "color", "falha": "failed",
+    "instante": "registered_at", "time": "registered_at",
+}
+
+_OPERATORS = ("<=", ">=", "!=", "=", "<", ">")
+
+# Tamanho mínimo da sequência recente antes de fundi-la na principal
+_MIN_RECENT = 4096
+
+
+def parse_time(text: str, now: Optional[float] = None) -> float:
+    """
+    Converte um instante em segundos desde a época.
+
+    Aceita segundos ("1700000000"), data/hora ISO ("2024-05-02T10:00",
+    "2024-05-02") ou só a hora ("10:00", "10:00:30"), que se refere ao dia
+    de now (padrão: hoje), no fuso local.
+
+    Raises:
+        ValueError: Se o texto não for um instante reconhecido
+    """
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    if ":" in text and "-" not in text:
+        parts = [int(part) for part in text.split(":")]
+        if not 2 <= len(parts) <= 3:
+            raise ValueError(f"Hora inválida: {text}")
+        day = datetime.fromtimestamp(time.time() if now is None else now)
+        moment = day.replace(
+            hour=parts[0], minute=parts[1], second=parts[2] if len(parts) == 3 else 0,
+            microsecond=0
+        )
+        return moment.timestamp()
+    return datetime.fromisoformat(text).timestamp()
+
+
+class Range:
+    """Faixa de valores com extremos opcionais, abertos ou fechados."""
+
+    __slots__ = ("low", "high", "low_open", "high_open")
+
+    def __init__(
+        self,
+        low: Optional[float] = None,
+        high: Optional[float] = None,
+        low_open: bool = False,
+        high_open: bool = False
+    ):
+        self.low = low
+        self.high = high
+        self.low_open = low_open
+        self.high_open = high_open
+
+    def narrow(self, operator: str, value: float) -> None:
+        """Restringe a faixa com uma comparação (<, <=, >, >= ou =)."""
+        if operator in (">", ">=", "="):
+            open_ = operator == ">"
+            if self.low is None or value > self.low or (value == self.low and open_):
+                self.low, self.low_open = value, open_
+        if operator in ("<", "<=", "="):
+            open_ = operator == "<"
+            if self.high is None or value < self.high or (value == self.high and open_):
+                self.high, self.high_open = value, open_
+
+    def filter(self, column: Sequence[float], rows: Iterable[int]) -> List[int]:
+        """Linhas de rows cujo valor na coluna está na faixa."""
+        low = -math.inf if self.low is None else self.low
+        high = math.inf if self.high is None else self.high
+        above = gt if self.low_open else ge
+        below = lt if self.high_open else le
+        return [row for row in rows if above(column[row], low) and below(column[row], high)]
+
+    def bounds(self, keys: Sequence[float]) -> Tuple[int, int]:
+        """Posições [início, fim) da faixa em uma sequência ordenada."""
+        start = 0 if self.low is None else (
+            bisect_right(keys, self.low) if self.low_open else bisect_left(keys, self.low)
+        )
+        end = len(keys) if self.high is None else (
+            bisect_left(keys, self.high) if self.high_open else bisect_right(keys, self.high)
+        )
+        return start, max(start, end)
+
+
+class PieceQuery:
+    """
+    Critérios de uma consulta, combinados com E.
+
+    Args:
+        status: 'aprovada' ou 'reprovada'
+        color: Cor ou lista de cores aceitas
+        failed: Campo (ou campos) em que a peça foi reprovada ('weight',
+            'color', 'length'); com vários, todos precisam ter falhado
+        min_weight, max_weight: Faixa de peso (inclusiva)
+        min_length, max_length: Faixa de comprimento (inclusiva)
+        since: Cadastradas a partir deste instante (inclusivo)
+        until: Cadastradas antes deste instante (exclusivo)
+        limit: Máximo de peças retornadas (as primeiras cadastradas)
+
+    Raises:
+        ValueError: Se o status ou o campo de falha forem desconhecidos
+    """
+
+    def __init__(
+        self,
+        status: Optional[str] = None,
+        color: Union[str, Sequence[str], None] = None,
+        failed: Union[str, Sequence[str], None] = None,
+        min_weight: Optional[float] = None,
+        max_weight: Optional[float] = None,
+        min_length: Optional[float] = None,
+        max_length: Optional[float] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: Optional[int] = None
+    ):
+        self.status: Optional[PieceStatus] = None
+        self.colors: Optional[List[str]] = None
+        self.failed: List[str] = []
+        self.ranges: Dict[str, Range] = {}
+        self.limit = limit
+        if status is not None:
+            self.where("status", "=", status)
+        if color is not None:
+            for value in [color] if isinstance(color, str) else color:
+                self.where("color", "=", value)
+        if failed is not None:
+            for value in [failed] if isinstance(failed, str) else failed:
+                self.where("failed", "=", value)
+        for field, operator, value in (
+            ("weight", ">=", min_weight), ("weight", "<=", max_weight),
+            ("length", ">=", min_length), ("length", "<=", max_length),
+            ("registered_at", ">=", since), ("registered_at", "<", until),
+        ):
+            if value is not None:
+                self.where(field, operator, value)
+
+    def where(self, field: str, operator: str, value) -> "PieceQuery":
+        """
+        Acrescenta um critério; cores repetidas são alternativas (OU).
+
+        Returns:
+            A própria consulta, para encadear chamadas
+
+        Raises:
+            ValueError: Se o campo, o operador ou o valor forem inválidos
+        """
+        field = _ALIASES.get(field, field)
+        if field in RANGE_COLUMNS:
+            if operator not in ("<", "<=", ">", ">=", "="):
+                raise ValueError(f"Operador inválido para {field}: {operator}")
+            self.ranges.setdefault(field, Range()).narrow(operator, float(value))
+            return self
+        if operator != "=":
+            raise ValueError(f"O campo {field} só aceita '='")
+        if field == "status":
+            try:
+                self.status = PieceStatus.from_label(str(value).lower())
+            except ValueError:
+                raise ValueError(f"Status desconhecido: {value}") from None
+        elif field == "color":
+            self.colors = (self.colors or []) + [str(value).lower()]
+        elif field == "failed":
+            value = _ALIASES.get(value, value)
+            if value not in ("weight", "color", "length"):
+                raise ValueError(f"Campo de falha desconhecido: {value}")
+            self.failed.append(value)
+        else:
+            raise ValueError(f"Campo desconhecido: {field}")
+        return self
+
+    @classmethod
+    def parse(
+        cls, expressions: Iterable[str], now: Optional[float] = None
+    ) -> "PieceQuery":
+        """
+        Monta a consulta a partir de expressões "campo OP valor".
+
+        Ex.: ["status=reprovada", "failed=weight", "cor=verde", "length>18",
+        "since=10:00", "until=11:00"]. since/until aceitam os formatos de
+        parse_time.
+
+        Raises:
+            ValueError: Se alguma expressão for inválida
+        """
+        query = cls()
+        for expression in expressions:
+            for operator in _OPERATORS:
+                field, found, value = expression.partition(operator)
+                if found:
+                    break
+            else:
+                raise ValueError(f"Expressão sem operador: {expression}")
+            field, value = field.strip().lower(), value.strip()
+            if not field or not value:
+                raise ValueError(f"Expressão incompleta: {expression}")
+            if field in ("since", "until"):
+                if operator != "=":
+                    raise ValueError(f"Use {field}=INSTANTE")
+                operator = ">=" if field == "since" else "<"
+                field, value = "registered_at", parse_time(value, now)
+            elif _ALIASES.get(field, field) == "registered_at":
+                value = parse_time(value, now)
+            query.where(field, operator, value)
+        return query
+
+
+class SortedColumnIndex:
+    """
+    Linhas ordenadas pelo valor de uma coluna numérica.
+
+    As linhas ficam em duas sequências ordenadas, cada uma com o array das
+    chaves ao lado do array das linhas: a principal e a recente. Novas
+    linhas aguardam em uma lista e são ordenadas na recente na consulta
+    seguinte; a recente é fundida na principal quando passa de 1/8 dela.
+    Uma faixa custa duas buscas binárias por sequência mais as linhas
+    encontradas.
+    """
+
+    def __init__(self, column: Sequence[float]):
+        self.column = column
+        self._runs: List[Tuple[array, array]] = [(array("d"), array("q"))] * 2
+        self._pending: List[int] = []
+
+    def add_rows(self, start: int, end: int) -> None:
+        self._pending.extend(range(start, end))
+
+    def _sorted(self, rows: List[int]) -> Tuple[array, array]:
+        rows.sort(key=self.column.__getitem__)
+        return array("d", map(self.column.__getitem__, rows)), array("q", rows)
+
+    def _settle(self) -> None:
+        """Ordena as linhas pendentes e, se preciso, funde as sequências."""
+        if not self._pending:
+            return
+        main, recent = self._runs
+        rows = recent[1].tolist() + self._pending
+        self._pending = []
+        if len(rows) > max(_MIN_RECENT, len(main[1]) >> 3):
+            # Timsort aproveita a sequência principal já ordenada
+            self._runs = [self._sorted(main[1].tolist() + rows), (array("d"), array("q"))]
+        else:
+            self._runs = [main, self._sorted(rows)]
+
+    def estimate(self, rng: Range) -> int:
+        """Quantidade de linhas na faixa (inclui lápides)."""
+        self._settle()
+        total = 0
+        for keys, _ in self._runs:
+            start, end = rng.bounds(keys)
+            total += end - start
+        return total
+
+    def rows(self, rng: Range) -> List[int]:
+        """Linhas na faixa (inclui lápides), sem ordem definida."""
+        self._settle()
+        result: List[int] = []
+        for keys, rows in self._runs:
+            start, end = rng.bounds(keys)
+            result.extend(rows[start:end])
+        return result
+
+
+class PieceIndex:
+    """
+    Índices secundários sobre um PieceStore, montados sob demanda.
+
+    Antes de cada consulta os índices já montados recebem as linhas
+    acrescentadas desde a anterior. Se o armazenamento for limpo, recarregado
+    ou alterado por uma visão (StoredPiece.weight = ..., por exemplo), os
+    índices são descartados e remontados na próxima consulta.
+
+    Não é thread-safe (como o QualityService).
+    """
+
+    def __init__(self, store: PieceStore):
+        self.store = store
+        self._reset()
+
+    def _reset(self) -> None:
+        store = self.store
+        self._columns = (store.column("weight"), store.column("status"))
+        self._revision = store.revision
+        self._indexed = store.row_count
+        self._postings: Dict[str, Dict[int, array]] = {}
+        self._bits: Optional[Dict[int, array]] = None
+        self._sorted: Dict[str, SortedColumnIndex] = {}
+
+    def _sync(self) -> None:
+        """Acrescenta aos índices montados as linhas novas do armazenamento."""
+        store = self.store
+        if (
+            store.revision != self._revision
+            or store.column("weight") is not self._columns[0]
+            or store.column("status") is not self._columns[1]
+            or store.row_count < self._indexed
+        ):
+            self._reset()
+            return
+        start, end = self._indexed, store.row_count
+        if start == end:
+            return
+        for name, postings in self._postings.items():
+            self._add_postings(postings, store.column(name), start, end)
+        if self._bits is not None:
+            self._add_bits(self._bits, start, end)
+        for index in self._sorted.values():
+            index.add_rows(start, end)
+        self._indexed = end
+
+    @staticmethod
+    def _add_postings(postings: Dict[int, array], column, start: int, end: int) -> None:
+        segment = column[start:end]
+        rows = range(start, end)
+        for code in set(segment):
+            postings.setdefault(code, array("q")).extend(
+                compress(rows, map(code.__eq__, segment))
+            )
+
+    def _add_bits(self, bits: Dict[int, array], start: int, end: int) -> None:
+        segment = self.store.column("flags")[start:end]
+        seen = 0
+        for value in set(segment):
+            seen |= value
+        rows = range(start, end)
+        for bit in (1 << position for position in range(8)):
+            if seen & bit:
+                bits.setdefault(bit, array("q")).extend(
+                    compress(rows, map(and_, segment, repeat(bit)))
+                )
+
+    def postings(self, name: str) -> Dict[int, array]:
+        """Linhas por código da coluna name ('status' ou 'color')."""
+        postings = self._postings.get(name)
+        if postings is None:
+            postings = self._postings[name] = {}
+            self._add_postings(postings, self.store.column(name), 0, self._indexed)
+        return postings
+
+    def bits(self) -> Dict[int, array]:
+        """Linhas por bit de falha."""
+        if self._bits is None:
+            self._bits = {}
+            self._add_bits(self._bits, 0, self._indexed)
+        return self._bits
+
+    def sorted_index(self, field: str) -> SortedColumnIndex:
+        """Índice ordenado de um campo de RANGE_COLUMNS."""
+        index = self._sorted.get(field)
+        if index is None:
+            index = self._sorted[field] = SortedColumnIndex(self.store.column(field))
+            index.add_rows(0, self._indexed)
+        return index
+
+    def _failed_criterion(self, field: str) -> tuple:
+        """
+        Critério de falha em um campo, com a máscara de bits de cada geração.
+
+        Com uma única máscara (o caso comum) as candidatas são as listas dos
+        seus bits; com várias, cada geração contribui com o trecho das suas
+        linhas nas listas dos próprios bits, e o filtro procura a geração da
+        linha pelo início das faixas.
+        """
+        flags, bits = self.store.column("flags"), self.bits()
+        starts: List[int] = []
+        masks: List[int] = []
+        for rows, rules in self.store.generations():
+            mask = 0
+            for rule in rules.rules:
+                if rule.field == field:
+                    mask |= rule.bit
+            starts.append(rows.start)
+            masks.append(mask)
+        if len(set(masks)) == 1:
+            mask = masks[0]
+            lists = [bits[bit] for bit in bits if mask & bit]
+            return (
+                sum(map(len, lists)),
+                lambda: lists[0] if len(lists) == 1 else set().union(*lists),
+                lambda candidates: [row for row in candidates if flags[row] & mask]
+            )
+        ends = starts[1:] + [self._indexed]
+        lists = []
+        for start, end, mask in zip(starts, ends, masks):
+            for bit in bits:
+                if mask & bit:
+                    rows = bits[bit]
+                    lists.append(rows[bisect_left(rows, start):bisect_left(rows, end)])
+        return (
+            sum(map(len, lists)),
+            lambda: set().union(*lists),
+            lambda candidates: [
+                row for row in candidates
+                if flags[row] & masks[bisect_right(starts, row) - 1]
+            ]
+        )
+
+    def search(self, query: PieceQuery) -> List[int]:
+        """
+        Linhas das peças ativas que atendem à consulta, em ordem de cadastro.
+
+        O critério com menos linhas candidatas (pelo tamanho das listas ou
+        pela busca binária nas faixas) gera as candidatas; os demais são
+        conferidos nas colunas apenas para elas.
+        """
+        self._sync()
+        store = self.store
+        # Critérios como (estimativa, gerador de candidatas, filtro de linhas)
+        criteria = []
+
+        if query.status is not None:
+            statuses, status = store.column("status"), query.status
+            rows = self.postings("status").get(status, ())
+            criteria.append((
+                len(rows), lambda rows=rows: rows,
+                lambda candidates: [row for row in candidates if statuses[row] == status]
+            ))
+
+        if query.colors is not None:
+            colors = store.column("color")
+            codes = {store.color_code(color) for color in query.colors} - {None}
+            postings = self.postings("color")
+            lists = [postings.get(code, ()) for code in codes]
+            criteria.append((
+                sum(map(len, lists)),
+                lambda lists=lists: [row for rows in lists for row in rows],
+                lambda candidates, codes=codes: [
+                    row for row in candidates if colors[row] in codes
+                ]
+            ))
+
+        for field in query.failed:
+            criteria.append(self._failed_criterion(field))
+
+        for field, rng in query.ranges.items():
+            index = self.sorted_index(field)
+            criteria.append((
+                index.estimate(rng),
+                lambda index=index, rng=rng: index.rows(rng),
+                lambda candidates, column=index.column, rng=rng: rng.filter(column, candidates)
+            ))
+
+        if not criteria:
+            rows = list(store.live_rows())
+            return rows if query.limit is None else rows[:query.limit]
+
+        # O critério mais seletivo gera as candidatas; os demais as filtram,
+        # do mais para o menos seletivo
+        criteria.sort(key=lambda criterion: criterion[0])
+        candidates = criteria[0][1]()
+        for _, _, keep in criteria[1:]:
+            if not candidates:
+                break
+            candidates = keep(candidates)
+
+        result = sorted(filter(store.is_live, candidates))
+        return result if query.limit is None else result[:query.limit]
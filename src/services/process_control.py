@@ -0,0 +1,581 @@
+"""
+Controle estatístico de processo (CEP) para peso e comprimento.
+
+Cada campo numérico tem média e variância em fluxo (Welford), cartas de
+controle CUSUM e EWMA e os índices de capacidade Cp/Cpk em relação aos
+limites das regras de qualidade. A atualização é O(1) por peça e nenhum
+histórico é guardado: apenas os acumuladores e os alarmes mais recentes.
+Lotes grandes entram pelo resumo do lote e por uma amostra das leituras
+(ver ProcessControl).
+
+As cartas respondem a deslocamentos pequenos e persistentes da média
+(frações do desvio-padrão), de modo que o alarme costuma vir antes de as
+peças saírem da especificação. A referência (alvo e sigma) vem das
+primeiras `warmup` peças, ou de valores fixos informados.
+"""
+
+import math
+from collections import deque
+from itertools import repeat
+from operator import mul, sub
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..validators.rules import RuleSet
+
+# Campos numéricos acompanhados
+SPC_FIELDS: Tuple[str, ...] = ("weight", "length")
+
+DEFAULT_WARMUP = 100
+DEFAULT_MAX_ALARMS = 100
+
+# Leituras de um lote que passam pelas cartas; acima disso, uma amostra
+DEFAULT_BATCH_SAMPLE = 10_000
+
+# Parâmetros usuais das cartas: CUSUM tabular com folga k = 0,5σ e
+# intervalo de decisão h = 5σ; EWMA com λ = 0,2 e limites de 3σ
+CUSUM_K = 0.5
+CUSUM_H = 5.0
+EWMA_LAMBDA = 0.2
+EWMA_L = 3.0
+
+# Sigma mínimo, como fração da tolerância, quando a referência não varia
+_MIN_SIGMA_FRACTION = 1 / 600
+
+
+class RunningStatistics:
+    """
+    Média, variância, mínimo e máximo em fluxo (algoritmo de Welford).
+
+    Numericamente estável e O(1) por valor, sem guardar os valores.
+    """
+
+    __slots__ = ("count", "mean", "_m2", "minimum", "maximum")
+
+    def __init__(self):
+        self.clear()
+
+    def add(self, value: float) -> None:
+        """Acrescenta um valor."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    @property
+    def variance(self) -> float:
+        """Variância amostral (0 com menos de dois valores)."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self) -> float:
+        """Desvio-padrão amostral."""
+        return math.sqrt(self.variance)
+
+    def add_many(self, values: Sequence[float]) -> None:
+        """
+        Acrescenta um lote pelo resumo (contagem, média, M2, mín., máx.).
+
+        O resumo é calculado com funções embutidas, deslocado pela média
+        atual para evitar cancelamento, e combinado ao acumulado pela
+        fórmula de Chan et al.; o resultado difere de add() valor a valor
+        apenas por arredondamento.
+        """
+        size = len(values)
+        if not size:
+            return
+        shift = self.mean if self.count else values[0]
+        deviations = list(map(sub, values, repeat(shift)))
+        total = sum(deviations)
+        batch_mean = total / size
+        batch_m2 = sum(map(mul, deviations, deviations)) - total * batch_mean
+        count = self.count + size
+        delta = shift + batch_mean - self.mean
+        self._m2 += max(batch_m2, 0.0) + delta * delta * self.count * size / count
+        self.mean += delta * size / count
+        self.count = count
+        self.minimum = min(self.minimum, min(values))
+        self.maximum = max(self.maximum, max(values))
+
+    def get_state(self) -> List[float]:
+        return [self.count, self.mean, self._m2, self.minimum, self.maximum]
+
+    def set_state(self, state: Sequence[float]) -> None:
+        self.count, self.mean, self._m2, self.minimum, self.maximum = state
+        self.count = int(self.count)
+
+    def clear(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+
+class CusumChart:
+    """
+    CUSUM tabular bilateral.
+
+    Acumula os desvios acima de alvo + kσ (lado alto) e abaixo de
+    alvo - kσ (lado baixo); sinaliza quando um acumulado passa de hσ e
+    reinicia aquele lado.
+
+    Args:
+        target: Média de referência
+        sigma: Desvio-padrão de referência
+        k: Folga, em desvios-padrão
+        h: Intervalo de decisão, em desvios-padrão
+    """
+
+    __slots__ = ("target", "sigma", "k", "h", "high", "low", "_slack", "_limit")
+
+    def __init__(self, target: float, sigma: float, k: float = CUSUM_K, h: float = CUSUM_H):
+        self.target = target
+        self.sigma = sigma
+        self.k = k
+        self.h = h
+        self.high = self.low = 0.0
+        self._slack = k * sigma
+        self._limit = h * sigma
+
+    def update(self, value: float) -> int:
+        """
+        Acrescenta uma leitura.
+
+        Returns:
+            1 se sinalizou deslocamento para cima, -1 para baixo, 0 se não
+        """
+        deviation = value - self.target
+        high = self.high + deviation - self._slack
+        low = self.low - deviation - self._slack
+        self.high = high if high > 0.0 else 0.0
+        self.low = low if low > 0.0 else 0.0
+        if self.high > self._limit:
+            self.high = 0.0
+            return 1
+        if self.low > self._limit:
+            self.low = 0.0
+            return -1
+        return 0
+
+
+class EwmaChart:
+    """
+    Carta EWMA (média móvel exponencialmente ponderada).
+
+    z = λ·x + (1 - λ)·z, com limites alvo ± Lσ·√(λ/(2-λ)·(1-(1-λ)^2i)),
+    que se abrem nas primeiras leituras até o valor assintótico. Sinaliza
+    ao sair dos limites e só volta a sinalizar depois de retornar.
+
+    Args:
+        target: Média de referência
+        sigma: Desvio-padrão de referência
+        smoothing: λ, peso da leitura mais recente (0 < λ <= 1)
+        width: L, largura dos limites em desvios-padrão
+    """
+
+    __slots__ = ("target", "sigma", "smoothing", "width", "value", "out", "_decay", "_factor")
+
+    def __init__(
+        self,
+        target: float,
+        sigma: float,
+        smoothing: float = EWMA_LAMBDA,
+        width: float = EWMA_L
+    ):
+        if not 0.0 < smoothing <= 1.0:
+            raise ValueError("O fator de suavização deve estar em (0, 1]")
+        self.target = target
+        self.sigma = sigma
+        self.smoothing = smoothing
+        self.width = width
+        self.value = target
+        self.out = 0
+        self._decay = 1.0
+        self._factor = width * sigma * math.sqrt(smoothing / (2.0 - smoothing))
+
+    def limit(self) -> float:
+        """Meia-largura atual dos limites de controle."""
+        return self._factor * math.sqrt(1.0 - self._decay)
+
+    def update(self, value: float) -> int:
+        """
+        Acrescenta uma leitura.
+
+        Returns:
+            1 ao sair pelo limite superior, -1 pelo inferior, 0 caso contrário
+        """
+        keep = 1.0 - self.smoothing
+        self.value = self.smoothing * value + keep * self.value
+        decay = self._decay
+        if decay > 1e-12:
+            decay *= keep * keep
+            self._decay = decay
+        limit = self._factor * math.sqrt(1.0 - decay)
+        deviation = self.value - self.target
+        side = 1 if deviation > limit else -1 if deviation < -limit else 0
+        if side == self.out:
+            return 0
+        self.out = side
+        return side
+
+
+class FieldControl:
+    """
+    CEP de um campo: estatísticas da execução, cartas e capacidade.
+
+    Até a referência ser definida (primeiras `warmup` leituras, quando
+    target/sigma não são informados) as leituras só alimentam as
+    estatísticas. As cartas usam a referência fixa a partir daí.
+
+    Args:
+        field: Nome do campo ('weight' ou 'length')
+        lower: Limite inferior de especificação (ou None)
+        upper: Limite superior de especificação (ou None)
+        target: Média de referência (padrão: média da referência inicial)
+        sigma: Desvio-padrão de referência (padrão: da referência inicial)
+        warmup: Leituras usadas para estimar a referência
+    """
+
+    def __init__(
+        self,
+        field: str,
+        lower: Optional[float] = None,
+        upper: Optional[float] = None,
+        target: Optional[float] = None,
+        sigma: Optional[float] = None,
+        warmup: int = DEFAULT_WARMUP
+    ):
+        self.field = field
+        self.lower = lower
+        self.upper = upper
+        self.fixed_target = target
+        self.fixed_sigma = sigma
+        self.warmup = max(2, warmup)
+        self.statistics = RunningStatistics()
+        self._baseline = RunningStatistics()
+        self.cusum: Optional[CusumChart] = None
+        self.ewma: Optional[EwmaChart] = None
+        if target is not None and sigma is not None:
+            self._start_charts(target, sigma)
+
+    def _min_sigma(self) -> float:
+        if self.lower is not None and self.upper is not None and self.upper > self.lower:
+            return (self.upper - self.lower) * _MIN_SIGMA_FRACTION
+        return 1e-9
+
+    def _start_charts(self, target: float, sigma: float) -> None:
+        sigma = max(sigma, self._min_sigma())
+        self.cusum = CusumChart(target, sigma)
+        self.ewma = EwmaChart(target, sigma)
+
+    def update(self, value: float) -> Tuple[int, int]:
+        """
+        Acrescenta uma leitura.
+
+        Returns:
+            Sinais (CUSUM, EWMA): 1 para cima, -1 para baixo, 0 sem alarme
+        """
+        self.statistics.add(value)
+        return self._chart(value)
+
+    def _chart(self, value: float) -> Tuple[int, int]:
+        """Passo das cartas (ou da referência inicial) para uma leitura."""
+        cusum = self.cusum
+        if cusum is not None:
+            return cusum.update(value), self.ewma.update(value)
+        self._add_baseline(value)
+        return 0, 0
+
+    def _add_baseline(self, value: float) -> None:
+        """Acumula a referência inicial e liga as cartas quando completa."""
+        baseline = self._baseline
+        baseline.add(value)
+        if baseline.count >= self.warmup:
+            target = self.fixed_target if self.fixed_target is not None else baseline.mean
+            sigma = self.fixed_sigma if self.fixed_sigma is not None else baseline.stdev
+            self._start_charts(target, sigma)
+
+    def update_many(
+        self, values: Sequence[float], sample: Optional[int] = None
+    ) -> List[Tuple[int, int, int]]:
+        """
+        Acrescenta um lote de leituras, na ordem.
+
+        Sem sample (ou com o lote dentro dele) cada leitura passa por
+        update(), com o mesmo resultado da chamada peça a peça. Em lotes
+        maiores as estatísticas recebem o resumo do lote inteiro
+        (RunningStatistics.add_many) e as cartas, uma amostra de leituras
+        igualmente espaçadas, com no máximo sample leituras.
+
+        Returns:
+            Sinais (posição no lote, CUSUM, EWMA) das leituras que alarmaram
+        """
+        size = len(values)
+        if sample is None or size <= sample:
+            positions: Sequence[int] = range(size)
+            step = self.update
+        else:
+            self.statistics.add_many(values)
+            positions = range(0, size, -(-size // sample))
+            step = self._chart
+        signals: List[Tuple[int, int, int]] = []
+        for index in positions:
+            cusum, ewma = step(values[index])
+            if cusum or ewma:
+                signals.append((index, cusum, ewma))
+        return signals
+
+    def capability(self) -> Dict[str, Any]:
+        """
+        Índices de capacidade da execução.
+
+        Cp = (LSE - LIE) / 6σ e Cpk = min(LSE - μ, μ - LIE) / 3σ, com a
+        média e o desvio-padrão de todas as leituras. Com um só limite,
+        Cp fica None e Cpk usa o lado existente.
+
+        Returns:
+            Dicionário com count, mean, stdev, minimum, maximum, lower,
+            upper, cp, cpk, target e sigma (referência das cartas) e os
+            valores atuais de cusum_high, cusum_low e ewma
+        """
+        stats = self.statistics
+        sigma = stats.stdev
+        cp = cpk = None
+        if stats.count > 1 and sigma > 0:
+            if self.lower is not None and self.upper is not None:
+                cp = (self.upper - self.lower) / (6 * sigma)
+            sides = [
+                distance for distance in (
+                    None if self.upper is None else self.upper - stats.mean,
+                    None if self.lower is None else stats.mean - self.lower,
+                ) if distance is not None
+            ]
+            if sides:
+                cpk = min(sides) / (3 * sigma)
+        cusum, ewma = self.cusum, self.ewma
+        return {
+            "count": stats.count,
+            "mean": stats.mean if stats.count else None,
+            "stdev": sigma if stats.count > 1 else None,
+            "minimum": stats.minimum if stats.count else None,
+            "maximum": stats.maximum if stats.count else None,
+            "lower": self.lower,
+            "upper": self.upper,
+            "cp": cp,
+            "cpk": cpk,
+            "target": cusum.target if cusum else None,
+            "sigma": cusum.sigma if cusum else None,
+            "cusum_high": cusum.high if cusum else None,
+            "cusum_low": cusum.low if cusum else None,
+            "ewma": ewma.value if ewma else None,
+        }
+
+    def get_state(self) -> Dict[str, Any]:
+        cusum, ewma = self.cusum, self.ewma
+        return {
+            "statistics": self.statistics.get_state(),
+            "baseline": self._baseline.get_state(),
+            "charts": None if cusum is None else {
+                "target": cusum.target, "sigma": cusum.sigma,
+                "cusum": [cusum.high, cusum.low],
+                "ewma": [ewma.value, ewma.out, ewma._decay],
+            },
+        }
+
+    def set_state(self, state: Dict[str, Any]) -> None:
+        self.statistics.set_state(state["statistics"])
+        self._baseline.set_state(state["baseline"])
+        charts = state.get("charts")
+        if charts is None:
+            self.cusum = self.ewma = None
+            return
+        self._start_charts(charts["target"], charts["sigma"])
+        self.cusum.high, self.cusum.low = charts["cusum"]
+        self.ewma.value, self.ewma.out, self.ewma._decay = charts["ewma"]
+
+    def clear(self) -> None:
+        self.statistics.clear()
+        self._baseline.clear()
+        self.cusum = self.ewma = None
+        if self.fixed_target is not None and self.fixed_sigma is not None:
+            self._start_charts(self.fixed_target, self.fixed_sigma)
+
+
+def specification_limits(rules: RuleSet, field: str) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Limites de especificação de um campo segundo as regras.
+
+    Com várias regras sobre o mesmo campo vale a faixa mais estreita.
+
+    Returns:
+        Tupla (inferior, superior); None onde não houver limite
+    """
+    lower = upper = None
+    for rule in rules.rules:
+        if rule.field != field:
+            continue
+        if rule.minimum is not None and (lower is None or rule.minimum > lower):
+            lower = rule.minimum
+        if rule.maximum is not None and (upper is None or rule.maximum < upper):
+            upper = rule.maximum
+    return lower, upper
+
+
+class ProcessControl:
+    """
+    CEP de peso e comprimento alimentado pelos cadastros do QualityService.
+
+    Como as janelas móveis, conta cadastros (eventos): remoções posteriores
+    não alteram as estatísticas. Os alarmes mais recentes ficam em
+    self.alarms (no máximo max_alarms) e alarm_counts conta todos.
+
+    Lotes com mais de batch_sample leituras (record_batch) entram nas
+    estatísticas e em Cp/Cpk pelo resumo do lote e nas cartas por uma
+    amostra igualmente espaçada; com batch_sample=None todas as leituras
+    passam pelas cartas, como em record.
+
+    Args:
+        rules: Regras de qualidade (limites de especificação)
+        warmup: Leituras usadas para estimar alvo e sigma das cartas
+        targets: Alvo fixo por campo (opcional)
+        sigmas: Sigma fixo por campo (opcional)
+        max_alarms: Alarmes recentes guardados
+        batch_sample: Leituras de um lote enviadas às cartas (None: todas)
+    """
+
+    def __init__(
+        self,
+        rules: Optional[RuleSet] = None,
+        warmup: int = DEFAULT_WARMUP,
+        targets: Optional[Dict[str, float]] = None,
+        sigmas: Optional[Dict[str, float]] = None,
+        max_alarms: int = DEFAULT_MAX_ALARMS,
+        batch_sample: Optional[int] = DEFAULT_BATCH_SAMPLE
+    ):
+        targets, sigmas = targets or {}, sigmas or {}
+        self.batch_sample = batch_sample
+        self.fields = {
+            field: FieldControl(
+                field, target=targets.get(field), sigma=sigmas.get(field), warmup=warmup
+            )
+            for field in SPC_FIELDS
+        }
+        self._weight = self.fields["weight"]
+        self._length = self.fields["length"]
+        self.alarms: deque = deque(maxlen=max_alarms)
+        self.alarm_counts: Dict[str, int] = {}
+        if rules is not None:
+            self.set_rules(rules)
+
+    def set_rules(self, rules: RuleSet) -> None:
+        """Atualiza os limites de especificação (as estatísticas continuam)."""
+        for field, control in self.fields.items():
+            control.lower, control.upper = specification_limits(rules, field)
+
+    def _signal(
+        self, field: str, cusum: int, ewma: int, value: float, sequence: int,
+        piece_id: Optional[str], timestamp: Optional[float]
+    ) -> None:
+        """Registra os alarmes das cartas que sinalizaram para uma leitura."""
+        for chart, direction in (("cusum", cusum), ("ewma", ewma)):
+            if not direction:
+                continue
+            key = f"{chart}:{field}"
+            self.alarm_counts[key] = self.alarm_counts.get(key, 0) + 1
+            self.alarms.append({
+                "chart": chart,
+                "field": field,
+                "direction": "alta" if direction > 0 else "baixa",
+                "value": value,
+                "sequence": sequence,
+                "piece_id": piece_id,
+                "timestamp": timestamp,
+            })
+
+    def record(
+        self,
+        weight: float,
+        length: float,
+        piece_id: Optional[str] = None,
+        timestamp: Optional[float] = None
+    ) -> None:
+        """Acrescenta as leituras de uma peça (O(1))."""
+        cusum, ewma = self._weight.update(weight)
+        if cusum or ewma:
+            self._signal(
+                "weight", cusum, ewma, weight, self._weight.statistics.count,
+                piece_id, timestamp
+            )
+        cusum, ewma = self._length.update(length)
+        if cusum or ewma:
+            self._signal(
+                "length", cusum, ewma, length, self._length.statistics.count,
+                piece_id, timestamp
+            )
+
+    def record_batch(
+        self,
+        weights: Sequence[float],
+        lengths: Sequence[float],
+        piece_ids: Optional[Sequence[str]] = None,
+        timestamp: Optional[float] = None
+    ) -> None:
+        """
+        Acrescenta um lote de leituras.
+
+        Até batch_sample leituras, produz os mesmos estados e alarmes (na
+        mesma ordem) que chamar record peça a peça; acima disso, ver
+        FieldControl.update_many.
+        """
+        signals = []
+        for order, (field, values) in enumerate((("weight", weights), ("length", lengths))):
+            control = self.fields[field]
+            start = control.statistics.count
+            for index, cusum, ewma in control.update_many(values, self.batch_sample):
+                signals.append(
+                    (index, order, field, cusum, ewma, values[index], start + index + 1)
+                )
+        signals.sort(key=lambda signal: (signal[0], signal[1]))
+        for index, _, field, cusum, ewma, value, sequence in signals:
+            piece_id = piece_ids[index] if piece_ids is not None else None
+            self._signal(field, cusum, ewma, value, sequence, piece_id, timestamp)
+
+    def capability(self) -> Dict[str, Dict[str, Any]]:
+        """Índices de capacidade por campo (ver FieldControl.capability)."""
+        return {field: control.capability() for field, control in self.fields.items()}
+
+    def get_state(self) -> Dict[str, Any]:
+        """Estado serializável em JSON (ver set_state)."""
+        return {
+            "fields": {field: control.get_state() for field, control in self.fields.items()},
+            "alarms": list(self.alarms),
+            "alarm_counts": dict(self.alarm_counts),
+        }
+
+    def set_state(self, state: Dict[str, Any]) -> bool:
+        """
+        Repõe o estado salvo por get_state.
+
+        Returns:
+            False (sem alterar nada) se os campos salvos forem diferentes
+        """
+        saved = state.get("fields", {})
+        if set(saved) != set(self.fields):
+            return False
+        for field, control in self.fields.items():
+            control.set_state(saved[field])
+        self.alarms.clear()
+        self.alarms.extend(state.get("alarms", ()))
+        self.alarm_counts = dict(state.get("alarm_counts", {}))
+        return True
+
+    def clear(self) -> None:
+        """Descarta estatísticas, cartas e alarmes."""
+        for control in self.fields.values():
+            control.clear()
+        self.alarms.clear()
+        self.alarm_counts = {}
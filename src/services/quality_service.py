@@ -2,19 +2,149 @@
 Serviço de controle de qualidade para gerenciamento de peças.
 """
 
-from typing import List, Dict, Any
+import time
+from array import array
+from typing import List, Dict, Any, Callable, Iterator, Optional, Sequence, Collection, Tuple
 from ..models.piece import Piece
+from ..models.piece_store import PieceStore, PieceStatus
 from ..validators.quality_validator import QualityValidator
+from ..validators.rules import Rule, RuleSet
+from .piece_query import PieceIndex, PieceQuery
+from .process_control import ProcessControl
+from .rolling_metrics import RollingQualityMetrics, count_failures
 
 
 class QualityService:
     """
     Gerencia o processo de inspeção e classificação de peças.
+
+    As peças ficam em um PieceStore colunar indexado por ID, que preserva a
+    ordem de cadastro; busca e remoção por ID são O(1) e as peças retornadas
+    são visões sobre as linhas do armazenamento.
+
+    Cada cadastro recebe o instante de clock() e alimenta as métricas em
+    janelas móveis (self.metrics, ver get_rolling_statistics) e o controle
+    estatístico de peso e comprimento (self.spc, ver
+    get_process_capability).
+
+    Com um barramento em self.events (src.events.EventBus), cadastros e
+    remoções são publicados como PieceRegistered, PieceRejected e
+    PieceRemoved; os assinantes consomem em suas próprias filas.
     """
 
-    def __init__(self):
-        self.pieces: List[Piece] = []
+    def __init__(
+        self,
+        journal=None,
+        rules: Optional[RuleSet] = None,
+        metrics: Optional[RollingQualityMetrics] = None,
+        clock: Callable[[], float] = time.time,
+        spc: Optional[ProcessControl] = None,
+        events=None
+    ):
+        self._pieces = PieceStore()
+        self._index: Optional[PieceIndex] = None
         self._next_piece_number = 1
+        self.spc = spc if spc is not None else ProcessControl()
+        # Journal opcional (src.persistence.Journal) para durabilidade
+        self.journal = journal
+        self.clock = clock
+        self.metrics = metrics if metrics is not None else RollingQualityMetrics(clock=clock)
+        self.rules = rules or QualityValidator.rules
+
+        # Barramento de eventos opcional (src.events.EventBus)
+        self.events = events
+
+        # Contadores incrementais para get_statistics em O(1)
+        self._approved_count = 0
+        self._rejected_count = 0
+        # Reprovações por regra (a regra da geração que validou cada peça)
+        self._failure_counts: Dict[Rule, int] = {}
+
+    @property
+    def rules(self) -> RuleSet:
+        """
+        Regras de qualidade aplicadas aos novos cadastros.
+
+        Podem ser trocadas a qualquer momento (ex.: RuleRegistry.bind na
+        recarga dos arquivos); peças já cadastradas mantêm seus bits de falha
+        e continuam ligadas às regras que as validaram, que montam os seus
+        motivos e rótulos (ver PieceStore.rules_for_row).
+        """
+        return self._rules
+
+    @rules.setter
+    def rules(self, rules: RuleSet) -> None:
+        self._rules = rules
+        self._pieces.rules = rules
+        self.spc.set_rules(rules)
+        self.metrics.set_labels(rules.labels_for())
+        if self.journal is not None:
+            self.journal.record_rules(rules)
+
+    @property
+    def store(self) -> PieceStore:
+        """Armazenamento colunar das peças (snapshots e índices)."""
+        return self._pieces
+
+    @property
+    def next_piece_number(self) -> int:
+        """Número do próximo ID automático (P001, P002, ...)."""
+        return self._next_piece_number
+
+    def restore_next_piece_number(self, number: int) -> None:
+        """Repõe o número do próximo ID automático (recuperação)."""
+        self._next_piece_number = number
+
+    @property
+    def pieces(self) -> Sequence[Piece]:
+        """
+        Peças registradas, na ordem de cadastro.
+
+        Sequência somente leitura que acompanha o registro, sem copiar as
+        peças: len() e iteração não dependem de uma cópia O(N) a cada acesso
+        (use get_all_pieces para uma lista independente).
+        """
+        return self._pieces.views(self._pieces.live_rows())
+
+    def _account(self, piece: Piece, delta: int) -> None:
+        """Atualiza os contadores de estatística com a entrada/saída de uma peça."""
+        if piece.is_approved():
+            self._approved_count += delta
+        elif piece.is_rejected():
+            self._rejected_count += delta
+            flags, counts = piece.rejection_flags, self._failure_counts
+            for rule in piece.rules.rules:
+                if flags & rule.bit:
+                    counts[rule] = counts.get(rule, 0) + delta
+
+    def _generate_id(self, reserved: Collection[str] = ()) -> str:
+        """Gera o próximo ID automático livre (fora do registro e de reserved)."""
+        piece_id = f"P{self._next_piece_number:03d}"
+        self._next_piece_number += 1
+        while piece_id in self._pieces or piece_id in reserved:
+            piece_id = f"P{self._next_piece_number:03d}"
+            self._next_piece_number += 1
+        return piece_id
+
+    def _generate_ids(self, count: int) -> List[str]:
+        """
+        Gera count IDs automáticos de uma vez.
+
+        Os números seguintes ao contador viram IDs em uma passada; a partir
+        de P100 o preenchimento com zeros não altera o número, e f"P{n}"
+        custa menos da metade de f"P{n:03d}". Só se algum ID já estiver em
+        uso (ID personalizado no formato P001) os IDs são gerados um a um,
+        pulando os ocupados.
+        """
+        start = self._next_piece_number
+        end = start + count
+        padded = min(max(start, 100), end)
+        piece_ids = [f"P{number:03d}" for number in range(start, padded)]
+        piece_ids += [f"P{number}" for number in range(padded, end)]
+        if self._pieces.contains_any(piece_ids):
+            return [self._generate_id() for _ in range(count)]
+        self._next_piece_number = end
+        return piece_ids
 
     def register_piece(
         self,
@@ -34,53 +164,207 @@ class QualityService:
 
         Returns:
             Peça registrada e validada
+
+        Raises:
+            ValueError: Se já existir uma peça com o mesmo ID
         """
         # Gerar ID se não fornecido
         if custom_id is None:
-            custom_id = f"P{self._next_piece_number:03d}"
-            self._next_piece_number += 1
+            custom_id = self._generate_id()
+        elif custom_id in self._pieces:
+            raise ValueError(f"Já existe uma peça com o ID '{custom_id}'")
 
         # Criar peça
         piece = Piece(
             piece_id=custom_id,
             weight=weight,
             color=color,
-            length=length
+            length=length,
+            registered_at=self.clock()
         )
 
         # Aplicar validação
-        QualityValidator.apply_validation(piece)
+        QualityValidator.apply_validation(piece, self._rules)
 
         # Registrar peça
-        self.pieces.append(piece)
+        piece = self._pieces.add(piece)
+        self._account(piece, 1)
+        self.metrics.record(piece.registered_at, piece.rejection_flags)
+        self.spc.record(weight, length, piece.piece_id, piece.registered_at)
+
+        if self.journal is not None:
+            self.journal.record_register(piece)
+        if self.events is not None:
+            self.events.piece_registered(piece)
 
         return piece
 
+    def register_pieces(
+        self,
+        weights: Sequence[float],
+        colors: Sequence[str],
+        lengths: Sequence[float],
+        custom_ids: Optional[Sequence[str]] = None
+    ) -> Sequence[Piece]:
+        """
+        Registra um lote de leituras em formato colunar.
+
+        A validação é feita de uma vez por QualityValidator.validate_batch;
+        os motivos de reprovação só são montados quando consultados. Todas
+        as peças do lote recebem o mesmo instante de cadastro.
+
+        O retorno é uma sequência somente leitura (StoredPieces) sobre as
+        linhas ocupadas: cada peça só vira objeto quando acessada.
+
+        Args:
+            weights: Pesos em gramas
+            colors: Cores
+            lengths: Comprimentos em centímetros
+            custom_ids: IDs personalizados (opcional, um por leitura; entradas
+                None recebem ID automático)
+
+        Returns:
+            Peças registradas, na ordem das leituras
+
+        Raises:
+            ValueError: Se algum ID estiver repetido no lote ou já registrado
+        """
+        _, flags = QualityValidator.validate_batch(weights, colors, lengths, self._rules)
+
+        if custom_ids is None:
+            custom_ids = self._generate_ids(len(flags))
+        else:
+            if len(custom_ids) != len(flags):
+                raise ValueError("custom_ids deve ter o mesmo tamanho do lote")
+            given = [piece_id for piece_id in custom_ids if piece_id is not None]
+            if len(set(given)) != len(given):
+                raise ValueError("custom_ids contém IDs repetidos")
+            if self._pieces.contains_any(given):
+                duplicated = {piece_id for piece_id in given if piece_id in self._pieces}
+                raise ValueError(
+                    f"Já existem peças com os IDs: {', '.join(sorted(duplicated))}"
+                )
+            if len(given) != len(custom_ids):
+                reserved = set(given)
+                custom_ids = [
+                    self._generate_id(reserved) if piece_id is None else piece_id
+                    for piece_id in custom_ids
+                ]
+
+        now = self.clock()
+        timestamps = array("d", [now]) * len(flags)
+        rows, failures = self._ingest(custom_ids, weights, colors, lengths, flags, timestamps)
+        self.metrics.record_batch(now, flags, failures)
+        self.spc.record_batch(weights, lengths, custom_ids, now)
+
+        if self.journal is not None:
+            self.journal.record_registers(
+                custom_ids, weights, colors, lengths, flags, timestamps
+            )
+        if self.events is not None:
+            self.events.pieces_registered(
+                custom_ids, weights, colors, lengths, flags, timestamps
+            )
+
+        return self._pieces.views(rows)
+
+    def restore_pieces(
+        self,
+        piece_ids: Sequence[str],
+        weights: Sequence[float],
+        colors: Sequence[str],
+        lengths: Sequence[float],
+        flags: bytearray,
+        timestamps: Optional[Sequence[float]] = None
+    ) -> None:
+        """
+        Recarrega peças já validadas (snapshot/journal) sem revalidar.
+
+        Os cadastros ainda dentro das janelas móveis voltam para as métricas,
+        e todas as leituras voltam para o controle estatístico, na ordem.
+
+        Args:
+            piece_ids: IDs das peças
+            weights: Pesos em gramas
+            colors: Cores
+            lengths: Comprimentos em centímetros
+            flags: Bits de falha registrados de cada peça
+            timestamps: Instantes de cadastro (None se desconhecidos)
+        """
+        self._ingest(piece_ids, weights, colors, lengths, flags, timestamps)
+        if timestamps is not None:
+            self.metrics.record_series(timestamps, flags)
+        self.spc.record_batch(weights, lengths, piece_ids)
+
+    def _ingest(self, piece_ids, weights, colors, lengths, flags: bytearray, timestamps):
+        """
+        Grava um lote no armazenamento e atualiza os contadores.
+
+        Returns:
+            Tupla (linhas ocupadas, falhas por regra no lote)
+        """
+        rows = self._pieces.extend(piece_ids, weights, colors, lengths, flags, timestamps)
+
+        # Contabilizar o lote de uma vez, contando as ocorrências de cada bit
+        approved = flags.count(0)
+        self._approved_count += approved
+        self._rejected_count += len(flags) - approved
+        failures = count_failures(flags)
+        counts = self._failure_counts
+        for rule, count in zip(self._rules.rules, failures):
+            if count:
+                counts[rule] = counts.get(rule, 0) + count
+
+        return rows, failures
+
     def remove_piece(self, piece_id: str) -> bool:
         """
         Remove uma peça do registro.
 
+        A peça continua na caixa em que foi guardada; os front ends usam
+        withdraw_piece (src.services.removal), que também a retira da caixa.
+
         Args:
             piece_id: ID da peça a ser removida
 
         Returns:
             True se removida, False se não encontrada
         """
-        for i, piece in enumerate(self.pieces):
-            if piece.piece_id == piece_id:
-                self.pieces.pop(i)
-                return True
-        return False
+        piece = self._pieces.remove(piece_id)
+        if piece is None:
+            return False
+
+        self._account(piece, -1)
+
+        if self.journal is not None:
+            self.journal.record_remove(piece_id)
+        if self.events is not None:
+            self.events.piece_removed(piece_id)
+
+        return True
 
     def get_approved_pieces(self) -> List[Piece]:
         """Retorna lista de peças aprovadas."""
-        return [p for p in self.pieces if p.is_approved()]
+        return self._pieces.select(PieceStatus.APROVADA)
 
     def get_rejected_pieces(self) -> List[Piece]:
         """Retorna lista de peças reprovadas."""
-        return [p for p in self.pieces if p.is_rejected()]
+        return self._pieces.select(PieceStatus.REPROVADA)
+
+    def iter_records(self, status: Optional[str] = None) -> Iterator[Tuple]:
+        """
+        Percorre as peças como tuplas, com memória constante (para exportação).
+
+        Args:
+            status: 'aprovada', 'reprovada' ou None para todas
 
-    def get_piece_by_id(self, piece_id: str) -> Piece:
+        Yields:
+            Tuplas (id, peso, cor, comprimento, status, motivo_reprovacao)
+        """
+        code = None if status is None else PieceStatus.from_label(status)
+        return self._pieces.iter_records(code)
+
+    def get_piece_by_id(self, piece_id: str) -> Optional[Piece]:
         """
         Busca uma peça por ID.
 
@@ -90,43 +374,154 @@ class QualityService:
         Returns:
             Peça encontrada ou None
         """
-        for piece in self.pieces:
-            if piece.piece_id == piece_id:
-                return piece
-        return None
+        return self._pieces.get(piece_id)
+
+    def get_pieces_by_ids(self, piece_ids: Sequence[str]) -> List[Optional[Piece]]:
+        """
+        Busca várias peças por ID de uma só vez.
+
+        Args:
+            piece_ids: IDs das peças
+
+        Returns:
+            Peças na mesma ordem (None para IDs não encontrados)
+        """
+        return self._pieces.get_many(piece_ids)
+
+    def query(self, query: Optional[PieceQuery] = None, **criteria) -> List[Piece]:
+        """
+        Consulta o histórico de peças pelos índices secundários.
+
+        Ex.: query(status="reprovada", failed="weight", color="verde",
+        since=t0, until=t1, min_length=18). Os índices de cada campo são
+        montados na primeira consulta que o usa e depois acompanham os
+        cadastros; a consulta só visita as linhas candidatas do critério
+        mais seletivo.
+
+        Args:
+            query: Consulta pronta (ex.: PieceQuery.parse(["length>18"]))
+            **criteria: Argumentos de PieceQuery, se query não for dada
+
+        Returns:
+            Peças ativas que atendem a todos os critérios, em ordem de cadastro
+
+        Raises:
+            ValueError: Se algum critério for inválido
+        """
+        if query is None:
+            query = PieceQuery(**criteria)
+        if self._index is None:
+            self._index = PieceIndex(self._pieces)
+        return [self._pieces.view(row) for row in self._index.search(query)]
 
     def get_all_pieces(self) -> List[Piece]:
         """Retorna todas as peças registradas."""
-        return self.pieces.copy()
+        return list(self._pieces)
+
+    def count_by_status(self) -> Dict[str, int]:
+        """
+        Conta as peças ativas por status percorrendo a coluna de status.
+
+        Ao contrário de get_statistics, não usa os contadores incrementais
+        (serve para conferi-los, ver check_consistency); custo O(N).
+
+        Returns:
+            Dicionário status -> quantidade ('pendente', 'aprovada', 'reprovada')
+        """
+        return {
+            status.label: count for status, count in self._pieces.count_by_status().items()
+        }
 
     def get_statistics(self) -> Dict[str, Any]:
         """
         Retorna estatísticas consolidadas.
 
+        Os valores vêm de contadores mantidos no cadastro e na remoção,
+        portanto o custo não depende da quantidade de peças.
+
         Returns:
             Dicionário com estatísticas das peças
         """
-        approved = self.get_approved_pieces()
-        rejected = self.get_rejected_pieces()
+        total = len(self._pieces)
 
-        # Consolidar motivos de reprovação
-        rejection_reasons = {}
-        for piece in rejected:
-            if piece.rejection_reason:
-                # Extrair cada motivo individual
-                reasons = piece.rejection_reason.split("; ")
-                for reason in reasons:
-                    rejection_reasons[reason] = rejection_reasons.get(reason, 0) + 1
+        # Motivos de reprovação por rótulo (regras de gerações diferentes
+        # com o mesmo rótulo são somadas)
+        rejection_reasons: Dict[str, int] = {}
+        for rule, count in self._failure_counts.items():
+            if count:
+                label = rule.label_for()
+                rejection_reasons[label] = rejection_reasons.get(label, 0) + count
 
         return {
-            "total_pieces": len(self.pieces),
-            "approved_count": len(approved),
-            "rejected_count": len(rejected),
+            "total_pieces": total,
+            "approved_count": self._approved_count,
+            "rejected_count": self._rejected_count,
             "rejection_reasons": rejection_reasons,
-            "approval_rate": len(approved) / len(self.pieces) * 100 if self.pieces else 0
+            "approval_rate": self._approved_count / total * 100 if total else 0
         }
 
+    def restore_counters(
+        self,
+        approved: int,
+        rejected: int,
+        failures: Sequence[Tuple[RuleSet, Sequence[int]]]
+    ) -> None:
+        """
+        Recarrega os contadores de estatística gravados por um snapshot.
+
+        Args:
+            approved: Peças aprovadas ativas
+            rejected: Peças reprovadas ativas
+            failures: Pares (RuleSet, reprovações por bit na ordem de
+                FLAG_BITS), um por geração de regras
+        """
+        self._approved_count = approved
+        self._rejected_count = rejected
+        counts: Dict[Rule, int] = {}
+        for rules, totals in failures:
+            for index, rule in enumerate(rules.rules):
+                if index < len(totals) and totals[index]:
+                    counts[rule] = counts.get(rule, 0) + totals[index]
+        self._failure_counts = counts
+
+    def get_rolling_statistics(self, now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Retorna as métricas das janelas móveis (1min, 15min e turno).
+
+        Args:
+            now: Fim das janelas (padrão: clock())
+
+        Returns:
+            Dicionário nome da janela -> métricas (ver RollingQualityMetrics.query)
+        """
+        return self.metrics.query(now)
+
+    def get_process_capability(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Retorna o controle estatístico de peso e comprimento da execução.
+
+        Returns:
+            Dicionário campo -> média, desvio-padrão, Cp, Cpk, limites e
+            estado das cartas (ver FieldControl.capability)
+        """
+        return self.spc.capability()
+
     def clear_all(self) -> None:
-        """Limpa todos os registros de peças."""
-        self.pieces.clear()
+        """
+        Limpa todos os registros de peças, as janelas móveis e o CEP.
+
+        As peças passam para um armazenamento novo: o antigo fica apenas
+        com as visões já entregues (ex.: peças guardadas em caixas), que
+        continuam lendo os próprios dados em vez das linhas novas.
+        """
+        self._pieces = PieceStore(self._pieces.rules)
+        self._index = None
         self._next_piece_number = 1
+        self._approved_count = 0
+        self._rejected_count = 0
+        self._failure_counts = {}
+        self.metrics.clear()
+        self.spc.clear()
+
+        if self.journal is not None:
+            self.journal.record_clear("quality")
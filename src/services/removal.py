@@ -0,0 +1,37 @@
+"""
+Remoção coordenada de peças: registro e caixa em uma única chamada.
+"""
+
+from typing import Optional, Tuple
+
+from ..models.box import Box
+from .quality_service import QualityService
+from .storage_service import StorageService
+
+
+def withdraw_piece(
+    quality_service: QualityService,
+    storage_service: StorageService,
+    piece_id: str,
+    reopen: bool = False
+) -> Tuple[bool, Optional[Box]]:
+    """
+    Remove uma peça do registro e a retira da caixa que a guarda.
+
+    É o ponto de entrada dos front ends (menu, modo batch, servidor e
+    shards) para remoções: chamar só QualityService.remove_piece deixaria
+    a peça na caixa (ver check_consistency). Aceita também um
+    LaneStorageService no lugar do StorageService.
+
+    Args:
+        quality_service: Serviço de qualidade
+        storage_service: Serviço de armazenamento
+        piece_id: ID da peça
+        reopen: Reabrir a caixa se ela estiver fechada
+
+    Returns:
+        Tupla (removida do registro, caixa de onde saiu ou None)
+    """
+    if not quality_service.remove_piece(piece_id):
+        return False, None
+    return True, storage_service.remove_piece(piece_id, reopen=reopen)
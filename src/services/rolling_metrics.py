@@ -0,0 +1,421 @@
+"""
+Métricas de qualidade em janelas móveis (último minuto, 15 minutos, turno).
+
+Cada janela é um anel de baldes de tempo de largura fixa. Um cadastro soma
+no balde do seu instante; um balde é reaproveitado (zerado) quando o tempo
+dá a volta no anel. O custo por peça é O(1) e a memória é fixa, qualquer
+que seja a duração da execução.
+
+As falhas de cada balde são contadas por rótulo, e não por bit: o mesmo bit
+pode significar regras diferentes antes e depois de uma troca de regras
+(ver RollingQualityMetrics.set_labels), e cada cadastro é rotulado com as
+regras que o validaram.
+"""
+
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from ..validators.rules import MAX_RULES
+
+# Janelas padrão: (nome, duração em segundos)
+DEFAULT_WINDOWS: Tuple[Tuple[str, float], ...] = (
+    ("1min", 60.0),
+    ("15min", 15 * 60.0),
+    ("turno", 8 * 3600.0),
+)
+
+DEFAULT_BUCKETS = 60
+
+# Bits de falha possíveis (um por regra)
+FLAG_BITS = tuple(1 << index for index in range(MAX_RULES))
+
+# Tabela de tradução por bit: byte -> 1 se o bit estiver ligado, senão 0
+_BIT_TABLES = tuple(
+    bytes(1 if value & flag else 0 for value in range(256)) for flag in FLAG_BITS
+)
+
+
+# Rótulos padrão de cada bit (quando as regras não nomeiam o bit)
+DEFAULT_LABELS = tuple(f"Regra {flag}" for flag in FLAG_BITS)
+
+# Índices dos bits ligados em cada valor de byte
+_BIT_INDEXES = tuple(
+    tuple(index for index in range(MAX_RULES) if value >> index & 1) for value in range(256)
+)
+
+
+def count_failures(flags: bytearray) -> List[int]:
+    """
+    Conta as ocorrências de cada bit de falha em um lote (em C, via translate).
+
+    Returns:
+        Lista com uma contagem por regra, na ordem dos bits
+    """
+    counts = [0] * MAX_RULES
+    if flags.count(0) != len(flags):
+        highest = max(flags)
+        for index, flag in enumerate(FLAG_BITS):
+            if flag > highest:
+                break
+            counts[index] = flags.translate(_BIT_TABLES[index]).count(1)
+    return counts
+
+
+class RollingWindow:
+    """
+    Janela móvel de duração fixa sobre um anel de baldes.
+
+    A resolução é a largura de um balde (duração / buckets): a janela cobre
+    os `buckets` baldes mais recentes, incluindo o balde corrente.
+
+    Args:
+        seconds: Duração da janela
+        buckets: Quantidade de baldes no anel
+    """
+
+    __slots__ = (
+        "seconds", "buckets", "width", "_epochs", "_totals", "_approved", "_failures",
+        "_start", "_end", "_current",
+    )
+
+    def __init__(self, seconds: float, buckets: int = DEFAULT_BUCKETS):
+        if seconds <= 0 or buckets < 1:
+            raise ValueError("A janela precisa de duração positiva e ao menos um balde")
+
+        self.seconds = seconds
+        self.buckets = buckets
+        self.width = seconds / buckets
+        # Época (índice absoluto do balde) guardada em cada posição do anel
+        self._epochs = [-1] * buckets
+        self._totals = [0] * buckets
+        self._approved = [0] * buckets
+        # Falhas por rótulo em cada posição (um dicionário por balde)
+        self._failures: List[Dict[str, int]] = [{} for _ in range(buckets)]
+        # Balde mais recente: intervalo [_start, _end) e posição no anel
+        self._start = self._end = 0.0
+        self._current = 0
+
+    def _slot(self, timestamp: float) -> int:
+        """
+        Retorna a posição do anel para o instante, zerando o balde se ele
+        pertencia a uma volta anterior (-1 se o instante já saiu do anel).
+        """
+        if self._start <= timestamp < self._end:
+            return self._current
+
+        epoch = int(timestamp // self.width)
+        slot = epoch % self.buckets
+        current = self._epochs[slot]
+        if current > epoch:
+            return -1
+        if current < epoch:
+            self._epochs[slot] = epoch
+            self._totals[slot] = 0
+            self._approved[slot] = 0
+            self._failures[slot] = {}
+
+        if timestamp >= self._end:
+            self._start = epoch * self.width
+            self._end = self._start + self.width
+            self._current = slot
+        return slot
+
+    def add(self, timestamp: float, flags: int, labels: Sequence[str] = DEFAULT_LABELS) -> None:
+        """Soma um cadastro com seus bits de falha (labels: rótulo de cada bit)."""
+        if self._start <= timestamp < self._end:
+            slot = self._current
+        else:
+            slot = self._slot(timestamp)
+            if slot < 0:
+                return
+        self._totals[slot] += 1
+        if flags:
+            failures = self._failures[slot]
+            for index in _BIT_INDEXES[flags]:
+                label = labels[index]
+                failures[label] = failures.get(label, 0) + 1
+        else:
+            self._approved[slot] += 1
+
+    def add_batch(
+        self,
+        timestamp: float,
+        flags: bytearray,
+        counts: Sequence[int],
+        labels: Sequence[str] = DEFAULT_LABELS
+    ) -> None:
+        """
+        Soma um lote cadastrado no mesmo instante.
+
+        Args:
+            timestamp: Instante do cadastro
+            flags: Bits de falha de cada peça
+            counts: Falhas por regra já contadas no lote (uma por bit)
+            labels: Rótulo de cada bit
+        """
+        slot = self._slot(timestamp)
+        if slot < 0:
+            return
+        self._totals[slot] += len(flags)
+        self._approved[slot] += flags.count(0)
+        failures = self._failures[slot]
+        for label, count in zip(labels, counts):
+            if count:
+                failures[label] = failures.get(label, 0) + count
+
+    def add_series(
+        self,
+        timestamps: Sequence[float],
+        flags: bytearray,
+        start: int = 0,
+        labels: Sequence[str] = DEFAULT_LABELS
+    ) -> None:
+        """
+        Soma cadastros com instantes crescentes, um lote por balde.
+
+        Args:
+            timestamps: Instantes em ordem crescente
+            flags: Bits de falha de cada cadastro
+            start: Primeira posição a considerar
+            labels: Rótulo de cada bit
+        """
+        position, size = start, len(timestamps)
+        while position < size:
+            epoch = int(timestamps[position] // self.width)
+            end = max(bisect_left(timestamps, (epoch + 1) * self.width, position), position + 1)
+            chunk = flags[position:end]
+            self.add_batch(timestamps[position], chunk, count_failures(chunk), labels)
+            position = end
+
+    def totals(self, now: float) -> Tuple[int, int, Dict[str, int]]:
+        """
+        Soma os baldes dentro da janela que termina em now.
+
+        Returns:
+            Tupla (cadastros, aprovadas, falhas por rótulo)
+        """
+        newest = int(now // self.width)
+        oldest = newest - self.buckets + 1
+        total = approved = 0
+        failures: Dict[str, int] = {}
+        for slot, epoch in enumerate(self._epochs):
+            if oldest <= epoch <= newest:
+                total += self._totals[slot]
+                approved += self._approved[slot]
+                for label, count in self._failures[slot].items():
+                    failures[label] = failures.get(label, 0) + count
+        return total, approved, failures
+
+    def get_state(self) -> Dict[str, Any]:
+        """Retorna os baldes em um dicionário serializável (ver set_state)."""
+        return {
+            "seconds": self.seconds,
+            "buckets": self.buckets,
+            "epochs": list(self._epochs),
+            "totals": list(self._totals),
+            "approved": list(self._approved),
+            "failures": [dict(failures) for failures in self._failures],
+        }
+
+    def set_state(self, state: Dict[str, Any], labels: Sequence[str] = DEFAULT_LABELS) -> bool:
+        """
+        Repõe os baldes salvos por get_state.
+
+        Estados antigos, com as falhas de cada balde em uma lista por bit,
+        são rotulados com labels.
+
+        Returns:
+            False (sem alterar a janela) se a duração ou a quantidade de
+            baldes forem diferentes das desta janela
+        """
+        if state.get("seconds") != self.seconds or state.get("buckets") != self.buckets:
+            return False
+        self._epochs = list(state["epochs"])
+        self._totals = list(state["totals"])
+        self._approved = list(state["approved"])
+        self._failures = [
+            dict(failures) if isinstance(failures, dict) else {
+                label: count for label, count in zip(labels, failures) if count
+            }
+            for failures in state["failures"]
+        ]
+        self._start = self._end = 0.0
+        return True
+
+    def clear(self) -> None:
+        """Descarta todos os baldes."""
+        self._epochs = [-1] * self.buckets
+        self._start = self._end = 0.0
+
+
+class RollingQualityMetrics:
+    """
+    Conjunto de janelas móveis alimentadas pelos cadastros do QualityService.
+
+    As janelas contam cadastros (eventos): remoções posteriores não alteram
+    as taxas já observadas.
+
+    Args:
+        windows: Pares (nome, duração em segundos)
+        buckets: Baldes por janela (resolução = duração / buckets)
+        clock: Fonte de tempo em segundos (padrão: time.time)
+    """
+
+    def __init__(
+        self,
+        windows: Sequence[Tuple[str, float]] = DEFAULT_WINDOWS,
+        buckets: int = DEFAULT_BUCKETS,
+        clock: Callable[[], float] = time.time
+    ):
+        self.windows = {name: RollingWindow(seconds, buckets) for name, seconds in windows}
+        self._adders = tuple(window.add for window in self.windows.values())
+        self.clock = clock
+        self._first_timestamp: Optional[float] = None
+        self._labels: Tuple[str, ...] = DEFAULT_LABELS
+
+    def set_labels(self, labels: Dict[int, str]) -> None:
+        """
+        Define os rótulos dos próximos cadastros (RuleSet.labels_for).
+
+        Chamado a cada troca de regras: os cadastros já somados mantêm os
+        rótulos das regras que os validaram.
+
+        Args:
+            labels: Bit de falha -> rótulo
+        """
+        self._labels = tuple(
+            labels.get(flag, default) for flag, default in zip(FLAG_BITS, DEFAULT_LABELS)
+        )
+
+    def record(self, timestamp: float, flags: int) -> None:
+        """Registra um cadastro em todas as janelas (O(1) por janela)."""
+        if self._first_timestamp is None:
+            self._first_timestamp = timestamp
+        labels = self._labels
+        for add in self._adders:
+            add(timestamp, flags, labels)
+
+    def record_batch(
+        self,
+        timestamp: float,
+        flags: bytearray,
+        counts: Optional[Sequence[int]] = None
+    ) -> None:
+        """
+        Registra um lote cadastrado no mesmo instante.
+
+        Args:
+            timestamp: Instante do cadastro
+            flags: Bits de falha de cada peça
+            counts: Resultado de count_failures(flags), se já calculado
+        """
+        if not flags:
+            return
+        if self._first_timestamp is None:
+            self._first_timestamp = timestamp
+        if counts is None:
+            counts = count_failures(flags)
+        for window in self.windows.values():
+            window.add_batch(timestamp, flags, counts, self._labels)
+
+    def record_series(self, timestamps: Sequence[float], flags: bytearray) -> None:
+        """
+        Registra cadastros com instantes próprios (recuperação do journal).
+
+        Instantes fora da maior janela são descartados. Como os cadastros
+        chegam em ordem de tempo, cada janela recebe um lote por balde,
+        delimitado por busca binária; se o relógio tiver voltado, as
+        peças são registradas uma a uma.
+        """
+        values = list(timestamps)
+        cutoff = self.clock() - max(window.seconds for window in self.windows.values())
+        if not values or max(values) < cutoff:
+            return
+
+        if values != sorted(values):
+            for timestamp, value in zip(values, flags):
+                if timestamp >= cutoff:
+                    self.record(timestamp, value)
+            return
+
+        start = bisect_left(values, cutoff)
+        if self._first_timestamp is None:
+            self._first_timestamp = values[start]
+        for window in self.windows.values():
+            window.add_series(values, flags, start, self._labels)
+
+    def query(self, now: Optional[float] = None) -> Dict[str, Dict[str, Any]]:
+        """
+        Calcula as métricas de cada janela.
+
+        Args:
+            now: Fim das janelas (padrão: relógio atual)
+
+        Returns:
+            Dicionário nome da janela -> métricas (total_pieces,
+            approved_count, rejected_count, approval_rate, failure_rates
+            por regra em %, pieces_per_minute)
+        """
+        now = self.clock() if now is None else now
+        result = {}
+
+        for name, window in self.windows.items():
+            total, approved, failures = window.totals(now)
+
+            # Enquanto a execução for mais curta que a janela, a vazão usa
+            # o tempo decorrido desde o primeiro cadastro (no mínimo 1s)
+            span = window.seconds
+            if self._first_timestamp is not None:
+                span = min(span, max(now - self._first_timestamp, 1.0))
+
+            result[name] = {
+                "window_seconds": window.seconds,
+                "total_pieces": total,
+                "approved_count": approved,
+                "rejected_count": total - approved,
+                "approval_rate": approved / total * 100 if total else 0,
+                "failure_rates": {
+                    label: count / total * 100 for label, count in failures.items()
+                },
+                "pieces_per_minute": total / span * 60,
+            }
+        return result
+
+    def get_state(self) -> Dict[str, Any]:
+        """
+        Retorna o estado das janelas em um dicionário serializável.
+
+        Permite que um snapshot guarde as métricas sem precisar dos
+        instantes de cada cadastro (ver set_state).
+        """
+        return {
+            "first_timestamp": self._first_timestamp,
+            "windows": {name: window.get_state() for name, window in self.windows.items()},
+        }
+
+    def set_state(self, state: Dict[str, Any]) -> bool:
+        """
+        Repõe o estado salvo por get_state.
+
+        Returns:
+            False (sem alterar as métricas) se as janelas configuradas forem
+            diferentes das salvas
+        """
+        saved = state.get("windows", {})
+        if set(saved) != set(self.windows) or any(
+            saved[name].get("seconds") != window.seconds
+            or saved[name].get("buckets") != window.buckets
+            for name, window in self.windows.items()
+        ):
+            return False
+        for name, window in self.windows.items():
+            window.set_state(saved[name], self._labels)
+        self._first_timestamp = state.get("first_timestamp")
+        return True
+
+    def clear(self) -> None:
+        """Descarta as métricas de todas as janelas."""
+        for window in self.windows.values():
+            window.clear()
+        self._first_timestamp = None
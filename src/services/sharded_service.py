@@ -0,0 +1,261 @@
+"""
+Inspeção particionada entre processos (um shard por núcleo).
+
+Cada shard é um processo com seu próprio QualityService e StorageService.
+As peças são distribuídas pelo hash estável (CRC32) do ID, de modo que o
+mesmo ID sempre cai no mesmo shard e a detecção de IDs repetidos continua
+local. As estatísticas são somadas pelo coordenador.
+"""
+
+import os
+import zlib
+from array import array
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Sequence
+
+from ..models.box import Box
+from ..models.piece import Piece
+from ..validators.rules import RuleSet
+from .quality_service import QualityService
+from .removal import withdraw_piece
+from .storage_service import StorageService
+
+# Estado do shard, criado no processo filho pelo inicializador do executor
+_shard_quality: Optional[QualityService] = None
+_shard_storage: Optional[StorageService] = None
+
+
+def _init_shard(box_capacity: int, rules_spec: Optional[Dict[str, Any]]) -> None:
+    global _shard_quality, _shard_storage
+    rules = RuleSet.from_dict(rules_spec) if rules_spec is not None else None
+    _shard_quality = QualityService(rules=rules)
+    _shard_storage = StorageService(box_capacity=box_capacity)
+
+
+def _shard_register(ids, weights, colors, lengths) -> int:
+    """Registra e armazena um lote no shard; retorna as peças armazenadas."""
+    pieces = _shard_quality.register_pieces(weights, colors, lengths, custom_ids=ids)
+    return _shard_storage.store_pieces(pieces)
+
+
+def _shard_remove(piece_id: str, reopen: bool) -> bool:
+    """Remove a peça do registro e da caixa do shard."""
+    removed, _ = withdraw_piece(_shard_quality, _shard_storage, piece_id, reopen)
+    return removed
+
+
+def _shard_statistics():
+    return _shard_quality.get_statistics(), _shard_storage.get_statistics()
+
+
+def _shard_pieces(approved: bool) -> List[Piece]:
+    """
+    Copia as peças do shard para objetos Piece avulsos (serializáveis).
+
+    O motivo é montado no shard, pelas regras que validaram cada peça: os
+    bits sozinhos seriam lidos com as regras padrão no coordenador.
+    """
+    pieces = (
+        _shard_quality.get_approved_pieces() if approved
+        else _shard_quality.get_rejected_pieces()
+    )
+    return [
+        Piece(p.piece_id, p.weight, p.color, p.length, p.status,
+              rejection_reason=p.rejection_reason, rejection_flags=p.rejection_flags,
+              registered_at=p.registered_at)
+        for p in pieces
+    ]
+
+
+def _shard_clear() -> None:
+    _shard_quality.clear_all()
+    _shard_storage.clear_all()
+
+
+def _gather(values: Sequence[Any], rows: List[int]) -> List[Any]:
+    """Seleciona values[i] para cada i de rows."""
+    if len(rows) == 1:
+        return [values[rows[0]]]
+    return list(itemgetter(*rows)(values))
+
+
+class ShardedInspection:
+    """
+    Coordena o registro em lote entre vários processos.
+
+    Cada shard usa um ProcessPoolExecutor de um único processo, o que
+    garante que o estado do shard persiste entre as chamadas.
+
+    Atributos:
+        quality: Visão de qualidade consolidada (interface de QualityService
+            usada pelo ReportGenerator)
+        storage: Visão de armazenamento consolidada
+    """
+
+    def __init__(
+        self,
+        shards: Optional[int] = None,
+        box_capacity: int = Box.DEFAULT_CAPACITY,
+        rules: Optional[RuleSet] = None
+    ):
+        self.shards = shards or os.cpu_count() or 1
+        # As funções compiladas não são serializáveis: cada shard recompila a especificação
+        initargs = (box_capacity, rules.to_dict() if rules is not None else None)
+        self._executors = [
+            ProcessPoolExecutor(max_workers=1, initializer=_init_shard, initargs=initargs)
+            for _ in range(self.shards)
+        ]
+        self._next_piece_number = 1
+        self.quality = _ShardedQualityView(self)
+        self.storage = _ShardedStorageView(self)
+
+    def shard_of(self, piece_id: str) -> int:
+        """Retorna o shard responsável por um ID."""
+        return zlib.crc32(piece_id.encode()) % self.shards
+
+    def register_pieces(
+        self,
+        weights: Sequence[float],
+        colors: Sequence[str],
+        lengths: Sequence[float],
+        custom_ids: Optional[Sequence[str]] = None
+    ) -> int:
+        """
+        Distribui um lote entre os shards, que validam e armazenam em paralelo.
+
+        Args:
+            weights: Pesos em gramas
+            colors: Cores
+            lengths: Comprimentos em centímetros
+            custom_ids: IDs personalizados (opcional; gerados se ausentes)
+
+        Returns:
+            Quantidade de peças armazenadas em caixas
+
+        Raises:
+            ValueError: Se algum shard recusar sua parte do lote (ID repetido);
+                as partes dos demais shards são registradas normalmente
+        """
+        size = len(weights)
+        if len(colors) != size or len(lengths) != size:
+            raise ValueError("As colunas do lote devem ter o mesmo tamanho")
+
+        if custom_ids is None:
+            start = self._next_piece_number
+            custom_ids = [f"P{number:03d}" for number in range(start, start + size)]
+            self._next_piece_number += size
+        elif len(custom_ids) != size:
+            raise ValueError("custom_ids deve ter o mesmo tamanho do lote")
+
+        # Agrupar as linhas por shard com ordenação estável (em C), em vez de
+        # distribuir linha a linha em Python
+        crc32, shards = zlib.crc32, self.shards
+        keys = [crc32(piece_id.encode()) % shards for piece_id in custom_ids]
+        order = sorted(range(size), key=keys.__getitem__)
+        counts = Counter(keys)
+
+        futures = []
+        start = 0
+        for shard, executor in enumerate(self._executors):
+            rows = order[start:start + counts[shard]]
+            start += len(rows)
+            if not rows:
+                continue
+            futures.append(executor.submit(
+                _shard_register,
+                _gather(custom_ids, rows),
+                array("d", _gather(weights, rows)),
+                _gather(colors, rows),
+                array("d", _gather(lengths, rows))
+            ))
+
+        stored = 0
+        errors = []
+        for future in futures:
+            try:
+                stored += future.result()
+            except ValueError as e:
+                errors.append(str(e))
+        if errors:
+            raise ValueError("; ".join(errors))
+        return stored
+
+    def remove_piece(self, piece_id: str, reopen: bool = False) -> bool:
+        """
+        Remove uma peça do registro e da caixa no shard responsável pelo ID.
+
+        Args:
+            piece_id: ID da peça
+            reopen: Reabrir a caixa se ela estiver fechada
+
+        Returns:
+            True se removida, False se não encontrada
+        """
+        return self._executors[self.shard_of(piece_id)].submit(
+            _shard_remove, piece_id, reopen
+        ).result()
+
+    def _broadcast(self, function, *args) -> List[Any]:
+        """Executa uma função em todos os shards e retorna os resultados em ordem."""
+        futures = [executor.submit(function, *args) for executor in self._executors]
+        return [future.result() for future in futures]
+
+    def shard_statistics(self) -> List[Dict[str, Any]]:
+        """Estatísticas de cada shard, na ordem dos shards."""
+        return [
+            {"quality": quality, "storage": storage}
+            for quality, storage in self._broadcast(_shard_statistics)
+        ]
+
+    def clear_all(self) -> None:
+        """Limpa todos os shards."""
+        self._broadcast(_shard_clear)
+        self._next_piece_number = 1
+
+    def close(self) -> None:
+        """Encerra os processos dos shards."""
+        for executor in self._executors:
+            executor.shutdown()
+
+    def __enter__(self) -> "ShardedInspection":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class _ShardedQualityView:
+    """Expõe as consultas de QualityService somando os shards."""
+
+    def __init__(self, owner: ShardedInspection):
+        self._owner = owner
+
+    def get_statistics(self) -> Dict[str, Any]:
+        from ..reports.report_generator import ReportGenerator
+        return ReportGenerator.merge_quality_statistics(
+            [shard["quality"] for shard in self._owner.shard_statistics()]
+        )
+
+    def shard_statistics(self) -> List[Dict[str, Any]]:
+        return self._owner.shard_statistics()
+
+    def get_approved_pieces(self) -> List[Piece]:
+        return [p for part in self._owner._broadcast(_shard_pieces, True) for p in part]
+
+    def get_rejected_pieces(self) -> List[Piece]:
+        return [p for part in self._owner._broadcast(_shard_pieces, False) for p in part]
+
+
+class _ShardedStorageView:
+    """Expõe as estatísticas de StorageService somando os shards."""
+
+    def __init__(self, owner: ShardedInspection):
+        self._owner = owner
+
+    def get_statistics(self) -> Dict[str, Any]:
+        from ..reports.report_generator import ReportGenerator
+        return ReportGenerator.merge_storage_statistics(
+            [shard["storage"] for shard in self._owner.shard_statistics()]
+        )
@@ -2,52 +2,243 @@
 Serviço de armazenamento para gerenciamento de caixas.
 """
 
-from typing import List, Optional
+from itertools import repeat
+from typing import Any, Dict, Iterable, List, MutableMapping, Optional, Sequence, Union
 from ..models.piece import Piece
 from ..models.box import Box
+from .packing import PackingStrategy, make_strategy
 
 
 class StorageService:
     """
     Gerencia o armazenamento de peças aprovadas em caixas.
+
+    Caixas abertas, caixas fechadas (na ordem de fechamento), caixa por ID
+    e caixa por peça são índices mantidos a cada operação, de modo que as
+    consultas não dependem do histórico de caixas.
+
+    A caixa que recebe cada peça é escolhida por uma estratégia de
+    empacotamento (next-fit, first-fit ou best-fit; ver packing.py), que
+    respeita, além da capacidade, os limites de peso e comprimento por caixa.
+
+    Não é thread-safe; para várias estações de embalagem em paralelo use
+    LaneStorageService.
+
+    Args:
+        box_capacity: Capacidade (em peças) das novas caixas
+        journal: Journal que registra as operações (opcional)
+        events: Barramento de eventos (src.events.EventBus) que recebe
+            PieceStored e BoxClosed (opcional)
+        strategy: Nome da estratégia ou instância (padrão: next-fit)
+        max_weight: Peso total máximo por caixa (None = sem limite)
+        max_length: Comprimento total máximo por caixa (None = sem limite)
+        max_open_boxes: Limite de caixas abertas ao mesmo tempo para
+            first-fit e best-fit (None = sem limite)
     """
 
-    def __init__(self, box_capacity: int = Box.DEFAULT_CAPACITY):
+    def __init__(
+        self,
+        box_capacity: int = Box.DEFAULT_CAPACITY,
+        journal=None,
+        strategy: Union[str, PackingStrategy, None] = None,
+        max_weight: Optional[float] = None,
+        max_length: Optional[float] = None,
+        max_open_boxes: Optional[int] = None,
+        events=None
+    ):
         self.box_capacity = box_capacity
+        self.journal = journal
+        self.events = events
+        self.strategy = make_strategy(strategy, max_open_boxes)
+        self.max_weight = max_weight
+        self.max_length = max_length
         self.boxes: List[Box] = []
         self.current_box: Optional[Box] = None
         self._next_box_id = 1
+        self._reset_indexes()
+
+    def _reset_indexes(self) -> None:
+        """Cria os índices e contadores vazios."""
+        self._boxes_by_id: Dict[int, Box] = {}
+        self._box_of_piece: Dict[str, Box] = {}
+        self._open_boxes: Dict[int, Box] = {}
+        # Caixas na ordem de fechamento e a posição de cada uma no log
+        self._closed_log: List[Box] = []
+        self._closed_position: Dict[int, int] = {}
+
+        # Contadores incrementais para get_statistics em O(1)
+        self._stored_count = 0
+        self.strategy.clear()
+
+    def _new_box(self, box_id: int) -> Box:
+        """Cria uma caixa vazia com a capacidade e os limites configurados."""
+        return Box(box_id, self.box_capacity, self.max_weight, self.max_length)
+
+    def _fits_empty_box(self, piece: Piece) -> bool:
+        """Verifica se a peça cabe sozinha em uma caixa vazia."""
+        return (
+            (self.max_weight is None or piece.weight <= self.max_weight)
+            and (self.max_length is None or piece.length <= self.max_length)
+        )
+
+    def _add_box(self, box: Box) -> None:
+        """Inclui uma caixa nos índices."""
+        self.boxes.append(box)
+        self._boxes_by_id[box.box_id] = box
+        if box.is_closed:
+            self._mark_closed(box)
+        else:
+            self._open_boxes[box.box_id] = box
+        if box.pieces:
+            self._index_pieces(box, [piece.piece_id for piece in box.pieces])
+        self.strategy.update(box)
+
+    def _index_pieces(self, box: Box, piece_ids: Sequence[str]) -> None:
+        """Associa as peças à caixa no índice peça -> caixa."""
+        self._box_of_piece.update(zip(piece_ids, repeat(box)))
+
+    def _mark_closed(self, box: Box) -> None:
+        """Move uma caixa recém-fechada para o log de caixas fechadas."""
+        self._open_boxes.pop(box.box_id, None)
+        self._closed_position[box.box_id] = len(self._closed_log)
+        self._closed_log.append(box)
+        self.strategy.update(box)
 
     def store_piece(self, piece: Piece) -> bool:
         """
-        Armazena uma peça aprovada na caixa atual.
+        Armazena uma peça aprovada na caixa escolhida pela estratégia.
 
         Args:
             piece: Peça a ser armazenada
 
         Returns:
-            True se armazenada com sucesso, False caso contrário
+            True se armazenada com sucesso, False se não aprovada, já
+            guardada em uma caixa ou maior que os limites de
+            peso/comprimento de uma caixa vazia
         """
-        if not piece.is_approved():
+        if (
+            not piece.is_approved()
+            or piece.piece_id in self._box_of_piece
+            or not self._fits_empty_box(piece)
+        ):
             return False
 
         # Criar primeira caixa se necessário
         if self.current_box is None:
             self._create_new_box()
 
-        # Tentar adicionar à caixa atual
-        if self.current_box.add_piece(piece):
-            # Se a caixa ficou cheia, criar nova
-            if self.current_box.is_full():
+        box = self.strategy.select(piece, self.current_box)
+        if box is None:
+            box = self._open_box_for(piece)
+
+        if not box.add_piece(piece):
+            return False
+        self._stored_count += 1
+        self._box_of_piece[piece.piece_id] = box
+        if self.journal is not None:
+            self.journal.record_store(piece.piece_id, box.box_id)
+        if self.events is not None:
+            self.events.pieces_stored((piece.piece_id,), box.box_id)
+
+        if box.is_closed:
+            self._mark_closed(box)
+            if self.journal is not None:
+                self.journal.record_close(box.box_id)
+            if self.events is not None:
+                self.events.box_closed(box)
+
+            # Se a caixa atual ficou cheia, criar nova
+            if box is self.current_box:
+                self._create_new_box()
+        else:
+            self.strategy.update(box)
+        return True
+
+    def _open_box_for(self, piece: Piece) -> Box:
+        """
+        Abre uma caixa para uma peça que não coube em nenhuma caixa aberta,
+        fechando antes a caixa indicada pela estratégia (se houver).
+        """
+        victim = self.strategy.evict(self.current_box, len(self._open_boxes))
+        if victim is not None:
+            self.close_box(victim.box_id)
+
+        # Fechar a caixa atual já abre uma caixa vazia
+        if not self.current_box.fits(piece):
+            self.current_box = self._create_new_box()
+        return self.current_box
+
+    def store_pieces(self, pieces: Sequence[Piece]) -> int:
+        """
+        Armazena um lote de peças, enchendo as caixas em blocos.
+
+        Equivale a chamar store_piece para cada peça, na mesma ordem. Com
+        next-fit, o custo é proporcional ao número de caixas tocadas; as
+        demais estratégias escolhem a caixa peça a peça.
+
+        Args:
+            pieces: Peças a armazenar (as não aprovadas e as já guardadas
+                em uma caixa, ou repetidas no lote, são ignoradas)
+
+        Returns:
+            Quantidade de peças armazenadas
+        """
+        if not self.strategy.sequential:
+            return sum(self.store_piece(piece) for piece in pieces)
+
+        approved = [piece for piece in pieces if piece.is_approved()]
+        piece_ids = [piece.piece_id for piece in approved]
+        indexed = self._box_of_piece
+        if len(set(piece_ids)) != len(piece_ids) or not indexed.keys().isdisjoint(piece_ids):
+            # Caso raro: cada peça entra uma vez, e só se ainda não está guardada
+            unique: Dict[str, Piece] = {}
+            for piece in approved:
+                if piece.piece_id not in indexed:
+                    unique.setdefault(piece.piece_id, piece)
+            approved = list(unique.values())
+        position = stored = 0
+
+        while position < len(approved):
+            if self.current_box is None:
+                self._create_new_box()
+
+            box = self.current_box
+            added = box.add_pieces(approved[position:position + box.get_available_space()])
+            if not added:
+                # A próxima peça excede o peso/comprimento restante: fechar a
+                # caixa, ou descartar a peça se não cabe nem em uma caixa vazia
+                if box.pieces:
+                    self.close_box(box.box_id)
+                else:
+                    position += 1
+                continue
+
+            piece_ids = [piece.piece_id for piece in approved[position:position + added]]
+            self._index_pieces(box, piece_ids)
+            if self.journal is not None:
+                self.journal.record_stores(piece_ids, box.box_id)
+            if self.events is not None:
+                self.events.pieces_stored(piece_ids, box.box_id)
+            position += added
+            stored += added
+            self._stored_count += added
+
+            if box.is_closed:
+                self._mark_closed(box)
+                if self.journal is not None:
+                    self.journal.record_close(box.box_id)
+                if self.events is not None:
+                    self.events.box_closed(box)
                 self._create_new_box()
-            return True
 
-        return False
+        return stored
 
     def _create_new_box(self) -> Box:
         """Cria uma nova caixa e a define como atual."""
-        new_box = Box(box_id=self._next_box_id, capacity=self.box_capacity)
-        self.boxes.append(new_box)
+        new_box = self._new_box(self._next_box_id)
+        self._add_box(new_box)
+        if self.journal is not None:
+            self.journal.record_open(new_box.box_id, new_box.capacity)
 
         # Atualizar caixa atual apenas se a anterior estava fechada ou não existia
         if self.current_box is None or self.current_box.is_closed:
@@ -57,12 +248,105 @@ class StorageService:
         return new_box
 
     def get_closed_boxes(self) -> List[Box]:
-        """Retorna lista de caixas fechadas."""
-        return [box for box in self.boxes if box.is_closed]
+        """Retorna lista de caixas fechadas, na ordem de fechamento."""
+        return [
+            box for position, box in enumerate(self._closed_log)
+            if self._closed_position.get(box.box_id) == position
+        ]
+
+    def list_closed_boxes(self, limit: int = 50, offset: int = 0) -> List[Box]:
+        """
+        Retorna uma página de caixas fechadas, das mais recentes para as antigas.
+
+        O custo depende apenas de offset + limit, não do total de caixas.
+
+        Args:
+            limit: Máximo de caixas na página
+            offset: Quantidade de caixas recentes a pular
+
+        Returns:
+            Caixas da página
+        """
+        page: List[Box] = []
+        log, positions = self._closed_log, self._closed_position
+        for position in range(len(log) - 1, -1, -1):
+            if len(page) >= limit:
+                break
+            box = log[position]
+            # Entradas antigas de caixas reabertas (ou fechadas de novo) são puladas
+            if positions.get(box.box_id) != position:
+                continue
+            if offset:
+                offset -= 1
+            else:
+                page.append(box)
+        return page
 
     def get_open_boxes(self) -> List[Box]:
         """Retorna lista de caixas abertas."""
-        return [box for box in self.boxes if not box.is_closed]
+        return list(self._open_boxes.values())
+
+    def remove_piece(self, piece_id: str, reopen: bool = False) -> Optional[Box]:
+        """
+        Retira uma peça da caixa que a guarda.
+
+        A caixa é localizada pelo índice peça -> caixa; o custo não depende
+        da quantidade de caixas. Para remover a peça também do registro use
+        withdraw_piece (src.services.removal).
+
+        Args:
+            piece_id: ID da peça
+            reopen: Reabrir a caixa se ela estiver fechada
+
+        Returns:
+            Caixa de onde a peça saiu, ou None se a peça não estava armazenada
+        """
+        box = self._box_of_piece.get(piece_id)
+        if box is None or not self._unstore(box, piece_id, reopen):
+            return None
+        if self.journal is not None:
+            self.journal.record_unstore(piece_id, box.box_id, reopen)
+        return box
+
+    def _unstore(self, box: Box, piece_id: str, reopen: bool) -> bool:
+        """
+        Retira a peça da caixa e dos índices, reabrindo a caixa se pedido.
+
+        Returns:
+            False se a peça já não estava nessa caixa
+        """
+        if self._box_of_piece.get(piece_id) is not box:
+            return False
+        box.remove_piece(piece_id)
+        del self._box_of_piece[piece_id]
+        self._count_removal(box)
+        if reopen and box.is_closed:
+            self._reopen(box)
+        self.strategy.update(box)
+        return True
+
+    def _count_removal(self, box: Box) -> None:
+        """Desconta do contador de armazenadas uma peça retirada da caixa."""
+        self._stored_count -= 1
+
+    def _reopen(self, box: Box) -> None:
+        """Reabre uma caixa fechada (a entrada antiga do log fica obsoleta)."""
+        box.reopen()
+        del self._closed_position[box.box_id]
+        self._open_boxes[box.box_id] = box
+        self.strategy.update(box)
+
+    def get_box(self, box_id: int) -> Optional[Box]:
+        """Busca uma caixa pelo ID em O(1)."""
+        return self._boxes_by_id.get(box_id)
+
+    def find_box_by_piece(self, piece_id: str) -> Optional[Box]:
+        """Retorna a caixa que guarda a peça, em O(1) (None se não armazenada)."""
+        return self._box_of_piece.get(piece_id)
+
+    def indexed_piece_count(self) -> int:
+        """Entradas do índice peça -> caixa (igual às peças armazenadas)."""
+        return len(self._box_of_piece)
 
     def get_all_boxes(self) -> List[Box]:
         """Retorna todas as caixas."""
@@ -74,7 +358,11 @@ class StorageService:
 
     def get_total_stored_pieces(self) -> int:
         """Retorna o total de peças armazenadas em todas as caixas."""
-        return sum(box.get_piece_count() for box in self.boxes)
+        return self._stored_count
+
+    def _count_closed_boxes(self) -> int:
+        """Retorna o total de caixas fechadas (tamanho do índice)."""
+        return len(self._closed_position)
 
     def get_statistics(self) -> dict:
         """
@@ -83,13 +371,11 @@ class StorageService:
         Returns:
             Dicionário com estatísticas das caixas
         """
-        closed_boxes = self.get_closed_boxes()
-        open_boxes = self.get_open_boxes()
-
+        closed = self._count_closed_boxes()
         return {
             "total_boxes": len(self.boxes),
-            "closed_boxes": len(closed_boxes),
-            "open_boxes": len(open_boxes),
+            "closed_boxes": closed,
+            "open_boxes": len(self.boxes) - closed,
             "total_stored_pieces": self.get_total_stored_pieces(),
             "current_box_fill": (
                 self.current_box.get_piece_count() if self.current_box else 0
@@ -99,8 +385,168 @@ class StorageService:
             )
         }
 
+    def get_packing_statistics(self) -> Dict[str, Any]:
+        """
+        Retorna o aproveitamento das caixas usadas (com ao menos uma peça).
+
+        Percorre todas as caixas; serve para relatórios e comparações entre
+        estratégias, não para consultas frequentes.
+
+        Returns:
+            Dicionário com strategy, used_boxes, average_pieces,
+            average_weight, average_length e weight_utilization (% do peso
+            máximo, None se não houver limite)
+        """
+        used = [box for box in self.boxes if box.pieces]
+        count = len(used)
+        total_weight = sum(box.total_weight for box in used)
+        return {
+            "strategy": self.strategy.name,
+            "used_boxes": count,
+            "average_pieces": sum(len(box.pieces) for box in used) / count if count else 0,
+            "average_weight": total_weight / count if count else 0,
+            "average_length": sum(box.total_length for box in used) / count if count else 0,
+            "weight_utilization": (
+                total_weight / (count * self.max_weight) * 100
+                if count and self.max_weight else None
+            ),
+        }
+
+    @property
+    def next_box_id(self) -> int:
+        """ID da próxima caixa a ser aberta."""
+        return self._next_box_id
+
+    def restore_indexes(
+        self,
+        boxes: List[Box],
+        boxes_by_id: MutableMapping[int, Box],
+        box_of_piece: MutableMapping[str, Box],
+        closed_log: List[Box],
+        closed_position: MutableMapping[int, int],
+        open_boxes: Iterable[Box],
+        current_box: Optional[Box],
+        stored_count: int,
+        next_box_id: int
+    ) -> None:
+        """
+        Carrega caixas e índices gravados por um snapshot, sem journal.
+
+        As estruturas são usadas como recebidas, sem cópia: podem ser
+        sequências e mapeamentos sob demanda sobre o arquivo, que só criam
+        as caixas quando consultadas. Apenas as caixas abertas são
+        percorridas (entram na estratégia de empacotamento).
+
+        Args:
+            boxes: Todas as caixas, na ordem de abertura
+            boxes_by_id: ID -> caixa
+            box_of_piece: ID da peça -> caixa que a guarda
+            closed_log: Caixas fechadas, na ordem de fechamento
+            closed_position: ID da caixa -> posição em closed_log
+            open_boxes: Caixas abertas
+            current_box: Caixa atual
+            stored_count: Peças guardadas
+            next_box_id: ID da próxima caixa
+        """
+        self._reset_indexes()
+        self.boxes = boxes
+        self._boxes_by_id = boxes_by_id
+        self._box_of_piece = box_of_piece
+        self._closed_log = closed_log
+        self._closed_position = closed_position
+        for box in open_boxes:
+            self._open_boxes[box.box_id] = box
+            self.strategy.update(box)
+        self.current_box = current_box
+        self._stored_count = stored_count
+        self._next_box_id = next_box_id
+
+    def restore_box(self, box_id: int, capacity: int, is_closed: bool, pieces) -> Box:
+        """
+        Recria uma caixa a partir de um snapshot, sem registrar no journal.
+
+        A caixa restaurada mais recente passa a ser a caixa atual.
+
+        Args:
+            box_id: ID da caixa
+            capacity: Capacidade da caixa
+            is_closed: Se a caixa estava fechada
+            pieces: Peças contidas na caixa
+
+        Returns:
+            Caixa restaurada
+        """
+        box = Box(box_id, capacity, self.max_weight, self.max_length)
+        box.restore(pieces, is_closed)
+        self._add_box(box)
+        self.current_box = box
+
+        self._stored_count += len(box.pieces)
+        self._next_box_id = max(self._next_box_id, box_id + 1)
+        return box
+
+    def restore_stores(self, box_id: int, pieces: Sequence[Piece]) -> int:
+        """
+        Reaplica um armazenamento do journal na caixa indicada.
+
+        Diferente de store_pieces, respeita a caixa registrada, o que mantém
+        a recuperação correta quando várias caixas são enchidas em paralelo.
+
+        Args:
+            box_id: ID da caixa que recebeu as peças
+            pieces: Peças armazenadas
+
+        Returns:
+            Quantidade de peças adicionadas
+        """
+        box = self.get_box(box_id)
+        if box is None:
+            box = self._new_box(box_id)
+            self._add_box(box)
+            self._next_box_id = max(self._next_box_id, box_id + 1)
+            # A caixa aberta mais recentemente é a atual
+            current = self.current_box
+            if current is None or current.is_closed or box_id > current.box_id:
+                self.current_box = box
+
+        added = box.add_pieces(pieces)
+        self._stored_count += added
+        self._index_pieces(box, [piece.piece_id for piece in pieces[:added]])
+        if added and box.is_closed:
+            self._mark_closed(box)
+            if box is self.current_box:
+                self._create_new_box()
+        elif added:
+            self.strategy.update(box)
+        return added
+
+    def close_box(self, box_id: int) -> bool:
+        """
+        Fecha uma caixa pelo ID (usado na recuperação do journal).
+
+        Returns:
+            True se a caixa foi fechada agora, False caso contrário
+        """
+        box = self.get_box(box_id)
+        if box is None or box.is_closed:
+            return False
+
+        box.close()
+        self._mark_closed(box)
+        if self.journal is not None:
+            self.journal.record_close(box_id)
+        if self.events is not None:
+            self.events.box_closed(box)
+        if box is self.current_box:
+            self._create_new_box()
+        return True
+
     def clear_all(self) -> None:
         """Limpa todos os registros de caixas."""
         self.boxes.clear()
         self.current_box = None
         self._next_box_id = 1
+        self._reset_indexes()
+
+        if self.journal is not None:
+            self.journal.record_clear("storage")
@@ -4,5 +4,7 @@ Validadores de qualidade do sistema FactorySense.
 """
 
 from .quality_validator import QualityValidator
+from .messages import get_locale, set_locale
+from .rules import Rule, RuleRegistry, RuleSet
 
-__all__ = ['QualityValidator']
+__all__ = ['QualityValidator', 'Rule', 'RuleRegistry', 'RuleSet', 'get_locale', 'set_locale']
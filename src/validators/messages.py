@@ -0,0 +1,104 @@
+"""
+Textos das reprovações em vários idiomas (pt-BR, en, es).
+
+As peças guardam apenas os bits de falha e os valores medidos; o texto é
+montado quando alguém o exibe, a partir dos modelos deste catálogo. Cada
+regra monta as partes fixas da sua mensagem uma vez por idioma (ver
+Rule.message), de modo que exibir um motivo só insere o valor medido.
+
+O idioma padrão vem da variável de ambiente FACTORYSENSE_LOCALE (ou pt-BR)
+e pode ser trocado com set_locale.
+"""
+
+import os
+from typing import Dict, Optional
+
+DEFAULT_LOCALE = "pt-BR"
+
+CATALOGS: Dict[str, Dict[str, str]] = {
+    "pt-BR": {
+        "label.weight": "Peso fora do padrão",
+        "label.color": "Cor inválida",
+        "label.length": "Comprimento fora do padrão",
+        "limits.between": "permitido: {minimum}{unit} a {maximum}{unit}",
+        "limits.minimum": "mínimo: {minimum}{unit}",
+        "limits.maximum": "máximo: {maximum}{unit}",
+        "allowed.color": "permitidas: {allowed}",
+        "allowed.values": "permitidos: {allowed}",
+    },
+    "en": {
+        "label.weight": "Weight out of specification",
+        "label.color": "Invalid color",
+        "label.length": "Length out of specification",
+        "limits.between": "allowed: {minimum}{unit} to {maximum}{unit}",
+        "limits.minimum": "minimum: {minimum}{unit}",
+        "limits.maximum": "maximum: {maximum}{unit}",
+        "allowed.color": "allowed: {allowed}",
+        "allowed.values": "allowed: {allowed}",
+    },
+    "es": {
+        "label.weight": "Peso fuera de especificación",
+        "label.color": "Color no válido",
+        "label.length": "Longitud fuera de especificación",
+        "limits.between": "permitido: {minimum}{unit} a {maximum}{unit}",
+        "limits.minimum": "mínimo: {minimum}{unit}",
+        "limits.maximum": "máximo: {maximum}{unit}",
+        "allowed.color": "permitidos: {allowed}",
+        "allowed.values": "permitidos: {allowed}",
+    },
+}
+
+LOCALES = tuple(CATALOGS)
+
+# Formas aceitas -> idioma do catálogo ("pt", "pt_BR", "en-US", "es_ES", ...)
+_ALIASES = {"pt": "pt-BR", "en": "en", "es": "es"}
+
+
+def resolve_locale(locale: Optional[str] = None) -> str:
+    """
+    Normaliza o nome de um idioma (None = idioma padrão atual).
+
+    Raises:
+        ValueError: Se o idioma não tiver catálogo
+    """
+    if locale is None:
+        return _default
+    if locale in CATALOGS:
+        return locale
+    resolved = _ALIASES.get(locale.replace("_", "-").split("-")[0].lower())
+    if resolved is None:
+        raise ValueError(
+            f"Idioma sem catálogo: {locale} (disponíveis: {', '.join(LOCALES)})"
+        )
+    return resolved
+
+
+def set_locale(locale: str) -> str:
+    """
+    Troca o idioma padrão dos motivos e rótulos de reprovação.
+
+    Returns:
+        Idioma anterior
+
+    Raises:
+        ValueError: Se o idioma não tiver catálogo
+    """
+    global _default
+    previous, _default = _default, resolve_locale(locale)
+    return previous
+
+
+def get_locale() -> str:
+    """Idioma padrão atual."""
+    return _default
+
+
+def text(key: str, locale: Optional[str] = None) -> str:
+    """Modelo do catálogo do idioma (já normalizado ou None)."""
+    return CATALOGS[locale or _default][key]
+
+
+try:
+    _default = resolve_locale(os.environ.get("FACTORYSENSE_LOCALE", DEFAULT_LOCALE))
+except ValueError:
+    _default = DEFAULT_LOCALE
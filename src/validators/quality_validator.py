@@ -2,8 +2,9 @@
 Validador de qualidade para inspeção de peças.
 """
 
-from typing import Tuple, Optional
+from typing import Tuple, Optional, Sequence
 from ..models.piece import Piece
+from .rules import RuleSet
 
 
 class QualityValidator:
@@ -14,6 +15,10 @@ class QualityValidator:
     - Peso: 95g a 105g
     - Cor: azul ou verde
     - Comprimento: 10cm a 20cm
+
+    As constantes abaixo formam o RuleSet padrão (QualityValidator.rules),
+    compilado uma vez; produtos com outras tolerâncias usam seu próprio
+    RuleSet (ver validators/rules.py).
     """
 
     # Constantes de validação
@@ -23,6 +28,30 @@ class QualityValidator:
     MIN_LENGTH = 10
     MAX_LENGTH = 20
 
+    # Bits de falha por regra (combinados com OR quando mais de uma falha)
+    FLAG_WEIGHT = 1
+    FLAG_COLOR = 2
+    FLAG_LENGTH = 4
+
+    # Rótulo curto de cada regra, usado nas estatísticas de reprovação
+    FLAG_LABELS = {
+        FLAG_WEIGHT: "Peso fora do padrão",
+        FLAG_COLOR: "Cor inválida",
+        FLAG_LENGTH: "Comprimento fora do padrão",
+    }
+
+    # Regras padrão, compiladas uma vez a partir das constantes acima
+    rules = RuleSet([
+        {"field": "weight", "min": MIN_WEIGHT, "max": MAX_WEIGHT, "unit": "g",
+         "label": FLAG_LABELS[FLAG_WEIGHT]},
+        {"field": "color", "allowed": sorted(VALID_COLORS), "label": FLAG_LABELS[FLAG_COLOR]},
+        {"field": "length", "min": MIN_LENGTH, "max": MAX_LENGTH, "unit": "cm",
+         "label": FLAG_LABELS[FLAG_LENGTH]},
+    ])
+
+    # Tabela de tradução byte -> 1 (aprovada) / 0 (reprovada)
+    _APPROVAL_TABLE = bytes([1] + [0] * 255)
+
     @classmethod
     def validate(cls, piece: Piece) -> Tuple[bool, Optional[str]]:
         """
@@ -36,60 +65,99 @@ class QualityValidator:
             - is_approved: True se aprovada, False se reprovada
             - rejection_reason: Motivo da reprovação (None se aprovada)
         """
-        reasons = []
-
-        # Validar peso
-        if not cls._validate_weight(piece.weight):
-            reasons.append(
-                f"Peso fora do padrão ({piece.weight}g - permitido: "
-                f"{cls.MIN_WEIGHT}g a {cls.MAX_WEIGHT}g)"
-            )
+        flags = cls.failure_flags(piece.weight, piece.color, piece.length)
 
-        # Validar cor
-        if not cls._validate_color(piece.color):
-            reasons.append(
-                f"Cor inválida ('{piece.color}' - permitidas: "
-                f"{', '.join(sorted(cls.VALID_COLORS))})"
+        if flags:
+            return False, cls.describe_failures(
+                flags, piece.weight, piece.color, piece.length
             )
 
-        # Validar comprimento
-        if not cls._validate_length(piece.length):
-            reasons.append(
-                f"Comprimento fora do padrão ({piece.length}cm - permitido: "
-                f"{cls.MIN_LENGTH}cm a {cls.MAX_LENGTH}cm)"
-            )
-
-        if reasons:
-            return False, "; ".join(reasons)
-
         return True, None
 
     @classmethod
-    def _validate_weight(cls, weight: float) -> bool:
-        """Valida o peso da peça."""
-        return cls.MIN_WEIGHT <= weight <= cls.MAX_WEIGHT
+    def failure_flags(cls, weight: float, color: str, length: float) -> int:
+        """
+        Calcula os bits de falha de uma leitura sem montar mensagens.
+
+        Returns:
+            Combinação de FLAG_WEIGHT, FLAG_COLOR e FLAG_LENGTH (0 se aprovada)
+        """
+        return cls.rules.flags(weight, color, length)
 
     @classmethod
-    def _validate_color(cls, color: str) -> bool:
-        """Valida a cor da peça."""
-        return color.lower() in cls.VALID_COLORS
+    def describe_failures(
+        cls,
+        flags: int,
+        weight: float,
+        color: str,
+        length: float,
+        locale: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Monta o texto do motivo de reprovação a partir dos bits de falha.
+
+        Args:
+            flags: Bits de falha retornados por failure_flags/validate_batch
+            weight: Peso medido
+            color: Cor medida
+            length: Comprimento medido
+            locale: Idioma do texto ('pt-BR', 'en', 'es'; None = padrão)
+
+        Returns:
+            Motivos separados por "; " ou None se não houver falha
+        """
+        return cls.rules.describe(flags, weight, color, length, locale)
 
     @classmethod
-    def _validate_length(cls, length: float) -> bool:
-        """Valida o comprimento da peça."""
-        return cls.MIN_LENGTH <= length <= cls.MAX_LENGTH
+    def validate_batch(
+        cls,
+        weights: Sequence[float],
+        colors: Sequence[str],
+        lengths: Sequence[float],
+        rules: Optional[RuleSet] = None
+    ) -> Tuple[bytearray, bytearray]:
+        """
+        Valida um lote de leituras em formato colunar.
+
+        Aceita listas, array.array ou arrays NumPy. Nenhuma mensagem é
+        montada aqui; use describe_failures apenas para as linhas exibidas.
+
+        Args:
+            weights: Pesos em gramas
+            colors: Cores (texto)
+            lengths: Comprimentos em centímetros
+            rules: Regras do produto (padrão: QualityValidator.rules)
+
+        Returns:
+            Tupla (approved_mask, failure_flags), ambos bytearray do tamanho
+            do lote: approved_mask[i] é 1 se aprovada; failure_flags[i] traz
+            os bits de falha da linha i
+
+        Raises:
+            ValueError: Se as colunas tiverem tamanhos diferentes
+        """
+        size = len(weights)
+        if len(colors) != size or len(lengths) != size:
+            raise ValueError("As colunas do lote devem ter o mesmo tamanho")
+
+        flags = (rules or cls.rules).batch_flags(weights, colors, lengths)
+        return flags.translate(cls._APPROVAL_TABLE), flags
 
     @classmethod
-    def apply_validation(cls, piece: Piece) -> None:
+    def apply_validation(cls, piece: Piece, rules: Optional[RuleSet] = None) -> None:
         """
         Aplica a validação e atualiza o status da peça.
 
+        O texto do motivo só é montado quando alguém o consulta.
+
         Args:
             piece: Peça a ser validada
+            rules: Regras do produto (padrão: QualityValidator.rules)
         """
-        is_approved, rejection_reason = cls.validate(piece)
+        flags = (rules or cls.rules).flags(piece.weight, piece.color, piece.length)
 
-        if is_approved:
-            piece.approve()
+        if flags:
+            piece.reject(flags=flags)
         else:
-            piece.reject(rejection_reason)
+            piece.approve()
+
@@ -0,0 +1,489 @@
+"""
+Regras de qualidade declarativas, compiladas para funções especializadas.
+
+Uma especificação (JSON ou TOML, uma por produto) lista as regras:
+
+    {
+        "product": "padrao",
+        "rules": [
+            {"field": "weight", "min": 95, "max": 105, "unit": "g"},
+            {"field": "color", "allowed": ["azul", "verde"]},
+            {"field": "length", "min": 10, "max": 20, "unit": "cm"}
+        ]
+    }
+
+A regra na posição i usa o bit de falha 1 << i (no máximo 8 regras, já que
+os bits ficam em um byte por peça). Ao compilar, os limites viram
+constantes no código gerado, a verificação de aprovação faz curto-circuito
+e os textos das mensagens ficam prontos, restando só inserir o valor medido.
+"""
+
+import json
+import math
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional; sem ele usamos o caminho em Python puro
+    np = None
+
+try:
+    import tomllib
+except ImportError:  # tomllib só existe a partir do Python 3.11
+    tomllib = None
+
+from .messages import CATALOGS, DEFAULT_LOCALE, resolve_locale, text
+
+FIELDS = ("weight", "color", "length")
+MAX_RULES = 8
+
+_DEFAULT_LABELS = {field: CATALOGS[DEFAULT_LOCALE][f"label.{field}"] for field in FIELDS}
+_DEFAULT_UNITS = {"weight": "g", "color": "", "length": "cm"}
+
+
+class Rule:
+    """
+    Uma regra de qualidade sobre um campo da peça.
+
+    Atributos:
+        field: Campo verificado ('weight', 'color' ou 'length')
+        bit: Bit de falha da regra
+        label: Rótulo curto usado nas estatísticas (pt-BR; ver label_for)
+        minimum: Limite inferior (inclusivo) ou None
+        maximum: Limite superior (inclusivo) ou None
+        allowed: Valores permitidos ou None
+    """
+
+    __slots__ = ("field", "bit", "label", "unit", "minimum", "maximum", "allowed",
+                 "_labels", "_templates")
+
+    def __init__(self, spec: Dict[str, Any], bit: int):
+        field = spec.get("field")
+        if field not in FIELDS:
+            raise ValueError(f"Campo de regra inválido: {field!r} (use {', '.join(FIELDS)})")
+
+        self.field = field
+        self.bit = bit
+        self.label = spec.get("label", _DEFAULT_LABELS[field])
+        # Rótulos traduzidos na especificação ({"en": ..., "es": ...})
+        self._labels = {
+            resolve_locale(locale): label
+            for locale, label in (spec.get("labels") or {}).items()
+        }
+        if self.label != _DEFAULT_LABELS[field]:
+            self._labels.setdefault(DEFAULT_LOCALE, self.label)
+        self.unit = spec.get("unit", _DEFAULT_UNITS[field])
+        self.minimum = spec.get("min")
+        self.maximum = spec.get("max")
+        allowed = spec.get("allowed")
+
+        if allowed is not None:
+            if self.minimum is not None or self.maximum is not None:
+                raise ValueError(f"Regra de {field}: use 'allowed' ou 'min'/'max', não ambos")
+            self.allowed = frozenset(
+                value.lower() if isinstance(value, str) else value for value in allowed
+            )
+        elif self.minimum is None and self.maximum is None:
+            raise ValueError(f"Regra de {field} sem 'min', 'max' ou 'allowed'")
+        else:
+            if field == "color":
+                raise ValueError("A regra de cor deve usar 'allowed'")
+            for limit in (self.minimum, self.maximum):
+                if limit is not None and (
+                    isinstance(limit, bool) or not isinstance(limit, (int, float))
+                ):
+                    raise ValueError(f"Regra de {field}: limite não numérico {limit!r}")
+                if limit is not None and not math.isfinite(limit):
+                    # nan/inf não viram literais válidos no código compilado
+                    raise ValueError(f"Regra de {field}: limite não finito {limit!r}")
+            if (self.minimum is not None and self.maximum is not None
+                    and self.minimum > self.maximum):
+                raise ValueError(f"Regra de {field}: 'min' maior que 'max'")
+            self.allowed = None
+
+        # Partes fixas da mensagem por idioma, montadas no primeiro uso
+        self._templates: Dict[str, Tuple[str, str]] = {}
+
+    def label_for(self, locale: Optional[str] = None) -> str:
+        """
+        Rótulo no idioma (None = idioma padrão).
+
+        Rótulos personalizados sem tradução para o idioma são usados como
+        estão; os rótulos padrão vêm do catálogo.
+        """
+        locale = resolve_locale(locale)
+        label = self._labels.get(locale)
+        if label is not None:
+            return label
+        if self.label != _DEFAULT_LABELS[self.field]:
+            return self.label
+        return text(f"label.{self.field}", locale)
+
+    def _render_message(self, locale: str) -> Tuple[str, str]:
+        """Monta as partes fixas da mensagem de falha no idioma."""
+        label, unit = self.label_for(locale), self.unit
+        if self.allowed is not None:
+            allowed = ", ".join(sorted(str(value) for value in self.allowed))
+            if self.field == "color":
+                allowed = text("allowed.color", locale).format(allowed=allowed)
+                return f"{label} ('", f"' - {allowed})"
+            allowed = text("allowed.values", locale).format(allowed=allowed)
+            return f"{label} (", f"{unit} - {allowed})"
+
+        if self.minimum is not None and self.maximum is not None:
+            key = "limits.between"
+        elif self.minimum is not None:
+            key = "limits.minimum"
+        else:
+            key = "limits.maximum"
+        limits = text(key, locale).format(minimum=self.minimum, maximum=self.maximum, unit=unit)
+        return f"{label} (", f"{unit} - {limits})"
+
+    def message(self, value: Any, locale: Optional[str] = None) -> str:
+        """Mensagem de falha para o valor medido, no idioma (None = padrão)."""
+        locale = resolve_locale(locale)
+        parts = self._templates.get(locale)
+        if parts is None:
+            parts = self._templates[locale] = self._render_message(locale)
+        return f"{parts[0]}{value}{parts[1]}"
+
+    def expression(self, constant: str) -> str:
+        """Expressão Python que é verdadeira quando o valor passa na regra."""
+        name = self.field
+        if self.allowed is not None:
+            if self.field == "color":
+                return f"({name} in {constant} or {name}.lower() in {constant})"
+            return f"{name} in {constant}"
+        if self.minimum is not None and self.maximum is not None:
+            return f"{self.minimum!r} <= {name} <= {self.maximum!r}"
+        if self.minimum is not None:
+            return f"{self.minimum!r} <= {name}"
+        return f"{name} <= {self.maximum!r}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        spec: Dict[str, Any] = {"field": self.field, "label": self.label, "unit": self.unit}
+        translated = {
+            locale: label for locale, label in self._labels.items() if label != self.label
+        }
+        if translated:
+            spec["labels"] = translated
+        if self.allowed is not None:
+            spec["allowed"] = sorted(self.allowed, key=str)
+        if self.minimum is not None:
+            spec["min"] = self.minimum
+        if self.maximum is not None:
+            spec["max"] = self.maximum
+        return spec
+
+
+class RuleSet:
+    """
+    Conjunto de regras de um produto, compilado uma única vez.
+
+    Instâncias são imutáveis depois de criadas; para trocar as regras de um
+    produto, crie (ou recarregue) outro RuleSet.
+
+    Atributos:
+        product: Nome do produto/SKU
+        rules: Regras na ordem da especificação
+        labels: Bit de falha -> rótulo curto em pt-BR (ver labels_for)
+    """
+
+    def __init__(self, rules: Sequence[Dict[str, Any]], product: str = "padrao"):
+        if not rules:
+            raise ValueError("O conjunto de regras está vazio")
+        if len(rules) > MAX_RULES:
+            raise ValueError(f"No máximo {MAX_RULES} regras por produto")
+
+        self.product = product
+        self.rules = [Rule(spec, 1 << index) for index, spec in enumerate(rules)]
+        self.labels = {rule.bit: rule.label for rule in self.rules}
+        self._labels_by_locale: Dict[str, Dict[int, str]] = {}
+        self._messages: Dict[int, List[Rule]] = {}
+        self.flags, self._batch_flags, self.accepts = self._compile()
+
+    @classmethod
+    def from_dict(cls, spec: Dict[str, Any]) -> "RuleSet":
+        """Cria o conjunto a partir de uma especificação já carregada."""
+        if not isinstance(spec, dict) or "rules" not in spec:
+            raise ValueError("Especificação de regras sem a chave 'rules'")
+        return cls(spec["rules"], spec.get("product", "padrao"))
+
+    @classmethod
+    def from_file(cls, path: str) -> "RuleSet":
+        """
+        Carrega uma especificação JSON ou TOML (pela extensão).
+
+        Raises:
+            ValueError: Se o arquivo for inválido ou TOML não for suportado
+        """
+        if path.lower().endswith(".toml"):
+            if tomllib is None:
+                raise ValueError("Arquivos TOML exigem Python 3.11 ou superior")
+            with open(path, "rb") as handle:
+                try:
+                    spec = tomllib.load(handle)
+                except tomllib.TOMLDecodeError as e:
+                    raise ValueError(f"TOML inválido em {path}: {e}") from e
+        else:
+            with open(path, encoding="utf-8") as handle:
+                try:
+                    spec = json.load(handle)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"JSON inválido em {path}: {e}") from e
+        return cls.from_dict(spec)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Especificação equivalente (serializável em JSON)."""
+        return {"product": self.product, "rules": [rule.to_dict() for rule in self.rules]}
+
+    def _compile(self):
+        """Gera as funções de validação com os limites como constantes."""
+        namespace: Dict[str, Any] = {}
+        passes = []
+        for index, rule in enumerate(self.rules):
+            constant = f"_allowed_{index}"
+            namespace[constant] = rule.allowed
+            passes.append(rule.expression(constant))
+
+        # Aprovação: cadeia com curto-circuito; os bits só são calculados
+        # para as peças reprovadas
+        approved = " and ".join(passes)
+        failures = " | ".join(
+            f"(0 if {expression} else {rule.bit})"
+            for expression, rule in zip(passes, self.rules)
+        )
+        # No lote, cada cor distinta é verificada uma única vez (memo)
+        memos = []
+        batch_terms = []
+        for index, (expression, rule) in enumerate(zip(passes, self.rules)):
+            if rule.field == "color":
+                memos.append(
+                    f"    _memo_{index} = {{color: 0 if {expression} else {rule.bit} "
+                    f"for color in set(colors)}}\n"
+                )
+                batch_terms.append(f"_memo_{index}[color]")
+            else:
+                batch_terms.append(f"(0 if {expression} else {rule.bit})")
+
+        source = (
+            "def flags(weight, color, length):\n"
+            f"    if {approved}:\n"
+            "        return 0\n"
+            f"    return {failures}\n"
+            "\n"
+            "def batch_flags(weights, colors, lengths):\n"
+            + "".join(memos) +
+            f"    return bytearray([{' | '.join(batch_terms)}\n"
+            "                      for weight, color, length in zip(weights, colors, lengths)])\n"
+            "\n"
+            "def accepts(weight, color, length):\n"
+            f"    return {approved}\n"
+        )
+        exec(compile(source, f"<regras {self.product}>", "exec"), namespace)
+        return namespace["flags"], namespace["batch_flags"], namespace["accepts"]
+
+    def batch_flags(
+        self,
+        weights: Sequence[float],
+        colors: Sequence[str],
+        lengths: Sequence[float]
+    ) -> bytearray:
+        """
+        Calcula os bits de falha de um lote em formato colunar.
+
+        Usa operações vetorizadas quando alguma coluna é um array NumPy.
+        """
+        if np is not None and any(
+            isinstance(column, np.ndarray) for column in (weights, colors, lengths)
+        ):
+            return self._batch_flags_numpy(weights, colors, lengths)
+        return self._batch_flags(weights, colors, lengths)
+
+    def _batch_flags_numpy(self, weights, colors, lengths) -> bytearray:
+        columns = {"weight": weights, "color": colors, "length": lengths}
+        flags = np.zeros(len(weights), dtype=np.uint8)
+
+        for rule in self.rules:
+            if rule.allowed is None:
+                values = np.asarray(columns[rule.field], dtype=np.float64)
+                failed = np.zeros(len(values), dtype=bool)
+                if rule.minimum is not None:
+                    failed |= values < rule.minimum
+                if rule.maximum is not None:
+                    failed |= values > rule.maximum
+                flags[failed] |= rule.bit
+            else:
+                # Valida apenas os valores distintos e expande pelo índice inverso
+                values = np.asarray(columns[rule.field])
+                unique, inverse = np.unique(values, return_inverse=True)
+                table = np.array([
+                    0 if (value.lower() if isinstance(value, str) else value) in rule.allowed
+                    else rule.bit
+                    for value in unique.tolist()
+                ], dtype=np.uint8)
+                if len(table):
+                    flags |= table[inverse.reshape(-1)]
+
+        return bytearray(flags.tobytes())
+
+    def labels_for(self, locale: Optional[str] = None) -> Dict[int, str]:
+        """Bit de falha -> rótulo no idioma (None = idioma padrão), memorizado."""
+        locale = resolve_locale(locale)
+        labels = self._labels_by_locale.get(locale)
+        if labels is None:
+            labels = {rule.bit: rule.label_for(locale) for rule in self.rules}
+            self._labels_by_locale[locale] = labels
+        return labels
+
+    def failures(
+        self, flags: int, weight: float, color: str, length: float
+    ) -> List[Tuple[Rule, Any]]:
+        """
+        Forma estruturada de uma reprovação, sem montar texto.
+
+        Returns:
+            Pares (regra que falhou, valor medido), na ordem das regras
+        """
+        if not flags:
+            return []
+
+        failed = self._messages.get(flags)
+        if failed is None:
+            failed = [rule for rule in self.rules if flags & rule.bit]
+            self._messages[flags] = failed
+
+        values = {"weight": weight, "color": color, "length": length}
+        return [(rule, values[rule.field]) for rule in failed]
+
+    def describe(
+        self,
+        flags: int,
+        weight: float,
+        color: str,
+        length: float,
+        locale: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Monta o motivo de reprovação a partir dos bits de falha.
+
+        Args:
+            locale: Idioma do texto ('pt-BR', 'en', 'es'; None = padrão)
+
+        Returns:
+            Motivos separados por "; " ou None se não houver falha
+        """
+        if not flags:
+            return None
+        locale = resolve_locale(locale)
+        return "; ".join(
+            rule.message(value, locale)
+            for rule, value in self.failures(flags, weight, color, length)
+        )
+
+    def __repr__(self) -> str:
+        return f"RuleSet(product={self.product!r}, rules={len(self.rules)})"
+
+
+class RuleRegistry:
+    """
+    Conjuntos de regras por produto, com recarga a quente dos arquivos.
+
+    reload() relê os arquivos modificados desde a última carga e troca o
+    RuleSet do produto de forma atômica; serviços vinculados com bind()
+    passam a usar as novas regras. Um arquivo inválido mantém as regras
+    anteriores.
+    """
+
+    def __init__(self, default: Optional[RuleSet] = None):
+        self.default = default
+        self._rules: Dict[str, RuleSet] = {}
+        self._sources: Dict[str, Tuple[str, int]] = {}
+        self._bindings: Dict[str, List[Callable[[RuleSet], None]]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, rules: RuleSet) -> None:
+        """Registra (ou substitui) o conjunto de regras de um produto."""
+        with self._lock:
+            self._rules[rules.product] = rules
+            callbacks = list(self._bindings.get(rules.product, ()))
+        for callback in callbacks:
+            callback(rules)
+
+    def load(self, path: str) -> RuleSet:
+        """Carrega um arquivo de regras e o acompanha para recarga."""
+        mtime = os.stat(path).st_mtime_ns
+        rules = RuleSet.from_file(path)
+        with self._lock:
+            self._sources[rules.product] = (path, mtime)
+        self.register(rules)
+        return rules
+
+    def load_directory(self, directory: str) -> List[RuleSet]:
+        """Carrega todos os arquivos .json e .toml de um diretório."""
+        return [
+            self.load(os.path.join(directory, name))
+            for name in sorted(os.listdir(directory))
+            if name.lower().endswith((".json", ".toml"))
+        ]
+
+    def reload(self) -> List[str]:
+        """
+        Recarrega os arquivos alterados.
+
+        Returns:
+            Produtos cujas regras foram trocadas
+        """
+        with self._lock:
+            sources = list(self._sources.items())
+
+        reloaded = []
+        for product, (path, mtime) in sources:
+            try:
+                current = os.stat(path).st_mtime_ns
+                if current == mtime:
+                    continue
+                rules = RuleSet.from_file(path)
+            except (OSError, ValueError):
+                continue  # mantém as regras anteriores
+            with self._lock:
+                self._sources[product] = (path, current)
+            if rules.product != product:
+                continue
+            self.register(rules)
+            reloaded.append(product)
+        return reloaded
+
+    def get(self, product: str) -> RuleSet:
+        """
+        Retorna as regras atuais do produto (ou as padrão).
+
+        Raises:
+            KeyError: Se o produto não existir e não houver regras padrão
+        """
+        rules = self._rules.get(product, self.default)
+        if rules is None:
+            raise KeyError(f"Produto sem regras cadastradas: {product}")
+        return rules
+
+    def bind(self, product: str, service) -> None:
+        """Faz service.rules acompanhar as regras do produto, inclusive nas recargas."""
+        def update(rules: RuleSet) -> None:
+            service.rules = rules
+
+        update.service = service
+        with self._lock:
+            self._bindings.setdefault(product, []).append(update)
+        update(self.get(product))
+
+    def unbind(self, product: str, service) -> None:
+        """Desfaz bind(product, service); as regras atuais do serviço continuam."""
+        with self._lock:
+            callbacks = self._bindings.get(product)
+            if callbacks:
+                callbacks[:] = [c for c in callbacks if c.service is not service]
+
+    def products(self) -> List[str]:
+        return sorted(self._rules)
@@ -3,12 +3,44 @@
 Script de teste básico para validar funcionalidades principais do FactorySense.
 """
 
+import asyncio
+import io
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from array import array
+
 from src.models.piece import Piece
 from src.models.box import Box
+from src.models.piece_store import PieceStore, PieceStatus
 from src.validators.quality_validator import QualityValidator
+from src.validators.messages import set_locale
+from src.validators.rules import RuleRegistry, RuleSet
 from src.services.quality_service import QualityService
 from src.services.storage_service import StorageService
+from src.services.lane_storage_service import LaneStorageService
+from src.services.sharded_service import ShardedInspection
+from src.services.line_registry import LineRegistry
+from src.services.rolling_metrics import RollingQualityMetrics
+from src.services.consistency import check_consistency
+from src.services.removal import withdraw_piece
+from src.services.process_control import ProcessControl, RunningStatistics
+from src.services.piece_query import PieceQuery, parse_time
 from src.reports.report_generator import ReportGenerator
+from src.persistence import JournalReader, open_services, open_sqlite_services
+from src.ingestion import IngestionPipeline, read_csv_batches, read_ndjson_batches
+from src.server import InspectionServer
+from src.events import (
+    BLOCK, BOX_CLOSED, DROP_OLDEST, PIECE_REGISTERED, PIECE_REJECTED, PIECE_REMOVED,
+    PIECE_STORED, SPILL, EventBus, attach_event_bus
+)
+from src.cli.batch import BatchOutput, BatchSession, main as batch_main
+from src.instrumentation import (
+    Instrumentation, MetricsHTTPServer, MetricsRegistry, render_prometheus, snapshot
+)
 
 
 def test_piece_creation():
@@ -22,6 +54,35 @@ def test_piece_creation():
     print("  ✓ Criação de peça funcionando")
 
 
+def test_piece_store():
+    """Testa armazenamento colunar de peças."""
+    print("\nTestando armazenamento colunar...")
+
+    store = PieceStore()
+    stored = store.add(Piece("P001", 100, "Azul", 15, "aprovada"))
+    assert not hasattr(stored, "__dict__")
+    assert stored.piece_id == "P001" and stored.color == "azul"
+    assert stored.is_approved() and store.get("P001") == stored
+
+    stored.reject(flags=QualityValidator.FLAG_WEIGHT)
+    assert store.select(PieceStatus.REPROVADA) == [stored]
+    assert "Peso fora do padrão" in stored.rejection_reason
+
+    # Remoção tira do índice, mas a visão continua legível
+    assert store.remove("P001") == stored
+    assert len(store) == 0 and "P001" not in store
+    assert stored.weight == 100 and store.explicit_reasons() == {}
+
+    # Acesso por posição às linhas ativas com lápides
+    for number in range(2, 6):
+        store.add(Piece("P%03d" % number, 100, "azul", 15, "aprovada"))
+    store.remove("P003")
+    assert list(store.live_rows()) == [1, 3, 4] and store.live_rows()[1] == 3
+    store.remove("P005")
+    assert store.live_rows()[-1] == 3
+    print("  ✓ Visões sobre linhas do armazenamento funcionando")
+
+
 def test_quality_validation():
     """Testa validação de qualidade."""
     print("\nTestando validação de qualidade...")
@@ -51,6 +112,170 @@ def test_quality_validation():
     print("  ✓ Peça com comprimento inválido reprovada corretamente")
 
 
+def test_batch_validation():
+    """Testa validação em lote com colunas."""
+    print("\nTestando validação em lote...")
+
+    weights = array("d", [100, 200, 100, 100])
+    colors = ["azul", "azul", "Vermelho", "verde"]
+    lengths = array("d", [15, 15, 15, 5])
+
+    mask, flags = QualityValidator.validate_batch(weights, colors, lengths)
+    assert list(mask) == [1, 0, 0, 0]
+    assert list(flags) == [
+        0,
+        QualityValidator.FLAG_WEIGHT,
+        QualityValidator.FLAG_COLOR,
+        QualityValidator.FLAG_LENGTH,
+    ]
+    print("  ✓ Máscara de aprovação e bits de falha corretos")
+
+    # Registro em lote gera os mesmos motivos do caminho unitário
+    service = QualityService()
+    pieces = service.register_pieces(weights, colors, lengths)
+    assert [p.piece_id for p in pieces] == ["P001", "P002", "P003", "P004"]
+    assert pieces[0].is_approved()
+    single = Piece("X", 200.0, "azul", 15.0)
+    assert pieces[1].rejection_reason == QualityValidator.validate(single)[1]
+    assert len(pieces) == 4 and pieces[2:] == [service.get_piece_by_id("P003"), service.get_piece_by_id("P004")]
+    print("  ✓ Registro em lote funcionando corretamente")
+
+    # IDs automáticos em bloco pulam os já usados por IDs personalizados
+    service.register_piece(100, "azul", 15, "P006")
+    more = service.register_pieces([100] * 3, ["azul"] * 3, [15] * 3)
+    assert [p.piece_id for p in more] == ["P005", "P007", "P008"]
+    assert service.register_pieces([100], ["azul"], [15])[0].piece_id == "P009"
+
+
+def test_rule_engine():
+    """Testa regras declarativas por produto e a recarga a quente."""
+    print("\nTestando motor de regras...")
+
+    rules = RuleSet.from_dict({"product": "sku-9", "rules": [
+        {"field": "color", "allowed": ["Preto"], "label": "Cor fora do SKU"},
+        {"field": "weight", "min": 50, "unit": "g"},
+        {"field": "length", "max": 30, "unit": "cm"},
+    ]})
+    assert rules.flags(60.0, "PRETO", 25.0) == 0
+    assert rules.flags(40.0, "azul", 31.0) == 7
+    assert rules.describe(3, 40.0, "azul", 25.0) == (
+        "Cor fora do SKU ('azul' - permitidas: preto); "
+        "Peso fora do padrão (40.0g - mínimo: 50g)"
+    )
+    _, flags = QualityValidator.validate_batch([60.0, 40.0], ["preto", "preto"], [25.0, 25.0], rules)
+    assert list(flags) == [0, 2]
+
+    for invalid in ({"rules": []}, {"rules": [{"field": "peso", "min": 1}]},
+                    {"rules": [{"field": "weight", "min": "1; import os"}]},
+                    {"rules": [{"field": "weight", "min": float("nan")}]},
+                    {"rules": [{"field": "length", "max": float("inf")}]}):
+        try:
+            RuleSet.from_dict(invalid)
+            assert False, "Especificação inválida deveria falhar"
+        except ValueError:
+            pass
+    print("  ✓ Regras compiladas com mensagens pré-montadas")
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "sku-9.json")
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(rules.to_dict(), handle)
+
+    registry = RuleRegistry(default=QualityValidator.rules)
+    registry.load(path)
+    service = QualityService()
+    registry.bind("sku-9", service)
+    assert service.register_piece(60, "preto", 25).is_approved()
+    assert service.get_statistics()["total_pieces"] == 1
+
+    spec = rules.to_dict()
+    spec["rules"][1]["min"] = 70
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(spec, handle)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    assert registry.reload() == ["sku-9"]
+    piece = service.register_piece(60, "preto", 25)
+    assert piece.is_rejected() and "mínimo: 70g" in piece.rejection_reason
+    assert service.get_statistics()["rejection_reasons"] == {"Peso fora do padrão": 1}
+
+    # Recarga que muda a posição das regras: as peças antigas continuam
+    # interpretadas pelas regras que as validaram
+    spec["rules"] = [spec["rules"][1], spec["rules"][0], spec["rules"][2]]
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(spec, handle)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 2 * 10 ** 9))
+    assert registry.reload() == ["sku-9"]
+    assert piece.rejection_reason.startswith("Peso fora do padrão (60")
+    newer = service.register_piece(60, "azul", 25)
+    assert newer.rejection_flags == 3 and piece.rejection_flags == 2
+    assert service.get_statistics()["rejection_reasons"] == {
+        "Peso fora do padrão": 2, "Cor fora do SKU": 1
+    }
+    assert [p.piece_id for p in service.query(failed="color")] == [newer.piece_id]
+    assert len(service.query(failed="weight")) == 2
+    service.remove_piece(piece.piece_id)
+    assert service.get_statistics()["rejection_reasons"] == {
+        "Peso fora do padrão": 1, "Cor fora do SKU": 1
+    }
+    print("  ✓ Recarga com outra ordem de regras não reinterpreta peças antigas")
+
+    with open(path, "w", encoding="utf-8") as handle:
+        handle.write("{quebrado")
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    assert registry.reload() == []
+    assert service.rules is registry.get("sku-9")
+    print("  ✓ Recarga a quente troca as regras do serviço vinculado")
+
+
+def test_localized_reasons():
+    """Testa os motivos de reprovação montados sob demanda em vários idiomas."""
+    print("\nTestando motivos de reprovação em vários idiomas...")
+
+    rules = QualityValidator.rules
+    assert rules.describe(3, 80.0, "roxo", 15.0) == (
+        "Peso fora do padrão (80.0g - permitido: 95g a 105g); "
+        "Cor inválida ('roxo' - permitidas: azul, verde)"
+    )
+    assert rules.describe(3, 80.0, "roxo", 15.0, "en") == (
+        "Weight out of specification (80.0g - allowed: 95g to 105g); "
+        "Invalid color ('roxo' - allowed: azul, verde)"
+    )
+    assert rules.describe(4, 100.0, "azul", 25.0, "es_ES") == (
+        "Longitud fuera de especificación (25.0cm - permitido: 10cm a 20cm)"
+    )
+    assert [(rule.field, value) for rule, value in rules.failures(5, 80.0, "azul", 25.0)] == [
+        ("weight", 80.0), ("length", 25.0)
+    ]
+    try:
+        rules.describe(1, 80.0, "azul", 15.0, "fr")
+        assert False, "Idioma sem catálogo deveria falhar"
+    except ValueError:
+        pass
+
+    service = QualityService()
+    piece = service.register_piece(80, "azul", 15)
+    previous = set_locale("en")
+    try:
+        assert previous == "pt-BR"
+        assert piece.rejection_reason.startswith("Weight out of specification")
+        assert service.get_statistics()["rejection_reasons"] == {"Weight out of specification": 1}
+        assert piece.to_dict("pt-BR")["motivo_reprovacao"].startswith("Peso fora do padrão")
+    finally:
+        set_locale(previous)
+    assert piece.rejection_reason.startswith("Peso fora do padrão")
+    print("  ✓ Motivos e estatísticas seguem o idioma sem regravar as peças")
+
+    custom = RuleSet.from_dict({"product": "sku-7", "rules": [
+        {"field": "weight", "max": 50, "label": "Pesada demais",
+         "labels": {"en": "Too heavy"}},
+    ]})
+    assert custom.describe(1, 60.0, "azul", 10.0, "en") == "Too heavy (60.0g - maximum: 50g)"
+    assert custom.describe(1, 60.0, "azul", 10.0, "es") == "Pesada demais (60.0g - máximo: 50g)"
+    assert custom.labels_for("en") == {1: "Too heavy"}
+    assert RuleSet.from_dict(custom.to_dict()).labels_for("en") == {1: "Too heavy"}
+    print("  ✓ Rótulos personalizados com tradução na especificação")
+
+
 def test_box_storage():
     """Testa armazenamento em caixas."""
     print("\nTestando armazenamento em caixas...")
@@ -84,6 +309,301 @@ def test_quality_service():
     assert len(service.get_rejected_pieces()) == 1
     print("  ✓ Serviço de qualidade funcionando corretamente")
 
+    # Busca e remoção pelo índice de IDs
+    assert service.get_piece_by_id(piece2.piece_id) == piece2
+    assert service.remove_piece(piece1.piece_id)
+    assert not service.remove_piece(piece1.piece_id)
+    assert service.get_piece_by_id(piece1.piece_id) is None
+    assert service.get_all_pieces() == [piece2]
+    print("  ✓ Busca e remoção por ID funcionando corretamente")
+
+    # pieces é uma visão somente leitura que acompanha o registro
+    pieces = service.pieces
+    assert len(pieces) == 1 and pieces[0] == pieces[-1] == piece2
+    piece5 = service.register_piece(100, "azul", 15, custom_id="P005")
+    assert list(pieces) == [piece2, piece5] and pieces[1] == piece5
+    assert pieces[::-1] == [piece5, piece2]
+    assert not hasattr(pieces, "append")
+    service.remove_piece("P005")
+
+    # IDs duplicados são recusados e IDs automáticos pulam os já usados
+    service.register_piece(100, "verde", 15, custom_id="P003")
+    try:
+        service.register_piece(100, "verde", 15, custom_id="P003")
+        assert False, "ID duplicado deveria ser recusado"
+    except ValueError:
+        pass
+    assert service.register_piece(100, "verde", 15).piece_id == "P004"
+    print("  ✓ IDs duplicados recusados no cadastro")
+
+    # Limpar o registro não muda as peças já guardadas em caixas
+    storage = StorageService(box_capacity=2)
+    assert storage.store_piece(service.register_piece(100, "azul", 15, custom_id="P010"))
+    service.clear_all()
+    service.register_piece(300, "verde", 15, custom_id="Z9")
+    stored = storage.get_box(1).pieces[0]
+    assert stored.piece_id == "P010" and stored.is_approved()
+    print("  ✓ Peças em caixas preservadas ao limpar o registro")
+
+
+def test_incremental_statistics():
+    """Testa contadores incrementais de estatísticas."""
+    print("\nTestando estatísticas incrementais...")
+
+    service = QualityService()
+    service.register_piece(100, "azul", 15)
+    service.register_piece(200, "vermelho", 15)
+    service.register_pieces([120, 100], ["verde", "azul"], [15, 5])
+
+    stats = service.get_statistics()
+    assert stats["total_pieces"] == 4
+    assert stats["approved_count"] == 1
+    assert stats["rejected_count"] == 3
+    assert stats["rejection_reasons"] == {
+        "Peso fora do padrão": 2,
+        "Cor inválida": 1,
+        "Comprimento fora do padrão": 1,
+    }
+
+    service.remove_piece("P002")
+    stats = service.get_statistics()
+    assert stats["rejected_count"] == 2
+    assert stats["rejection_reasons"] == {
+        "Peso fora do padrão": 1,
+        "Comprimento fora do padrão": 1,
+    }
+
+    service.clear_all()
+    stats = service.get_statistics()
+    assert stats["total_pieces"] == 0 and stats["rejection_reasons"] == {}
+    print("  ✓ Contadores atualizados no cadastro, remoção e limpeza")
+
+
+def test_rolling_metrics():
+    """Testa as métricas em janelas móveis e o instante de cadastro."""
+    print("\nTestando métricas em janelas móveis...")
+
+    now = [1_000_000.0]
+    clock = lambda: now[0]
+    service = QualityService(
+        metrics=RollingQualityMetrics((("1min", 60), ("15min", 900)), clock=clock),
+        clock=clock
+    )
+
+    piece = service.register_piece(100, "azul", 15)
+    assert piece.registered_at == 1_000_000.0
+    service.register_pieces([200, 100, 100], ["azul", "rosa", "verde"], [15] * 3)
+    now[0] += 120
+    service.register_pieces([100, 200], ["azul", "azul"], [15, 15])
+
+    windows = service.get_rolling_statistics()
+    assert windows["1min"]["total_pieces"] == 2
+    assert windows["1min"]["approval_rate"] == 50.0
+    assert windows["1min"]["failure_rates"] == {"Peso fora do padrão": 50.0}
+    assert windows["15min"]["total_pieces"] == 6
+    assert windows["15min"]["pieces_per_minute"] == 3.0
+    print("  ✓ Taxas por janela e por regra calculadas")
+
+    # Depois de várias voltas do anel só os cadastros recentes contam
+    for _ in range(100):
+        now[0] += 30
+        service.register_piece(100, "verde", 15)
+    windows = service.get_rolling_statistics()
+    assert windows["1min"]["total_pieces"] == 2
+    assert windows["15min"]["total_pieces"] == 30
+    assert "JANELAS MÓVEIS" in ReportGenerator(service, StorageService()).generate_summary_report()
+    print("  ✓ Baldes antigos reaproveitados (memória fixa)")
+
+    # O mesmo bit muda de significado com a troca de regras
+    short = RuleSet.from_dict({"product": "sku-9", "rules": [
+        {"field": "length", "min": 20, "label": "Curta demais"},
+    ]})
+    now[0] += 600
+    service.register_piece(200, "azul", 15)
+    service.rules = short
+    service.register_pieces([100, 100], ["azul", "azul"], [15, 25])
+    assert service.get_rolling_statistics()["1min"]["failure_rates"] == {
+        "Peso fora do padrão": 1 / 3 * 100,
+        "Curta demais": 1 / 3 * 100,
+    }
+    print("  ✓ Falhas rotuladas com as regras que validaram cada cadastro")
+
+    directory = tempfile.mkdtemp()
+    quality, _, journal = open_services(directory, flush_interval=None)
+    quality.register_pieces([100, 200], ["azul", "azul"], [15, 15])
+    registered_at = quality.get_piece_by_id("P001").registered_at
+    quality.rules = short
+    quality.register_piece(100, "azul", 15)
+    expected = quality.get_rolling_statistics()["1min"]["failure_rates"]
+    journal.close()
+    recovered, _, journal = open_services(directory)
+    journal.close()
+    assert recovered.get_piece_by_id("P001").registered_at == registered_at
+    assert recovered.get_rolling_statistics()["1min"]["total_pieces"] == 3
+    assert recovered.get_rolling_statistics()["1min"]["failure_rates"] == expected
+    assert set(expected) == {"Peso fora do padrão", "Curta demais"}
+    print("  ✓ Instantes de cadastro recuperados do journal")
+
+
+def test_process_control():
+    """Testa Welford, alarmes de deriva antes da especificação e Cp/Cpk."""
+    print("\nTestando controle estatístico de processo...")
+    import random
+    import statistics
+
+    values = [100.0, 101.5, 98.25, 99.0, 102.0]
+    running = RunningStatistics()
+    for value in values:
+        running.add(value)
+    assert abs(running.mean - statistics.mean(values)) < 1e-12
+    assert abs(running.stdev - statistics.stdev(values)) < 1e-12
+
+    # Deriva lenta do peso a partir da peça 300: alarme antes da 1ª peça fora
+    rng = random.Random(7)
+    quality = QualityService()
+    first_alarm = first_out = None
+    for index in range(2000):
+        mean = 100.0 + max(0, index - 300) * 0.004
+        piece = quality.register_piece(rng.gauss(mean, 0.8), "azul", rng.gauss(15.0, 0.5))
+        if first_alarm is None and any(
+            alarm["field"] == "weight" and alarm["direction"] == "alta"
+            for alarm in quality.spc.alarms
+        ):
+            first_alarm = index
+        if first_out is None and piece.is_rejected():
+            first_out = index
+    assert first_out is not None and first_alarm is not None
+    assert 300 < first_alarm < first_out, (first_alarm, first_out)
+
+    capability = quality.get_process_capability()
+    weight = capability["weight"]
+    assert (weight["lower"], weight["upper"]) == (95, 105)
+    expected_cpk = min(105 - weight["mean"], weight["mean"] - 95) / (3 * weight["stdev"])
+    assert abs(weight["cpk"] - expected_cpk) < 1e-9
+    assert abs(weight["cp"] - 10 / (6 * weight["stdev"])) < 1e-9
+    assert weight["cpk"] < capability["length"]["cpk"]
+    assert "CAPACIDADE DO PROCESSO" in ReportGenerator(
+        quality, StorageService()
+    ).generate_summary_report()
+
+    # Lote e peça a peça chegam ao mesmo estado
+    weights = array("d", (rng.gauss(100.0, 1.0) for _ in range(500)))
+    lengths = array("d", (rng.gauss(15.0, 1.0) for _ in range(500)))
+    single, batch = ProcessControl(QualityValidator.rules), ProcessControl(QualityValidator.rules)
+    for weight_value, length_value in zip(weights, lengths):
+        single.record(weight_value, length_value)
+    batch.record_batch(weights[:123], lengths[:123])
+    batch.record_batch(weights[123:], lengths[123:])
+    assert single.get_state() == batch.get_state()
+
+    # Lote acima de batch_sample: estatísticas pelo resumo, cartas por amostra
+    sampled = ProcessControl(QualityValidator.rules, batch_sample=50)
+    sampled.record_batch(weights[:123], lengths[:123])
+    sampled.record_batch(weights[123:], lengths[123:])
+    exact, approximate = single.capability()["weight"], sampled.capability()["weight"]
+    assert exact["count"] == approximate["count"] == 500
+    assert abs(exact["mean"] - approximate["mean"]) < 1e-9
+    assert abs(exact["stdev"] - approximate["stdev"]) < 1e-9
+    assert exact["minimum"] == approximate["minimum"]
+    assert sampled.fields["weight"]._baseline.count == 41 + 48  # passos 3 e 8
+
+    # O estado vai para o snapshot e volta na recuperação
+    with tempfile.TemporaryDirectory() as directory:
+        quality, storage, journal = open_services(directory)
+        quality.register_pieces(weights, ["azul"] * 500, lengths)
+        journal.checkpoint(quality, storage)
+        journal.close()
+        expected = quality.spc.get_state()
+        recovered, _, journal = open_services(directory)
+        assert recovered.spc.get_state() == expected
+        journal.close()
+    print("  ✓ Deriva detectada antes de sair da especificação, Cp/Cpk e snapshot")
+
+
+def test_piece_query():
+    """Testa as consultas por índices secundários contra uma varredura completa."""
+    print("\nTestando consultas com índices secundários...")
+    import random
+
+    clock = [1000.0]
+    quality = QualityService(clock=lambda: clock[0])
+    generator = random.Random(3)
+    colors = ["azul", "verde", "vermelho", "Preto"]
+    for _ in range(20):
+        size = 300
+        quality.register_pieces(
+            [generator.gauss(100, 3) for _ in range(size)],
+            [generator.choice(colors) for _ in range(size)],
+            [generator.gauss(15, 3) for _ in range(size)],
+        )
+        clock[0] += 60
+
+    def scan(predicate):
+        return [piece.piece_id for piece in quality.get_all_pieces() if predicate(piece)]
+
+    def ids(**criteria):
+        return [piece.piece_id for piece in quality.query(**criteria)]
+
+    cases = [
+        (dict(status="reprovada", failed="weight", color="verde", min_length=18),
+         lambda p: p.rejection_flags & 1 and p.color == "verde" and p.length >= 18),
+        (dict(min_weight=99, max_weight=99.5),
+         lambda p: 99 <= p.weight <= 99.5),
+        (dict(color=["azul", "preto"], status="aprovada", since=1300, until=1600),
+         lambda p: p.color in ("azul", "preto") and p.is_approved()
+         and 1300 <= p.registered_at < 1600),
+        (dict(failed=["weight", "length"]),
+         lambda p: p.rejection_flags & 1 and p.rejection_flags & 4),
+    ]
+    for criteria, predicate in cases:
+        assert ids(**criteria) == scan(predicate)
+    assert ids(color="amarelo") == [] and ids(failed="color", color="azul") == []
+    assert len(ids(status="reprovada", limit=5)) == 5
+    print("  ✓ Resultados iguais aos de uma varredura completa")
+
+    # Os índices acompanham cadastros, remoções, alterações e limpeza
+    quality.register_pieces([120.0, 121.0], ["verde", "verde"], [19.0, 19.5])
+    removed = ids(**cases[0][0])[0]
+    quality.remove_piece(removed)
+    quality.get_piece_by_id(ids(min_weight=99, max_weight=99.5)[0]).weight = 50.0
+    for criteria, predicate in cases:
+        assert ids(**criteria) == scan(predicate)
+    assert removed not in ids(**cases[0][0])
+
+    query = PieceQuery.parse(["status=reprovada", "falha=peso", "cor=verde", "comprimento>19"])
+    assert [p.piece_id for p in quality.query(query)] == scan(
+        lambda p: p.rejection_flags & 1 and p.color == "verde" and p.length > 19
+    )
+    assert parse_time("10:30", now=parse_time("2024-05-02T08:00")) == parse_time(
+        "2024-05-02T10:30"
+    )
+    for expression in ("cor>verde", "status=quebrada", "peso", "falha=altura"):
+        try:
+            PieceQuery.parse([expression])
+            assert False, f"Deveria recusar {expression}"
+        except ValueError:
+            pass
+    quality.clear_all()
+    assert ids(status="aprovada") == []
+    print("  ✓ Índices atualizados de forma incremental")
+
+    # Sobre o snapshot mapeável e pelo modo em lote
+    directory = tempfile.mkdtemp()
+    quality, storage, journal = open_services(directory)
+    quality.register_pieces([120.0, 100.0, 100.0], ["verde", "verde", "azul"], [19.0, 19.0, 15.0])
+    journal.checkpoint(quality, storage)
+    journal.close()
+    quality, storage, journal = open_services(directory)
+    quality.register_piece(130.0, "verde", 20.0, "X1")
+    stream = io.StringIO()
+    session = BatchSession(quality, storage, BatchOutput(stream, json_mode=True))
+    session.run_script(["query falha=peso cor=verde 'comprimento>18'"])
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [r["id"] for r in records if r["command"] == "piece"] == ["P001", "X1"]
+    assert records[-1] == {"command": "query", "matches": 2}
+    journal.close()
+    print("  ✓ Consulta sobre o snapshot e pelo subcomando query")
+
 
 def test_storage_service():
     """Testa serviço de armazenamento."""
@@ -100,8 +620,183 @@ def test_storage_service():
     # Deve ter criado 2 caixas (3 + 2 peças)
     assert len(storage.get_all_boxes()) == 2
     assert len(storage.get_closed_boxes()) == 1
+    stats = storage.get_statistics()
+    assert stats["closed_boxes"] == 1 and stats["open_boxes"] == 1
+    assert stats["total_stored_pieces"] == 5
     print("  ✓ Serviço de armazenamento funcionando corretamente")
 
+    # A mesma peça não é guardada duas vezes, nem no lote
+    assert not storage.store_piece(piece)
+    extra = Piece("P006", 100, "azul", 15, "aprovada")
+    assert storage.store_pieces([piece, extra, extra]) == 1
+    assert storage.get_total_stored_pieces() == storage.indexed_piece_count() == 6
+    first_fit = StorageService(box_capacity=3, strategy="first-fit")
+    assert first_fit.store_pieces([extra, extra]) == 1
+    assert first_fit.get_total_stored_pieces() == 1
+    print("  ✓ Peças já guardadas recusadas")
+
+
+def test_box_indexes():
+    """Testa os índices de caixas abertas/fechadas, por ID e por peça."""
+    print("\nTestando índices de caixas...")
+
+    quality = QualityService()
+    storage = StorageService(box_capacity=2)
+    pieces = quality.register_pieces([100] * 9, ["azul"] * 9, [15] * 9)
+    storage.store_pieces(pieces[:5])
+    assert storage.close_box(storage.find_box_by_piece("P005").box_id)
+    storage.store_piece(pieces[5])
+
+    assert [box.box_id for box in storage.list_closed_boxes(2)] == [3, 2]
+    assert [box.box_id for box in storage.list_closed_boxes(2, offset=2)] == [1]
+    assert [box.box_id for box in storage.get_open_boxes()] == [4]
+    assert storage.get_box(2).pieces[0].piece_id == "P003"
+    assert storage.find_box_by_piece("P006").box_id == 4
+    assert storage.find_box_by_piece("P009") is None and storage.get_box(99) is None
+    print("  ✓ Caixas paginadas e localizadas por ID e por peça")
+
+    lanes = LaneStorageService(box_capacity=2, lanes=2)
+    lanes.store_pieces(pieces[:3], lane=0)
+    lanes.store_piece(pieces[3], lane=1)
+    assert [box.box_id for box in lanes.list_closed_boxes()] == [1]
+    assert lanes.find_box_by_piece("P004") is lanes.get_lane_box(1)
+    assert lanes.get_statistics()["open_boxes"] == len(lanes.get_open_boxes()) == 2
+    print("  ✓ Índices mantidos também nas linhas de embalagem")
+
+
+def test_consistent_removal():
+    """Testa a remoção de peças guardadas e a verificação de consistência."""
+    print("\nTestando remoção consistente...")
+
+    directory = tempfile.mkdtemp()
+    quality, storage, journal = open_services(directory, box_capacity=2)
+    pieces = quality.register_pieces([100] * 5, ["azul"] * 5, [15] * 5)
+    storage.store_pieces(pieces)
+    assert check_consistency(quality, storage) == []
+
+    # Remoção de uma caixa fechada, reabrindo-a
+    quality.remove_piece("P001")
+    assert any("P001" in problem for problem in check_consistency(quality, storage))
+    box = storage.remove_piece("P001", reopen=True)
+    assert box.box_id == 1 and not box.is_closed and box.get_piece_count() == 1
+    assert storage.find_box_by_piece("P001") is None
+    assert storage.remove_piece("P001") is None
+    assert [b.box_id for b in storage.list_closed_boxes()] == [2]
+    assert check_consistency(quality, storage) == []
+    print("  ✓ Peça retirada do registro e da caixa, com caixa reaberta")
+
+    assert withdraw_piece(quality, storage, "P005")[1].box_id == 3
+    assert withdraw_piece(quality, storage, "P005") == (False, None)
+    assert quality.count_by_status() == {"pendente": 0, "aprovada": 3, "reprovada": 0}
+    assert storage.indexed_piece_count() == storage.get_total_stored_pieces() == 3
+    journal.close()
+    recovered, recovered_storage, journal = open_services(directory, box_capacity=2)
+    assert recovered_storage.get_statistics() == storage.get_statistics()
+    assert recovered_storage.find_box_by_piece("P005") is None
+    assert check_consistency(recovered, recovered_storage) == []
+    journal.close()
+    reader = JournalReader.from_directory(directory, box_capacity=2)
+    assert reader.storage_statistics() == storage.get_statistics()
+    print("  ✓ Remoção recuperada do journal sem inconsistências")
+
+    lanes = LaneStorageService(box_capacity=2, lanes=2)
+    lanes.store_pieces(pieces[1:4], lane=0)
+    assert lanes.remove_piece("P004").get_piece_count() == 0
+    assert lanes.store_piece(pieces[3], lane=0)
+    assert check_consistency(quality, lanes) == []
+
+    # Caixa fechada reaberta volta para a linha dona e é completada primeiro
+    box = lanes.remove_piece("P002", reopen=True)
+    assert box.box_id == 1 and not box.is_closed
+    assert lanes._stored_count == 0 and lanes._lane_stored == [2, 0]
+    extra = quality.register_pieces([100] * 2, ["azul"] * 2, [15] * 2)
+    assert lanes.store_pieces(extra, lane=0) == 2
+    assert lanes.find_box_by_piece(extra[1].piece_id) is box and box.is_closed
+    assert lanes.get_total_stored_pieces() == 4
+    assert check_consistency(quality, lanes) == []
+    print("  ✓ Remoção consistente também nas linhas de embalagem")
+
+
+def test_packing_strategies():
+    """Testa as estratégias de empacotamento com limite de peso."""
+    print("\nTestando estratégias de empacotamento...")
+
+    def pack(strategy, weights, **options):
+        storage = StorageService(strategy=strategy, max_weight=10, **options)
+        for number, weight in enumerate(weights, 1):
+            storage.store_piece(Piece(f"K{number}", weight, "azul", 15, "aprovada"))
+        return storage, [[p.piece_id for p in box.pieces] for box in storage.boxes if box.pieces]
+
+    assert pack("next-fit", [5, 6, 3])[1] == [["K1"], ["K2", "K3"]]
+    assert pack("first-fit", [5, 6, 3])[1] == [["K1", "K3"], ["K2"]]
+    assert pack("best-fit", [5, 6, 3])[1] == [["K1"], ["K2", "K3"]]
+    assert pack("first-fit", [6, 5, 4, 3])[1] == [["K1", "K3"], ["K2", "K4"]]
+    storage, boxes = pack("first-fit", [5, 6, 3], max_open_boxes=1)
+    assert boxes == [["K1"], ["K2", "K3"]] and storage.get_statistics()["closed_boxes"] == 1
+    assert not storage.store_piece(Piece("K9", 11, "azul", 15, "aprovada"))
+    print("  ✓ next-fit, first-fit e best-fit respeitam o peso por caixa")
+
+    directory = tempfile.mkdtemp()
+    quality, storage, journal = open_services(directory, strategy="best-fit", max_weight=250)
+    storage.store_pieces(quality.register_pieces([100, 104, 96, 99, 101], ["azul"] * 5, [15] * 5))
+    journal.close()
+    _, recovered, journal = open_services(directory, strategy="best-fit", max_weight=250)
+    assert [len(b.pieces) for b in recovered.boxes] == [len(b.pieces) for b in storage.boxes]
+    assert recovered.get_statistics() == storage.get_statistics()
+    journal.close()
+    assert JournalReader.from_directory(directory).storage_statistics() == storage.get_statistics()
+    print("  ✓ Caixas escolhidas pela estratégia recuperadas do journal")
+
+
+def test_sqlite_repository():
+    """Testa o repositório SQLite: gravação em grupo, agregações e recarga."""
+    print("\nTestando repositório SQLite...")
+
+    path = os.path.join(tempfile.mkdtemp(), "factory.db")
+    quality, storage, repository = open_sqlite_services(path, box_capacity=3)
+    for weight in (100, 200, 100, 100, 101, 99):
+        storage.store_piece(quality.register_piece(weight, "azul", 15))
+    quality.remove_piece("P002")
+    quality.remove_piece("P003")
+    storage.remove_piece("P004", reopen=True)
+
+    assert repository.quality.get_statistics() == quality.get_statistics()
+    assert repository.storage.get_statistics() == storage.get_statistics()
+    assert [r[0] for r in repository.iter_records("aprovada")] == ["P001", "P004", "P005", "P006"]
+    print("  ✓ Estatísticas calculadas por agregação SQL")
+
+    repository.close()
+    recovered, recovered_storage, repository = open_sqlite_services(path, box_capacity=3)
+    assert recovered.get_statistics() == quality.get_statistics()
+    assert recovered_storage.get_statistics() == storage.get_statistics()
+    assert recovered_storage.find_box_by_piece("P003").box_id == 1
+    assert check_consistency(recovered, recovered_storage) == [
+        "Peça P003 na caixa #1 não está no registro"
+    ]
+    assert recovered.register_piece(100, "verde", 15).piece_id == "P007"
+    repository.checkpoint(recovered, recovered_storage)
+    repository.close()
+    print("  ✓ Serviços recarregados do banco")
+
+    color_first = RuleSet.from_dict({"rules": [
+        {"field": "color", "allowed": ["preto"]}, {"field": "weight", "min": 50, "unit": "g"},
+    ]})
+    weight_first = RuleSet.from_dict({"rules": color_first.to_dict()["rules"][::-1]})
+    path = os.path.join(tempfile.mkdtemp(), "rules.db")
+    quality, _, repository = open_sqlite_services(path, rules=color_first)
+    quality.register_piece(40, "preto", 15)
+    repository.close()
+    recovered, _, repository = open_sqlite_services(path, rules=weight_first)
+    reason = "Peso fora do padrão (40.0g - mínimo: 50g)"
+    assert recovered.get_piece_by_id("P001").rejection_reason == reason
+    assert recovered.register_piece(100, "azul", 15).is_rejected()
+    assert [record[5] for record in repository.iter_records()] == [
+        reason, "Cor inválida ('azul' - permitidas: preto)"
+    ]
+    assert repository.quality.get_statistics() == recovered.get_statistics()
+    repository.close()
+    print("  ✓ Regras dos cadastros gravadas no banco")
+
 
 def test_report_generation():
     """Testa geração de relatórios."""
@@ -125,6 +820,711 @@ def test_report_generation():
     print("  ✓ Geração de relatórios funcionando corretamente")
 
 
+def test_journal_recovery():
+    """Testa recuperação dos serviços a partir do journal e do snapshot."""
+    print("\nTestando journal e recuperação...")
+
+    directory = tempfile.mkdtemp()
+    quality, storage, journal = open_services(directory, box_capacity=3)
+    for weight in (100, 200, 100, 100, 101):
+        piece = quality.register_piece(weight, "azul", 15)
+        storage.store_piece(piece)
+    quality.remove_piece("P002")
+    journal.close()
+
+    recovered, recovered_storage, journal = open_services(directory, box_capacity=3)
+    assert recovered.get_statistics() == quality.get_statistics()
+    assert recovered_storage.get_statistics() == storage.get_statistics()
+    assert recovered.register_piece(100, "verde", 15).piece_id == "P006"
+    print("  ✓ Estado reconstruído a partir do journal")
+
+    # Snapshot + final do journal, ignorando um quadro incompleto
+    journal.checkpoint(recovered, recovered_storage)
+    recovered.register_piece(100, "verde", 15)
+    journal.close()
+    with open(os.path.join(directory, "journal.log"), "ab") as handle:
+        handle.write(b"R\x10\x00")
+
+    final, final_storage, journal = open_services(directory, box_capacity=3)
+    assert final.get_statistics()["total_pieces"] == 6
+    assert [len(box.pieces) for box in final_storage.boxes] == [3, 1]
+    journal.close()
+    print("  ✓ Snapshot e final do journal recuperados após crash")
+
+    # Peças voltam com as regras gravadas, não com as da reabertura
+    color_first = RuleSet.from_dict({"rules": [
+        {"field": "color", "allowed": ["preto"]}, {"field": "weight", "min": 50, "unit": "g"},
+    ]})
+    weight_first = RuleSet.from_dict({"rules": color_first.to_dict()["rules"][::-1]})
+    reason = "Peso fora do padrão (40.0g - mínimo: 50g)"
+    directory = tempfile.mkdtemp()
+    quality, storage, journal = open_services(directory, rules=color_first)
+    quality.register_piece(40, "preto", 15)
+    journal.close()
+    for checkpoint in (False, True):
+        recovered, recovered_storage, journal = open_services(directory, rules=weight_first)
+        assert recovered.get_piece_by_id("P001").rejection_reason == reason
+        assert recovered.get_statistics() == quality.get_statistics()
+        extra = recovered.register_piece(100, "azul", 15)
+        assert extra.is_rejected() and recovered.remove_piece(extra.piece_id)
+        if checkpoint:
+            journal.checkpoint(recovered, recovered_storage)
+        journal.close()
+        reader = JournalReader.from_directory(directory, rules=weight_first)
+        assert [record[5] for record in reader.iter_records()] == [reason]
+        assert reader.quality.get_statistics() == quality.get_statistics()
+    print("  ✓ Regras dos cadastros gravadas no journal e no snapshot")
+
+
+def test_mapped_snapshot():
+    """Testa o snapshot mapeável: abertura sob demanda e novas operações."""
+    print("\nTestando snapshot mapeável...")
+
+    directory = tempfile.mkdtemp()
+    quality, storage, journal = open_services(directory, box_capacity=3, flush_interval=None)
+    pieces = quality.register_pieces([100, 200, 100, 100, 101, 99, 100], ["azul"] * 7, [15] * 7)
+    storage.store_pieces(pieces)
+    quality.remove_piece("P001")  # continua guardada na caixa #1
+    storage.remove_piece("P006", reopen=True)
+    quality.get_piece_by_id("P007").reject("Inspeção visual")
+    journal.checkpoint(quality, storage)
+    journal.close()
+    assert sorted(os.listdir(directory)) == ["journal.log", "snapshot.bin"]
+
+    def state(quality, storage):
+        return (
+            quality.get_statistics(), list(quality.iter_records()), storage.get_statistics(),
+            [(box.box_id, box.is_closed, [p.piece_id for p in box.pieces]) for box in storage.boxes],
+            [box.box_id for box in storage.get_closed_boxes()],
+        )
+
+    mapped, mapped_storage, journal = open_services(directory, box_capacity=3, flush_interval=None)
+    assert state(mapped, mapped_storage) == state(quality, storage)
+    assert check_consistency(mapped, mapped_storage) == check_consistency(quality, storage)
+    assert mapped.get_piece_by_id("P001") is None
+    assert mapped_storage.find_box_by_piece("P001").box_id == 1
+    assert mapped.get_piece_by_id("P007").rejection_reason == "Inspeção visual"
+    assert mapped.get_rolling_statistics() == quality.get_rolling_statistics()
+    print("  ✓ Peças, caixas, índices e métricas lidos do mapeamento")
+
+    # Alterações sobre o estado mapeado: journal, novo checkpoint e reabertura
+    mapped.register_piece(100, "azul", 15, "P001")
+    mapped_storage.store_pieces(mapped.register_pieces([100] * 3, ["verde"] * 3, [15] * 3))
+    mapped_storage.remove_piece("P003")
+    mapped.remove_piece("P004")
+    journal.close()
+    replayed, replayed_storage, journal = open_services(directory, box_capacity=3)
+    assert state(replayed, replayed_storage) == state(mapped, mapped_storage)
+    journal.checkpoint(replayed, replayed_storage)
+    journal.close()
+    final, final_storage, journal = open_services(directory, box_capacity=3)
+    assert state(final, final_storage) == state(mapped, mapped_storage)
+    assert final.register_piece(100, "azul", 15).piece_id == "P011"
+    try:
+        final.store.restore_rows([], {}, [], {}, {}, [(0, final.rules)])
+        assert False, "Snapshot só deveria ser carregado em um armazenamento vazio"
+    except ValueError:
+        pass
+    journal.close()
+
+    reader = JournalReader.from_directory(directory, box_capacity=3)
+    assert reader.quality.get_statistics() == final.get_statistics()
+    assert reader.storage.get_statistics() == final_storage.get_statistics()
+    # O leitor deriva o status dos bits de falha (reject() manual não vai ao journal)
+    assert [r for r in reader.quality.iter_records() if r[0] != "P007"] == [
+        r for r in final.iter_records() if r[0] != "P007"
+    ]
+    print("  ✓ Novas operações, novo checkpoint e leitura para exportação")
+
+
+def test_streaming_export():
+    """Testa a exportação em fluxo sobre os serviços e sobre os arquivos."""
+    print("\nTestando exportação em fluxo...")
+
+    directory = tempfile.mkdtemp()
+    quality, storage, journal = open_services(directory, box_capacity=3, flush_interval=None)
+    pieces = quality.register_pieces(
+        [100, 200, 100, 100, 100, 101, 99],
+        ["azul", "azul", "rosa", "verde", "azul", "azul", "verde"],
+        [15] * 7
+    )
+    storage.store_pieces(pieces[:4])
+    quality.remove_piece("P001")
+    journal.checkpoint(quality, storage)
+    storage.store_pieces(pieces[4:])
+    quality.remove_piece("P006")
+    quality.register_piece(100, "azul", 15, "P001")
+    storage.close_box(storage.current_box.box_id)
+    journal.close()
+
+    generator = ReportGenerator(quality, storage)
+    reader = JournalReader.from_directory(directory, box_capacity=3)
+    assert reader.quality.get_statistics() == quality.get_statistics()
+    assert reader.storage.get_statistics() == storage.get_statistics()
+    assert list(reader.quality.iter_records()) == list(quality.iter_records())
+    print("  ✓ Snapshot + journal lidos sem carregar os serviços")
+
+    output = io.StringIO()
+    assert generator.export(output, "json") == 6
+    assert json.loads(output.getvalue()) == generator.get_consolidated_data()
+
+    output = io.StringIO()
+    ReportGenerator(reader.quality, reader.storage).export(output, "ndjson")
+    lines = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [line["id"] for line in lines] == ["P002", "P003", "P004", "P005", "P007", "P001"]
+    assert lines[1]["motivo_reprovacao"].startswith("Cor inválida")
+
+    output = io.StringIO()
+    assert generator.export(output, "csv") == 6
+    rows = output.getvalue().splitlines()
+    assert rows[0] == "id,peso,cor,comprimento,status,motivo_reprovacao"
+    assert rows[-1] == "P001,100.0,azul,15.0,aprovada,"
+    print("  ✓ NDJSON, CSV e JSON em blocos gravados")
+
+
+def test_streaming_ingestion():
+    """Testa a ingestão em lotes de CSV e NDJSON."""
+    print("\nTestando ingestão em fluxo...")
+
+    csv_data = io.StringIO(
+        "id,peso,cor,comprimento\n"
+        "A1,100,azul,15\n"
+        ",200,azul,15\n"
+        "A3,abc,azul,15\n"
+        "A4,101,verde,12\n"
+        "A1,100,azul,15\n"
+    )
+    quality, storage = QualityService(), StorageService(box_capacity=2)
+    pipeline = IngestionPipeline(quality, storage)
+    summary = pipeline.run(read_csv_batches(csv_data, batch_size=2))
+    assert summary["rows"] == 3
+    assert summary["approved"] == 2 and summary["rejected"] == 1
+    assert summary["stored"] == 2
+    assert summary["invalid_rows"] == 2  # valor inválido e ID repetido
+    assert quality.get_piece_by_id("A4").is_approved()
+    assert storage.get_statistics()["closed_boxes"] == 1
+    print("  ✓ CSV ingerido em lotes, com linhas inválidas contadas")
+
+    ndjson_data = io.StringIO(
+        '{"piece_id": "N1", "weight": 100, "color": "verde", "length": 15}\n'
+        '{"peso": 100, "cor": "vermelho", "comprimento": 15}\n'
+        "nao e json\n"
+    )
+    pipeline = IngestionPipeline(QualityService(), StorageService(), validate_only=True)
+    summary = pipeline.run(read_ndjson_batches(ndjson_data))
+    assert (summary["rows"], summary["approved"], summary["invalid_rows"]) == (2, 1, 1)
+    assert len(pipeline.quality_service.get_all_pieces()) == 0
+    print("  ✓ NDJSON validado sem reter peças")
+
+
+def test_inspection_server():
+    """Testa o servidor de inspeção com clientes simultâneos."""
+    print("\nTestando servidor de inspeção...")
+
+    async def scenario():
+        server = InspectionServer(storage_service=StorageService(box_capacity=2))
+        port = await server.start("127.0.0.1", 0)
+
+        async def station(requests):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"".join(json.dumps(r).encode() + b"\n" for r in requests))
+            responses = [json.loads(await reader.readline()) for _ in requests]
+            writer.close()
+            return responses
+
+        reading = {"weight": 100, "color": "azul", "length": 15}
+        first, second = await asyncio.gather(
+            station([dict(reading, id=f"A{n}") for n in range(5)]),
+            station([dict(reading, weight=200), {"op": "nada"}, "x", dict(reading, id="A0")]),
+        )
+        stats = (await station([{"op": "stats"}]))[0]
+
+        # Falha inesperada em um lote: só esse lote recebe erro
+        register_pieces = server.quality_service.register_pieces
+        server.quality_service.register_pieces = None
+        failed = await station([reading])
+        server.quality_service.register_pieces = register_pieces
+        recovered = await station([dict(reading, id="B0")])
+        removed = await station([{"op": "remove", "id": "A4"}, {"op": "remove", "id": "A4"}])
+        await server.stop()
+        assert not failed[0]["ok"] and recovered[0]["box_id"] == 3
+        assert removed[0]["removed"] and removed[0]["box_id"] == 3
+        assert not removed[1]["removed"] and removed[1]["box_id"] is None
+        assert check_consistency(server.quality_service, server.storage_service) == []
+        return server, first, second, stats
+
+    server, first, second, stats = asyncio.run(scenario())
+    assert [r["id"] for r in first] == ["A0", "A1", "A2", "A3", "A4"]
+    assert [r["box_id"] for r in first] == [1, 1, 2, 2, 3]
+    assert second[0]["status"] == "reprovada" and second[0]["box_id"] is None
+    assert not second[1]["ok"] and not second[2]["ok"]
+    assert not second[3]["ok"]  # ID repetido
+    assert stats["quality"]["total_pieces"] == 6
+    assert stats["storage"]["total_stored_pieces"] == 5
+    print("  ✓ Registros concorrentes em ordem e caixas determinísticas")
+
+    async def packed(storage, lengths):
+        server = InspectionServer(storage_service=storage)
+        port = await server.start("127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b"".join(
+            json.dumps({"weight": 100, "color": "azul", "length": length}).encode() + b"\n"
+            for length in lengths
+        ))
+        responses = [json.loads(await reader.readline()) for _ in lengths]
+        writer.close()
+        await server.stop()
+        return responses
+
+    storage = StorageService(strategy="first-fit", max_length=30)
+    responses = asyncio.run(packed(storage, [20, 20, 10, 10]))
+    assert [r["box_id"] for r in responses] == [1, 2, 1, 2]
+    assert [storage.find_box_by_piece(r["id"]).box_id for r in responses] == [1, 2, 1, 2]
+    responses = asyncio.run(packed(StorageService(max_length=12), [15, 11]))
+    assert responses[0]["status"] == "aprovada" and responses[0]["box_id"] is None
+    assert "comprimento 15.0cm > 12cm" in responses[0]["storage_error"]
+    assert responses[1]["box_id"] == 1 and "storage_error" not in responses[1]
+    print("  ✓ Caixas lidas do índice com first-fit; peça fora dos limites sem caixa")
+
+
+def test_lane_storage_stress():
+    """Testa armazenamento concorrente em várias linhas de embalagem."""
+    print("\nTestando armazenamento paralelo por linhas...")
+
+    count = 3000
+    quality = QualityService()
+    pieces = quality.register_pieces([100.0] * count, ["azul"] * count, [15.0] * count)
+    storage = LaneStorageService(box_capacity=7, lanes=4)
+
+    def station(number):
+        # Cada peça é enviada por duas estações, em linhas diferentes
+        for index, piece in enumerate(pieces):
+            if index % 4 in (number % 4, (number + 1) % 4):
+                if index % 3:
+                    storage.store_piece(piece, lane=number % 4)
+                else:
+                    storage.store_piece(piece)
+
+    threads = [threading.Thread(target=station, args=(n,)) for n in range(8)]
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)  # força trocas de thread frequentes
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    stored_ids = [piece.piece_id for box in storage.boxes for piece in box.pieces]
+    assert len(stored_ids) == len(set(stored_ids)) == count
+    assert all(len(box.pieces) <= box.capacity for box in storage.boxes)
+    assert all(box.is_full() for box in storage.boxes if box.is_closed)
+    assert len({box.box_id for box in storage.boxes}) == len(storage.boxes)
+    assert sum(not box.is_closed for box in storage.boxes) <= 4
+    stats = storage.get_statistics()
+    assert stats["total_stored_pieces"] == count
+    assert stats["closed_boxes"] + stats["open_boxes"] == stats["total_boxes"]
+    assert not storage.store_piece(pieces[0])
+    print("  ✓ Nenhuma caixa acima da capacidade e nenhuma peça repetida")
+
+    # Linhas intercaladas no journal são recuperadas nas caixas certas
+    directory = tempfile.mkdtemp()
+    quality, _, journal = open_services(directory, box_capacity=3)
+    lanes = LaneStorageService(box_capacity=3, lanes=2, journal=journal)
+    for index, piece in enumerate(quality.register_pieces([100.0] * 7, ["azul"] * 7, [15.0] * 7)):
+        lanes.store_piece(piece, lane=index % 2)
+    journal.close()
+    _, recovered, journal = open_services(directory, box_capacity=3)
+    contents = lambda service: [
+        (box.box_id, [piece.piece_id for piece in box.pieces]) for box in service.boxes
+        if box.pieces
+    ]
+    assert contents(recovered) == contents(lanes)
+    journal.close()
+    print("  ✓ Caixas de linhas paralelas recuperadas do journal")
+
+
+def test_sharded_inspection():
+    """Testa o registro particionado entre processos e o relatório somado."""
+    print("\nTestando inspeção particionada...")
+
+    weights = [100.0, 200.0, 100.0, 100.0, 99.0, 100.0, 100.0]
+    colors = ["azul", "azul", "vermelho", "verde", "azul", "verde", "azul"]
+    lengths = [15.0] * 7
+
+    single_quality, single_storage = QualityService(), StorageService(box_capacity=2)
+    single_storage.store_pieces(single_quality.register_pieces(weights, colors, lengths))
+
+    with ShardedInspection(shards=2, box_capacity=2) as sharded:
+        assert sharded.register_pieces(weights, colors, lengths) == 5
+        try:
+            sharded.register_pieces([100.0], ["azul"], [15.0], custom_ids=["P001"])
+            assert False, "Deveria recusar ID repetido"
+        except ValueError:
+            pass
+
+        report = ReportGenerator(sharded.quality, sharded.storage)
+        data = report.get_consolidated_data()
+        assert data["quality"] == single_quality.get_statistics()
+        assert data["storage"]["total_stored_pieces"] == 5
+        assert len(data["shards"]) == 2
+        assert sum(s["quality"]["total_pieces"] for s in data["shards"]) == 7
+        assert len(data["pieces"]["approved"]) == 5
+        assert "RELATÓRIO FINAL" in report.generate_summary_report()
+
+        assert sharded.remove_piece("P001") and not sharded.remove_piece("P001")
+        assert sharded.storage.get_statistics()["total_stored_pieces"] == 4
+        assert sharded.quality.get_statistics()["total_pieces"] == 6
+    print("  ✓ Shards somados no relatório consolidado")
+
+    rules = RuleSet.from_dict({"product": "sku-9", "rules": [
+        {"field": "color", "allowed": ["preto"]},
+        {"field": "weight", "min": 50, "unit": "g"},
+    ]})
+    with ShardedInspection(shards=1, rules=rules) as sharded:
+        sharded.register_pieces([40.0], ["preto"], [25.0])
+        rejected, = sharded.quality.get_rejected_pieces()
+        assert rejected.rejection_reason == "Peso fora do padrão (40.0g - mínimo: 50g)"
+    print("  ✓ Motivos dos shards montados pelas regras do shard")
+
+
+def test_line_registry():
+    """Testa linhas isoladas, carga sob demanda, descarte ocioso e o relatório da planta."""
+    print("\nTestando registro de linhas de produção...")
+
+    rules = RuleSet.from_dict({
+        "product": "sku-9",
+        "rules": [{"field": "weight", "min": 50, "max": 80, "unit": "g"}],
+    })
+    products = RuleRegistry(default=QualityValidator.rules)
+    products.register(rules)
+
+    now = [0.0]
+    directory = tempfile.mkdtemp()
+    plant = LineRegistry(products, data_dir=directory, idle_seconds=60, clock=lambda: now[0])
+    plant.add_line("L1")
+    plant.add_line("L2", product="sku-9", box_capacity=2)
+    try:
+        plant.add_line("L1")
+        assert False, "Deveria recusar linha repetida"
+    except ValueError:
+        pass
+    assert plant.loaded_lines() == []
+
+    assert plant.register_piece("L1", 100, "azul", 15, "A").is_approved()
+    assert plant.register_piece("L2", 60, "preto", 25, "A").is_approved()
+    plant.register_pieces("L2", [70.0, 100.0], ["preto", "azul"], [25.0, 15.0])
+    assert plant.line("L2").storage.get_statistics()["closed_boxes"] == 1
+    assert plant.loaded_lines() == ["L1", "L2"]
+    print("  ✓ Linhas isoladas, com regras e capacidade próprias")
+
+    now[0] = 50.0
+    plant.line("L2")
+    assert plant.evict_idle(now=61.0) == ["L1"]
+    assert plant.loaded_lines() == ["L2"]
+    stats = plant.line_statistics()
+    assert [(s["line"], s["loaded"], s["quality"]["total_pieces"]) for s in stats] == [
+        ("L1", False, 1), ("L2", True, 3)
+    ]
+    assert plant.quality.get_statistics()["total_pieces"] == 4
+    assert plant.quality.get_statistics()["approved_count"] == 3
+    assert plant.storage.get_statistics()["total_stored_pieces"] == 3
+
+    # A linha descarregada volta do checkpoint no próximo uso
+    assert plant.line("L1").quality.get_piece_by_id("A").weight == 100
+    print("  ✓ Linha ociosa descarregada e recarregada do diretório")
+
+    report = ReportGenerator(plant.quality, plant.storage)
+    text = report.generate_summary_report()
+    assert "LINHAS DE PRODUÇÃO" in text and "L2 (sku-9): 3 peça(s)" in text
+    data = report.get_consolidated_data()
+    assert len(data["lines"]) == 2 and len(data["pieces"]["approved"]) == 3
+    plant.close()
+    assert plant.loaded_lines() == []
+
+    # Recarga das regras do produto chega às linhas carregadas; as descarregadas
+    # deixam de ser acompanhadas
+    bounded = LineRegistry(products, data_dir=directory, max_loaded=1)
+    bounded.add_line("L1")
+    bounded.add_line("L2", product="sku-9", box_capacity=2)
+    assert bounded.line("L2").quality.get_statistics()["total_pieces"] == 3
+    products.register(RuleSet.from_dict({
+        "product": "sku-9",
+        "rules": [{"field": "weight", "min": 65, "max": 80, "unit": "g"}],
+    }))
+    assert bounded.register_piece("L2", 60, "preto", 25).is_rejected()
+    evicted = bounded.line("L2").quality
+    bounded.line("L1")
+    assert bounded.loaded_lines() == ["L1"]
+    products.register(rules)
+    assert evicted.rules is not rules
+    assert bounded.quality.get_statistics()["total_pieces"] == 5
+    # As listas de peças leem a linha descarregada dos arquivos, sem carregá-la
+    rejected = bounded.quality.get_rejected_pieces()
+    assert bounded.loaded_lines() == ["L1"]
+    assert len(rejected) + len(bounded.quality.get_approved_pieces()) == 5
+    assert [piece.weight for piece in rejected if piece.length == 25] == [60]
+    bounded.close()
+
+    try:
+        LineRegistry(max_loaded=2)
+        assert False, "Deveria exigir diretório de dados"
+    except ValueError:
+        pass
+    print("  ✓ Resumo por linha e da planta sem percorrer as peças")
+
+
+def test_event_bus():
+    """Testa o barramento de eventos com filas limitadas e assinantes lentos."""
+    print("\nTestando barramento de eventos...")
+
+    bus = EventBus()
+    received = []
+    bus.subscribe(received.append, name="todos")
+    rejected = []
+    bus.subscribe(lambda event: rejected.append(event["piece_id"]), kinds=PIECE_REJECTED,
+                  name="reprovadas")
+    quality = QualityService(events=bus)
+    storage = StorageService(box_capacity=2, events=bus)
+    storage.store_pieces(quality.register_pieces([100, 100, 80], ["azul", "verde", "azul"],
+                                                 [15, 15, 15], ["A", "B", "C"]))
+    quality.remove_piece("C")
+    assert bus.flush(5)
+    assert [event.kind for event in received] == [
+        PIECE_REGISTERED, PIECE_REGISTERED, PIECE_REGISTERED, PIECE_REJECTED,
+        PIECE_STORED, PIECE_STORED, BOX_CLOSED, PIECE_REMOVED,
+    ]
+    assert [event.sequence for event in received] == sorted(event.sequence for event in received)
+    assert received[6]["piece_ids"] == ("A", "B") and rejected == ["C"]
+    print("  ✓ Eventos de peças e caixas entregues na ordem a cada assinante")
+
+    gate = threading.Event()
+
+    def slow(event):
+        gate.wait(5)
+
+    dropping = bus.subscribe(slow, kinds=[PIECE_REGISTERED], capacity=2, policy=DROP_OLDEST)
+    spilling = bus.subscribe(slow, kinds=[PIECE_REGISTERED], capacity=2, policy=SPILL,
+                             batch_size=2, spill_dir=tempfile.mkdtemp())
+    failing = bus.subscribe(lambda event: 1 / 0, kinds=[PIECE_REMOVED], name="falha")
+    quality.register_pieces([100] * 20, ["azul"] * 20, [15] * 20)
+    quality.remove_piece("A")
+    time.sleep(0.02)
+    statistics = bus.statistics()["subscribers"]
+    assert statistics["slow"]["dropped"] > 0 and statistics["slow"]["pending"] <= 4
+    assert statistics["slow-2"]["on_disk"] > 0 and statistics["slow-2"]["dropped"] == 0
+    assert statistics["slow-2"]["lag_seconds"] > 0
+    gate.set()
+    assert bus.flush(5)
+    assert spilling.delivered == 20 and spilling.spilled >= 16
+    assert spilling.statistics()["on_disk"] == 0
+    assert dropping.delivered + dropping.dropped == 20
+    assert failing.errors == 1 and "ZeroDivisionError" in failing.last_error
+    print("  ✓ Assinante lento não segura o cadastro (descarte e transbordo em disco)")
+
+    # Vários publicadores transbordando ao mesmo tempo mantêm a ordem de cada um
+    held = threading.Event()
+    seen = []
+    ordered = bus.subscribe(lambda event: (held.wait(5), seen.append(event.data)),
+                            kinds=[PIECE_STORED], capacity=4, policy=SPILL, batch_size=3,
+                            spill_dir=tempfile.mkdtemp())
+    publishers = [
+        threading.Thread(target=lambda lane=lane: [
+            bus.publish(PIECE_STORED, {"piece_id": (lane, number), "box_id": lane})
+            for number in range(200)
+        ])
+        for lane in range(4)
+    ]
+    for publisher in publishers:
+        publisher.start()
+    for publisher in publishers:
+        publisher.join(5)
+    held.set()
+    assert bus.flush(5) and ordered.spilled > 0 and len(seen) == 800
+    for lane in range(4):
+        numbers = [data["piece_id"][1] for data in seen if data["box_id"] == lane]
+        assert numbers == list(range(200))
+    bus.unsubscribe(ordered)
+
+    gate.clear()
+    blocking = bus.subscribe(slow, kinds=[PIECE_REMOVED], capacity=1, policy=BLOCK)
+    publisher = threading.Thread(target=lambda: [quality.remove_piece(i) for i in ("B", "P001", "P002")])
+    publisher.start()
+    time.sleep(0.05)
+    assert publisher.is_alive() and blocking.statistics()["pending"] == 2
+    gate.set()
+    publisher.join(5)
+    assert bus.flush(5) and blocking.delivered == 3
+
+    for invalid in (dict(policy="fila"), dict(kinds=["PecaCadastrada"]), dict(capacity=0)):
+        try:
+            bus.subscribe(slow, **invalid)
+            assert False, "Assinatura inválida deveria falhar"
+        except ValueError:
+            pass
+    bus.close()
+    assert bus.publish(PIECE_REMOVED, {"piece_id": "X"}) is None
+    print("  ✓ Política 'block' aplica contrapressão ao publicador")
+
+    async def scenario():
+        async_bus = EventBus()
+        delivered = []
+
+        async def handler(event):
+            await asyncio.sleep(0)
+            delivered.append(event["box_id"])
+
+        try:
+            async_bus.subscribe(handler, loop=asyncio.get_running_loop(), policy=BLOCK)
+            assert False, "'block' com asyncio deveria falhar"
+        except ValueError:
+            pass
+        subscription = async_bus.subscribe(handler, kinds=[BOX_CLOSED],
+                                           loop=asyncio.get_running_loop())
+        service = StorageService(box_capacity=1, events=async_bus)
+        service.store_pieces(QualityService().register_pieces([100] * 3, ["azul"] * 3, [15] * 3))
+        for _ in range(100):
+            if subscription.statistics()["pending"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        async_bus.close()
+        return delivered
+
+    assert asyncio.run(scenario()) == [1, 2, 3]
+    print("  ✓ Assinante asyncio com corrotina como handler")
+
+    # Barramento dos pontos de entrada: sem assinantes, ou gravando NDJSON
+    quality, storage = QualityService(), StorageService(box_capacity=2)
+    bus = attach_event_bus(quality, storage)
+    assert quality.events is bus and storage.events is bus and not bus.subscriptions
+    bus.close()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "eventos.ndjson")
+        assert batch_main(["--events-log", path, "register", "100", "azul", "15"]) == 0
+        with open(path, encoding="utf-8") as handle:
+            kinds = [json.loads(line)["kind"] for line in handle]
+        assert kinds == [PIECE_REGISTERED, PIECE_STORED]
+    print("  ✓ Barramento ligado pelos pontos de entrada, com log de eventos opcional")
+
+
+def test_instrumentation():
+    """Testa histogramas de baldes fixos, a troca de métodos e a exposição."""
+    print("\nTestando instrumentação...")
+
+    registry = MetricsRegistry()
+    histogram = registry.histogram("lat", bounds=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(value)
+    assert histogram.cumulative() == [2, 3, 4]
+    assert histogram.quantile(0.5) == 0.1
+    assert registry.histogram("lat", bounds=(0.1, 1.0)) is histogram
+    try:
+        registry.counter("lat")
+        assert False, "Deveria recusar o mesmo nome com outro tipo"
+    except ValueError:
+        pass
+
+    original = QualityService.register_piece
+    instrumentation = Instrumentation()
+    with instrumentation:
+        assert QualityService.register_piece is not original
+        quality, storage = QualityService(), StorageService(box_capacity=2)
+        for weight in (100.0, 100.0, 200.0, 100.0):
+            storage.store_piece(quality.register_piece(weight, "azul", 15.0))
+        assert QualityValidator.validate(quality.get_piece_by_id("P001"))[0]
+        ReportGenerator(quality, storage).generate_summary_report()
+        try:
+            Instrumentation().enable()
+            assert False, "Deveria recusar duas instrumentações ligadas"
+        except RuntimeError:
+            pass
+    assert QualityService.register_piece is original
+    assert not instrumentation.enabled
+
+    assert instrumentation.stage("register_piece").count == 4
+    assert instrumentation.stage("apply_validation").count == 4
+    assert instrumentation.stage("validate").count == 1
+    assert instrumentation.stage("store_piece").count == 4
+    assert instrumentation.stage("create_box").count == 2
+    assert instrumentation.stage("summary_report").count == 1
+
+    text = render_prometheus(instrumentation.registry)
+    assert "# TYPE factorysense_stage_seconds histogram" in text
+    assert 'factorysense_stage_seconds_count{stage="register_piece"} 4' in text
+    assert 'factorysense_stage_seconds_bucket{stage="store_piece",le="+Inf"} 4' in text
+    stages = {
+        entry["labels"]["stage"]: entry for entry in snapshot(instrumentation.registry)["metrics"]
+        if entry["type"] == "histogram"
+    }
+    assert stages["create_box"]["count"] == 2
+
+    from urllib.request import urlopen
+    server = MetricsHTTPServer(instrumentation.registry)
+    port = server.start()
+    try:
+        with urlopen(f"http://127.0.0.1:{port}/metrics.json") as response:
+            assert json.loads(response.read())["metrics"]
+        with urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            assert b"factorysense_stage_errors_total" in response.read()
+    finally:
+        server.stop()
+    print("  ✓ Etapas medidas, métodos restaurados e métricas expostas por HTTP")
+
+
+def test_batch_cli():
+    """Testa o modo em lote: arquivo de comandos, saída NDJSON e persistência."""
+    print("\nTestando modo em lote...")
+    from main import batch_command
+
+    assert batch_command(["--data-dir", "report", "run", "x.txt"])
+    assert not batch_command(["--data-dir", "report"])
+    assert not batch_command([])
+
+    stream = io.StringIO()
+    quality, storage = QualityService(), StorageService(box_capacity=2)
+    session = BatchSession(quality, storage, BatchOutput(stream, json_mode=True))
+    errors = session.run_script([
+        "# turno A",
+        "register 100 azul 15",
+        "register 101 verde 12 X1",
+        "register abc azul 15",
+        "register 200 azul 15",
+        "remove X1 --reopen",
+        "register 100 azul 15 P001",
+        "boxes --current",
+        "desconhecido",
+        "report",
+    ], batch_size=2)
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert errors == 1
+
+    batches = [r for r in records if r["command"] == "register_batch"]
+    assert [r["rows"] for r in batches] == [2, 1, 0]
+    assert sum(r["invalid_rows"] for r in batches) == 2  # malformada + ID repetido
+    assert {"command": "remove", "id": "X1", "removed": True, "box_id": 1} in records
+    assert records[-3]["command"] == "box" and records[-3]["box_id"] == 2
+    assert records[-2]["line"] == 9
+    assert records[-1]["quality"] == quality.get_statistics()
+    assert quality.get_statistics()["total_pieces"] == 2
+    assert storage.get_statistics()["total_stored_pieces"] == 1
+
+    with tempfile.TemporaryDirectory() as directory:
+        data_dir = os.path.join(directory, "dados")
+        script = os.path.join(directory, "turno.txt")
+        output = os.path.join(directory, "saida.ndjson")
+        with open(script, "w", encoding="utf-8") as handle:
+            handle.write("register 100 azul 15\nregister 100 vermelho 15\n")
+        assert batch_main(["--data-dir", data_dir, "-o", output, "run", script]) == 0
+        assert batch_main(["--json", "--data-dir", data_dir, "-o", output, "report"]) == 0
+        with open(output, encoding="utf-8") as handle:
+            report = json.loads(handle.read())
+        assert report["quality"]["approved_count"] == 1
+        assert report["quality"]["rejected_count"] == 1
+        assert report["storage"]["total_stored_pieces"] == 1
+    print("  ✓ Comandos em lote, NDJSON e recuperação do diretório")
+
+
 def main():
     """Executa todos os testes."""
     print("=" * 60)
@@ -133,11 +1533,34 @@ def main():
 
     try:
         test_piece_creation()
+        test_piece_store()
         test_quality_validation()
+        test_batch_validation()
+        test_rule_engine()
+        test_localized_reasons()
         test_box_storage()
         test_quality_service()
+        test_incremental_statistics()
+        test_rolling_metrics()
+        test_process_control()
+        test_piece_query()
         test_storage_service()
+        test_box_indexes()
+        test_consistent_removal()
+        test_packing_strategies()
         test_report_generation()
+        test_journal_recovery()
+        test_mapped_snapshot()
+        test_sqlite_repository()
+        test_streaming_export()
+        test_streaming_ingestion()
+        test_inspection_server()
+        test_lane_storage_stress()
+        test_sharded_inspection()
+        test_line_registry()
+        test_event_bus()
+        test_instrumentation()
+        test_batch_cli()
 
         print("\n" + "=" * 60)
         print("✓ TODOS OS TESTES PASSARAM COM SUCESSO!")